@@ -32,6 +32,8 @@ import Misc
 import TransanaConstants
 # import Transana's Globals
 import TransanaGlobal
+# import Transana's persistent Media Job Queue
+import MediaJobQueue
 # import Transana's waveform progress routines
 import WaveformProgress
 # import Python's locale module
@@ -205,6 +207,17 @@ class BatchFileProcessor(Dialogs.GenForm):
         # Initialize the process variable
         self.process = None
 
+        # For Audio Extraction (waveform creation) ...
+        if self.mode == "waveform":
+            # ... load the persistent job queue, which remembers work left unfinished by an earlier session
+            self.jobQueue = MediaJobQueue.MediaJobQueue(os.path.join(TransanaGlobal.configData.GetDefaultProfilePath(), 'BatchJobQueue.dat'))
+            # Jobs that failed last time can be selected again if the user wants to retry them
+            self.jobQueue.ClearFailedJobs()
+            # Add the files from any unfinished jobs to the File List so the batch can be resumed
+            for job in self.jobQueue.PendingJobs():
+                if not (job['source'] in self.fileList.GetStrings()):
+                    self.fileList.Append(job['source'])
+
     def get_input(self):
         """ Get the Input values from the Batch Waveform Generator form and process the selected files """
         # Show the form and get the user response to the form.
@@ -228,8 +241,28 @@ class BatchFileProcessor(Dialogs.GenForm):
 
     def AudioExtract(self, data):
         """ Perform Audio Extraction using as many threads as possible """
-        # Set the list of data files to be processed
-        self.processFileList = data
+        # Determine how many extractions to run at once.  0 means one per processor.
+        if TransanaGlobal.configData.batchProcessCount > 0:
+            self.maxConversions = TransanaGlobal.configData.batchProcessCount
+        else:
+            self.maxConversions = multiprocessing.cpu_count()
+        # Drop any unfinished jobs from an earlier session that the user removed from the File List
+        for job in self.jobQueue.PendingJobs():
+            if not (job['source'] in data):
+                self.jobQueue.JobCancelled(job)
+        # Add the data files to be processed to the job queue
+        for filename in data:
+            # Split the path off of the file name
+            (path, filenameroot) = os.path.split(filename)
+            # Split the extension off the file name
+            (filenameroot, extension) = os.path.splitext(filenameroot)
+            # Build the filename for the extracted audio out of the filename parts
+            waveFilename = os.path.join(TransanaGlobal.configData.visualizationPath, filenameroot + '.wav')
+            self.jobQueue.AddJob(filename, waveFilename)
+        # Save the job queue, so the batch can be resumed if Transana is closed before it's done
+        self.jobQueue.Save()
+        # Start the throughput statistics
+        self.jobQueue.ResetStatistics()
         # Create a Timer to control the multi-thread audio extraction process
         self.processTimer = wx.Timer(self, ID_PROCESSTIMER)
         wx.EVT_TIMER(self, ID_PROCESSTIMER, self.OnTimer)
@@ -238,23 +271,23 @@ class BatchFileProcessor(Dialogs.GenForm):
 
     def OnTimer(self, event):
         """ Check the threads to see if we need to add more extraction processes """
-        # While there are processors free and files to process ...
-        while (len(self.runningConversions) < multiprocessing.cpu_count()) and (len(self.processFileList) > 0):
-            # Get the current filename
-            filename = self.processFileList[0]
+        # While there are processors free and jobs to process ...
+        while (len(self.runningConversions) < self.maxConversions) and (self.jobQueue.NextJob() != None):
+            # Get the next job
+            job = self.jobQueue.NextJob()
             # Remember the original File Name that is passed in
-            originalFilename = filename
-            # Split the path off of the file name
-            (path, filename) = os.path.split(filename)
-            # Split the extension off the file name
-            (filenameroot, extension) = os.path.splitext(filename)
+            originalFilename = job['source']
             # Build the progress box's label
             # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
             prompt = unicode(_("Extracting %s\nfrom %s"), 'utf8')
-            # Build the filename for the extracted audio out of the filename parts
-            self.waveFilename = os.path.join(TransanaGlobal.configData.visualizationPath, filenameroot + '.wav')
-            # If there is no extracted audio file, OR if we're over-writing extracted audio ...
-            if not(os.path.exists(self.waveFilename)) or self.overwrite.GetValue():
+            # Get the filename for the extracted audio
+            self.waveFilename = job['dest']
+            # If the extracted audio file is up to date with the media file, and we're not over-writing extracted audio ...
+            if not self.overwrite.GetValue() and self.jobQueue.IsUpToDate(job):
+                # ... we can skip this file
+                self.jobQueue.JobSkipped(job)
+            # Otherwise ...
+            else:
                 # Create the Progress Dialog, allowing MULTIPLE THREADS
                 progressDialog = WaveformProgress.WaveformProgress(self,
                                                                    prompt % (self.waveFilename, originalFilename),
@@ -271,25 +304,76 @@ class BatchFileProcessor(Dialogs.GenForm):
                 progressDialog.indexNum = indexNum
                 # Have the Progress Dialog remember the name of the file being converted
                 progressDialog.originalFilename = originalFilename
+                # Have the Progress Dialog remember its job
+                progressDialog.job = job
                 # Add the Progress Dialog to the dictionary that holds the running conversions
                 self.runningConversions[indexNum] = progressDialog
+                # Signal that the job is running
+                self.jobQueue.JobStarted(job)
+                # Media Conversion jobs need their conversion command
+                if job['mode'] == 'CustomConvert':
+                    progressDialog.SetProcessCommand(job['processCommand'])
                 # Tell the Waveform Progress Dialog to handle the audio extraction modally.
-                progressDialog.Extract(originalFilename, self.waveFilename)
-            # Remove the file from the list
-            self.processFileList = self.processFileList[1:]
+                progressDialog.Extract(originalFilename, self.waveFilename, mode=job['mode'])
 
-        # If we've requested extractio for all Files, we can stop the timer.
-        if len(self.processFileList) == 0:
+        # If we've requested extraction for all Files, we can stop the timer.
+        if self.jobQueue.NextJob() == None:
             self.processTimer.Stop()
+            # If every remaining job was skipped, no conversion will complete to finish the batch, so finish it here
+            self.CheckBatchComplete()
 
     def OnConvertComplete(self, progressDlg):
+        # Get the job that was being processed
+        job = progressDlg.job
+        # Get the Error Log that may have been created
+        errorLog = progressDlg.GetErrorMessages()
+        # If the user cancelled the extraction ...
+        if (len(errorLog) == 1) and (errorLog[0] == 'Cancelled'):
+            # ... drop the job from the queue
+            self.jobQueue.JobCancelled(job)
+        else:
+            # The job succeeded if it produced a destination file
+            success = os.path.exists(job['dest']) and (os.path.getsize(job['dest']) > 0)
+            # If it failed, remove any partial file so it won't look up to date
+            if not success and os.path.exists(job['dest']):
+                try:
+                    os.remove(job['dest'])
+                except OSError:
+                    pass
+            # Record the result.  If the job is going to be retried, make sure the timer is running to start it.
+            if self.jobQueue.JobFinished(job, success, errorLog) and not self.processTimer.IsRunning():
+                self.processTimer.Start(500)
         # Remove this conversion from the dictionary of running conversions
         del(self.runningConversions[progressDlg.indexNum])
-        # If we have NO MORE running conversions ...
-        if len(self.runningConversions) == 0:
+        # If this was the last job, finish the batch
+        self.CheckBatchComplete()
+
+    def CheckBatchComplete(self):
+        """ If there are no running conversions and no jobs waiting, report the results and close """
+        # If we have NO MORE running conversions and no more jobs waiting ...
+        if (len(self.runningConversions) == 0) and (self.jobQueue.NextJob() == None):
+            # Report the results of the batch
+            self.ReportResults()
             # Close and destroy the Batch File Processor
             self.Close()
 
+    def ReportResults(self):
+        """ Report how many files were processed, skipped, and failed, and the throughput achieved """
+        (filesPerMinute, mbPerSecond) = self.jobQueue.GetThroughput()
+        # Build the results message
+        prompt = unicode(_("%d file(s) processed, %d file(s) skipped as up to date, %d file(s) failed.\n%0.1f files per minute, %0.2f MB per second."), 'utf8')
+        msg = prompt % (self.jobQueue.filesProcessed, self.jobQueue.filesSkipped, self.jobQueue.filesFailed, filesPerMinute, mbPerSecond)
+        # If any files failed, list them
+        failedJobs = [job for job in self.jobQueue.jobs if job['status'] == MediaJobQueue.JOB_FAILED]
+        if len(failedJobs) > 0:
+            msg += '\n\n' + unicode(_("Failed:"), 'utf8')
+            for job in failedJobs:
+                msg += '\n  %s' % job['source']
+        # Display the results
+        dlg = Dialogs.InfoDialog(self, msg)
+        dlg.ShowModal()
+        dlg.Destroy()
+
     def OnBrowse(self, evt):
         """ Invoked when the user presses the Get Files button. """
         if self.mode == "document":
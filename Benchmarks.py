@@ -0,0 +1,438 @@
+# Copyright (C) 2002 - 2017 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+""" Headless performance benchmarks for Transana's data paths.  Results are written as JSON so they
+    can be compared between releases.
+
+    Usage:  python Benchmarks.py sqlite [rows] [output.json]
+            python Benchmarks.py startup [modules] [output.json]
+            python Benchmarks.py suite [name=count ...] [output.json]
+
+      sqlite   compares bulk import and export speed with and without the sqlite performance
+               profile (DBInterface.SQLITE_PROFILE).  Requires the sqlite version of Transana.
+      startup  times the import of each module Transana loads at start-up, in a fresh Python
+               process, and reports the most expensive ones.
+      suite    generates an sqlite database and times Transana's core non-GUI data paths against it:
+               the DBInterface list_of_* functions, search query building and execution, report data
+               assembly, XML export and import, time code stripping, UTF-8 decoding, word counting and waveform drawing.
+               The database is made by ProjectGenerator, and its size is set with the same counts,
+               for example "libraries=10 clips=50".  Requires the sqlite version of Transana. """
+
+__author__ = 'David Woods <dwoods@transana.com>'
+
+# import wxPython
+import wx
+if __name__ == '__main__':
+    # Define the "_" method, pointing it to wxPython's GetTranslation method
+    __builtins__._ = wx.GetTranslation
+
+# import Python's array module
+import array
+# import Python's json module
+import json
+# import Python's math module
+import math
+# import Python's os module
+import os
+# import Python's subprocess module
+import subprocess
+# import Python's sys module
+import sys
+# import Python's tempfile module
+import tempfile
+# import Python's time module
+import time
+# import Python's wave module
+import wave
+
+# import Transana's Configuration Data
+import ConfigData
+# import Transana's Database Interface
+import DBInterface
+# import Transana's Project Generator
+import ProjectGenerator
+# import Transana's Constants
+import TransanaConstants
+# import Transana's Global Variables
+import TransanaGlobal
+
+# The random number seed used to generate the suite's database, so every run uses the same data
+SUITE_SEED = 1
+# The number of times the quicker suite benchmarks are repeated, so their times are large enough to measure
+SUITE_REPEAT = 20
+
+
+def InitializeBenchmarks():
+    """ Set up the parts of Transana the benchmarks need without starting the user interface.
+        Returns the wx.App, which must be kept for as long as the benchmarks run. """
+    # Create a wx.App, which wxPython needs before the Configuration Data can be loaded
+    app = wx.App(False)
+    # Load the Configuration Data
+    TransanaGlobal.configData = ConfigData.ConfigData()
+    # Add the RTF modules to the Python module search path, as Transana does at startup
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rtf'))
+    return app
+
+def TimeCall(func, *args):
+    """ Call func(*args) and return the number of seconds it took """
+    startTime = time.time()
+    func(*args)
+    return time.time() - startTime
+
+def _CreateSQLiteTables(dbConn):
+    """ Create the Clips and Clip Keywords tables in an sqlite benchmark database """
+    dbCursor = dbConn.cursor()
+    dbCursor.execute(DBInterface.CreateClipsTableQuery(2))
+    dbCursor.execute(DBInterface.CreateClipKeywordsTableQuery(2))
+    dbCursor.close()
+
+def _ImportSQLiteRows(dbConn, rows, useTransaction):
+    """ Insert rows Clips, each with three keywords, the way an import does """
+    dbCursor = dbConn.cursor()
+    # With the profile, bulk writers wrap their work in a single transaction (see DBInterface.RunInTransaction())
+    if useTransaction:
+        dbCursor.execute('BEGIN')
+    for clipNum in range(1, rows + 1):
+        query = """ INSERT INTO Clips2 (ClipID, CollectNum, EpisodeNum, MediaFile, ClipStart, ClipStop, ClipOffset, Audio,
+                                        ClipComment, SortOrder, RecordLock, LockTime)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) """
+        dbCursor.execute(query, ('Clip %d' % clipNum, clipNum % 50, clipNum % 20, 'media.mp4', clipNum * 1000,
+                                 clipNum * 1000 + 5000, 0, 1, '', clipNum, '', None))
+        for kwNum in range(3):
+            query = """ INSERT INTO ClipKeywords2 (EpisodeNum, DocumentNum, ClipNum, QuoteNum, SnapshotNum, KeywordGroup, Keyword, Example)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?) """
+            dbCursor.execute(query, (0, 0, clipNum, 0, 0, 'Group %d' % (clipNum % 10), 'Keyword %d' % ((clipNum + kwNum) % 100), ''))
+    if useTransaction:
+        dbCursor.execute('COMMIT')
+    dbCursor.close()
+
+def _ExportSQLiteRows(dbConn):
+    """ Read all Clips and their keywords back, the way an export does """
+    dbCursor = dbConn.cursor()
+    query = """ SELECT c.ClipNum, c.ClipID, c.CollectNum, ck.KeywordGroup, ck.Keyword
+                FROM Clips2 c, ClipKeywords2 ck
+                WHERE c.ClipNum = ck.ClipNum
+                ORDER BY c.CollectNum, c.SortOrder """
+    dbCursor.execute(query)
+    dbCursor.fetchall()
+    dbCursor.close()
+
+def BenchmarkSQLiteProfile(rows=5000):
+    """ Compare bulk import and export times for an sqlite database opened with the old default
+        settings (autocommit for every statement) and with the performance profile plus a single
+        transaction.  Returns a dictionary of results. """
+    results = {'benchmark' : 'sqliteProfile', 'rows' : rows}
+    for (label, useProfile) in [('default', False), ('profile', True)]:
+        # Create an empty database file in the temp directory
+        (fd, dbName) = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        try:
+            dbConn = DBInterface.ConnectSQLite(dbName, useProfile)
+            _CreateSQLiteTables(dbConn)
+            importTime = TimeCall(_ImportSQLiteRows, dbConn, rows, useProfile)
+            exportTime = TimeCall(_ExportSQLiteRows, dbConn)
+            dbConn.close()
+        finally:
+            # Remove the database file, and the write-ahead log files if there are any
+            for suffix in ['', '-wal', '-shm']:
+                if os.path.exists(dbName + suffix):
+                    os.remove(dbName + suffix)
+        results[label] = {'import' : importTime, 'export' : exportTime}
+    # Report how many times faster the profile is
+    results['importSpeedup'] = results['default']['import'] / max(results['profile']['import'], 0.000001)
+    results['exportSpeedup'] = results['default']['export'] / max(results['profile']['export'], 0.000001)
+    return results
+
+def BenchmarkStartupImports(count=40):
+    """ Time the import of each module Transana loads at start-up.  This is done in a new Python process,
+        so that nothing has already been imported.  Returns a dictionary of results, with the count
+        most expensive modules. """
+    # The script run in the new process.  The import timer is installed before anything else is imported.
+    script = "import StartupProfiler, json\n" + \
+             "timer = StartupProfiler.ImportTimer()\n" + \
+             "timer.Install()\n" + \
+             "import wx, __builtin__\n" + \
+             "__builtin__._ = wx.GetTranslation\n" + \
+             "import Transana\n" + \
+             "timer.Uninstall()\n" + \
+             "print json.dumps(timer.GetResults())\n"
+    startTime = time.time()
+    process = subprocess.Popen([sys.executable, '-c', script], cwd=os.path.dirname(os.path.abspath(__file__)),
+                               stdout=subprocess.PIPE)
+    (output, errors) = process.communicate()
+    elapsed = time.time() - startTime
+    # The results are on the last line of the output
+    modules = json.loads(output.strip().splitlines()[-1])
+    results = {'benchmark' : 'startupImports',
+               'processTime' : elapsed,
+               'importTime' : sum([own for (name, total, own) in modules]),
+               'modules' : [{'name' : name, 'total' : total, 'self' : own} for (name, total, own) in modules[:count]]}
+    return results
+
+def _RepeatCall(repeat, func, *args):
+    """ Call func(*args) repeat times and return the average number of seconds each call took """
+    startTime = time.time()
+    for loop in range(repeat):
+        func(*args)
+    return (time.time() - startTime) / repeat
+
+def BenchmarkListFunctions():
+    """ Time the DBInterface list_of_* functions the Database Tree and reports use, against the current database.
+        Functions that take a record number are called once for each record.  Returns a dictionary of seconds. """
+    results = {}
+    libraries = DBInterface.list_of_series()
+    episodes = DBInterface.list_of_episodes()
+    collections = DBInterface.list_of_all_collections()
+    keywordGroups = DBInterface.list_of_keyword_groups()
+    results['list_of_series'] = TimeCall(DBInterface.list_of_series)
+    results['list_of_episodes'] = TimeCall(DBInterface.list_of_episodes)
+    results['list_of_episode_transcripts'] = TimeCall(DBInterface.list_of_episode_transcripts)
+    results['list_of_collections'] = TimeCall(DBInterface.list_of_collections)
+    results['list_of_all_collections'] = TimeCall(DBInterface.list_of_all_collections)
+    results['list_of_clips'] = TimeCall(DBInterface.list_of_clips)
+    results['list_of_keyword_groups'] = TimeCall(DBInterface.list_of_keyword_groups)
+    results['list_of_all_keywords'] = TimeCall(DBInterface.list_of_all_keywords)
+    results['list_of_episodes_for_series'] = TimeCall(lambda: [DBInterface.list_of_episodes_for_series(library[1]) for library in libraries])
+    results['list_of_clips_by_collectionnum'] = TimeCall(lambda: [DBInterface.list_of_clips_by_collectionnum(collection[0]) for collection in collections])
+    results['list_of_clips_by_episode'] = TimeCall(lambda: [DBInterface.list_of_clips_by_episode(episode[0]) for episode in episodes])
+    results['list_of_keywords_by_group'] = TimeCall(lambda: [DBInterface.list_of_keywords_by_group(kwg) for kwg in keywordGroups])
+    results['list_of_keywords'] = TimeCall(lambda: [DBInterface.list_of_keywords(Episode=episode[0]) for episode in episodes])
+    return results
+
+def BenchmarkSearch():
+    """ Time ProcessSearch.BuildQueries() and the execution of the queries it builds, for keyword searches with
+        AND, OR and NOT and for a text search.  Returns a dictionary of results for each search. """
+    # import Transana's Search module (only needed here)
+    import ProcessSearch
+    # Create a ProcessSearch object without running its __init__(), which displays the Search Dialog
+    search = ProcessSearch.ProcessSearch.__new__(ProcessSearch.ProcessSearch)
+    search.documentList = []
+    search.transcriptList = []
+    search.collectionList = []
+    searches = {'and' : [u'Group 00:Keyword 001 AND', u'Group 01:Keyword 012'],
+                'or' : [u'Group 00:Keyword 001 OR', u'Group 01:Keyword 012 OR', u'Group 02:Keyword 023'],
+                'not' : [u'Group 00:Keyword 001 AND', u'NOT Group 01:Keyword 012'],
+                'text' : [u'Item Text contains "triangle" AND', u'Group 00:Keyword 002']}
+    results = {}
+    for (name, searchTerms) in searches.items():
+        buildTime = _RepeatCall(SUITE_REPEAT, search.BuildQueries, searchTerms)
+        (documentQuery, episodeQuery, quoteQuery, clipQuery, wholeSnapshotQuery, snapshotCodingQuery, params, textSearchItems) = \
+            search.BuildQueries(searchTerms)
+        dbCursor = DBInterface.get_db().cursor()
+        count = 0
+        startTime = time.time()
+        for query in [documentQuery, episodeQuery, quoteQuery, clipQuery]:
+            dbCursor.execute(DBInterface.FixQuery(query), tuple(params))
+            count += len(dbCursor.fetchall())
+        executeTime = time.time() - startTime
+        dbCursor.close()
+        results[name] = {'build' : buildTime, 'execute' : executeTime, 'results' : count}
+    return results
+
+def BenchmarkReportData():
+    """ Time each stage of assembling the data for the global Collection Report, including all nested Collections,
+        their Notes, and the Quote text and Clip Transcripts.  Returns a dictionary of seconds for each stage. """
+    # import Transana's Report Data assembly (only needed here)
+    import ReportData
+    reportData = ReportData.ReportData()
+    majorList = reportData.GetCollectionItems(0, True)
+    itemKeys = [(objType, objNum) for (objType, objNum, objID, collectNum) in majorList]
+    reportData.LoadKeywords(itemKeys, detailKeywords=True)
+    reportData.LoadItems(itemKeys, quoteText=True, transcriptText=True)
+    reportData.LoadNotes(itemKeys + [('Collection', collectNum) for collectNum in reportData.collections.keys()])
+    results = {'items' : len(majorList), 'total' : reportData.GetTotalTime()}
+    for (stageName, seconds) in reportData.stageTimes:
+        results[stageName] = seconds
+    return results
+
+def BenchmarkXML(importDBName):
+    """ Time a full XML export of the current database, and an import of the exported file into a new database
+        in the sqlite file importDBName, which is left as the current database.  Returns a dictionary of results. """
+    # import Transana's XML Export and Import modules (only needed here).  XMLExport imports RichTextEditCtrl_RTC,
+    # which has to follow TranscriptEditor_RTC (see BenchmarkText()).
+    import TranscriptEditor_RTC
+    import XMLExport
+    import XMLImport
+    (fd, xmlName) = tempfile.mkstemp(suffix='.tra')
+    os.close(fd)
+    try:
+        # Create the XML Export dialog, without showing it
+        exporter = XMLExport.XMLExport(None, -1, 'Benchmarks')
+        exporter.XMLFile.SetValue(xmlName)
+        exporter.parallelCtrl.SetValue(False)
+        exportTime = TimeCall(exporter.Export)
+        exporter.Destroy()
+        # Import into a new, empty database
+        DBInterface._dbref.close()
+        ProjectGenerator.CreateSQLiteDatabase(importDBName)
+        # Create the XML Import dialog, passing the file name so the dialog doesn't need to be shown
+        importer = XMLImport.XMLImport(None, -1, 'Benchmarks', importData=(xmlName, 'utf8'))
+        importTime = TimeCall(importer.Import)
+        importer.Destroy()
+        fileSize = os.path.getsize(xmlName)
+    finally:
+        os.remove(xmlName)
+    return {'export' : exportTime, 'import' : importTime, 'fileSize' : fileSize}
+
+def BenchmarkText():
+    """ Time time code stripping, UTF-8 decoding and word counting on the transcripts in the current database.
+        Returns a dictionary of results. """
+    # import Transana's RichTextEditCtrl and Word Frequency Report (only needed here).  RichTextEditCtrl_RTC and
+    # TranscriptEditor_RTC import each other, so TranscriptEditor_RTC has to be imported first, as Transana does.
+    import TranscriptEditor_RTC
+    import RichTextEditCtrl_RTC
+    import WordFrequencyReport
+
+    class WordCounter(object):
+        """ Supplies what the Word Frequency Report's text methods use, so they can be run without the report window """
+        synonymLookups = {}
+        PrepareText = WordFrequencyReport.WordFrequencyReport.PrepareText.im_func
+        CountWords = WordFrequencyReport.WordFrequencyReport.CountWords.im_func
+
+    dbCursor = DBInterface.get_db().cursor()
+    dbCursor.execute('SELECT RTFText, PlainText FROM Transcripts2')
+    transcripts = dbCursor.fetchall()
+    dbCursor.close()
+    results = {'transcripts' : len(transcripts)}
+    # StripTimeCodes() doesn't use the control, so it can be called without creating one
+    stripTimeCodes = RichTextEditCtrl_RTC.RichTextEditCtrl.StripTimeCodes.im_func
+    results['stripTimeCodes'] = TimeCall(lambda: [stripTimeCodes(None, xmlText) for (xmlText, plainText) in transcripts])
+    # Decode the Plain Text the way data from the database is decoded
+    results['processDBDataForUTF8Encoding'] = TimeCall(lambda: [DBInterface.ProcessDBDataForUTF8Encoding(plainText) for (xmlText, plainText) in transcripts])
+    # MySQLdb hands over each byte of the data as a character.  Time the character by character decoding that
+    # ProcessDBDataForUTF8Encoding() falls back to for that data.
+    mySQLData = [plainText.decode('latin1') for (xmlText, plainText) in transcripts]
+    results['processDBDataForUTF8EncodingByCharacter'] = TimeCall(lambda: [DBInterface.ProcessDBDataForUTF8EncodingByCharacter(text) for text in mySQLData])
+    # Count the words in all the transcripts
+    counter = WordCounter()
+    texts = [plainText.decode('utf8') for (xmlText, plainText) in transcripts]
+    startTime = time.time()
+    preparedTexts = [counter.PrepareText(text) for text in texts]
+    results['prepareText'] = time.time() - startTime
+    words = {}
+    startTime = time.time()
+    for text in preparedTexts:
+        counter.CountWords(text, words)
+    results['countWords'] = time.time() - startTime
+    results['uniqueWords'] = len(words)
+    return results
+
+def BenchmarkWaveform(seconds=600, graphicSize=(1000, 100)):
+    """ Time the drawing of a waveform for a generated wave file of the given length in seconds.
+        Returns a dictionary of results. """
+    # import Transana's Waveform Graphic module (only needed here)
+    import WaveformGraphic
+    (fd, waveName) = tempfile.mkstemp(suffix='.wav')
+    os.close(fd)
+    try:
+        # Write 8 kHz, 8 bit mono audio, a tone that rises and falls in volume.  Transana extracts 8 bit audio for
+        # waveforms, and the Waveform Graphic only draws 8 bit wave files.
+        samples = array.array('B', [128 + int(100 * math.sin(n / 4.0) * math.sin(n / 40000.0)) for n in range(seconds * 8000)])
+        waveFile = wave.open(waveName, 'w')
+        waveFile.setparams((1, 1, 8000, len(samples), 'NONE', 'not compressed'))
+        waveFile.writeframes(samples.tostring())
+        waveFile.close()
+        # The wave file starts at the beginning of the media and runs its full length, in milliseconds
+        drawTime = TimeCall(WaveformGraphic.WaveformGraphicCreate, [{'filename' : waveName, 'offset' : 0, 'length' : seconds * 1000}],
+                            ':memory:', 0, seconds * 1000, graphicSize)
+    finally:
+        os.remove(waveName)
+    return {'seconds' : seconds, 'width' : graphicSize[0], 'draw' : drawTime}
+
+def BenchmarkSuite(size=ProjectGenerator.GENERATOR_SIZE, seed=SUITE_SEED):
+    """ Generate an sqlite database of the given size (see ProjectGenerator.GENERATOR_SIZE), then time Transana's
+        core non-GUI data paths against it.  Returns a dictionary of results. """
+    results = {'benchmark' : 'suite', 'size' : size, 'seed' : seed}
+    # Create files for the generated database and for the database the XML export is imported into
+    dbNames = []
+    for loop in range(2):
+        (fd, dbName) = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        dbNames.append(dbName)
+    try:
+        ProjectGenerator.CreateSQLiteDatabase(dbNames[0])
+        startTime = time.time()
+        results['records'] = ProjectGenerator.ProjectGenerator(size, seed).Generate()
+        results['generate'] = time.time() - startTime
+        results['listFunctions'] = BenchmarkListFunctions()
+        results['search'] = BenchmarkSearch()
+        results['reportData'] = BenchmarkReportData()
+        results['text'] = BenchmarkText()
+        results['waveform'] = BenchmarkWaveform()
+        # The XML benchmark replaces the database with the imported one, so it runs last
+        results['xml'] = BenchmarkXML(dbNames[1])
+    finally:
+        if DBInterface._dbref != None:
+            DBInterface._dbref.close()
+            DBInterface._dbref = None
+        # Remove the database files, and the write-ahead log files if there are any
+        for dbName in dbNames:
+            for suffix in ['', '-wal', '-shm']:
+                if os.path.exists(dbName + suffix):
+                    os.remove(dbName + suffix)
+    return results
+
+def WriteResults(results, filename=None):
+    """ Write benchmark results as JSON, to filename if one is given or to the console if not """
+    data = json.dumps(results, indent=2, sort_keys=True)
+    if filename == None:
+        print data
+    else:
+        f = open(filename, 'w')
+        f.write(data)
+        f.close()
+
+
+if __name__ == '__main__':
+    # Determine which benchmark to run
+    if (len(sys.argv) < 2) or (sys.argv[1] not in ['sqlite', 'startup', 'suite']):
+        print __doc__
+        sys.exit(1)
+    app = InitializeBenchmarks()
+    if (sys.argv[1] in ['sqlite', 'suite']) and not (TransanaConstants.DBInstalled in ['sqlite3']):
+        print "The %s benchmark requires the sqlite version of Transana." % sys.argv[1]
+        sys.exit(1)
+    if sys.argv[1] == 'suite':
+        # The suite takes any number of name=count size settings, then an optional output file
+        size = ProjectGenerator.GENERATOR_SIZE.copy()
+        filename = None
+        for arg in sys.argv[2:]:
+            if '=' in arg:
+                (name, count) = arg.split('=', 1)
+                if not size.has_key(name):
+                    print __doc__
+                    sys.exit(1)
+                size[name] = int(count)
+            else:
+                filename = arg
+        WriteResults(BenchmarkSuite(size), filename)
+        sys.exit(0)
+    if sys.argv[1] == 'sqlite':
+        if len(sys.argv) > 2:
+            rows = int(sys.argv[2])
+        else:
+            rows = 5000
+        results = BenchmarkSQLiteProfile(rows)
+    elif sys.argv[1] == 'startup':
+        if len(sys.argv) > 2:
+            count = int(sys.argv[2])
+        else:
+            count = 40
+        results = BenchmarkStartupImports(count)
+    if len(sys.argv) > 3:
+        WriteResults(results, sys.argv[3])
+    else:
+        WriteResults(results)
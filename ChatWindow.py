@@ -62,6 +62,8 @@ import Document
 import Library
 # import Transana's Episode object
 import Episode
+# import Transana's Episode Segment Index
+import EpisodeSegmentIndex
 # import Transana's Transcript object
 import Transcript
 # import Transana's Collection object
@@ -92,6 +94,24 @@ EVT_CLOSE_MESSAGE_ID = wx.NewId()
 # Get an ID for a custom Event for if the Message Server is lost
 EVT_MESSAGESERVER_LOST_ID = wx.NewId()
 
+# Database Tree update messages from other users are collected for this many milliseconds and then applied as a
+# single batch, so that a colleague importing or deleting hundreds of items doesn't freeze everyone else's copy.
+MESSAGE_BATCH_DELAY = 250
+
+# Add messages that a later Delete Node (DN) message can cancel out, with the Node Type and untranslated
+# root node label that the Delete Node message uses for the same node.  The rest of each of these messages
+# is the node list below the root node.
+CANCELLABLE_ADD_MESSAGES = {'AS'    : ('LibraryNode', 'Libraries'),
+                            'AD'    : ('DocumentNode', 'Libraries'),
+                            'AE'    : ('EpisodeNode', 'Libraries'),
+                            'AT'    : ('TranscriptNode', 'Libraries'),
+                            'AC'    : ('CollectionNode', 'Collections'),
+                            'AQ'    : ('QuoteNode', 'Collections'),
+                            'ACl'   : ('ClipNode', 'Collections'),
+                            'ASnap' : ('SnapshotNode', 'Collections'),
+                            'AKG'   : ('KeywordGroupNode', 'Keywords'),
+                            'AK'    : ('KeywordNode', 'Keywords')}
+
 # Define a custom "Post Message" event
 def EVT_POST_MESSAGE(win, func):
     """ Defines the EVT_POST_MESSAGE event type """
@@ -110,13 +130,15 @@ def EVT_MESSAGESERVER_LOST(win, func):
 # Create the actual Custom Post Message Event object
 class PostMessageEvent(wx.PyEvent):
     """ This event is used to trigger posting a message in the GUI. It carries the data. """
-    def __init__(self, data):
+    def __init__(self, data, batched=False):
         # Initialize a wxPyEvent
         wx.PyEvent.__init__(self)
         # Link the event to the Event ID
         self.SetEventType(EVT_POST_MESSAGE_ID)
         # Store the message data in the Custom Event object
         self.data = data
+        # Note whether the message is being applied as part of a batch of queued messages
+        self.batched = batched
 
         if DEBUG:
             print "PostMessageEvent created with data =", self.data.encode('latin1'), "ChatWindow.EventIDS:", EVT_POST_MESSAGE_ID, EVT_CLOSE_MESSAGE_ID, EVT_MESSAGESERVER_LOST_ID
@@ -143,6 +165,63 @@ class MessageServerLostEvent(wx.PyEvent):
         if DEBUG:
             print "MessageServerLost Event created"
 
+def ParseMessage(data):
+    """ Break a message from the Transana Message Server into its Message Header, Message Sender, and Message """
+    messageHeader = data[:data.find(' ')]
+    message = data[data.find(' ') + 1:].strip()
+    # If the last character of the messageSender is a colon ...
+    if message[:message.find(' ')][-1] == ':':
+        # drop the ":"
+        messageSender = message[:message.find(' ') - 1]
+    # ... but it might not be?  If there's no message, this wasn't working, anyway.
+    else:
+        messageSender = message[:message.find(' ')]
+    message = message[message.find(' ') + 1:].strip()
+    return (messageHeader, messageSender, message)
+
+def CoalesceMessages(messages):
+    """ Take a list of queued Database Tree update messages and drop the ones that would cancel each other out.
+        Adding a node and then deleting it drops both messages, and deleting a Library, Episode, Collection, or Keyword Group
+        drops any earlier messages adding nodes below it.  Returns the list of messages that still need to be applied. """
+    # Parse all the messages
+    parsedMessages = [ParseMessage(data) for data in messages]
+    # Start out keeping all messages
+    keep = [True] * len(messages)
+    # Look for Delete Node messages
+    for delIndex in range(len(parsedMessages)):
+        (messageHeader, messageSender, message) = parsedMessages[delIndex]
+        if messageHeader != 'DN':
+            continue
+        # Delete Node messages are Node Type, untranslated root node label, and then the node list
+        nodelist = tuple(message.split(' >|< '))
+        # Keyword Example deletions carry a Clip Number rather than a node list, so we leave them alone.
+        if (len(nodelist) < 3) or (nodelist[0] == 'KeywordExampleNode'):
+            continue
+        (delType, delRoot, delPath) = (nodelist[0], nodelist[1], nodelist[2:])
+        # Look back through the earlier messages for Add messages for this node or for nodes below it
+        for addIndex in range(delIndex - 1, -1, -1):
+            addHeader = parsedMessages[addIndex][0]
+            # Renames and Moves change node lists, and Imports reload the whole tree, so we can't look back past them.
+            if addHeader in ['RN', 'MCN', 'I']:
+                break
+            if keep[addIndex] and CANCELLABLE_ADD_MESSAGES.has_key(addHeader):
+                (addType, addRoot) = CANCELLABLE_ADD_MESSAGES[addHeader]
+                addPath = tuple(parsedMessages[addIndex][2].split(' >|< '))
+                if addRoot != delRoot:
+                    continue
+                # If the node was added and then deleted ...
+                if (addPath == delPath) and (addType == delType):
+                    # ... neither message needs to be applied.
+                    keep[addIndex] = False
+                    keep[delIndex] = False
+                # If the node was added below a container node that is deleted ...
+                elif (len(addPath) > len(delPath)) and (addPath[:len(delPath)] == delPath) and \
+                     (delType in ['LibraryNode', 'EpisodeNode', 'CollectionNode', 'KeywordGroupNode']):
+                    # ... the Add message doesn't need to be applied.
+                    keep[addIndex] = False
+    # Return the messages we still need
+    return [messages[index] for index in range(len(messages)) if keep[index]]
+
 # Create a Thread Lock object so that we can use thread locking as needed
 threadLock = threading.Lock()
 
@@ -404,6 +483,16 @@ class ChatWindow(wx.Frame):
         self.txtEntry.SetFocus()
         # We need to know if loss of socket connection is expected or should be reported
         self.reportSocketLoss = True
+
+        # Initialize the queue of Database Tree update messages waiting to be applied
+        self.messageQueue = []
+        # Count the messages received versus the tree operations actually performed
+        self.messagesReceived = 0
+        self.treeOperations = 0
+        # Create a Timer to apply queued messages in batches
+        self.messageBatchTimer = wx.Timer()
+        # Assign the Timer's event
+        self.messageBatchTimer.Bind(wx.EVT_TIMER, self.OnMessageBatchTimer)
         # Start the Listener Thread to listen for messages from the Message Server
         self.listener = ListenerThread(self, self.socketObj)
 
@@ -680,23 +769,28 @@ class ChatWindow(wx.Frame):
             if DEBUG:
                 print 'event.data = "%s"' % event.data.encode('latin1')
 
-            message = event.data
-            messageHeader = message[:message.find(' ')]
-            message = message[message.find(' ') + 1:].strip()
-            # If the last character of the messageSender is a colon ...
-            if message[:message.find(' ')][-1] == ':':
-                # drop the ":"
-                messageSender = message[:message.find(' ') - 1]
-            # ... but it might not be?  If there's no message, this wasn't working, anyway.
-            else:
-                messageSender = message[:message.find(' ')]
-            message = message[message.find(' ') + 1:].strip()
+            (messageHeader, messageSender, message) = ParseMessage(event.data)
 
             if DEBUG:
                 print 'messageHeader = "%s"' % messageHeader
                 print 'messageSender = "%s"' % messageSender
                 print 'message = "%s"' % message.encode('latin1')
                 print
+
+            # Database Tree update messages from other users are queued and applied in batches by ProcessMessageQueue()
+            if not (messageHeader in ['M', 'C', 'R', 'I', 'V', 'D']) and (self.userName != messageSender) and \
+               not event.batched:
+                # Add the message to the queue
+                self.messageQueue.append(event.data)
+                self.messagesReceived += 1
+                # Start the batch timer if it isn't already running
+                if not self.messageBatchTimer.IsRunning():
+                    self.messageBatchTimer.Start(MESSAGE_BATCH_DELAY, wx.TIMER_ONE_SHOT)
+                return
+
+            # An Import message refreshes the whole tree, so we need to apply any queued messages first to keep them in order.
+            if messageHeader == 'I':
+                self.ProcessMessageQueue()
             
             # Determine what type of message it is by looking at the first character.                
             # Text Message ?
@@ -804,6 +898,8 @@ class ChatWindow(wx.Frame):
             else:
                 # The remaining messages should not be processed if this user was the message sender
                 if self.userName != messageSender:
+                    # Another user has changed the database, so the Episode Items we display may be out of date
+                    EpisodeSegmentIndex.Invalidate()
                     # We can't have the tree selection changing because of the activity of other users.  That creates all kinds of
                     # problems if we're in the middle of editing something.  So let's note the current selection
                     currentSelection = self.ControlObject.DataWindow.DBTab.tree.GetSelections()
@@ -816,7 +912,7 @@ class ChatWindow(wx.Frame):
                             # Sort the list of libraries
                             nodelist = (_('Libraries'),)
                             node = self.ControlObject.DataWindow.DBTab.tree.select_Node(nodelist, 'LibraryRootNode', False)
-                            self.ControlObject.DataWindow.DBTab.tree.SortChildren(node)
+                            self.ControlObject.DataWindow.DBTab.tree.SortNode(node)
                             
                         # Add Episode Message
                         elif messageHeader == 'AE':
@@ -835,7 +931,7 @@ class ChatWindow(wx.Frame):
                             self.ControlObject.DataWindow.DBTab.tree.add_Node('TranscriptNode', (_('Libraries'),) + nodelist, tempTranscript.number, tempEpisode.number, expandNode=False, avoidRecursiveYields = True)
                             # Sort the list of transcripts
                             node = self.ControlObject.DataWindow.DBTab.tree.select_Node((_('Libraries'),) + nodelist[:-1], 'EpisodeNode', False)
-                            self.ControlObject.DataWindow.DBTab.tree.SortChildren(node)
+                            self.ControlObject.DataWindow.DBTab.tree.SortNode(node)
 
                         # Add Document Message
                         elif messageHeader == 'AD':
@@ -858,7 +954,7 @@ class ChatWindow(wx.Frame):
                             # Sort the list of libraries
                             nodelist = (_('Collections'),) + nodelist[:-1]
                             node = self.ControlObject.DataWindow.DBTab.tree.select_Node(nodelist, 'CollectionsRootNode', False)
-                            self.ControlObject.DataWindow.DBTab.tree.SortChildren(node)
+                            self.ControlObject.DataWindow.DBTab.tree.SortNode(node)
 
                         # Add Quote Message
                         elif messageHeader == 'AQ':
@@ -1631,6 +1727,46 @@ class ChatWindow(wx.Frame):
                     if DEBUG:
                         print "We DON'T need to add an object, as we created it in the first place."
 
+    def OnMessageBatchTimer(self, event):
+        """ Apply the Database Tree update messages that have been queued since the timer was started """
+        self.ProcessMessageQueue()
+
+    def ProcessMessageQueue(self):
+        """ Coalesce the queued Database Tree update messages from other users and apply them as a single batch """
+        # Stop the timer, in case we were called directly
+        self.messageBatchTimer.Stop()
+        # If there's nothing in the queue, there's nothing to do
+        if len(self.messageQueue) == 0:
+            return
+        # Drop messages that cancel each other out
+        messages = CoalesceMessages(self.messageQueue)
+        # Clear the queue
+        self.messageQueue = []
+        # If there's a Database Tree, don't update it on screen until the whole batch has been applied.
+        if (self.ControlObject != None) and (self.ControlObject.DataWindow != None):
+            tree = self.ControlObject.DataWindow.DBTab.tree
+            tree.BeginBatchUpdate()
+        else:
+            tree = None
+        try:
+            for data in messages:
+                # A problem with one message shouldn't prevent the rest of the batch from being applied
+                try:
+                    self.OnPostMessage(PostMessageEvent(data, batched=True))
+                except:
+                    print "ChatWindow.ProcessMessageQueue():", data.encode('utf8')
+                    print sys.exc_info()[0], sys.exc_info()[1]
+                    import traceback
+                    traceback.print_exc(file=sys.stdout)
+                self.treeOperations += 1
+        finally:
+            # Now update the tree on screen
+            if tree != None:
+                tree.EndBatchUpdate()
+
+        if DEBUG:
+            print "ChatWindow.ProcessMessageQueue():  %d messages received, %d tree operations performed" % (self.messagesReceived, self.treeOperations)
+
     def OnMessageServerLost(self, event):
         dlg = Dialogs.ErrorDialog(None, _("Your connection to the Message Server has been lost.\nYou may have lost your connection to the network, or there may be a problem with the Server.\nPlease quit Transana immediately and resolve the problem."))
         dlg.ShowModal()
@@ -1702,6 +1838,8 @@ class ChatWindow(wx.Frame):
             print sys.exc_info()[0], sys.exc_info()[1]
             import traceback
             print traceback.print_exc(file=sys.stdout)
+        # Stop the message batch timer
+        self.messageBatchTimer.Stop()
         # Try to tell the listener thread to abort (probably does nothing.)
         self.listener.abort()
         # Destroy the Chat Sound player
@@ -40,6 +40,8 @@ import DBInterface
 import Dialogs
 # Import Transana's Episode Object
 import Episode
+# import Transana's Episode Segment Index
+import EpisodeSegmentIndex
 # import Transana's Miscellaneous Functions
 import Misc
 # import Transana's Note Object
@@ -548,6 +550,8 @@ class Clip(DataObject.DataObject):
                 c.execute('COMMIT')
             # Close the Database Cursor
             c.close()
+            # Displayed Episode Items may have changed, so the Episode Segment Indexes must be reloaded
+            EpisodeSegmentIndex.Invalidate()
 
     def db_delete(self, use_transactions=True, examplesPrompt=True):
         """ Delete this object record from the database.  Parameters indicate if we should use DB Transactions
@@ -654,6 +658,8 @@ class Clip(DataObject.DataObject):
             raise e
         except:
             raise
+        # Displayed Episode Items may have changed, so the Episode Segment Indexes must be reloaded
+        EpisodeSegmentIndex.Invalidate()
         return result
 
     def lock_record(self):
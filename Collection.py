@@ -32,6 +32,8 @@ import Clip
 import DataObject
 # import Transana's Database Interface
 import DBInterface
+# import Transana's Episode Segment Index
+import EpisodeSegmentIndex
 # import Transana's Note Object
 import Note
 # import Transana's Quote object
@@ -269,6 +271,8 @@ class Collection(DataObject.DataObject):
         # if new collection, Number was auto assigned, so resync.
         if (self.number == 0):
             self.db_load_by_name(self.id, self.parent)
+        # Displayed Episode Items may have changed, so the Episode Segment Indexes must be reloaded
+        EpisodeSegmentIndex.Invalidate()
         
 
     def db_delete(self, use_transactions=1):
@@ -366,6 +370,8 @@ class Collection(DataObject.DataObject):
 
         if DEBUG:
             print
+        # Displayed Episode Items may have changed, so the Episode Segment Indexes must be reloaded
+        EpisodeSegmentIndex.Invalidate()
         return result
 
     def GetNodeData(self):
@@ -110,6 +110,9 @@ class ConfigData(object):
         str += 'colorAsKeywords = %s\n' % self.colorAsKeywords
         str = str + 'colorConfigFilename = %s\n' % self.colorConfigFilename
         str = str + 'quickClipsWarning = %s\n' % self.quickClipWarning
+        str += 'lazyDatabaseTree = %s\n' % self.lazyDatabaseTree
+        str += 'batchProcessCount = %s\n' % self.batchProcessCount
+        str += 'sqliteProfile = %s\n' % self.sqliteProfile
         if 'wxMSW' in wx.PlatformInfo:
             str = str + 'mediaPlayer = %s\n' % self.mediaPlayer
             str = str + 'mp4MediaPlayer = %s\n' % self.mp4MediaPlayer
@@ -390,6 +393,12 @@ class ConfigData(object):
         self.colorConfigFilename = config.Read('/2.0/ColorConfigFilename', '')
         # Load the Quick Clips Warning setting
         self.quickClipWarning = config.ReadInt('/2.0/QuickClipWarning', True)
+        # Load the Lazy Database Tree setting, which loads Database Tree nodes only when they are expanded
+        self.lazyDatabaseTree = config.ReadInt('/3.0/LazyDatabaseTree', False)
+        # Load the number of simultaneous Batch media processing jobs.  0 means one per processor.
+        self.batchProcessCount = config.ReadInt('/3.0/BatchProcessCount', 0)
+        # Load the setting for using the sqlite performance profile (WAL journaling, larger caches)
+        self.sqliteProfile = config.ReadInt('/3.0/SQLiteProfile', True)
         # Load the Primary Screen setting
         self.primaryScreen = config.ReadInt('/2.0/PrimaryScreen', 0)
         # Check for screen set to higher than current number of monitors
@@ -630,6 +639,14 @@ class ConfigData(object):
         config.Write('/2.0/ColorConfigFilename', self.colorConfigFilename)
         # Save the Quick Clips Warning setting
         config.WriteInt('/2.0/QuickClipWarning', self.quickClipWarning)
+        # Save the Lazy Database Tree setting.
+        # This cannot currently be changed without editing the Registry / Config file.
+        config.WriteInt('/3.0/LazyDatabaseTree', self.lazyDatabaseTree)
+        # Save the number of simultaneous Batch media processing jobs
+        config.WriteInt('/3.0/BatchProcessCount', self.batchProcessCount)
+        # Save the setting for using the sqlite performance profile.
+        # This cannot currently be changed without editing the Registry / Config file.
+        config.WriteInt('/3.0/SQLiteProfile', self.sqliteProfile)
         # For Windows only ...
         if 'wxMSW' in wx.PlatformInfo:
             # ... save the Media Player selection
@@ -58,16 +58,8 @@ import DBInterface
 import Dialogs
 # import Transana's DragAndDrop Objects for Quick Clip creation
 import DragAndDropObjects
-# import Transana File Management System
-import FileManagement
-# import Play All Clips
-import PlayAllClips
-# import the Episode Transcript Change Propagation tool
-import PropagateChanges
 # import Transana's Snapshot object
 import Snapshot
-# import the Snapshot Window
-import SnapshotWindow
 # import Transana's Exceptions
 import TransanaExceptions
 # Import Transana's Transcript User Interface for creating supplemental Transcript Windows
@@ -75,8 +67,6 @@ if TransanaConstants.USESRTC:
     import TranscriptionUI_RTC as TranscriptionUI
 else:
     import TranscriptionUI
-# import Transana's Word Frequency Report
-import WordFrequencyReport
 # import Python's os module
 import os
 # import Python's platform module
@@ -507,12 +497,17 @@ class ControlObject(object):
                 # Now point the DBTree (the notebook's parent window's DBTab's tree) to the loaded Quote
                 self.DataWindow.DBTab.tree.select_Node(nodeList, 'QuoteNode')
 
-    def LoadClipByNumber(self, clipNum, textSearchItems=[]):
+    def LoadClipByNumber(self, clipNum, textSearchItems=[], clipObj=None):
         """ When a Clip is identified to trigger systematic loading of all related information,
-            this method should be called so that all Transana Objects are set appropriately. """
+            this method should be called so that all Transana Objects are set appropriately.
+            If the caller has already loaded the Clip (as Play All Clips does), it can be passed in as clipObj. """
 
-        # Load the Clip based on the ClipNumber.  (Let's get NotFound exceptions out of the way early!)
-        clipObj = Clip.Clip(clipNum)
+        # If we weren't passed the Clip ...
+        if clipObj == None:
+            # ... load the Clip based on the ClipNumber.  (Let's get NotFound exceptions out of the way early!)
+            clipObj = Clip.Clip(clipNum)
+        # If the Clip uses the same media as the loaded Clip, we can re-position the media players rather than re-create them
+        reuseMedia = self.UsesLoadedMedia(clipObj)
 
         # First, let's see if there's already a video loaded in the system.  Iterate through all Notebook Pages.
         self.BringTranscriptToFront()
@@ -538,8 +533,8 @@ class ControlObject(object):
 
         # If the current Editor is a Transcript (not None, not a Document) ...
         elif isinstance(self.TranscriptWindow.GetCurrentObject(), Transcript.Transcript):
-            # ... then we need to Clear all Windows of media information
-            self.ClearAllWindows(clearAllPanes=True)
+            # ... then we need to Clear all Windows of media information, keeping the media players if we can re-use them
+            self.ClearAllWindows(clearAllPanes=True, keepMedia=reuseMedia)
             if self.currentObj != None:
                 # ... create a new Notebook Page for the Document
                 self.TranscriptWindow.AddNotebookPage(clipObj.id)
@@ -556,14 +551,12 @@ class ControlObject(object):
 
         # Set the current object to the loaded Clip
         self.currentObj = clipObj
-        # Load the Collection that contains the loaded Clip
-        collectionObj = Collection.Collection(clipObj.collection_num)
         # set the video start and end points to the start and stop points defined in the clip
         self.VideoStartPoint = clipObj.clip_start                     # Set the Video Start Point to the Clip beginning
         self.VideoEndPoint = clipObj.clip_stop                        # Set the Video End Point to the Clip end
 
         # Load the video identified in the Clip
-        if self.LoadVideo(self.currentObj):
+        if self.LoadVideo(self.currentObj, reuseMedia):
             # If we have only one video file ...
             if len(self.currentObj.additional_media_files) == 0:
                 # Identify the loaded media file
@@ -1041,6 +1034,8 @@ class ControlObject(object):
 
     def LoadSnapshot(self, snapshot):
         """ Load the SnapshotWindow for the Snapshot object passed in """
+        # import the Snapshot Window when it is first needed, rather than at start-up
+        import SnapshotWindow
         # Assume no Snapshot Window exists for this snapshot
         windowOpen = False
         # If we have a known Snapshot Number ...
@@ -1247,8 +1242,9 @@ class ControlObject(object):
               signal the MessageServer to have other MU instances update! """
         # For each registred Report ...
         for reportNum in self.ReportWindows.keys():
-            # ... if the report is a Word Frequency Report ...
-            if isinstance(self.ReportWindows[reportNum], WordFrequencyReport.WordFrequencyReport):
+            # ... if the report is a Word Frequency Report ...  (We check the type's name because the Word Frequency
+            #     Report module is not imported until a report is first created.)
+            if type(self.ReportWindows[reportNum]).__name__ == 'WordFrequencyReport':
                 # ... and the report has not been explicitly excluded ...
                 if reportNum != reportNumber:
                     # if the report is not in the process of repopulating itself ...
@@ -1432,9 +1428,10 @@ class ControlObject(object):
                     # ... restore the cursorPosition or selection to the Editor
                     pane.editor.RestoreCursor()
 
-    def ClearAllWindows(self, clearAllTabs=False, clearAllPanes=False):
+    def ClearAllWindows(self, clearAllTabs=False, clearAllPanes=False, keepMedia=False):
         """ Clears all windows and resets all objects related to Media Files.
-            If clearAllTabs is True, we close all Documents and Quotes too! """
+            If clearAllTabs is True, we close all Documents and Quotes too!
+            If keepMedia is True, the media players are left in place because the next object uses the same media. """
         # Let's stop the media from playing
         self.VideoWindow.Stop()
 
@@ -1522,8 +1519,10 @@ class ControlObject(object):
             self.MenuWindow.ClearMenus()
             # Clear Visualization Window
             self.VisualizationWindow.ClearVisualization()
-            # Clear the Video Window
-            self.ClearMediaWindow()
+            # If we're not keeping the media players for the next object ...
+            if not keepMedia:
+                # ... clear the Video Window
+                self.ClearMediaWindow()
 
             # Clear the Data Window
             self.DataWindow.ClearData()
@@ -1964,9 +1963,10 @@ class ControlObject(object):
 
     # Private Methods
         
-    def LoadVideo(self, currentObj):  # (self, Filename, mediaStart, mediaLength):
+    def LoadVideo(self, currentObj, reuseMedia=False):  # (self, Filename, mediaStart, mediaLength):
         """ This method handles loading a video in the video window and loading the
-            corresponding Visualization in the Visualization window. """
+            corresponding Visualization in the Visualization window.  If reuseMedia is True, the media
+            players already have the object's media loaded, and are re-positioned rather than re-created. """
         # Get the primary file name
         Filename = currentObj.media_filename
         # See if the primary media file exists
@@ -1998,11 +1998,27 @@ class ControlObject(object):
             # Now that the Visualization is done, load the video in the Video Window
             self.VideoFilename = Filename                # Remember the Video File Name
 
-            # Open the video(s) in the Video Window if the file is found
-            self.VideoWindow.open_media_file()
+            # If the media players don't already have this media loaded ...
+            if not reuseMedia:
+                # ... open the video(s) in the Video Window if the file is found.  (Otherwise, setting the video
+                # selection moves the existing media players to the right position, which is much faster.)
+                self.VideoWindow.open_media_file()
         # Let the calling routine know if we were successful
         return success
 
+    def UsesLoadedMedia(self, obj):
+        """ Determine whether a Clip uses exactly the same media files, offset, and audio settings as the
+            loaded Clip, so that the loaded media players can be re-used for it. """
+        # Only Clip-to-Clip changes with media players already in place qualify
+        if (not isinstance(self.currentObj, Clip.Clip)) or (not isinstance(obj, Clip.Clip)) or \
+           (len(self.VideoWindow.mediaPlayers) == 0):
+            return False
+        return (self.VideoFilename == obj.media_filename) and \
+               (self.currentObj.media_filename == obj.media_filename) and \
+               (self.currentObj.offset == obj.offset) and \
+               (self.currentObj.audio == obj.audio) and \
+               (self.currentObj.additional_media_files == obj.additional_media_files)
+
     def ClearVisualization(self):
         """ Clear the current selection from the Visualization Window """
         # Clear the currently loaded object, as there is none
@@ -3499,6 +3515,8 @@ class ControlObject(object):
 
     def PropagateChanges(self, transcriptWindowNumber):
         """ Propagate changes in an Episode transcript down to derived clips """
+        # import the Episode Transcript Change Propagation tool when it is first needed, rather than at start-up
+        import PropagateChanges
         # First, let's save the changes in the Transcript.  We don't want to propagate changes, then end up
         # not saving them in the source!
         if TransanaConstants.partialTranscriptEdit:
@@ -3811,19 +3829,25 @@ class ControlObject(object):
                     # ... we really can stop looking!
                     break
 
-        # Get the Quote Data from the Database
-        data = DBInterface.list_of_quotes_by_document(documentNum, textPos, textSel)
+        # If the Document is not open ...
+        if docFound == None:
+            # ... get the Quote Data from the Database
+            return DBInterface.list_of_quotes_by_document(documentNum, textPos, textSel)
 
+        # Find the Quotes at the position in the LIVE document, using the live document's quote positions
+        quoteNums = docFound.quote_dict.GetQuotesAt(textPos, textSel)
+        # Get the rest of the Quote Data for just these Quotes from the Database
+        data = DBInterface.list_of_quotes_by_quotenums(quoteNums)
         # Iterate through the list of quotes found in the DATABASE.  We need to go backwards because we may
         # delete some elements, which screws up list iteration otherwise
         for x in range(len(data)-1, -1, -1):
             # If the Quote is in the LIVE document ...
-            if data[x]['QuoteNum'] in docFound.quote_dict.keys():
+            if docFound.quote_dict.has_key(data[x]['QuoteNum']):
                 # ... use the live document's quote positions
                 (data[x]['StartChar'], data[x]['EndChar']) = docFound.quote_dict[data[x]['QuoteNum']]
-            # If the quote has been deleted from the LIVE Document ...
+            # If the quote has been deleted from the Database ...
             else:
-                # ... drop it from the Database List
+                # ... drop it from the list
                 del(data[x])
         
         return data
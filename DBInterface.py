@@ -31,12 +31,18 @@ if TransanaConstants.DBInstalled in ['MySQLdb-embedded', 'MySQLdb-server']:
     import MySQLdb
     # We also need the MySQL exceptions!
     import _mysql_exceptions
+    # The base class of the database module's exceptions
+    DBError = MySQLdb.Error
 elif TransanaConstants.DBInstalled in ['PyMySQL']:
     # import PyMySQL
     import pymysql as MySQLdb
+    # The base class of the database module's exceptions
+    DBError = MySQLdb.Error
 elif TransanaConstants.DBInstalled in ['sqlite3']:
     # import sqlite
     import sqlite3
+    # The base class of the database module's exceptions
+    DBError = sqlite3.Error
     # import the python DateTime module
     import datetime
 else:
@@ -96,6 +102,27 @@ import Transcript
 # Declare Global Variables
 # Database Reference
 _dbref = None
+# Parameters used to open the Database Reference, needed by get_independent_db()
+_connectionParams = None
+# The number of nested RunInTransaction() calls currently running
+_transactionDepth = 0
+
+# The largest number of values put in a single "IN (...)" list.  sqlite allows 999 parameters per query.
+IN_LIST_SIZE = 500
+# The number of prepared statements each sqlite connection keeps for re-use
+SQLITE_CACHED_STATEMENTS = 250
+# The sqlite performance profile, applied to each connection when configData.sqliteProfile is enabled.
+#   journal_mode WAL lets readers and the writer work at the same time and replaces most fsyncs with appends.
+#   synchronous NORMAL only syncs at WAL checkpoints.  This is safe with WAL, though the most recent
+#     transactions can be lost (never corrupted) if the power fails.
+#   cache_size is negative, so it's in KB rather than pages.  64 MB.
+#   mmap_size lets sqlite read the database file through memory mapping.  256 MB.
+#   temp_store keeps temporary tables and indexes (used by ORDER BY and DISTINCT) in memory.
+SQLITE_PROFILE = [('journal_mode', 'WAL'),
+                  ('synchronous', 'NORMAL'),
+                  ('cache_size', '-65536'),
+                  ('mmap_size', '268435456'),
+                  ('temp_store', 'MEMORY')]
 
 def InitializeSingleUserDatabase():
     """ For single-user Transana only, this initializes (starts) the embedded MySQL Server. """
@@ -170,6 +197,101 @@ def EndSingleUserDatabase():
         # End the embedded MySQL Server
         MySQLdb.server_end()
 
+def ConnectSQLite(dbName, useProfile=True):
+    """ Open a connection to an sqlite database file, set up the way Transana needs it.
+        If useProfile is True, the SQLITE_PROFILE performance settings are applied. """
+    # Connect to the database, with a larger prepared statement cache than the default
+    dbConn = sqlite3.connect(dbName, cached_statements=SQLITE_CACHED_STATEMENTS)
+    # Enable AutoCommit
+    dbConn.isolation_level = None
+    # Have sqlite use Strings rather than Unicode, as all fields in Transana are manually encoded
+    dbConn.text_factory = str
+    # If requested, apply the performance profile
+    if useProfile:
+        # Get a database cursor
+        dbCursor = dbConn.cursor()
+        # Apply each setting
+        for (pragma, value) in SQLITE_PROFILE:
+            dbCursor.execute("PRAGMA %s = %s" % (pragma, value))
+        dbCursor.close()
+    return dbConn
+
+def RunInTransaction(func, *args, **kwargs):
+    """ Run func(*args, **kwargs) inside a single database transaction, so bulk writes are committed (and
+        synced to disk) once rather than once per statement.  The transaction is rolled back if func raises
+        an exception.  Calls made while a RunInTransaction() call is already running join that transaction.
+        func must not start its own transaction with BEGIN.  Returns func's return value. """
+    global _transactionDepth
+    # If we're already inside a transaction, just run the function as part of it
+    if _transactionDepth > 0:
+        return func(*args, **kwargs)
+    # Get a database cursor
+    dbCursor = get_db().cursor()
+    # Begin the transaction
+    dbCursor.execute('BEGIN')
+    _transactionDepth += 1
+    try:
+        # Do the work
+        result = func(*args, **kwargs)
+    except:
+        # Remember the exception, as the ROLLBACK could replace it
+        (excType, excValue, excTraceback) = sys.exc_info()
+        _transactionDepth -= 1
+        # Undo the work
+        dbCursor.execute('ROLLBACK')
+        dbCursor.close()
+        # Pass the exception on to the caller
+        raise excType, excValue, excTraceback
+    _transactionDepth -= 1
+    # Commit the work
+    dbCursor.execute('COMMIT')
+    dbCursor.close()
+    return result
+
+def BulkInsert(table, fields, rows, timeStampField=None):
+    """ Insert many records into table with executemany().  rows is a list of tuples of values for fields, which
+        must already be encoded for the database.  If timeStampField is given, it is set to the SERVER's time stamp
+        for every record.  MySQLdb sends each executemany() call as a single query, so the rows are split into
+        calls of no more than half of max_allowed_packet bytes, which leaves room for escaping.  Each row must
+        already fit.  Bulk writers should call this inside RunInTransaction(). """
+    # If there's nothing to insert, we're done
+    if len(rows) == 0:
+        return
+    # Build the query, with one parameter for each field
+    query = "INSERT INTO %s\n  (%s" % (table, ', '.join(fields))
+    if timeStampField != None:
+        query += ', %s' % timeStampField
+    query += ')\n  VALUES\n  (%s' % ', '.join(['%s'] * len(fields))
+    # The time stamp is the SERVER's time stamp because we don't know if the clients are synchronized.
+    if timeStampField != None:
+        query += ', CURRENT_TIMESTAMP'
+    query += ')'
+    # Adjust the query for sqlite if needed
+    query = FixQuery(query)
+    # Get a database cursor
+    dbCursor = get_db().cursor()
+    # Split the records into groups small enough to send to the database
+    maxBytes = TransanaGlobal.max_allowed_packet / 2
+    start = 0
+    size = 0
+    for loop in range(len(rows)):
+        # Estimate the size of the record from the size of its strings
+        rowSize = len(query)
+        for value in rows[loop]:
+            if isinstance(value, (str, unicode)):
+                rowSize += len(value)
+            else:
+                rowSize += 20
+        # If this record won't fit in the current group, insert the group and start a new one
+        if (loop > start) and (size + rowSize > maxBytes):
+            dbCursor.executemany(query, rows[start:loop])
+            start = loop
+            size = 0
+        size += rowSize
+    # Insert the last group of records
+    dbCursor.executemany(query, rows[start:])
+    dbCursor.close()
+
 def SetTableType(hasInnoDB, query):
     """ Set Table Type and Character Set Information for the database as appropriate """
     # If we're using MySQL ...
@@ -914,6 +1036,141 @@ def CreateSynonymsTableQuery(num):
     # Return the query to the calling routine
     return query % num
 
+# The version of the secondary index set.  Increase this when SECONDARY_INDEXES changes so that
+# existing databases get the new indexes the next time they are opened.
+INDEX_VERSION = 2
+
+# Secondary indexes on the columns used to look up child records.  Each entry is (index name, table, columns).
+# Index names include the table name because sqlite requires index names to be unique across the database.
+SECONDARY_INDEXES = [('Episodes2_SeriesNum', 'Episodes2', 'SeriesNum'),
+                     ('Transcripts2_EpisodeNum', 'Transcripts2', 'EpisodeNum, ClipNum'),
+                     ('Transcripts2_ClipNum', 'Transcripts2', 'ClipNum'),
+                     # The lineage indexes find the copies of a Clip or Quote, which share its source and range
+                     ('Transcripts2_Lineage', 'Transcripts2', 'SourceTranscriptNum, ClipStart, ClipStop'),
+                     ('Collections2_ParentCollectNum', 'Collections2', 'ParentCollectNum'),
+                     ('Clips2_CollectNum', 'Clips2', 'CollectNum'),
+                     ('Clips2_EpisodeNum', 'Clips2', 'EpisodeNum'),
+                     ('Snapshots2_CollectNum', 'Snapshots2', 'CollectNum'),
+                     ('Snapshots2_EpisodeNum', 'Snapshots2', 'EpisodeNum'),
+                     ('Documents2_LibraryNum', 'Documents2', 'LibraryNum'),
+                     ('Quotes2_CollectNum', 'Quotes2', 'CollectNum'),
+                     ('Quotes2_SourceDocumentNum', 'Quotes2', 'SourceDocumentNum'),
+                     ('QuotePositions2_Lineage', 'QuotePositions2', 'DocumentNum, StartChar, EndChar'),
+                     ('Notes2_SeriesNum', 'Notes2', 'SeriesNum'),
+                     ('Notes2_EpisodeNum', 'Notes2', 'EpisodeNum'),
+                     ('Notes2_CollectNum', 'Notes2', 'CollectNum'),
+                     ('Notes2_ClipNum', 'Notes2', 'ClipNum'),
+                     ('Notes2_SnapshotNum', 'Notes2', 'SnapshotNum'),
+                     ('Notes2_TranscriptNum', 'Notes2', 'TranscriptNum'),
+                     ('Notes2_DocumentNum', 'Notes2', 'DocumentNum'),
+                     ('Notes2_QuoteNum', 'Notes2', 'QuoteNum'),
+                     ('ClipKeywords2_EpisodeNum', 'ClipKeywords2', 'EpisodeNum'),
+                     ('ClipKeywords2_DocumentNum', 'ClipKeywords2', 'DocumentNum'),
+                     ('ClipKeywords2_ClipNum', 'ClipKeywords2', 'ClipNum'),
+                     ('ClipKeywords2_QuoteNum', 'ClipKeywords2', 'QuoteNum'),
+                     ('ClipKeywords2_SnapshotNum', 'ClipKeywords2', 'SnapshotNum'),
+                     ('ClipKeywords2_Keyword', 'ClipKeywords2', 'KeywordGroup, Keyword'),
+                     ('SnapshotKeywords2_SnapshotNum', 'SnapshotKeywords2', 'SnapshotNum'),
+                     ('AdditionalVids2_EpisodeNum', 'AdditionalVids2', 'EpisodeNum'),
+                     ('AdditionalVids2_ClipNum', 'AdditionalVids2', 'ClipNum')]
+
+# Frequently-run queries that should be able to use the indexes above, for CheckQueryPlans()
+INDEXED_QUERIES = [('Clips by Collection', "SELECT ClipNum, SortOrder FROM Clips2 WHERE CollectNum = %s", (0, )),
+                   ('Clips by Episode', "SELECT ClipNum FROM Clips2 WHERE EpisodeNum = %s", (0, )),
+                   ('Quotes by Collection', "SELECT QuoteNum, SortOrder FROM Quotes2 WHERE CollectNum = %s", (0, )),
+                   ('Quotes by Document', "SELECT QuoteNum FROM Quotes2 WHERE SourceDocumentNum = %s", (0, )),
+                   ('Snapshots by Collection', "SELECT SnapshotNum, SortOrder FROM Snapshots2 WHERE CollectNum = %s", (0, )),
+                   ('Snapshots by Episode', "SELECT SnapshotNum FROM Snapshots2 WHERE EpisodeNum = %s", (0, )),
+                   ('Episodes by Library', "SELECT EpisodeNum FROM Episodes2 WHERE SeriesNum = %s", (0, )),
+                   ('Documents by Library', "SELECT DocumentNum FROM Documents2 WHERE LibraryNum = %s", (0, )),
+                   ('Collections by Parent', "SELECT CollectNum FROM Collections2 WHERE ParentCollectNum = %s", (0, )),
+                   ('Transcripts by Episode', "SELECT TranscriptNum FROM Transcripts2 WHERE EpisodeNum = %s AND ClipNum = 0", (0, )),
+                   ('Transcripts by Clip', "SELECT TranscriptNum FROM Transcripts2 WHERE ClipNum = %s", (0, )),
+                   ('Notes by Clip', "SELECT NoteNum FROM Notes2 WHERE ClipNum = %s", (0, )),
+                   ('Keywords by Clip', "SELECT KeywordGroup, Keyword FROM ClipKeywords2 WHERE ClipNum = %s", (0, )),
+                   ('Keywords by Quote', "SELECT KeywordGroup, Keyword FROM ClipKeywords2 WHERE QuoteNum = %s", (0, )),
+                   ('Clip Copies', "SELECT ClipNum FROM Transcripts2 WHERE SourceTranscriptNum = %s AND ClipStart = %s AND ClipStop = %s", (0, 0, 0)),
+                   ('Quote Copies', "SELECT QuoteNum FROM QuotePositions2 WHERE DocumentNum = %s AND StartChar = %s AND EndChar = %s", (0, 0, 0)),
+                   ('Keyword Examples', "SELECT ClipNum FROM ClipKeywords2 WHERE KeywordGroup = %s AND Keyword = %s", ('', '')),
+                   ('Clips in a Search Join', """SELECT c.ClipNum FROM Clips2 c, ClipKeywords2 ck
+                                                   WHERE ck.KeywordGroup = %s AND ck.Keyword = %s AND c.ClipNum = ck.ClipNum""", ('', ''))]
+
+def CreateSecondaryIndexes(dbCursor):
+    """ Create the secondary indexes in SECONDARY_INDEXES if this database's index version is
+        older than INDEX_VERSION.  Indexes that already exist are left alone. """
+    # Get this database's index version from the Configuration Information table
+    query = "SELECT Value FROM ConfigInfo WHERE KeyVal = 'IndexVersion'"
+    dbCursor.execute(query)
+    data = dbCursor.fetchall()
+    # If there's no index version, this database has never had secondary indexes
+    if len(data) <= 0:
+        indexVersion = 0
+    else:
+        indexVersion = int(data[0][0])
+    # If the indexes are up to date, there's nothing to do
+    if indexVersion >= INDEX_VERSION:
+        return
+    # For each index ...
+    for (indexName, tableName, columns) in SECONDARY_INDEXES:
+        # If we're using MySQL ...
+        if TransanaConstants.DBInstalled in ['MySQLdb-embedded', 'MySQLdb-server', 'PyMySQL']:
+            # ... MySQL does not support CREATE INDEX IF NOT EXISTS, so see if the index is already there
+            query = "SHOW INDEX FROM %s WHERE Key_name = %%s" % tableName
+            dbCursor.execute(query, (indexName, ))
+            # If it is, skip it
+            if len(dbCursor.fetchall()) > 0:
+                continue
+            query = "CREATE INDEX %s ON %s (%s)" % (indexName, tableName, columns)
+        # If we're using sqlite ...
+        else:
+            query = "CREATE INDEX IF NOT EXISTS %s ON %s (%s)" % (indexName, tableName, columns)
+        if DEBUG:
+            print "DBInterface.CreateSecondaryIndexes():", query
+        dbCursor.execute(query)
+    # Update the index version in the Configuration Information table
+    if indexVersion == 0:
+        query = "INSERT INTO ConfigInfo (KeyVal, Value) VALUES ('IndexVersion', %s)"
+    else:
+        query = "UPDATE ConfigInfo SET Value = %s WHERE KeyVal = 'IndexVersion'"
+    # Adjust the query for sqlite if needed
+    query = FixQuery(query)
+    dbCursor.execute(query, ('%d' % INDEX_VERSION, ))
+    # sqlite needs the change committed
+    if TransanaConstants.DBInstalled in ['sqlite3']:
+        get_db().commit()
+
+def CheckQueryPlans():
+    """ Ask the database how it will run each query in INDEXED_QUERIES.  Returns a list of
+        (description, plan) tuples for the queries that would have to scan a whole table.
+        An empty list means all of the frequently-run queries can use an index. """
+    # Start with an empty list of problems
+    results = []
+    # Get a database cursor
+    dbCursor = get_db().cursor()
+    # For each query to be checked ...
+    for (description, query, params) in INDEXED_QUERIES:
+        # If we're using MySQL ...
+        if TransanaConstants.DBInstalled in ['MySQLdb-embedded', 'MySQLdb-server', 'PyMySQL']:
+            dbCursor.execute("EXPLAIN " + query, params)
+            # Get the column names from the results set
+            columns = [col[0].lower() for col in dbCursor.description]
+            for row in dbCursor.fetchall():
+                row = dict(zip(columns, row))
+                # An access type of ALL with no usable key is a full table scan
+                if (row['type'] == 'ALL') and (row['possible_keys'] in [None, '']):
+                    results.append((description, 'ALL %s' % row['table']))
+        # If we're using sqlite ...
+        else:
+            dbCursor.execute("EXPLAIN QUERY PLAN " + FixQuery(query), params)
+            for row in dbCursor.fetchall():
+                # The plan detail is the last column.  A SCAN that doesn't use an index is a full table scan.
+                detail = row[-1]
+                if detail.startswith('SCAN') and (detail.find('INDEX') == -1):
+                    results.append((description, detail))
+    dbCursor.close()
+    # Return the list of queries that would scan a whole table
+    return results
+
 
 def establish_db_exists(dbToOpen=None, usePrompt=True):
     """ Check for the existence of all database tables and create them
@@ -1676,6 +1933,13 @@ def establish_db_exists(dbToOpen=None, usePrompt=True):
                         query += "AFTER XMLText "
                 dbCursor.execute(query)
 
+        # Add secondary indexes on the columns used to look up child records, if they're not already there
+        CreateSecondaryIndexes(dbCursor)
+        # If we're debugging, report any frequently-run queries that would still scan a whole table
+        if DEBUG:
+            for (description, plan) in CheckQueryPlans():
+                print "DBInterface.establish_db_exists(): table scan in %s:  %s" % (description, plan)
+
         # See if there are any records that need Plain Text extraction
         plainTextCount = CountItemsWithoutPlainText()
         # If there are ...
@@ -1791,6 +2055,7 @@ def get_db(dbToOpen=None, usePrompt=True):
     """ Get a connection object reference to the database.  If a connection has not yet been established, then create the connection.
         dbToOpen is passed if we are automatically importing a database following 2.42 to 2.50 Data Conversion. """
     global _dbref
+    global _connectionParams
     # If a database reference is not defined ...
     if (_dbref == None):
         # If we are NOT passed a database name, we need to get information from the user.
@@ -1828,6 +2093,8 @@ def get_db(dbToOpen=None, usePrompt=True):
                 dbServer = dbToOpen.dbServer          # ''
                 databaseName = dbToOpen.databaseName  # dbToOpen
                 port = dbToOpen.port                  # ''
+            # Assume no SSL connection unless we learn otherwise below
+            ssl = False
             # For unit_test_search.py...
             if dbServer == '192.168.1.202':
                 messageServer = '192.168.1.202'
@@ -1882,11 +2149,7 @@ def get_db(dbToOpen=None, usePrompt=True):
                 # If we should connect to the database ...
                 if result == wx.ID_YES:
                     # ... connect to it.
-                    _dbref = sqlite3.connect(dbName.encode('utf8'))
-                    # Enable AutoCommit
-                    _dbref.isolation_level = None
-                    # Have sqlite use Strings rather than Unicode, as all fields in Transana are manually encoded
-                    _dbref.text_factory = str
+                    _dbref = ConnectSQLite(dbName.encode('utf8'), TransanaGlobal.configData.sqliteProfile)
                     # Set the Max Allowed Packet setting for use with sqlite (This number came from the sqlite documentation)
                     TransanaGlobal.max_allowed_packet = 2147483647
                     # ... and we'll make this the default database to make it even easier.
@@ -2405,9 +2668,76 @@ def get_db(dbToOpen=None, usePrompt=True):
 
             else:
                 TransanaExceptions.ProgrammingError('Database Undefined in DBInterface.get_db()')
+
+            # If the connection was established ...
+            if _dbref != None:
+                # ... remember how we connected so that worker threads can open connections of their own.
+                # (This is kept in memory only and is never written to the configuration file.)
+                _connectionParams = {'userName' : userName,
+                                     'password' : password,
+                                     'dbServer' : dbServer,
+                                     'databaseName' : databaseName,
+                                     'port' : port,
+                                     'ssl' : ssl}
+                if TransanaConstants.DBInstalled in ['sqlite3']:
+                    _connectionParams['dbName'] = dbName
+                elif ssl:
+                    _connectionParams['sslClientCert'] = sslClientCert
+                    _connectionParams['sslClientKey'] = sslClientKey
     # Return the database reference
     return _dbref
 
+def get_independent_db():
+    """ Open an additional connection to the current database, independent of the main connection returned
+        by get_db().  This allows a worker thread to read from the database while the main connection is in use.
+        The caller is responsible for closing the connection.  Returns None if no independent connection
+        can be made, in which case the caller should fall back to using get_db(). """
+    # If the main database connection has not been established, or the embedded MySQL server is in use
+    # (which only supports the main connection), we can't open an independent connection.
+    if (_dbref == None) or (_connectionParams == None) or \
+       (TransanaConstants.DBInstalled in ['MySQLdb-embedded']):
+        return None
+    # If we're using sqlite ...
+    if TransanaConstants.DBInstalled in ['sqlite3']:
+        # ... open a second connection to the same database file
+        return ConnectSQLite(_connectionParams['dbName'].encode('utf8'), TransanaGlobal.configData.sqliteProfile)
+    # If we're using MySQL ...
+    else:
+        # Build the connection parameters that were used for the main connection
+        kwargs = {'host' : _connectionParams['dbServer'],
+                  'user' : _connectionParams['userName'],
+                  'passwd' : _connectionParams['password'],
+                  'port' : int(_connectionParams['port']),
+                  'use_unicode' : True}
+        if _connectionParams['ssl']:
+            kwargs['ssl'] = {'cert': _connectionParams['sslClientCert'], 'key': _connectionParams['sslClientKey']}
+        if TransanaConstants.DBInstalled in ['PyMySQL']:
+            kwargs['charset'] = 'utf8'
+        try:
+            dbConn = MySQLdb.connect(**kwargs)
+        except MySQLdb.OperationalError:
+            if DEBUG:
+                print "DBInterface.get_independent_db():  ", sys.exc_info()[1]
+            return None
+        dbCursor = dbConn.cursor()
+        # Match the Character Encoding settings of the main connection
+        if float(TransanaGlobal.DBVersion) >= 4.1:
+            # Suppress database warnings
+            warnings.filterwarnings('ignore', category = MySQLdb.Warning)
+            dbCursor.execute('SET CHARACTER SET utf8')
+            dbCursor.execute('SET character_set_connection = utf8')
+            dbCursor.execute('SET character_set_client = utf8')
+            dbCursor.execute('SET character_set_results = utf8')
+            dbCursor.execute('SET collation_connection = utf8_general_ci')
+            # Restore database warnings
+            warnings.resetwarnings()
+        # Select the appropriate database
+        dbCursor.execute('USE %s' % _connectionParams['databaseName'].encode(TransanaGlobal.encoding))
+        # Deal with SQL_MODE=ONLY_FULL_GROUP_BY
+        dbCursor.execute("set session sql_mode = 'STRICT_TRANS_TABLES,NO_ZERO_IN_DATE,NO_ZERO_DATE,ERROR_FOR_DIVISION_BY_ZERO,NO_AUTO_CREATE_USER,NO_ENGINE_SUBSTITUTION'")
+        dbCursor.close()
+        return dbConn
+
 def GetDBNamesMU(username, password, server, port, useSSL, SSLClient, SSLKey):
     """ Get all Transana database names on the specified server for which the User has permission """
     # Start with a blank list
@@ -2470,8 +2800,14 @@ def close_db():
         db.close()
 
     global _dbref
+    global _connectionParams
     # Remove all reference to the database
     _dbref = None
+    _connectionParams = None
+    # import Transana's Episode Segment Index (only needed here)
+    import EpisodeSegmentIndex
+    # Data cached from this database must not be used with the next one
+    EpisodeSegmentIndex.Invalidate()
 
 
 def get_username():
@@ -2542,16 +2878,22 @@ def list_of_episodes_for_series(LibraryName):
     DBCursor.close()
     return l
 
-def list_of_episode_transcripts(withoutPlainText = False):
-    """ Get a list of all Episode Transcript records, potentially only those missing extracted Plain Text. """
+def list_of_episode_transcripts(withoutPlainText = False, libraryNum = None):
+    """ Get a list of all Episode Transcript records, or only those for the specified Library, potentially
+        only those missing extracted Plain Text. """
     # Create an empty list
     l = []
     # Define the Query.  We only want Episode Transcripts, not Clip Transcripts.
-    query = "SELECT TranscriptNum, TranscriptID, EpisodeNum FROM Transcripts2 WHERE ClipNum = 0 "
+    query = "SELECT t.TranscriptNum, t.TranscriptID, t.EpisodeNum FROM Transcripts2 t "
+    # If we only want the Transcripts for one Library, we need the Episodes table too
+    if libraryNum != None:
+        query += ", Episodes2 e WHERE t.ClipNum = 0 AND t.EpisodeNum = e.EpisodeNum AND e.SeriesNum = %d " % libraryNum
+    else:
+        query += "WHERE t.ClipNum = 0 "
     # If we ONLY want Episode Transcripts that are missing PlainText ...
     if withoutPlainText:
-        query += " AND PlainText IS NULL "
-    query += "ORDER BY TranscriptID"
+        query += " AND t.PlainText IS NULL "
+    query += "ORDER BY t.TranscriptID"
     # Get a Database Cursor
     DBCursor = get_db().cursor()
     # Execute the Query
@@ -2782,15 +3124,23 @@ def locate_quick_quotes_and_clips_collection():
         tempCollection.db_save()
         return (tempCollection.number, collectionName, True)    
 
-def list_of_quotes(withoutPlainText = False):
-    """ Get a list of all Quotes, regardless of collection, potentially only those missing extracted Plain Text. """
+def list_of_quotes(withoutPlainText = False, collectionNum = None):
+    """ Get a list of all Quotes, regardless of collection, or only those for the specified Collection,
+        potentially only those missing extracted Plain Text. """
     # Create an empty list
     l = []
     # Define the Query
     query = "SELECT QuoteNum, QuoteID, CollectNum, SourceDocumentNum, SortOrder FROM Quotes2 "
+    if (collectionNum != None) or withoutPlainText:
+        query += "WHERE "
+    # If we only want the Quotes in one Collection ...
+    if collectionNum != None:
+        query += "CollectNum = %d " % collectionNum
+        if withoutPlainText:
+            query += "AND "
     # If we ONLY want Quotes that are missing PlainText ...
     if withoutPlainText:
-        query += "WHERE PlainText IS NULL "
+        query += "PlainText IS NULL "
     query += "ORDER BY SortOrder, QuoteID "
     # Get a Database Cursor
     DBCursor = get_db().cursor()
@@ -2862,6 +3212,39 @@ def list_of_quotes_by_document(DocumentNum, textPos=-1, textSel=(-2, -2)):
     DBCursor.close()
     return l
 
+def list_of_quotes_by_quotenums(quoteNums):
+    """ Get the same information as list_of_quotes_by_document() for the Quotes whose numbers are in quoteNums,
+        in the same order, in as few queries as possible.  Used with the live Quote positions of an open Document. """
+    l = []
+    # If there are no Quotes, there's nothing to look up
+    if len(quoteNums) == 0:
+        return l
+    # The query ends with the Quote Number field, so it can be run for a limited number of Quotes at a time
+    query = """
+              SELECT a.QuoteNum, a.QuoteID, a.CollectNum, b.StartChar, b.EndChar, c.CollectID, c.ParentCollectNum, a.Comment
+                    FROM Quotes2 a, QuotePositions2 b, Collections2 c
+                    WHERE a.QuoteNum = b.QuoteNum AND
+                          a.CollectNum = c.CollectNum AND
+                          a.QuoteNum"""
+    DBCursor = get_db().cursor()
+    rows = {}
+    for (QuoteNum, QuoteID, CollectNum, StartChar, EndChar, CollectID, ParentCollectNum, Comment) in \
+            _execute_for_number_list(DBCursor, query, (), quoteNums, fetch=True):
+        # Convert the ID values to the proper UTF-8 representation if needed
+        if 'unicode' in wx.PlatformInfo:
+            QuoteID = ProcessDBDataForUTF8Encoding(QuoteID)
+            CollectID = ProcessDBDataForUTF8Encoding(CollectID)
+        rows[QuoteNum] = {'Type' : 'Quote', 'QuoteNum' : QuoteNum, 'QuoteID' : QuoteID,
+                          'StartChar' : StartChar, 'EndChar' : EndChar,
+                          'CollectID' : CollectID, 'CollectNum' : CollectNum, 'ParentCollectNum' : ParentCollectNum,
+                          'Comment' : Comment}
+    DBCursor.close()
+    # Return the Quotes in the order requested.  Quotes not yet in the database are skipped.
+    for quoteNum in quoteNums:
+        if rows.has_key(quoteNum):
+            l.append(rows[quoteNum])
+    return l
+
 def list_of_quotes_by_collectionnum(collectionNum, includeSortOrder=False):
     quoteList = []
     query = """ SELECT QuoteNum, QuoteID, CollectNum, SortOrder, SourceDocumentNum
@@ -2883,8 +3266,31 @@ def list_of_quotes_by_collectionnum(collectionNum, includeSortOrder=False):
     cursor.close()
     return quoteList
 
-def list_of_clips(withoutPlainText = False):
-    """ Get a list of all Clips, regardless of collection, potentially only those missing extracted Plain Text. """
+def list_of_quotes_by_source_documents(documentNums):
+    """ Get a list of (QuoteNum, QuoteID, CollectNum, SourceDocumentNum) for all the Quotes taken from the
+        Documents whose numbers are in documentNums, using a single query. """
+    quoteList = []
+    # If there are no Documents, there are no Quotes
+    if len(documentNums) == 0:
+        return quoteList
+    query = """ SELECT QuoteNum, QuoteID, CollectNum, SourceDocumentNum
+                FROM Quotes2
+                WHERE SourceDocumentNum IN (%s) """ % ', '.join(['%s'] * len(documentNums))
+    # Adjust the query for sqlite if needed
+    query = FixQuery(query)
+    cursor = get_db().cursor()
+    cursor.execute(query, tuple(documentNums))
+    for (quoteNum, quoteID, collectNum, sourceDocNum) in cursor.fetchall():
+        id = quoteID
+        if 'unicode' in wx.PlatformInfo:
+            id = ProcessDBDataForUTF8Encoding(id)
+        quoteList.append((quoteNum, id, collectNum, sourceDocNum))
+    cursor.close()
+    return quoteList
+
+def list_of_clips(withoutPlainText = False, collectionNum = None):
+    """ Get a list of all Clips, regardless of collection, or only those for the specified Collection,
+        potentially only those missing extracted Plain Text. """
     # Create an empty list
     l = []
     # Define the Query
@@ -2892,6 +3298,13 @@ def list_of_clips(withoutPlainText = False):
     # If we ONLY want Clips that are missing PlainText ...
     if withoutPlainText:
         query += ", Transcripts2 t WHERE c.ClipNum = t.ClipNum AND t.PlainText IS NULL "
+    # If we only want the Clips in one Collection ...
+    if collectionNum != None:
+        if withoutPlainText:
+            query += "AND "
+        else:
+            query += " WHERE "
+        query += "c.CollectNum = %d " % collectionNum
     query += " ORDER BY c.SortOrder, c.ClipID "
     # Get a Database Cursor
     DBCursor = get_db().cursor()
@@ -3051,16 +3464,17 @@ def list_of_quote_copies(quoteID, sourceDocumentNum, start_char, end_char):
     """ Return a list of quotes that match the QuoteID, start, and stop positions submitted """
     # Create an empty list to hold data
     quoteList = []
-    # Define the SQL query
+    # Define the SQL query.  The Quote Positions lineage index finds the Quotes taken from the same
+    # range of the source Document, so only those Quotes' IDs need to be checked.
     query = """ SELECT q.QuoteNum, QuoteID, CollectNum, SourceDocumentNum, StartChar, EndChar
-                  FROM Quotes2 q, QuotePositions2 qp
-                  WHERE q.QuoteNum = qp.QuoteNum AND
-                  QuoteID = %s AND
-                  SourceDocumentNum = %s AND
-                  StartChar = %s AND
-                  EndChar = %s """
+                  FROM QuotePositions2 qp, Quotes2 q
+                  WHERE qp.DocumentNum = %s AND
+                        qp.StartChar = %s AND
+                        qp.EndChar = %s AND
+                        q.QuoteNum = qp.QuoteNum AND
+                        QuoteID = %s """
     # Define the data to get plugged into the SQL query
-    data = (quoteID.encode('utf8'), sourceDocumentNum, start_char, end_char)
+    data = (sourceDocumentNum, start_char, end_char, quoteID.encode('utf8'))
     # Adjust the query for sqlite if needed
     query = FixQuery(query)
     # Get a database cursor
@@ -3081,26 +3495,46 @@ def list_of_quote_copies(quoteID, sourceDocumentNum, start_char, end_char):
 
 def list_of_clip_copies(clipID, sourceTranscriptNum, clipStart, clipStop):
     """ Return a list of clips that match the ClipID, source Transcript number, start, and stop times submitted """
+    return list_of_clip_copies_by_lineage(clipID, [(sourceTranscriptNum, clipStart, clipStop)])
+
+def list_of_clip_copies_by_lineage(clipID, lineage):
+    """ Return a list of clips that match the ClipID and have a transcript that matches one of the
+        (source Transcript number, start time, stop time) entries in lineage.  Each clip is listed once, as
+        (clip number, collection number, clip ID, number of the first matching transcript). """
     # Create an empty list to hold data
     clipList = []
-    # Define the SQL query
+    # If there's no lineage to match, there are no copies
+    if len(lineage) == 0:
+        return clipList
+    # Define the SQL query.  The Transcripts lineage index finds the Clip Transcripts taken from the same
+    # range of each source Transcript, so only those Clips' IDs need to be checked.
     query = """ SELECT c.ClipNum, CollectNum, ClipID, TranscriptNum
-                  FROM Clips2 c, Transcripts2 t
-                  WHERE ClipID = %s AND
-                        SourceTranscriptNum = %s AND
+                  FROM Transcripts2 t, Clips2 c
+                  WHERE ("""
+    query += ' OR\n                         '.join(['(t.SourceTranscriptNum = %s AND t.ClipStart = %s AND t.ClipStop = %s)'] * len(lineage))
+    query += """) AND
                         c.ClipNum = t.ClipNum AND
-                        t.ClipStart = %s AND
-                        t.ClipStop = %s"""
+                        ClipID = %s
+                  ORDER BY c.ClipNum, t.SortOrder"""
     # Define the data to get plugged into the SQL query
-    data = (clipID.encode('utf8'), sourceTranscriptNum, clipStart, clipStop)
+    data = ()
+    for (sourceTranscriptNum, clipStart, clipStop) in lineage:
+        data += (sourceTranscriptNum, clipStart, clipStop)
+    data += (clipID.encode('utf8'), )
     # Adjust the query for sqlite if needed
     query = FixQuery(query)
     # Get a database cursor
     cursor = get_db().cursor()
     # Execute the SQL query
     cursor.execute(query, data)
+    # Keep track of the clips already listed
+    clipNums = {}
     # Fetch the data and iterate through it.
     for (clipNum, collectNum, clipID, transcriptNum) in cursor.fetchall():
+        # Only list each clip once
+        if clipNums.has_key(clipNum):
+            continue
+        clipNums[clipNum] = True
         # Get the Clip ID
         id = clipID
         # Convert it for UTF-8 if needed
@@ -3113,13 +3547,154 @@ def list_of_clip_copies(clipID, sourceTranscriptNum, clipStart, clipStop):
     # Return the data list to the calling routine
     return clipList
 
-def list_of_snapshots():
-    """ Get a list of all Snapshots, regardless of collection. """
+def list_of_collections_with_item_id(itemID, collectNums):
+    """ Return a dictionary of the numbers of the Collections in collectNums that contain a Clip or a Quote
+        named itemID.  Change Propagation uses this to find the copies that cannot take a new ID. """
+    results = {}
+    if 'unicode' in wx.PlatformInfo:
+        itemID = itemID.encode(TransanaGlobal.encoding)
+    # Get a database cursor
+    cursor = get_db().cursor()
+    for (table, idField) in (('Clips2', 'ClipID'), ('Quotes2', 'QuoteID')):
+        query = "SELECT CollectNum FROM %s WHERE %s = %%s AND CollectNum" % (table, idField)
+        for row in _execute_for_number_list(cursor, query, (itemID, ), collectNums, fetch=True):
+            results[row[0]] = True
+    cursor.close()
+    return results
+
+def _execute_for_number_list(dbCursor, query, values, numbers, fetch=False):
+    """ Execute query, which must end with the name of a record number field, with " IN (...)" added for
+        up to IN_LIST_SIZE of the numbers at a time.  values are the values for the rest of the query,
+        which must not have been adjusted with FixQuery().  If fetch is True, returns the combined rows. """
+    rows = []
+    for start in range(0, len(numbers), IN_LIST_SIZE):
+        numberList = tuple(numbers[start:start + IN_LIST_SIZE])
+        # Adjust the query for sqlite if needed
+        chunkQuery = FixQuery(query + " IN (" + ', '.join(['%s'] * len(numberList)) + ")")
+        dbCursor.execute(chunkQuery, tuple(values) + numberList)
+        if fetch:
+            rows += list(dbCursor.fetchall())
+    return rows
+
+def _check_keywords_exist(keywords, objType, itemID):
+    """ Raise a SaveError if any of the (Keyword Group, Keyword) pairs, which must be encoded for the database,
+        no longer exists.  Another user may have changed a Keyword while it was being applied.  objType
+        ('Clip' or 'Quote') and itemID identify the item for the error message. """
+    if objType == 'Quote':
+        keywordPrompt = _('Keyword "%s : %s" cannot be added to Quote "%s".\nAnother user must have edited the keyword while you were adding it.')
+    else:
+        keywordPrompt = _('Keyword "%s : %s" cannot be added to Clip "%s".\nAnother user must have edited the keyword while you were adding it.')
+    prompt = ''
+    DBCursor = get_db().cursor()
+    # Adjust the query for sqlite if needed
+    query = FixQuery("SELECT KeywordGroup FROM Keywords2 WHERE KeywordGroup = %s AND Keyword = %s")
+    checked = {}
+    for (kwg, kw) in keywords:
+        if checked.has_key((kwg, kw)):
+            continue
+        checked[(kwg, kw)] = True
+        DBCursor.execute(query, (kwg, kw))
+        if len(DBCursor.fetchall()) == 0:
+            # if the prompt isn't blank ...
+            if prompt != '':
+                # ... add a couple of line breaks to it
+                prompt += u'\n\n'
+            # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
+            prompt += unicode(keywordPrompt, 'utf8') % (ProcessDBDataForUTF8Encoding(kwg), ProcessDBDataForUTF8Encoding(kw), itemID)
+    DBCursor.close()
+    if prompt != '':
+        prompt += u'\n\n' + unicode(_('Please remove, and possibly replace, this keyword.'), 'utf8')
+        raise TransanaExceptions.SaveError, prompt
+
+def propagate_quote_changes(quoteID, quoteNums, text, plainText, keywords):
+    """ Give every Quote in quoteNums the same Quote ID, text, and keywords, for Change Propagation.  keywords
+        is a list of (Keyword Group, Keyword) pairs.  The Quotes are updated a few statements at a time rather
+        than one Quote at a time.  Must be run inside a transaction, such as RunInTransaction(). """
+    if len(quoteNums) == 0:
+        return
+    # Encode strings for the database
+    if 'unicode' in wx.PlatformInfo:
+        encodedID = quoteID.encode(TransanaGlobal.encoding)
+        if plainText != None:
+            plainText = plainText.encode(TransanaGlobal.encoding)
+    else:
+        encodedID = quoteID
+    if len(text) > TransanaGlobal.max_allowed_packet:   # 8388000
+        raise TransanaExceptions.SaveError, _("This quote is too large for the database.  Please shorten it, split it into two parts\nor if you are importing an RTF document, remove some unnecessary RTF encoding.")
+    encodedKeywords = _encode_keyword_list(keywords)
+    _check_keywords_exist(encodedKeywords, 'Quote', quoteID)
+    DBCursor = get_db().cursor()
+    # Update the Quote records.  The time stamp is the SERVER's, as clients may not be synchronized.
+    query = """UPDATE Quotes2
+                 SET QuoteID = %s,
+                     XMLText = %s,
+                     PlainText = %s,
+                     LastSaveTime = CURRENT_TIMESTAMP
+                 WHERE QuoteNum"""
+    _execute_for_number_list(DBCursor, query, (encodedID, text, plainText), quoteNums)
+    # Replace the Quotes' keywords
+    _execute_for_number_list(DBCursor, "DELETE FROM ClipKeywords2 WHERE QuoteNum", (), quoteNums)
+    rows = []
+    for quoteNum in quoteNums:
+        for (kwg, kw) in encodedKeywords:
+            rows.append((0, 0, 0, quoteNum, 0, kwg, kw, 0))
+    BulkInsert('ClipKeywords2', ('EpisodeNum', 'DocumentNum', 'ClipNum', 'QuoteNum', 'SnapshotNum', 'KeywordGroup', 'Keyword', 'Example'), rows)
+    DBCursor.close()
+
+def propagate_clip_changes(clipID, clipNums, transcripts, keywords):
+    """ Give every Clip in clipNums the same Clip ID, for Change Propagation, and update the Clips' transcripts
+        and keywords.  transcripts is a dictionary of Clip Transcript number : (text, plain text).  keywords is a
+        dictionary of Clip number : list of (Keyword Group, Keyword, Example) for the Clips whose keywords are
+        replaced.  Clips and transcripts that get the same values are updated a few statements at a time rather
+        than one at a time.  Must be run inside a transaction, such as RunInTransaction(). """
+    # Encode the Clip ID for the database
+    if 'unicode' in wx.PlatformInfo:
+        encodedID = clipID.encode(TransanaGlobal.encoding)
+    else:
+        encodedID = clipID
+    # Encode the keywords, and make sure they still exist
+    keywordRows = []
+    for clipNum in keywords.keys():
+        for (kwg, kw, example) in keywords[clipNum]:
+            if 'unicode' in wx.PlatformInfo:
+                kwg = kwg.encode(TransanaGlobal.encoding)
+                kw = kw.encode(TransanaGlobal.encoding)
+            keywordRows.append((0, 0, clipNum, 0, 0, kwg, kw, example))
+    _check_keywords_exist([(row[5], row[6]) for row in keywordRows], 'Clip', clipID)
+    DBCursor = get_db().cursor()
+    # Update the Clip IDs
+    _execute_for_number_list(DBCursor, "UPDATE Clips2 SET ClipID = %s WHERE ClipNum", (encodedID, ), clipNums)
+    # Group the Clip Transcripts by their new text.  Copies of the same source transcript all get the same text.
+    textGroups = {}
+    for transcriptNum in transcripts.keys():
+        textGroups.setdefault(transcripts[transcriptNum], []).append(transcriptNum)
+    for ((text, plainText), transcriptNums) in textGroups.items():
+        if len(text) > TransanaGlobal.max_allowed_packet:   # 8388000
+            raise TransanaExceptions.SaveError, _("This transcript is too large for the database.  Please shorten it, split it into two parts\nor if you are importing an RTF document, remove some unnecessary RTF encoding.")
+        if ('unicode' in wx.PlatformInfo) and (plainText != None):
+            plainText = plainText.encode(TransanaGlobal.encoding)
+        # The time stamp is the SERVER's, as clients may not be synchronized.
+        query = """UPDATE Transcripts2
+                     SET RTFText = %s,
+                         PlainText = %s,
+                         LastSaveTime = CURRENT_TIMESTAMP
+                     WHERE TranscriptNum"""
+        _execute_for_number_list(DBCursor, query, (text, plainText), transcriptNums)
+    # Replace the keywords
+    _execute_for_number_list(DBCursor, "DELETE FROM ClipKeywords2 WHERE ClipNum", (), keywords.keys())
+    BulkInsert('ClipKeywords2', ('EpisodeNum', 'DocumentNum', 'ClipNum', 'QuoteNum', 'SnapshotNum', 'KeywordGroup', 'Keyword', 'Example'), keywordRows)
+    DBCursor.close()
+
+def list_of_snapshots(collectionNum = None):
+    """ Get a list of all Snapshots, regardless of collection, or only those for the specified Collection. """
     # Create an empty list
     l = []
     # Define the Query
-    query = """ SELECT SnapshotNum, SnapshotID, CollectNum, SortOrder FROM Snapshots2
-                  ORDER BY SortOrder, SnapshotID """
+    query = " SELECT SnapshotNum, SnapshotID, CollectNum, SortOrder FROM Snapshots2 "
+    # If we only want the Snapshots in one Collection ...
+    if collectionNum != None:
+        query += "WHERE CollectNum = %d " % collectionNum
+    query += "ORDER BY SortOrder, SnapshotID "
     # Get a Database Cursor
     DBCursor = get_db().cursor()
     # Execute the Query
@@ -3187,6 +3762,60 @@ def list_of_snapshots_by_episode(EpisodeNum, TimeCode=None):
     DBCursor.close()
     return l
 
+def list_of_item_keywords_by_episode(EpisodeNum):
+    """ Get the Keywords for all Clips and Snapshots that have been created from a given Episode Number in a
+        single query.  Returns a dictionary of ('Clip', ClipNum) or ('Snapshot', SnapshotNum) : list of
+        (KeywordGroup, Keyword), in the same order as list_of_keywords(). """
+    keywords = {}
+    query = """
+              SELECT ck.ClipNum, ck.SnapshotNum, ck.KeywordGroup, ck.Keyword
+                FROM ClipKeywords2 ck
+                WHERE ck.ClipNum IN (SELECT ClipNum FROM Clips2 WHERE EpisodeNum = %s) OR
+                      ck.SnapshotNum IN (SELECT SnapshotNum FROM Snapshots2 WHERE EpisodeNum = %s)
+                ORDER BY ck.KeywordGroup, ck.Keyword
+            """
+    DBCursor = get_db().cursor()
+    # Adjust the query for sqlite if needed
+    query = FixQuery(query)
+    DBCursor.execute(query, (EpisodeNum, EpisodeNum))
+    for (clipNum, snapshotNum, kwg, kw) in DBCursor.fetchall():
+        # Convert the Keyword values to the proper UTF-8 representation if needed
+        if 'unicode' in wx.PlatformInfo:
+            kwg = ProcessDBDataForUTF8Encoding(kwg)
+            kw = ProcessDBDataForUTF8Encoding(kw)
+        # A Keyword record belongs to either a Clip or a Snapshot
+        if (clipNum != None) and (clipNum > 0):
+            key = ('Clip', clipNum)
+        else:
+            key = ('Snapshot', snapshotNum)
+        if not keywords.has_key(key):
+            keywords[key] = []
+        keywords[key].append((kwg, kw))
+    DBCursor.close()
+    return keywords
+
+def list_of_snapshot_coding_by_episode(EpisodeNum):
+    """ Get the Coded Keywords for all Snapshots that have been attached to a given Episode Number in a
+        single query.  Returns a dictionary of SnapshotNum : list of (KeywordGroup, Keyword, visible). """
+    coding = {}
+    query = """
+              SELECT sk.SnapshotNum, sk.KeywordGroup, sk.Keyword, sk.visible
+                FROM SnapshotKeywords2 sk, Snapshots2 s
+                WHERE sk.SnapshotNum = s.SnapshotNum AND
+                      s.EpisodeNum = %s
+            """
+    DBCursor = get_db().cursor()
+    # Adjust the query for sqlite if needed
+    query = FixQuery(query)
+    DBCursor.execute(query, (EpisodeNum, ))
+    for (snapshotNum, kwg, kw, visible) in DBCursor.fetchall():
+        if not coding.has_key(snapshotNum):
+            coding[snapshotNum] = []
+        # Snapshot.Snapshot() always decodes Coded Keywords, so we do too
+        coding[snapshotNum].append((ProcessDBDataForUTF8Encoding(kwg), ProcessDBDataForUTF8Encoding(kw), visible == '1'))
+    DBCursor.close()
+    return coding
+
 def list_of_snapshots_by_transcriptnum(transcriptNum):
     snapshotList = []
     query = """ SELECT SnapshotNum, SnapshotID, CollectNum
@@ -3728,7 +4357,8 @@ def list_of_notes(** kwargs):
 
 def list_of_node_notes(** kwargs):
     """ Get a list of all Notes for the given Library or Collection node, including sub-nodes.
-        Valid parameters are LibraryNode=True or CollectionNode=True."""
+        Valid parameters are LibraryNode=True or CollectionNode=True.  LibraryNum or CollectionNum may
+        also be passed to limit the results to the Notes for one Library or Collection and its direct children."""
     # Create an empty list
     notelist = []
     # Start building the Query
@@ -3737,17 +4367,37 @@ def list_of_node_notes(** kwargs):
     # If we're looking for Library Node Notes ...
     if kwargs.has_key("LibraryNode"):
         # ... we need to build a query for Library, Episode, or Transcript Notes
-        query += """WHERE   SeriesNum <> 0 OR
-                            EpisodeNum <> 0 OR
-                            TranscriptNum <> 0 OR
-                            DocumentNum <> 0 """
+        # If we only want the Notes for a single Library ...
+        if kwargs.has_key("LibraryNum"):
+            # ... we need to limit the query to that Library and its Documents, Episodes, and Episode Transcripts
+            query += """WHERE   SeriesNum = %(num)d OR
+                                DocumentNum IN (SELECT DocumentNum FROM Documents2 WHERE LibraryNum = %(num)d) OR
+                                EpisodeNum IN (SELECT EpisodeNum FROM Episodes2 WHERE SeriesNum = %(num)d) OR
+                                TranscriptNum IN (SELECT t.TranscriptNum FROM Transcripts2 t, Episodes2 e
+                                                    WHERE t.ClipNum = 0 AND t.EpisodeNum = e.EpisodeNum AND e.SeriesNum = %(num)d) """ % \
+                     {'num' : kwargs['LibraryNum']}
+        else:
+            query += """WHERE   SeriesNum <> 0 OR
+                                EpisodeNum <> 0 OR
+                                TranscriptNum <> 0 OR
+                                DocumentNum <> 0 """
     # If we're looking for Collection Node Notes ...
     elif kwargs.has_key("CollectionNode"):
         # ... we need to build a query for Collection or Clip Notes
-        query += """WHERE   CollectNum <> 0 OR
-                            ClipNum <> 0 OR
-                            SnapshotNum <> 0 OR
-                            QuoteNum <> 0 """
+        # If we only want the Notes for a single Collection ...
+        if kwargs.has_key("CollectionNum"):
+            # ... we need to limit the query to that Collection and its Quotes, Clips, and Snapshots.
+            # (Nested Collections get their Notes when they are loaded.)
+            query += """WHERE   CollectNum = %(num)d OR
+                                ClipNum IN (SELECT ClipNum FROM Clips2 WHERE CollectNum = %(num)d) OR
+                                SnapshotNum IN (SELECT SnapshotNum FROM Snapshots2 WHERE CollectNum = %(num)d) OR
+                                QuoteNum IN (SELECT QuoteNum FROM Quotes2 WHERE CollectNum = %(num)d) """ % \
+                     {'num' : kwargs['CollectionNum']}
+        else:
+            query += """WHERE   CollectNum <> 0 OR
+                                ClipNum <> 0 OR
+                                SnapshotNum <> 0 OR
+                                QuoteNum <> 0 """
     # If neither LibraryNode nor CollectionNode is defined, we've got a programming error.
     else:
         return []   # Should we raise an exception?
@@ -4037,12 +4687,22 @@ def list_of_snapshot_detail_keywords(** kwargs):
     DBCursor.close()
     return kwlist
 
-def list_of_keyword_examples():
-    """Get a list of all Keyword Examples from the ClipKeywords table."""
+def list_of_keyword_examples(kwg=None, kw=None):
+    """Get a list of all Keyword Examples from the ClipKeywords table, or only those for the specified Keyword."""
     
     query = "SELECT EpisodeNum, ClipNum, SnapshotNum, KeywordGroup, Keyword, Example FROM ClipKeywords2 WHERE Example = 1"
     dbCursor = get_db().cursor()
-    dbCursor.execute(query)
+    # If we only want the Examples for a single Keyword ...
+    if (kwg != None) and (kw != None):
+        if 'unicode' in wx.PlatformInfo:
+            kwg = kwg.encode(TransanaGlobal.encoding)
+            kw = kw.encode(TransanaGlobal.encoding)
+        query += " AND KeywordGroup = %s AND Keyword = %s"
+        # Adjust the query for sqlite if needed
+        query = FixQuery(query)
+        dbCursor.execute(query, (kwg, kw))
+    else:
+        dbCursor.execute(query)
     results = dbCursor.fetchall()
     keywordExampleList = []
     # Current ClipKeywords table row format used:
@@ -4490,6 +5150,26 @@ def list_all_keyword_examples_for_a_clip(clipnum):
     # Return the list of Keyword Examples as the function result
     return kwExamples
 
+def list_keyword_examples_for_clips(clipNums):
+    """ Lists the Keyword Examples for all of the Clips in clipNums.  Returns a dictionary of Clip number :
+        list of (Keyword Group, Keyword, Clip number, Clip ID), as list_all_keyword_examples_for_a_clip() returns. """
+    kwExamples = {}
+    # Get a Database Cursor
+    cursor = get_db().cursor()
+    query = """ SELECT KeywordGroup, Keyword, CK.ClipNum, ClipID
+                FROM ClipKeywords2 CK, Clips2 C
+                WHERE Example = 1 AND
+                      CK.ClipNum = C.ClipNum AND
+                      CK.ClipNum"""
+    for (kwg, kw, clipNumber, clipID) in _execute_for_number_list(cursor, query, (), clipNums, fetch=True):
+        kwg = ProcessDBDataForUTF8Encoding(kwg)
+        kw = ProcessDBDataForUTF8Encoding(kw)
+        clipID = ProcessDBDataForUTF8Encoding(clipID)
+        kwExamples.setdefault(clipNumber, []).append((kwg, kw, clipNumber, clipID))
+    # Close the Database Cursor
+    cursor.close()
+    return kwExamples
+
 def delete_all_keywords_for_a_group(epnum, docnum, clipnum, quotenum, snapshotnum):
     """ Given an Episode, Document, Clip, Quote, or Snapshot number, delete the appropriate keywordgroup/word pairs. """
     # If we have an Episode Number ...
@@ -4585,446 +5265,397 @@ def add_keyword(group, kw_name):
     DBCursor.execute(query, (group, kw_name))
     DBCursor.close()
 
-def delete_keyword_group(name):
-    """Delete a Keyword Group from the database, including all associated
-    keywords."""
-
+def _encode_keyword(kwg, kw):
+    """ Encode a (Keyword Group, Keyword) pair for use in a query.  A Keyword of None stands for every Keyword
+        in the Keyword Group. """
+    # If we're in Unicode mode, we need to encode the parameters so that the query will work right.
     if 'unicode' in wx.PlatformInfo:
-        kwg = name.encode(TransanaGlobal.encoding)
-
+        kwg = kwg.encode(TransanaGlobal.encoding)
+        if kw != None:
+            kw = kw.encode(TransanaGlobal.encoding)
+    return (kwg, kw)
+
+def _encode_keyword_list(keywords):
+    """ Encode a list of (Keyword Group, Keyword) pairs for use in a query.  A Keyword of None stands for every
+        Keyword in the Keyword Group.  Duplicate pairs are dropped. """
+    encodedKeywords = []
+    found = {}
+    for (kwg, kw) in keywords:
+        pair = _encode_keyword(kwg, kw)
+        if not found.has_key(pair):
+            found[pair] = True
+            encodedKeywords.append(pair)
+    return encodedKeywords
+
+def _keyword_list_conditions(encodedKeywords, alias='', pairsPerQuery=IN_LIST_SIZE / 2):
+    """ Build the WHERE conditions that match a list of encoded (Keyword Group, Keyword) pairs, at most pairsPerQuery
+        pairs per condition.  A single condition for a long list exceeds the database's limits on query parameters
+        and expression depth.  Returns a list of (condition, parameter values). """
+    conditions = []
+    for start in range(0, len(encodedKeywords), pairsPerQuery):
+        conditions.append(_keyword_list_condition(encodedKeywords[start:start + pairsPerQuery], alias))
+    return conditions
+
+def _keyword_list_condition(encodedKeywords, alias=''):
+    """ Build a WHERE condition that matches any of a short list of encoded (Keyword Group, Keyword) pairs.
+        alias is the table alias, if any.  Returns the condition and its parameter values.  Longer lists must be
+        split up with _keyword_list_conditions(). """
+    if alias != '':
+        alias += '.'
+    conditions = []
+    values = ()
+    for (kwg, kw) in encodedKeywords:
+        # A Keyword of None matches the whole Keyword Group
+        if kw == None:
+            conditions.append('(%sKeywordGroup = %%s)' % alias)
+            values += (kwg, )
+        else:
+            conditions.append('(%sKeywordGroup = %%s AND %sKeyword = %%s)' % (alias, alias))
+            values += (kwg, kw)
+    return ('(' + ' OR '.join(conditions) + ')', values)
+
+def list_keyword_locks(keywords, includeKeywords=True):
+    """ Return a list of (Object Type, Object Name, Record Lock) for the records that are locked and use any of
+        a list of (Keyword Group, Keyword) pairs, with one query per table no matter how many Keywords are
+        listed (or per IN_LIST_SIZE / 2 Keywords, for long lists).  A Keyword of None stands for every Keyword in
+        the Keyword Group.  The Object Name of a locked Keyword is a (Keyword Group, Keyword) tuple.  If
+        includeKeywords is False, locks on the Keyword records themselves are ignored. """
+    encodedKeywords = _encode_keyword_list(keywords)
+    locks = []
+    if len(encodedKeywords) == 0:
+        return locks
     DBCursor = get_db().cursor()
-    DBCursor.execute("BEGIN")
+    # Check for locked Keywords
+    if includeKeywords:
+        for (condition, values) in _keyword_list_conditions(encodedKeywords):
+            query = """SELECT KeywordGroup, Keyword, RecordLock
+                FROM Keywords2
+                WHERE   """ + condition + """ AND
+                        RecordLock <> %s
+            """
+            # Adjust the query for sqlite if needed
+            query = FixQuery(query)
+            DBCursor.execute(query, values + ("", ))
+            for row in fetchall_named(DBCursor):
+                tempkwg = row['KeywordGroup']
+                tempkw = row['Keyword']
+                temprl = row['RecordLock']
+                if 'unicode' in wx.PlatformInfo:
+                    tempkwg = ProcessDBDataForUTF8Encoding(tempkwg)
+                    tempkw = ProcessDBDataForUTF8Encoding(tempkw)
+                    temprl = ProcessDBDataForUTF8Encoding(temprl)
+                locks.append(('Keyword', (tempkwg, tempkw), temprl))
+
+    # The locked records already reported
+    found = {}
+    # Check for locked Documents, Episodes, Quotes, Clips, Snapshots with Whole Snapshot Keywords, and Snapshots
+    # with Snapshot Coding
+    for (condition, values) in _keyword_list_conditions(encodedKeywords, 'a'):
+        for (keywordTable, objectTable, numField, idField, objectType) in \
+            (('ClipKeywords2', 'Documents2', 'DocumentNum', 'DocumentID', 'Document'),
+             ('ClipKeywords2', 'Episodes2', 'EpisodeNum', 'EpisodeID', 'Episode'),
+             ('ClipKeywords2', 'Quotes2', 'QuoteNum', 'QuoteID', 'Quote'),
+             ('ClipKeywords2', 'Clips2', 'ClipNum', 'ClipID', 'Clip'),
+             ('ClipKeywords2', 'Snapshots2', 'SnapshotNum', 'SnapshotID', 'Snapshot'),
+             ('SnapshotKeywords2', 'Snapshots2', 'SnapshotNum', 'SnapshotID', 'Snapshot')):
+            query = "SELECT DISTINCT b." + idField + ", b.RecordLock\n" + \
+                    "  FROM " + keywordTable + " a, " + objectTable + " b\n" + \
+                    "  WHERE " + condition + " AND\n" + \
+                    "        a." + numField + " <> %s AND\n" + \
+                    "        a." + numField + " = b." + numField + " AND\n" + \
+                    "        b.RecordLock <> %s"
+            # Adjust the query for sqlite if needed
+            query = FixQuery(query)
+            DBCursor.execute(query, values + (0, ""))
+            for row in fetchall_named(DBCursor):
+                tempid = row[idField]
+                temprl = row['RecordLock']
+                if 'unicode' in wx.PlatformInfo:
+                    tempid = ProcessDBDataForUTF8Encoding(tempid)
+                    temprl = ProcessDBDataForUTF8Encoding(temprl)
+                # Each locked record is reported once, no matter how many of the Keywords it uses.  (A Snapshot can
+                # also be locked for both kinds of coding.)
+                if not found.has_key((objectType, tempid, temprl)):
+                    found[(objectType, tempid, temprl)] = True
+                    locks.append((objectType, tempid, temprl))
+    DBCursor.close()
+    return locks
+
+def _keyword_lock_text(locks):
+    """ Build the explanation of the locks returned by list_keyword_locks() for an error message """
     t = ""
-    query = """SELECT KeywordGroup, Keyword, RecordLock
-        FROM Keywords2
-        WHERE   KeywordGroup = %s AND
-                RecordLock <> %s
-    """
-    # Adjust the query for sqlite if needed
-    query = FixQuery(query)
-    DBCursor.execute(query, (kwg, ""))
-    for row in fetchall_named(DBCursor):
-        tempkwg = row['KeywordGroup']
-        tempkw = row['Keyword']
-        temprl = row['RecordLock']
-        if 'unicode' in wx.PlatformInfo:
-            tempkwg = ProcessDBDataForUTF8Encoding(tempkwg)
-            tempkw = ProcessDBDataForUTF8Encoding(tempkw)
-            temprl = ProcessDBDataForUTF8Encoding(temprl)
-        if 'unicode' in wx.PlatformInfo:
-            # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
-            prompt = unicode(_('%s  Keyword "%s : %s" is locked by %s\n'), 'utf8')
-        else:
+    for (objectType, objectName, recordLock) in locks:
+        if objectType == 'Keyword':
             prompt = _('%s  Keyword "%s : %s" is locked by %s\n')
-        t = prompt % (t, tempkwg, tempkw, temprl)
-
-# Check for locked Documents
-    query = """SELECT a.KeywordGroup, a.Keyword, b.DocumentID, b.RecordLock
-        FROM ClipKeywords2 a, Documents2 b
-        WHERE   a.KeywordGroup = %s AND
-                a.DocumentNum <> %s AND
-                a.DocumentNum = b.DocumentNum AND
-                b.RecordLock <> %s
-    """
-    # Adjust the query for sqlite if needed
-    query = FixQuery(query)
-    DBCursor.execute(query, (kwg, 0, ""))
-    for row in fetchall_named(DBCursor):
-        tempdocid = row['DocumentID']
-        temprl = row['RecordLock']
-        if 'unicode' in wx.PlatformInfo:
-            tempdocid = ProcessDBDataForUTF8Encoding(tempdocid)
-            temprl = ProcessDBDataForUTF8Encoding(temprl)
-        if 'unicode' in wx.PlatformInfo:
-            # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
-            prompt = unicode(_('%s  Document "%s" is locked by %s\n'), 'utf8')
-        else:
+        elif objectType == 'Document':
             prompt = _('%s  Document "%s" is locked by %s\n')
-        t = prompt % (t, tempdocid, temprl)
-
-# Check for locked Episodes
-    query = """SELECT a.KeywordGroup, a.Keyword, b.EpisodeID, b.RecordLock
-        FROM ClipKeywords2 a, Episodes2 b
-        WHERE   a.KeywordGroup = %s AND
-                a.EpisodeNum <> %s AND
-                a.EpisodeNum = b.EpisodeNum AND
-                b.RecordLock <> %s
-    """
-    # Adjust the query for sqlite if needed
-    query = FixQuery(query)
-    DBCursor.execute(query, (kwg, 0, ""))
-    for row in fetchall_named(DBCursor):
-        tempepid = row['EpisodeID']
-        temprl = row['RecordLock']
-        if 'unicode' in wx.PlatformInfo:
-            tempepid = ProcessDBDataForUTF8Encoding(tempepid)
-            temprl = ProcessDBDataForUTF8Encoding(temprl)
-        if 'unicode' in wx.PlatformInfo:
-            # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
-            prompt = unicode(_('%s  Episode "%s" is locked by %s\n'), 'utf8')
-        else:
+        elif objectType == 'Episode':
             prompt = _('%s  Episode "%s" is locked by %s\n')
-        t = prompt % (t, tempepid, temprl)
-
-    # Quotes next
-    query = """SELECT a.KeywordGroup, a.Keyword, c.QuoteID, c.RecordLock
-        FROM ClipKeywords2 a, Quotes2 c
-        WHERE   a.KeywordGroup = %s AND
-                a.QuoteNum <> %s AND
-                a.QuoteNum = c.QuoteNum AND
-                c.RecordLock <> %s
-    """
-    # Adjust the query for sqlite if needed
-    query = FixQuery(query)
-    DBCursor.execute(query, (kwg, 0, ""))
-    for row in fetchall_named(DBCursor):
-        tempqid = row['QuoteID']
-        temprl = row['RecordLock']
-        if 'unicode' in wx.PlatformInfo:
-            tempqid = ProcessDBDataForUTF8Encoding(tempqid)
-            temprl = ProcessDBDataForUTF8Encoding(temprl)
-        if 'unicode' in wx.PlatformInfo:
-            # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
-            prompt = unicode(_('%s  Quote "%s" is locked by %s\n'), 'utf8')
-        else:
+        elif objectType == 'Quote':
             prompt = _('%s  Quote "%s" is locked by %s\n')
-        t = prompt % (t, tempqid, temprl)
-
-    # Clips next
-    query = """SELECT a.KeywordGroup, a.Keyword, c.ClipID, c.RecordLock
-        FROM ClipKeywords2 a, Clips2 c
-        WHERE   a.KeywordGroup = %s AND
-                a.ClipNum <> %s AND
-                a.ClipNum = c.ClipNum AND
-                c.RecordLock <> %s
-    """
-    # Adjust the query for sqlite if needed
-    query = FixQuery(query)
-    DBCursor.execute(query, (kwg, 0, ""))
-    for row in fetchall_named(DBCursor):
-        tempclid = row['ClipID']
-        temprl = row['RecordLock']
-        if 'unicode' in wx.PlatformInfo:
-            tempclid = ProcessDBDataForUTF8Encoding(tempclid)
-            temprl = ProcessDBDataForUTF8Encoding(temprl)
-        if 'unicode' in wx.PlatformInfo:
-            # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
-            prompt = unicode(_('%s  Clip "%s" is locked by %s\n'), 'utf8')
-        else:
+        elif objectType == 'Clip':
             prompt = _('%s  Clip "%s" is locked by %s\n')
-        t = prompt % (t, tempclid, temprl)
-
-    # Whole Snapshot Keywords next
-    query = """SELECT a.KeywordGroup, a.Keyword, s.SnapshotID, s.RecordLock
-        FROM ClipKeywords2 a, Snapshots2 s
-        WHERE   a.KeywordGroup = %s AND
-                a.SnapshotNum <> %s AND
-                a.SnapshotNum = s.SnapshotNum AND
-                s.RecordLock <> %s
-    """
-    # Adjust the query for sqlite if needed
-    query = FixQuery(query)
-    DBCursor.execute(query, (kwg, 0, ""))
-    for row in fetchall_named(DBCursor):
-        tempsnid = row['SnapshotID']
-        temprl = row['RecordLock']
-        if 'unicode' in wx.PlatformInfo:
-            tempsnid = ProcessDBDataForUTF8Encoding(tempsnid)
-            temprl = ProcessDBDataForUTF8Encoding(temprl)
-        if 'unicode' in wx.PlatformInfo:
-            # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
-            prompt = unicode(_('%s  Snapshot "%s" is locked by %s\n'), 'utf8')
         else:
             prompt = _('%s  Snapshot "%s" is locked by %s\n')
-        t = prompt % (t, tempsnid, temprl)
-
-    # Snapshot Coding next
-    query = """SELECT a.KeywordGroup, a.Keyword, s.SnapshotID, s.RecordLock
-        FROM SnapshotKeywords2 a, Snapshots2 s
-        WHERE   a.KeywordGroup = %s AND
-                a.SnapshotNum <> %s AND
-                a.SnapshotNum = s.SnapshotNum AND
-                s.RecordLock <> %s
-    """
-    # Adjust the query for sqlite if needed
-    query = FixQuery(query)
-    DBCursor.execute(query, (kwg, 0, ""))
-    for row in fetchall_named(DBCursor):
-        tempsnid = row['SnapshotID']
-        temprl = row['RecordLock']
-        if 'unicode' in wx.PlatformInfo:
-            tempsnid = ProcessDBDataForUTF8Encoding(tempsnid)
-            temprl = ProcessDBDataForUTF8Encoding(temprl)
         if 'unicode' in wx.PlatformInfo:
             # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
-            prompt = unicode(_('%s  Snapshot "%s" is locked by %s\n'), 'utf8')
+            prompt = unicode(prompt, 'utf8')
+        if objectType == 'Keyword':
+            t = prompt % (t, objectName[0], objectName[1], recordLock)
         else:
-            prompt = _('%s  Snapshot "%s" is locked by %s\n')
-        t = prompt % (t, tempsnid, temprl)
-
-    if t == "":
-        # Delphi Transana had a confirmation dialog here, but we won't do
-        # that here (do it before calling this function).
-
-        # Build and execute the SQL to delete a word from the list.
-        query = """DELETE FROM Keywords2
-            WHERE   KeywordGroup = %s """
-        # Adjust the query for sqlite if needed
-        query = FixQuery(query)
-        DBCursor.execute(query, (kwg, ))
-        # Now delete all instances of this keywordgroup/keyword combo in the
-        # ClipKeywords file
-        query = """DELETE FROM ClipKeywords2
-            WHERE   KeywordGroup = %s """
-        # Adjust the query for sqlite if needed
-        query = FixQuery(query)
-        DBCursor.execute(query, (kwg, ))
-        # Now delete all instances of this keywordgroup/keyword combo in the
-        # SnapshotKeywords file
-        query = """DELETE FROM SnapshotKeywords2
-            WHERE   KeywordGroup = %s """
-        # Adjust the query for sqlite if needed
-        query = FixQuery(query)
-        DBCursor.execute(query, (kwg, ))
-        # Now delete all instances of this keywordgroup/keyword combo in the
-        # SnapshotKeywordStyles file
-        query = """DELETE FROM SnapshotKeywordStyles2
-            WHERE   KeywordGroup = %s """
-        # Adjust the query for sqlite if needed
-        query = FixQuery(query)
-        DBCursor.execute(query, (kwg, ))
-
-        # Finish the transaction
-        DBCursor.execute("COMMIT")
-    else:
-        DBCursor.execute("ROLLBACK")
-        DBCursor.close()
-        msg = _('Unable to delete keyword group "%s".\n%s')
-        if 'unicode' in wx.PlatformInfo:
-            # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
-            msg = unicode(msg, 'utf8')
-        msg = msg  % (name, t)
+            t = prompt % (t, objectName, recordLock)
+    return t
+
+def delete_keywords(keywords):
+    """ Delete a list of (Keyword Group, Keyword) pairs from the database, including every place they are used,
+        as a single transaction.  A Keyword of None deletes the whole Keyword Group.  Each table is checked for
+        locks and changed with a single query, no matter how many Keywords are deleted.  Raises a GeneralError,
+        and deletes nothing, if any Keyword or any record that uses one is locked. """
+    # Delphi Transana had a confirmation dialog here, but we won't do
+    # that here (do it before calling this function).
+    if len(keywords) == 0:
+        return
+    # import Transana's Episode Segment Index (only needed here)
+    import EpisodeSegmentIndex
+    RunInTransaction(_delete_keywords, keywords)
+    # Displayed Episode Items may have changed, so the Episode Segment Indexes must be reloaded
+    EpisodeSegmentIndex.Invalidate()
+
+def _delete_keywords(keywords):
+    """ The work of delete_keywords(), which must be run inside a transaction """
+    t = _keyword_lock_text(list_keyword_locks(keywords))
+    if t != "":
+        if len(keywords) == 1:
+            if keywords[0][1] == None:
+                msg = _('Unable to delete keyword group "%s".\n%s')
+                if 'unicode' in wx.PlatformInfo:
+                    # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
+                    msg = unicode(msg, 'utf8')
+                msg = msg % (keywords[0][0], t)
+            else:
+                msg = _('Unable to delete keyword "%s : %s".\n%s')
+                if 'unicode' in wx.PlatformInfo:
+                    # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
+                    msg = unicode(msg, 'utf8')
+                msg = msg % (keywords[0][0], keywords[0][1], t)
+        else:
+            msg = _('Unable to delete the selected keywords.\n%s')
+            if 'unicode' in wx.PlatformInfo:
+                # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
+                msg = unicode(msg, 'utf8')
+            msg = msg % t
         raise TransanaExceptions.GeneralError, msg
-    DBCursor.close()
 
-def delete_keyword(group, kw_name):
-    """Delete a Keyword from the database."""
-    if 'unicode' in wx.PlatformInfo:
-        kwg = group.encode(TransanaGlobal.encoding)
-        kw = kw_name.encode(TransanaGlobal.encoding)
-    else:
-        kwg = group
-        kw = kw_name
     DBCursor = get_db().cursor()
-    DBCursor.execute("BEGIN")
-    t = ""
-    query = """SELECT KeywordGroup, Keyword, RecordLock
-        FROM Keywords2
-        WHERE   KeywordGroup = %s AND
-                Keyword = %s AND
-                RecordLock <> %s
-    """
-    # Adjust the query for sqlite if needed
-    query = FixQuery(query)
-    DBCursor.execute(query, (kwg, kw, ""))
-    for row in fetchall_named(DBCursor):
-        msg = _('%s  Keyword "%s : %s" is locked by %s\n')
-        tempkwg = row['KeywordGroup']
-        tempkw = row['Keyword']
-        temprl = row['RecordLock']
-        if 'unicode' in wx.PlatformInfo:
-            msg = unicode(msg, 'utf8')
-            tempkwg = ProcessDBDataForUTF8Encoding(tempkwg)
-            tempkw = ProcessDBDataForUTF8Encoding(tempkw)
-            temprl = ProcessDBDataForUTF8Encoding(temprl)
-        t =  msg % (t, tempkwg, tempkw, temprl)
-
-    # Check for locked Documents
-    query = """SELECT a.KeywordGroup, a.Keyword, b.DocumentID, b.RecordLock
-        FROM ClipKeywords2 a, Documents2 b
-        WHERE   a.KeywordGroup = %s AND
-                a.Keyword = %s AND
-                a.DocumentNum <> %s AND
-                a.DocumentNum = b.DocumentNum AND
-                b.RecordLock <> %s
-    """
-    # Adjust the query for sqlite if needed
-    query = FixQuery(query)
-    DBCursor.execute(query, (kwg, kw, 0, ""))
-    for row in fetchall_named(DBCursor):
-        msg = _('%s  Document "%s" is locked by %s\n')
-        tempdocid = row['DocumentID']
-        temprl = row['RecordLock']
-        if 'unicode' in wx.PlatformInfo:
-            msg = unicode(msg, 'utf8')
-            tempdocid = ProcessDBDataForUTF8Encoding(tempdocid)
-            temprl = ProcessDBDataForUTF8Encoding(temprl)
-        t = msg % (t, tempdocid, temprl)
-
-    # Check for locked Episodes
-    query = """SELECT a.KeywordGroup, a.Keyword, b.EpisodeID, b.RecordLock
-        FROM ClipKeywords2 a, Episodes2 b
-        WHERE   a.KeywordGroup = %s AND
-                a.Keyword = %s AND
-                a.EpisodeNum <> %s AND
-                a.EpisodeNum = b.EpisodeNum AND
-                b.RecordLock <> %s
-    """
-    # Adjust the query for sqlite if needed
-    query = FixQuery(query)
-    DBCursor.execute(query, (kwg, kw, 0, ""))
-    for row in fetchall_named(DBCursor):
-        msg = _('%s  Episode "%s" is locked by %s\n')
-        tempepid = row['EpisodeID']
-        temprl = row['RecordLock']
-        if 'unicode' in wx.PlatformInfo:
-            msg = unicode(msg, 'utf8')
-            tempepid = ProcessDBDataForUTF8Encoding(tempepid)
-            temprl = ProcessDBDataForUTF8Encoding(temprl)
-        t = msg % (t, tempepid, temprl)
-
-    # Quotes next
-    query = """SELECT a.KeywordGroup, a.Keyword, c.QuoteID, c.RecordLock
-        FROM ClipKeywords2 a, Quotes2 c
-        WHERE   a.KeywordGroup = %s AND
-                a.Keyword = %s AND
-                a.QuoteNum <> %s AND
-                a.QuoteNum = c.QuoteNum AND
-                c.RecordLock <> %s
-    """
-    # Adjust the query for sqlite if needed
-    query = FixQuery(query)
-    DBCursor.execute(query, (kwg, kw, 0, ""))
-    for row in fetchall_named(DBCursor):
-        msg = _('%s  Quote "%s" is locked by %s\n')
-        tempqid = row['QuoteID']
-        temprl = row['RecordLock']
-        if 'unicode' in wx.PlatformInfo:
-            msg = unicode(msg, 'utf8')
-            tempqid = ProcessDBDataForUTF8Encoding(tempqid)
-            temprl = ProcessDBDataForUTF8Encoding(temprl)
-        t = msg % (t, tempqid, temprl)
-
-    # Clips next
-    query = """SELECT a.KeywordGroup, a.Keyword, c.ClipID, c.RecordLock
-        FROM ClipKeywords2 a, Clips2 c
-        WHERE   a.KeywordGroup = %s AND
-                a.Keyword = %s AND
-                a.ClipNum <> %s AND
-                a.ClipNum = c.ClipNum AND
-                c.RecordLock <> %s
-    """
-    # Adjust the query for sqlite if needed
-    query = FixQuery(query)
-    DBCursor.execute(query, (kwg, kw, 0, ""))
-    for row in fetchall_named(DBCursor):
-        msg = _('%s  Clip "%s" is locked by %s\n')
-        tempclid = row['ClipID']
-        temprl = row['RecordLock']
-        if 'unicode' in wx.PlatformInfo:
-            msg = unicode(msg, 'utf8')
-            tempclid = ProcessDBDataForUTF8Encoding(tempclid)
-            temprl = ProcessDBDataForUTF8Encoding(temprl)
-        t = msg % (t, tempclid, temprl)
-
-    # Whole Snapshot Keywords next
-    query = """SELECT a.KeywordGroup, a.Keyword, s.SnapshotID, s.RecordLock
-        FROM ClipKeywords2 a, Snapshots2 s
-        WHERE   a.KeywordGroup = %s AND
-                a.Keyword = %s AND
-                a.SnapshotNum <> %s AND
-                a.SnapshotNum = s.SnapshotNum AND
-                s.RecordLock <> %s
-    """
-    # Adjust the query for sqlite if needed
-    query = FixQuery(query)
-    DBCursor.execute(query, (kwg, kw, 0, ""))
+    for (condition, values) in _keyword_list_conditions(_encode_keyword_list(keywords)):
+        # Delete the Keywords, then all instances of them in the ClipKeywords, SnapshotKeywords, and
+        # SnapshotKeywordStyles tables
+        for table in ['Keywords2', 'ClipKeywords2', 'SnapshotKeywords2', 'SnapshotKeywordStyles2']:
+            query = "DELETE FROM " + table + "\n  WHERE " + condition
+            # Adjust the query for sqlite if needed
+            query = FixQuery(query)
+            DBCursor.execute(query, values)
+    DBCursor.close()
 
-    for row in fetchall_named(DBCursor):
-        msg = _('%s  Snapshot "%s" is locked by %s\n')
-        tempsnid = row['SnapshotID']
-        temprl = row['RecordLock']
-        if 'unicode' in wx.PlatformInfo:
-            msg = unicode(msg, 'utf8')
-            tempsnid = ProcessDBDataForUTF8Encoding(tempsnid)
-            temprl = ProcessDBDataForUTF8Encoding(temprl)
-        t = msg % (t, tempsnid, temprl)
-
-    # Snapshot Coding next
-    query = """SELECT a.KeywordGroup, a.Keyword, s.SnapshotID, s.RecordLock
-        FROM SnapshotKeywords2 a, Snapshots2 s
-        WHERE   a.KeywordGroup = %s AND
-                a.Keyword = %s AND
-                a.SnapshotNum <> %s AND
-                a.SnapshotNum = s.SnapshotNum AND
-                s.RecordLock <> %s
-    """
-    # Adjust the query for sqlite if needed
-    query = FixQuery(query)
-    DBCursor.execute(query, (kwg, kw, 0, ""))
+def rename_keywords(renames, checkLocks=True):
+    """ Rename a list of Keywords, given as ((Old Keyword Group, Old Keyword), (New Keyword Group, New Keyword))
+        pairs, including every place they are used, as a single transaction.  Moving Keywords to another Keyword
+        Group is a rename that changes the Keyword Group.  Each table is checked for locks with a single query
+        (per IN_LIST_SIZE / 2 Keywords) and changed with a single executemany() call.  Raises a GeneralError, and
+        changes nothing, if any of the new names is already in use (see merge_keywords()) or is given to more than
+        one Keyword, or, if checkLocks is True, if any Keyword or any record that uses one is locked. """
+    # Skip any "renames" that don't change anything
+    renames = [(old, new) for (old, new) in renames if old != new]
+    if len(renames) == 0:
+        return
+    # import Transana's Episode Segment Index (only needed here)
+    import EpisodeSegmentIndex
+    RunInTransaction(_rename_keywords, renames, checkLocks)
+    # Displayed Episode Items may have changed, so the Episode Segment Indexes must be reloaded
+    EpisodeSegmentIndex.Invalidate()
+
+def _rename_keywords(renames, checkLocks):
+    """ The work of rename_keywords(), which must be run inside a transaction """
+    if checkLocks:
+        t = _keyword_lock_text(list_keyword_locks([old for (old, new) in renames]))
+        if t != "":
+            msg = _('Unable to change the selected keywords.\n%s')
+            if 'unicode' in wx.PlatformInfo:
+                # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
+                msg = unicode(msg, 'utf8')
+            raise TransanaExceptions.GeneralError, msg % t
 
-    for row in fetchall_named(DBCursor):
-        msg = _('%s  Snapshot "%s" is locked by %s\n')
-        tempsnid = row['SnapshotID']
-        temprl = row['RecordLock']
-        if 'unicode' in wx.PlatformInfo:
-            msg = unicode(msg, 'utf8')
-            tempsnid = ProcessDBDataForUTF8Encoding(tempsnid)
-            temprl = ProcessDBDataForUTF8Encoding(temprl)
-        t = msg % (t, tempsnid, temprl)
-
-    if t == "":
-        # Delphi Transana had a confirmation dialog here, but we won't do
-        # that here (do it before calling this function).
-
-        # Build and execute the SQL to delete a word from the list.
-        query = """DELETE FROM Keywords2
-            WHERE   KeywordGroup = %s AND
-                    KeyWord = %s
-        """
-        # Adjust the query for sqlite if needed
-        query = FixQuery(query)
-        DBCursor.execute(query, (kwg, kw))
-        # Now delete all instances of this keywordgroup/keyword combo in the
-        # Clipkeywords file
-        query = """DELETE FROM ClipKeywords2
-            WHERE   KeywordGroup = %s AND
-                    KeyWord = %s
-        """
+    # Encode each (old, new) pair as a whole, so the old and new names stay together.  Repeated pairs are dropped.
+    rows = []
+    newNames = {}
+    t = ""
+    for (old, new) in renames:
+        (oldKeyword, newKeyword) = (_encode_keyword(old[0], old[1]), _encode_keyword(new[0], new[1]))
+        if newNames.has_key(newKeyword):
+            # The same rename can be listed more than once
+            if newNames[newKeyword] == oldKeyword:
+                continue
+            # Two Keywords can't be given the same name
+            prompt = _('More than one keyword would be renamed to "%s : %s".')
+            if 'unicode' in wx.PlatformInfo:
+                # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
+                prompt = unicode(prompt, 'utf8')
+            t += (prompt % new) + '\n'
+        else:
+            newNames[newKeyword] = oldKeyword
+            rows.append(newKeyword + oldKeyword)
+    if t != "":
+        raise TransanaExceptions.GeneralError, t
+
+    DBCursor = get_db().cursor()
+    # Duplicate Keywords are not allowed.  Look for new names that are already in use with one query per
+    # IN_LIST_SIZE / 2 Keywords.
+    for (condition, values) in _keyword_list_conditions([row[:2] for row in rows]):
+        query = "SELECT KeywordGroup, Keyword FROM Keywords2\n  WHERE " + condition
         # Adjust the query for sqlite if needed
         query = FixQuery(query)
-        DBCursor.execute(query, (kwg, kw))
-        # Now delete all instances of this keywordgroup/keyword combo in the
-        # SnapshotKeywords file
-        query = """DELETE FROM SnapshotKeywords2
-            WHERE   KeywordGroup = %s AND
-                    KeyWord = %s
+        DBCursor.execute(query, values)
+        for (kwg, kw) in DBCursor.fetchall():
+            if 'unicode' in wx.PlatformInfo:
+                kwg = ProcessDBDataForUTF8Encoding(kwg)
+                kw = ProcessDBDataForUTF8Encoding(kw)
+            prompt = _('A Keyword named "%s : %s" already exists.')
+            if 'unicode' in wx.PlatformInfo:
+                # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
+                prompt = unicode(prompt, 'utf8')
+            t += (prompt % (kwg, kw)) + '\n'
+    if t != "":
+        DBCursor.close()
+        raise TransanaExceptions.GeneralError, t
+
+    # Rename the Keywords, then all instances of them in the ClipKeywords, SnapshotKeywords, and
+    # SnapshotKeywordStyles tables
+    for table in ['Keywords2', 'ClipKeywords2', 'SnapshotKeywords2', 'SnapshotKeywordStyles2']:
+        query = """UPDATE """ + table + """
+            SET KeywordGroup = %s,
+                Keyword = %s
+            WHERE KeywordGroup = %s AND
+                  Keyword = %s
         """
         # Adjust the query for sqlite if needed
         query = FixQuery(query)
-        DBCursor.execute(query, (kwg, kw))
-        # Now delete all instances of this keywordgroup/keyword combo in the
-        # SnapshotKeywordStyles file
-        query = """DELETE FROM SnapshotKeywordStyles2
-            WHERE   KeywordGroup = %s AND
-                    KeyWord = %s
-        """
+        DBCursor.executemany(query, rows)
+    DBCursor.close()
+
+def merge_keywords(keywords, targetGroup, targetKeyword, checkLocks=True):
+    """ Merge a list of (Keyword Group, Keyword) pairs into the existing Keyword "targetGroup : targetKeyword"
+        as a single transaction.  Every place the merged Keywords are used is changed to the target Keyword, and
+        the merged Keyword records are deleted.  Each table is checked for locks and changed with a single
+        query (per IN_LIST_SIZE / 2 Keywords, or IN_LIST_SIZE / 4 when looking for duplicates), plus a few queries
+        per merged Keyword to remove what would become duplicate records.  Raises a
+        GeneralError, and changes nothing, if checkLocks is True and any Keyword or any record that uses one
+        is locked. """
+    # Merging the target into itself does nothing
+    keywords = [(kwg, kw) for (kwg, kw) in keywords if (kwg, kw) != (targetGroup, targetKeyword)]
+    if len(keywords) == 0:
+        return
+    # import Transana's Episode Segment Index (only needed here)
+    import EpisodeSegmentIndex
+    RunInTransaction(_merge_keywords, keywords, targetGroup, targetKeyword, checkLocks)
+    # Displayed Episode Items may have changed, so the Episode Segment Indexes must be reloaded
+    EpisodeSegmentIndex.Invalidate()
+
+def _merge_keywords(keywords, targetGroup, targetKeyword, checkLocks):
+    """ The work of merge_keywords(), which must be run inside a transaction """
+    if checkLocks:
+        t = _keyword_lock_text(list_keyword_locks(keywords + [(targetGroup, targetKeyword)]))
+        if t != "":
+            msg = _('Unable to merge keywords into "%s : %s".\n%s')
+            if 'unicode' in wx.PlatformInfo:
+                # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
+                msg = unicode(msg, 'utf8')
+            raise TransanaExceptions.GeneralError, msg % (targetGroup, targetKeyword, t)
+
+    # The target Keyword comes last in the list of encoded Keywords
+    encodedKeywords = _encode_keyword_list(keywords + [(targetGroup, targetKeyword)])
+    target = encodedKeywords[-1]
+    DBCursor = get_db().cursor()
+
+    # An object that has more than one of the merged Keywords would end up with the target Keyword more than once.
+    # We keep the target Keyword if the object already has it, or the first merged Keyword otherwise, and delete
+    # the rest.  The query numbers each record by the position of its Keyword in the list, so we never need to
+    # compare Keyword text that has been through the database driver.  Each query numbers IN_LIST_SIZE / 4 Keywords,
+    # since it lists each Keyword twice.
+    pairsPerQuery = IN_LIST_SIZE / 4
+    for (table, keyFields) in (('ClipKeywords2', ('EpisodeNum', 'DocumentNum', 'ClipNum', 'QuoteNum', 'SnapshotNum')),
+                               ('SnapshotKeywordStyles2', ('SnapshotNum', ))):
+        # Group the Keyword positions by object.  Each record belongs to the one object whose number isn't zero.
+        objects = {}
+        for start in range(0, len(encodedKeywords), pairsPerQuery):
+            chunk = encodedKeywords[start:start + pairsPerQuery]
+            (condition, values) = _keyword_list_condition(chunk)
+            keywordIndex = "CASE"
+            for position in range(start, start + len(chunk)):
+                keywordIndex += " WHEN KeywordGroup = %s AND Keyword = %s THEN " + str(position)
+            keywordIndex += " END"
+            indexValues = ()
+            for pair in chunk:
+                indexValues += pair
+            query = "SELECT " + ', '.join(keyFields) + ", " + keywordIndex + "\n" + \
+                    "  FROM " + table + "\n" + \
+                    "  WHERE " + condition
+            # Adjust the query for sqlite if needed
+            query = FixQuery(query)
+            DBCursor.execute(query, indexValues + values)
+            for row in DBCursor.fetchall():
+                fieldIndex = 0
+                while (fieldIndex < len(keyFields) - 1) and (row[fieldIndex] in [0, None]):
+                    fieldIndex += 1
+                objects.setdefault((fieldIndex, row[fieldIndex]), []).append(int(row[-1]))
+        # Collect the numbers of the objects to delete each Keyword from, by object type
+        deletes = {}
+        for ((fieldIndex, objectNum), positions) in objects.items():
+            # The target Keyword has the highest position, so the object keeps it if it has it
+            keep = max(positions)
+            if keep != len(encodedKeywords) - 1:
+                keep = min(positions)
+            for position in positions:
+                if position != keep:
+                    deletes.setdefault((fieldIndex, position), []).append(objectNum)
+        # Delete the duplicates, with one query per Keyword and object type (for up to IN_LIST_SIZE objects)
+        for ((fieldIndex, position), objectNums) in deletes.items():
+            for start in range(0, len(objectNums), IN_LIST_SIZE):
+                objectList = tuple(objectNums[start:start + IN_LIST_SIZE])
+                query = "DELETE FROM " + table + "\n" + \
+                        "  WHERE KeywordGroup = %s AND\n" + \
+                        "        Keyword = %s AND\n" + \
+                        "        " + keyFields[fieldIndex] + " IN (" + ', '.join(['%s'] * len(objectList)) + ")"
+                # Adjust the query for sqlite if needed
+                query = FixQuery(query)
+                DBCursor.execute(query, encodedKeywords[position] + objectList)
+
+    # Now change every remaining use of the merged Keywords to the target Keyword.  For Snapshot Coding, we don't
+    # want to LOSE any of the drawn shapes, so they are all changed.
+    for (condition, values) in _keyword_list_conditions(encodedKeywords[:-1]):
+        for table in ['ClipKeywords2', 'SnapshotKeywords2', 'SnapshotKeywordStyles2']:
+            query = "UPDATE " + table + "\n" + \
+                    "  SET KeywordGroup = %s,\n" + \
+                    "      Keyword = %s\n" + \
+                    "  WHERE " + condition
+            # Adjust the query for sqlite if needed
+            query = FixQuery(query)
+            DBCursor.execute(query, target + values)
+        # Finally, delete the merged Keywords
+        query = "DELETE FROM Keywords2\n  WHERE " + condition
         # Adjust the query for sqlite if needed
         query = FixQuery(query)
-        DBCursor.execute(query, (kwg, kw))
-
-        # Finish the transaction
-        DBCursor.execute("COMMIT")
-    else:
-        DBCursor.execute("ROLLBACK")
-        DBCursor.close()
-        msg = _('Unable to delete keyword "%s : %s".\n%s')
-        if 'unicode' in wx.PlatformInfo:
-            msg = unicode(msg, 'utf8')
-        msg = msg % (group, kw_name, t)
-        raise TransanaExceptions.GeneralError, msg
+        DBCursor.execute(query, values)
     DBCursor.close()
 
+def delete_keyword_group(name):
+    """Delete a Keyword Group from the database, including all associated
+    keywords."""
+    delete_keywords([(name, None)])
+
+def delete_keyword(group, kw_name):
+    """Delete a Keyword from the database."""
+    delete_keywords([(group, kw_name)])
+
 def AddSynonym(synonymGroup, synonym):
     """ Add a Synonym to the Synonyms Table """
     # Get a Database cursor
@@ -5322,85 +5953,28 @@ def ProcessDBDataForUTF8Encoding(text):
     else:
         # If we're using MySQLdb (either server or embedded) ...
         if TransanaConstants.DBInstalled in ['MySQLdb-embedded', 'MySQLdb-server']:
-            # Initialize a unicode object to build the function's result
-            result = unicode('', TransanaGlobal.encoding)
-            # Because some Unicode characters are more than one byte wide, but the STC doesn't recognize this,
-            # we will need to skip the processing of the later parts of multi-byte characters.  skipNext allows this.
-            skipNext = 0
-            # process each character in the StyledText.  The GetStyledText() call has returned a string
-            # with the data in two-character chunks, the text char and the styling char.  This for loop
-            # allows up to process these character pairs.
+            # MySQLdb hands us the encoded bytes of the string as individual characters.  In almost all cases,
+            # we can reassemble them by turning the characters back into bytes and decoding the whole string
+            # at once, which is much faster than examining the string one character at a time.
             try:
-                for x in range(len(text)):
-                    # If we are looking at the second character of a Unicode character pair, we can skip
-                    # this processing, as it has already been handled.
-                    if skipNext > 0:
-                        # We need to reset the skipNext flag so we won't skip too many characters.
-                        skipNext -= 1
-                    else:
-                        # Check for a Unicode character pair by looking to see if the first character is above 128
-                        if ord(text[x]) > 127:
-                                
-                            # UTF-8 characters are variable length.  We need to figure out the correct number of bytes.
-                            # Note the current position
-                            pos = x
-                            # Initialize the final character variable
-                            c = ''
-
-                            # Begin processing of unicode characters, continue until we have a legal character.
-                            while (pos < len(text)):
-
-                                # Add the current character to the character variable
-                                c += chr(ord(text[pos]))  # "Un-Unicode" the character ????
-                                # Try to encode the character.
-                                try:
-                                    # See if we have a legal UTF-8 character yet.
-                                    d = unicode(c, TransanaGlobal.encoding)
-                                    # If so, break out of the while loop
-                                    break
-                                # If we don't have a legal UTF-8 character, we'll get a UnicodeDecodeError exception
-                                except UnicodeDecodeError:
-                                    # We need to signal the need to skip a charater in overall processing
-                                    skipNext += 1
-                                    # We need to update the current position and keep processing until we have a legal UTF-8 character
-                                    pos += 1
-
-                            result += unicode(c, TransanaGlobal.encoding)
-                        else:
-                            c = text[x]
-                            result += c
-
-            except TypeError:
-                result = text
-            except UnicodeDecodeError:
-                # If we are reading Unicode text from Transana 2.05 or earlier, the line above that reads:
-                # result += unicode(c, TransanaGlobal.encoding)
-                # throws a UnicodeDecodeError when it can't interpret Latin-1 encoded characters using UTF-8.
-                # When that happens, we need to use Latin-1 encoding instead of UTF-8.
-
-                # The text doesn't need to be encoded in this circumstance.
-                result = text
-                # If we're in Russian, change the encoding to KOI8r
-                if TransanaGlobal.configData.language == 'ru':
-                    TransanaGlobal.encoding = 'koi8_r'
-                # If we're in Chinese, change the encoding to the appropriate Chinese encoding
-                elif TransanaGlobal.configData.language == 'zh':
-                    TransanaGlobal.encoding = TransanaConstants.chineseEncoding
-                # If we're in Eastern European Encoding, change the encoding to 'iso8859_2'
-                elif TransanaGlobal.configData.language == 'easteurope':
-                    TransanaGlobal.encoding = 'iso8859_2'
-                # If we're in Greek, change the encoding to 'iso8859_7'
-                elif TransanaGlobal.configData.language == 'el':
-                    TransanaGlobal.encoding = 'iso8859_7'
-                # If we're in Japanese, change the encoding to cp932
-                elif TransanaGlobal.configData.language == 'ja':
-                    TransanaGlobal.encoding = 'cp932'
-                # If we're in Korean, change the encoding to cp949
-                elif TransanaGlobal.configData.language == 'ko':
-                    TransanaGlobal.encoding = 'cp949'
-                # Otherwise, fall back to UTF8, not Latin-1 as of 2.50
+                # If we have a unicode object ...
+                if isinstance(text, unicode):
+                    # ... "un-unicode" the characters.  This fails if the text holds characters above 255.
+                    data = text.encode('latin1')
+                # If we have a string object ...
+                elif isinstance(text, str):
+                    # ... we already have the bytes
+                    data = text
+                # If we have anything else (None, an integer, etc.) ...
                 else:
-                    TransanaGlobal.encoding = 'utf8'  # 'latin1'
+                    # ... let the character by character method deal with it
+                    raise TypeError
+                # Decode the bytes.  This fails if the data is not legal in the current encoding.
+                return data.decode(TransanaGlobal.encoding)
+            # If the fast method fails, fall back to the character by character method, which deals with the
+            # legacy cases (non-string data, Latin-1 data from Transana 2.05 and earlier, etc.)
+            except (TypeError, UnicodeEncodeError, UnicodeDecodeError):
+                return ProcessDBDataForUTF8EncodingByCharacter(text)
 
         # If we're NOT using MySQLdb ...
         else:
@@ -5423,6 +5997,93 @@ def ProcessDBDataForUTF8Encoding(text):
         # Return the results
         return result
 
+def ProcessDBDataForUTF8EncodingByCharacter(text):
+    """ Character by character version of ProcessDBDataForUTF8Encoding() for MySQLdb data, used when the data
+        can't be decoded all at once.  This handles data that is not a string, data that contains characters
+        that are not encoded bytes, and Latin-1 encoded data from Transana 2.05 and earlier.  In the last case,
+        the text is returned unchanged and TransanaGlobal.encoding is adjusted for the current language. """
+    # Initialize a unicode object to build the function's result
+    result = unicode('', TransanaGlobal.encoding)
+    # Because some Unicode characters are more than one byte wide, but the STC doesn't recognize this,
+    # we will need to skip the processing of the later parts of multi-byte characters.  skipNext allows this.
+    skipNext = 0
+    # process each character in the StyledText.  The GetStyledText() call has returned a string
+    # with the data in two-character chunks, the text char and the styling char.  This for loop
+    # allows up to process these character pairs.
+    try:
+        for x in range(len(text)):
+            # If we are looking at the second character of a Unicode character pair, we can skip
+            # this processing, as it has already been handled.
+            if skipNext > 0:
+                # We need to reset the skipNext flag so we won't skip too many characters.
+                skipNext -= 1
+            else:
+                # Check for a Unicode character pair by looking to see if the first character is above 128
+                if ord(text[x]) > 127:
+                        
+                    # UTF-8 characters are variable length.  We need to figure out the correct number of bytes.
+                    # Note the current position
+                    pos = x
+                    # Initialize the final character variable
+                    c = ''
+
+                    # Begin processing of unicode characters, continue until we have a legal character.
+                    while (pos < len(text)):
+
+                        # Add the current character to the character variable
+                        c += chr(ord(text[pos]))  # "Un-Unicode" the character ????
+                        # Try to encode the character.
+                        try:
+                            # See if we have a legal UTF-8 character yet.
+                            d = unicode(c, TransanaGlobal.encoding)
+                            # If so, break out of the while loop
+                            break
+                        # If we don't have a legal UTF-8 character, we'll get a UnicodeDecodeError exception
+                        except UnicodeDecodeError:
+                            # We need to signal the need to skip a charater in overall processing
+                            skipNext += 1
+                            # We need to update the current position and keep processing until we have a legal UTF-8 character
+                            pos += 1
+
+                    result += unicode(c, TransanaGlobal.encoding)
+                else:
+                    c = text[x]
+                    result += c
+
+    except TypeError:
+        result = text
+    except UnicodeDecodeError:
+        # If we are reading Unicode text from Transana 2.05 or earlier, the line above that reads:
+        # result += unicode(c, TransanaGlobal.encoding)
+        # throws a UnicodeDecodeError when it can't interpret Latin-1 encoded characters using UTF-8.
+        # When that happens, we need to use Latin-1 encoding instead of UTF-8.
+
+        # The text doesn't need to be encoded in this circumstance.
+        result = text
+        # If we're in Russian, change the encoding to KOI8r
+        if TransanaGlobal.configData.language == 'ru':
+            TransanaGlobal.encoding = 'koi8_r'
+        # If we're in Chinese, change the encoding to the appropriate Chinese encoding
+        elif TransanaGlobal.configData.language == 'zh':
+            TransanaGlobal.encoding = TransanaConstants.chineseEncoding
+        # If we're in Eastern European Encoding, change the encoding to 'iso8859_2'
+        elif TransanaGlobal.configData.language == 'easteurope':
+            TransanaGlobal.encoding = 'iso8859_2'
+        # If we're in Greek, change the encoding to 'iso8859_7'
+        elif TransanaGlobal.configData.language == 'el':
+            TransanaGlobal.encoding = 'iso8859_7'
+        # If we're in Japanese, change the encoding to cp932
+        elif TransanaGlobal.configData.language == 'ja':
+            TransanaGlobal.encoding = 'cp932'
+        # If we're in Korean, change the encoding to cp949
+        elif TransanaGlobal.configData.language == 'ko':
+            TransanaGlobal.encoding = 'cp949'
+        # Otherwise, fall back to UTF8, not Latin-1 as of 2.50
+        else:
+            TransanaGlobal.encoding = 'utf8'  # 'latin1'
+    # Return the results
+    return result
+
 
 def UpdateDBFilenames(parent, filePath, fileList, newName=''):
     """ Update the Database Filenames """
@@ -5814,6 +6475,10 @@ def DeleteDatabase(username, password, server, database, port):
                 if result == wx.ID_YES:
                     # Delete the database file!
                     os.remove(dbName)
+                    # Also delete the write-ahead log files sqlite keeps alongside a database in WAL mode
+                    for suffix in ['-wal', '-shm']:
+                        if os.path.exists(dbName + suffix):
+                            os.remove(dbName + suffix)
                     # If we get this far, return True rather than False
                     res = 1
                 # If user cancels ...
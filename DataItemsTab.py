@@ -22,12 +22,8 @@ __author__ = 'David Woods <dwoods@transana.com>'
 import wx
 from wx import grid
 
-# import Transana's Clip Object
-import Clip
-# import Transana's Collection Object
-import Collection
-# import Database Calls
-import DBInterface
+# import Transana's Episode Segment Index
+import EpisodeSegmentIndex
 # import Miscellaneous Routines
 import Misc
 # import Transana's Snapshot Object
@@ -46,6 +42,10 @@ class DataItemsTab(wx.Panel):
         # Make the initial data objects which are passed in available to the entire EpisodeClips object
         self.seriesObj = seriesObj
         self.episodeObj = episodeObj
+        # The Episode's Clips and Snapshots are loaded into an index the first time they are displayed
+        self.segmentIndex = None
+        # The index positions of the items displayed in the Grid, so we only update the Grid when they change
+        self.displayedItems = None
 
         # Get the size of the parent window
         psize = parent.GetSizeTuple()
@@ -106,62 +106,44 @@ class DataItemsTab(wx.Panel):
         self.Layout()
 
     def DisplayCells(self, TimeCode):
-        """ Get data from the database and populate the Episode Clips / Selected Clips Grid """
-        # Get clip data from the database
-        clipData = DBInterface.list_of_clips_by_episode(self.episodeObj.number, TimeCode)
-        if TransanaConstants.proVersion:
-            # Get the snapshot data from the database
-            snapshotData = DBInterface.list_of_snapshots_by_episode(self.episodeObj.number, TimeCode)
-
-        # Combine the two lists
-        cellData = {}
-        # For each Clip ...
-        for clip in clipData:
-            # load the Clip
-            tmpObj = Clip.Clip(clip['ClipNum'])
-            # add the Clip to the cellData
-            cellData[(clip['ClipStart'], clip['ClipStop'], tmpObj.GetNodeString(True).upper())] = tmpObj
-        if TransanaConstants.proVersion:
-            # for each Snapshot ...
-            for snapshot in snapshotData:
-                # load the Snapshot
-                tmpObj = Snapshot.Snapshot(snapshot['SnapshotNum'])
-                # add the Snapshot to the cellData
-                cellData[(snapshot['SnapshotStart'], snapshot['SnapshotStop'], tmpObj.GetNodeString(True).upper())] = tmpObj
+        """ Get data from the Episode Segment Index and populate the Episode Clips / Selected Clips Grid """
+        # If we don't have an index for the Episode, or the data has changed since it was loaded ...
+        if (self.segmentIndex == None) or (not self.segmentIndex.IsCurrent()):
+            # ... load the Clip (and Snapshot) data from the database
+            self.segmentIndex = EpisodeSegmentIndex.EpisodeSegmentIndex(self.episodeObj.number, TransanaConstants.proVersion)
+            self.displayedItems = None
+        # Find the items that cover the TimeCode.  This gets called for each position update while media plays!
+        itemNums = self.segmentIndex.Query(TimeCode)
+        # If the Grid already shows these items, there's nothing to do
+        if itemNums == self.displayedItems:
+            return
+        self.displayedItems = itemNums
 
-        # Get the Keys for the cellData
-        sortedKeys = cellData.keys()
-        # Sort the keys for the cellData into the right order
-        sortedKeys.sort()
-        
         # Add rows to the Grid to accomodate the amount of data returned, or delete rows if we have too many
-        if len(cellData) > self.gridClips.GetNumberRows():
-            self.gridClips.AppendRows(len(cellData) - self.gridClips.GetNumberRows(), False)
-        elif len(cellData) < self.gridClips.GetNumberRows():
-            self.gridClips.DeleteRows(numRows = self.gridClips.GetNumberRows() - len(cellData))
+        if len(itemNums) > self.gridClips.GetNumberRows():
+            self.gridClips.AppendRows(len(itemNums) - self.gridClips.GetNumberRows(), False)
+        elif len(itemNums) < self.gridClips.GetNumberRows():
+            self.gridClips.DeleteRows(numRows = self.gridClips.GetNumberRows() - len(itemNums))
 
         # Initialize the Row Counter
         loop = 0
         # Add the data to the Grid
-        for keyVals in sortedKeys:
+        for itemNum in itemNums:
+            item = self.segmentIndex.items[itemNum]
+            # ... get the start, stop times and the object type
+            startTime = item['Start']
+            stopTime = item['Stop']
+            objType = item['Type']
             # If we have a Clip ...
-            if isinstance(cellData[keyVals], Clip.Clip):
-                # ... get the start, stop times and the object type
-                startTime = cellData[keyVals].clip_start
-                stopTime = cellData[keyVals].clip_stop
-                objType = 'Clip'
+            if objType == 'Clip':
                 # Initialize the string for all the Keywords to blank
                 kwString = unicode('', 'utf8')
                 # Initialize the prompt for building the keyword string
                 kwPrompt = '%s'
             # If we have a Snapshot ...
-            elif isinstance(cellData[keyVals], Snapshot.Snapshot):
-                # ... get the start, stop times and the object type
-                startTime = cellData[keyVals].episode_start
-                stopTime = cellData[keyVals].episode_start + cellData[keyVals].episode_duration
-                objType = 'Snapshot'
+            elif objType == 'Snapshot':
                 # if there are whole snapshot keywords ...
-                if len(cellData[keyVals].keyword_list) > 0:
+                if len(item['Keywords']) > 0:
                     # ... initialize the string for all the Keywords to indicate this
                     kwString = unicode(_('Whole:'), 'utf8') + '\n'
                 # If there are NOT whole snapshot keywords ...
@@ -171,30 +153,29 @@ class DataItemsTab(wx.Panel):
                 # Initialize the prompt for building the keyword string
                 kwPrompt = '  %s'
             # For each Keyword in the Keyword List ...
-            for kws in cellData[keyVals].keyword_list:
-                # ... add the Keyword to the Keyword List
-                kwString += kwPrompt % kws.keywordPair
+            for (kwg, kw) in item['Keywords']:
+                # ... add the Keyword to the Keyword List, in the same form as ClipKeyword.keywordPair
+                kwString += kwPrompt % (kwg + ' : ' + kw)
                 # If we have a Clip ...
-                if isinstance(cellData[keyVals], Clip.Clip):
+                if objType == 'Clip':
                     # After the first keyword, we need a NewLine in front of the Keywords.  This accompishes that!
                     kwPrompt = '\n%s'
                 # If we have a Snapshot ...
-                elif isinstance(cellData[keyVals], Snapshot.Snapshot):
+                elif objType == 'Snapshot':
                     # After the first keyword, we need a NewLine in front of the Keywords.  This accompishes that!
                     kwPrompt = '\n  %s'
 
             # If we have a Snapshot, we also want to display CODED Keywords in addition to the WHOLE Snapshot keywords
             # we've already included
-            if isinstance(cellData[keyVals], Snapshot.Snapshot):
+            if objType == 'Snapshot':
                 # Keep a list of the coded keywords we've already displayed
                 codedKeywords = []
                 # Modify the template for additional keywords
                 kwPrompt = '\n  %s : %s'
-                # For each of the Snapshot's Coding Objects ...
-                for x in range(len(cellData[keyVals].codingObjects)):
+                # For each of the Snapshot's Coded Keywords ...
+                for (kwg, kw, visible) in item['Coding']:
                     # ... if the Coding Object is visible and if it is not already in the codedKeywords list ...
-                    if (cellData[keyVals].codingObjects[x]['visible']) and \
-                      (not (cellData[keyVals].codingObjects[x]['keywordGroup'], cellData[keyVals].codingObjects[x]['keyword']) in codedKeywords):
+                    if visible and (not (kwg, kw) in codedKeywords):
                         # ... if this is the FIRST Coded Keyword ...
                         if len(codedKeywords) == 0:
                             # ... and if there WERE Whole Snapshot Keywords ...
@@ -204,21 +185,21 @@ class DataItemsTab(wx.Panel):
                             # ... add the indicator to the Keywords String that we're starting to show Coded Keywords
                             kwString += unicode(_('Coded:'), 'utf8')
                         # ... add the coded keyword to the Keywords String ...
-                        kwString += kwPrompt % (cellData[keyVals].codingObjects[x]['keywordGroup'], cellData[keyVals].codingObjects[x]['keyword'])
+                        kwString += kwPrompt % (kwg, kw)
                         # ... add the keyword to the Coded Keywords list
-                        codedKeywords.append((cellData[keyVals].codingObjects[x]['keywordGroup'], cellData[keyVals].codingObjects[x]['keyword']))
+                        codedKeywords.append((kwg, kw))
 
             # Insert the data values into the Grid Row
             # Start and Stop time in column 0
             self.gridClips.SetCellValue(loop, 0, "%s -\n %s" % (Misc.time_in_ms_to_str(startTime), Misc.time_in_ms_to_str(stopTime)))
             # Node String (including Item name) in column 1
-            self.gridClips.SetCellValue(loop, 1, cellData[keyVals].GetNodeString(True))
+            self.gridClips.SetCellValue(loop, 1, item['NodeString'])
             # make the Collection / Item ID line auto-word-wrap
             self.gridClips.SetCellRenderer(loop, 1, grid.GridCellAutoWrapStringRenderer())
             # Keywords in column 2
             self.gridClips.SetCellValue(loop, 2, kwString)
             # Item Number (hidden) in column 3.  Convert value to a string
-            self.gridClips.SetCellValue(loop, 3, "%s" % cellData[keyVals].number)
+            self.gridClips.SetCellValue(loop, 3, "%s" % item['Number'])
             # Item Type (hidden) in column 4
             self.gridClips.SetCellValue(loop, 4, "%s" % objType)
             # Auto-size THIS row
@@ -231,6 +212,7 @@ class DataItemsTab(wx.Panel):
     def Refresh(self, TimeCode=None):
         """ Redraw the contents of this tab to reflect possible changes in the data since the tab was created. """
         # To refresh the window, all we need to do is re-call the DisplayCells method!
+        # (The Grid is only updated if the data has changed or different items cover the TimeCode.)
         self.DisplayCells(TimeCode)
         
 
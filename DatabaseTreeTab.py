@@ -48,11 +48,8 @@ import NotesBrowser
 import KeywordObject as Keyword                      
 import KeywordPropertiesForm
 import ClipKeywordObject
-import SpreadsheetDataImport
-import BatchFileProcessor
 import ProcessSearch
 from TransanaExceptions import *
-import KWManager
 import exceptions
 import DBInterface
 import Dialogs
@@ -63,18 +60,9 @@ import os
 import sys
 import string
 import time
-import LibraryMap
-import KeywordMapClass
-import ReportGenerator
-import KeywordSummaryReport
-import AnalyticDataExport
-import PlayAllClips
 import DragAndDropObjects           # Implements Drag and Drop logic and objects
 import cPickle                      # Used in Drag and Drop
 import Misc                         # Transana's Miscellaneous functions
-import PropagateChanges             # Transana's Change Propagation routines
-import MediaConvert
-import WordFrequencyReport          # Transana's Word Frequency Report
 
 class DatabaseTreeTab(wx.Panel):
     """This class defines the object for the "Database" tab of the Data
@@ -1087,6 +1075,8 @@ class DatabaseTreeTab(wx.Panel):
 
     def edit_quote(self, quote):
         """User interface for editing a quote."""
+        # import Transana's Change Propagation routines when they are first needed, rather than at start-up
+        import PropagateChanges
 
         # If the user tries to edit a currently-loaded Quote, close it first.
         self.ControlObject.CloseOpenTranscriptWindowObject(Quote.Quote, quote.number)
@@ -1284,6 +1274,8 @@ class DatabaseTreeTab(wx.Panel):
 
     def edit_clip(self, clip):
         """User interface for editing a clip."""
+        # import Transana's Change Propagation routines when they are first needed, rather than at start-up
+        import PropagateChanges
         # If the user wants to edit the currently-loaded Clip ...
         if ((type(self.ControlObject.currentObj) == type(Clip.Clip())) and \
             (self.ControlObject.currentObj.number == clip.number)):
@@ -2270,13 +2262,16 @@ class MenuIDError(exceptions.Exception):
         self.explanation = msg
 
 
-class _NodeData:
+class _NodeData(object):
     """ This class defines the information that is known about each node in the Database Tree. """
 
     # NOTE:  _NodeType and DataTreeDragDropData have very similar structures so that they can be
     #        used interchangably.  If you alter one, please also alter the other.
+
+    # There is one of these objects for every node in the Database Tree, so we use __slots__ to keep them small.
+    __slots__ = ('nodetype', 'recNum', 'parent', 'sortOrder', 'sourceObj', 'textSearchItems', 'childrenLoaded')
    
-    def __init__(self, nodetype='Unknown', recNum=0, parent=0, sortOrder=None, sourceObj=0, textSearchItems=[]):
+    def __init__(self, nodetype='Unknown', recNum=0, parent=0, sortOrder=None, sourceObj=0, textSearchItems=[], childrenLoaded=True):
         """ Initialize the NodeData Object """
         self.nodetype = nodetype    # nodetype indicates what sort of node we have.  Options include:
                                     # Root, LibraryRootNode, LibraryNode, DocumentNode, EpisodeNode, TranscriptNode,
@@ -2291,6 +2286,7 @@ class _NodeData:
         self.sortOrder = sortOrder  # sortOrder indicates order of Clips and Snapshots in a Collection
         self.sourceObj = sourceObj
         self.textSearchItems = textSearchItems
+        self.childrenLoaded = childrenLoaded  # childrenLoaded is False for lazy Database Tree nodes that haven't been expanded yet
 
     def __repr__(self):
         """ Provides a string representation of the data in the _NodeData object """
@@ -2309,6 +2305,11 @@ class _DBTreeCtrl(wx.TreeCtrl):
 
         self.cmd_id = TransanaConstants.DATA_MENU_CMD_OFSET
         self.parent = parent
+        # In a lazy tree, Libraries, Collections, and Keywords with Examples don't load their children from the
+        # database until they are expanded (or traversed).  This speeds up opening large databases considerably.
+        self.lazyTree = TransanaGlobal.configData.lazyDatabaseTree
+        # During a batch update, nodes that need sorting are collected here and sorted once when the batch ends
+        self.deferredSortNodes = None
         
         # Track the number of Searches that have been requested
         self.searchCount = 1
@@ -2365,6 +2366,9 @@ class _DBTreeCtrl(wx.TreeCtrl):
         # This processes double-clicks in the Tree Control
         wx.EVT_TREE_ITEM_ACTIVATED(self, id, self.OnItemActivated)
 
+        # Lazy tree nodes get populated when they are expanded
+        wx.EVT_TREE_ITEM_EXPANDING(self, id, self.OnItemExpanding)
+
         # Prevent the ability to Edit Node Labels unless it is in a Search Result
         # or is explicitly processed in OnEndLabelEdit()
         wx.EVT_TREE_BEGIN_LABEL_EDIT(self, id, self.OnBeginLabelEdit)
@@ -2455,6 +2459,9 @@ class _DBTreeCtrl(wx.TreeCtrl):
     # FIXME: Doesn't preserve node 'expanded' states
     def refresh_tree(self, evt=None):
         """Load information from database and re-create the tree."""
+        # Any nodes waiting to be sorted in a batch update are about to be deleted
+        if self.deferredSortNodes != None:
+            self.deferredSortNodes = []
         self.DeleteAllItems()
         self.create_root_node()
         self.create_series_node()
@@ -2465,6 +2472,47 @@ class _DBTreeCtrl(wx.TreeCtrl):
         self.UnselectAll()
         self.SelectItem(self.GetRootItem())
 
+    def BeginBatchUpdate(self):
+        """ Start a batch of tree changes (such as Message Server updates).  The tree is not redrawn and
+            nodes are not sorted until EndBatchUpdate() is called. """
+        self.Freeze()
+        self.deferredSortNodes = []
+
+    def EndBatchUpdate(self):
+        """ Finish a batch of tree changes, sorting each changed node once and redrawing the tree """
+        self.FlushDeferredSorts()
+        self.deferredSortNodes = None
+        self.Thaw()
+
+    def SortNode(self, node):
+        """ Sort the children of a node, or, during a batch update, note that they need to be sorted """
+        # If we're not in a batch update ...
+        if self.deferredSortNodes == None:
+            # ... sort the node now
+            self.SortChildren(node)
+        # Otherwise, remember the node so it only gets sorted once, no matter how many children are added
+        elif (node != None) and node.IsOk() and not (node in self.deferredSortNodes):
+            self.deferredSortNodes.append(node)
+
+    def FlushDeferredSorts(self):
+        """ Sort all the nodes whose sorting has been deferred during a batch update """
+        if self.deferredSortNodes:
+            for node in self.deferredSortNodes:
+                self.SortChildren(node)
+            self.deferredSortNodes = []
+
+    def Delete(self, item):
+        """ Over-ride the wxTreeCtrl method so nodes waiting to be sorted in a batch update get sorted
+            before they might be deleted along with item """
+        self.FlushDeferredSorts()
+        wx.TreeCtrl.Delete(self, item)
+
+    def DeleteChildren(self, item):
+        """ Over-ride the wxTreeCtrl method so nodes waiting to be sorted in a batch update get sorted
+            before they might be deleted along with item's children """
+        self.FlushDeferredSorts()
+        wx.TreeCtrl.DeleteChildren(self, item)
+
     def OnMotion(self, event):
         """ Detects Mouse Movement in the Database Tree Tab so that we can scroll as needed
             during Drag-and-Drop operations. """
@@ -2750,12 +2798,19 @@ class _DBTreeCtrl(wx.TreeCtrl):
         for (libraryNo, libraryID) in DBInterface.list_of_series():
             # Create the tree node
             item = self.AppendItem(root_item, libraryID)
-            # Add the node's image and node data
-            nodedata = _NodeData(nodetype='LibraryNode', recNum=libraryNo)          # Identify this as a Library node
+            # Add the node's image and node data.  (In a lazy tree, the Library's contents aren't loaded yet.)
+            nodedata = _NodeData(nodetype='LibraryNode', recNum=libraryNo, childrenLoaded=not self.lazyTree)          # Identify this as a Library node
             self.SetPyData(item, nodedata)                       # Associate this data with the node
             self.set_image(item, "Library16")
             # Add the new node to the map dictionary
             mapDict['Libraries'][libraryNo] = item
+            # In a lazy tree, show the expand button so the Library contents can be loaded on demand
+            if self.lazyTree:
+                self.SetItemHasChildren(item, True)
+
+        # In a lazy tree, populate_library_node() loads each Library's contents when it is expanded
+        if self.lazyTree:
+            return
 
         # Populate the tree with all Documents AND Episodes
         tmpDict = DBInterface.dictionary_of_documents_and_episodes()
@@ -2853,6 +2908,14 @@ class _DBTreeCtrl(wx.TreeCtrl):
         # minimizing the number of database calls and tracking the tree nodes with a map dictionary so that we can
         # easily locate the node we want to add a child node to.
 
+        # In a lazy tree, we only add the top-level Collections.  populate_collection_node() loads
+        # each Collection's contents when it is expanded.
+        if self.lazyTree:
+            for (collNo, collID, parentCollNo) in DBInterface.list_of_collections():
+                self.add_lazy_collection_node(root_item, collNo, collID, parentCollNo)
+            self.SortChildren(root_item)
+            return
+
         # Populate the tree with all Collection records
         for (collNo, collID, parentCollNo) in DBInterface.list_of_all_collections():
 
@@ -3085,6 +3148,16 @@ class _DBTreeCtrl(wx.TreeCtrl):
         # Get all Keyword Examples from the database
         keywordExamples = DBInterface.list_of_keyword_examples()
 
+        # In a lazy tree, we don't load the Example Clips now.  We just flag the Keywords that have Examples
+        # so populate_keyword_node() can load them when the Keyword is expanded.
+        if self.lazyTree:
+            for (episodeNum, clipNum, snapshotNum, kwg, kw, example) in keywordExamples:
+                if mapDict.has_key(kwg.upper()) and mapDict[kwg.upper()].has_key(kw):
+                    kw_item = mapDict[kwg.upper()][kw]
+                    self.GetPyData(kw_item).childrenLoaded = False
+                    self.SetItemHasChildren(kw_item, True)
+            keywordExamples = []
+
         # NOTE:  This would be more efficient if the DBInterface.list_of_keyword_examples() method passed all necessary
         #        information from the database rather than requiring that we load each Clip to determine its ID and parent
         #        Collection.  However, I suspect that Keyword Examples are rare enough that it's not a major issue.
@@ -3106,6 +3179,238 @@ class _DBTreeCtrl(wx.TreeCtrl):
         # Refresh the Tree Node so that changes are displayed appropriately (such as new children are indicated if the node was empty)
         self.Refresh()
 
+    def OnItemExpanding(self, event):
+        """ Load the children of a lazy Database Tree node when it is first expanded """
+        # Make sure the node's children have been loaded
+        self.PopulateNode(event.GetItem())
+        # Allow the expansion to proceed
+        event.Skip()
+
+    def GetFirstChild(self, item):
+        """ Over-ride the wxTreeCtrl method so that walking the tree (in select_Node(), add_Node(), drag-and-drop,
+            search, etc.) loads the children of lazy Database Tree nodes before looking at them """
+        # If we have a lazy tree, make sure the node's children have been loaded
+        if self.lazyTree:
+            self.PopulateNode(item)
+        # Now we can let the wxTreeCtrl do its job
+        return wx.TreeCtrl.GetFirstChild(self, item)
+
+    def PopulateNode(self, item):
+        """ Load the children of a lazy Database Tree node if they haven't been loaded yet.
+            Returns True if the children were loaded by this call. """
+        # Get the node's data
+        nodeData = self.GetPyData(item)
+        # If the node has no data or its children are already in the tree, there's nothing to do.
+        if (nodeData == None) or nodeData.childrenLoaded:
+            return False
+        # Signal that the children have been loaded BEFORE we add them, as adding them traverses the tree
+        nodeData.childrenLoaded = True
+        # Load the children appropriate to the node type
+        if nodeData.nodetype == 'LibraryNode':
+            self.populate_library_node(item)
+        elif nodeData.nodetype == 'CollectionNode':
+            self.populate_collection_node(item)
+        elif nodeData.nodetype == 'KeywordNode':
+            self.populate_keyword_node(item)
+        # If no children were found, remove the node's expand button
+        if not wx.TreeCtrl.GetFirstChild(self, item)[0].IsOk():
+            self.SetItemHasChildren(item, False)
+        return True
+
+    def FindChildNode(self, parentItem, nodeType, nodeText, nodeRecNum):
+        """ Find the child of parentItem with the given node type, text, and record number.  Returns None if there isn't one. """
+        # Get the first child of the parent node
+        (childItem, cookie) = wx.TreeCtrl.GetFirstChild(self, parentItem)
+        # Iterate through the children
+        while childItem.IsOk():
+            # Get the child's node data
+            childData = self.GetPyData(childItem)
+            # If the node type, record number, and text all match ...
+            if (childData.nodetype == nodeType) and (childData.recNum == nodeRecNum) and \
+               (Misc.unistrip(self.GetItemText(childItem)).upper() == Misc.unistrip(nodeText).upper()):
+                # ... we've found the node we're looking for
+                return childItem
+            (childItem, cookie) = self.GetNextChild(parentItem, cookie)
+        return None
+
+    def populate_library_node(self, libItem):
+        """ Load the Documents, Episodes, Transcripts, and Notes for one Library node of a lazy Database Tree """
+        # Get the Library Number from the node data
+        libraryNo = self.GetPyData(libItem).recNum
+        # We need to keep track of the nodes so we can add sub-nodes quickly, just like create_series_node() does.
+        mapDict = {'Episode' : {}, 'Transcript' : {}, 'Document' : {}}
+        # Build a dictionary of this Library's Documents and Episodes, sorted by ID
+        tmpDict = {}
+        # Don't include Documents in Transana Basic
+        if TransanaConstants.proVersion:
+            for (docNo, docID, docLibNo) in DBInterface.list_of_documents(libraryNo):
+                tmpDict[(docID, docLibNo)] = ('Document', docNo, docLibNo)
+        for (epNo, epID, epLibNo) in DBInterface.list_of_episodes_for_series(Misc.unistrip(self.GetItemText(libItem))):
+            tmpDict[(epID, epLibNo)] = ('Episode', epNo, epLibNo)
+        keys = tmpDict.keys()
+        keys.sort()
+        for key in keys:
+            (objType, objNum, objParentNum) = tmpDict[key]
+            # Create the tree node
+            deitem = self.AppendItem(libItem, key[0])
+            if objType == 'Document':
+                # Add the node's image and node data
+                nodedata = _NodeData(nodetype='DocumentNode', recNum=objNum, parent=objParentNum)  # Identify this as a Document node
+                self.set_image(deitem, "Document16")
+            else:
+                # Add the node's image and node data
+                nodedata = _NodeData(nodetype='EpisodeNode', recNum=objNum, parent=objParentNum)   # Identify this as an Episode node
+                self.set_image(deitem, "Episode16")
+            self.SetPyData(deitem, nodedata)                  # Associate this data with the node
+            # Add the new node to the map dictionary
+            mapDict[objType][objNum] = deitem
+
+        # Add the Episode Transcripts for this Library
+        for (transcriptNo, transcriptID, transcriptEpisodeNo) in DBInterface.list_of_episode_transcripts(libraryNum=libraryNo):
+            # Create the tree node under the correct Episode
+            titem = self.AppendItem(mapDict['Episode'][transcriptEpisodeNo], transcriptID)
+            # Add the node's image and node data
+            nodedata = _NodeData(nodetype='TranscriptNode', recNum=transcriptNo, parent=transcriptEpisodeNo)  # Identify this as a Transcript node
+            self.SetPyData(titem, nodedata)                  # Associate this data with the node
+            self.set_image(titem, "Transcript16")
+            # Add the new node to the map dictionary
+            mapDict['Transcript'][transcriptNo] = titem
+
+        # Now add the Notes for this Library and its Documents, Episodes, and Transcripts
+        for (noteNum, noteID, libraryNum, episodeNum, transcriptNum, collectNum, clipNum, snapshotNum, documentNum, quoteNum) in \
+            DBInterface.list_of_node_notes(LibraryNode=True, LibraryNum=libraryNo):
+            # Find the correct Library, Episode, Transcript, or Document node
+            if libraryNum > 0:
+                item = libItem
+                noteNodeType = 'LibraryNoteNode'
+            elif (episodeNum > 0) and mapDict['Episode'].has_key(episodeNum):
+                item = mapDict['Episode'][episodeNum]
+                noteNodeType = 'EpisodeNoteNode'
+            elif (transcriptNum > 0) and mapDict['Transcript'].has_key(transcriptNum):
+                item = mapDict['Transcript'][transcriptNum]
+                noteNodeType = 'TranscriptNoteNode'
+            elif TransanaConstants.proVersion and (documentNum > 0) and mapDict['Document'].has_key(documentNum):
+                item = mapDict['Document'][documentNum]
+                noteNodeType = 'DocumentNoteNode'
+            else:
+                noteNodeType = 'UNSUPPORTEDNoteNode'
+            # If the Note Node is one of the supported note node types ...
+            if noteNodeType != 'UNSUPPORTEDNoteNode':
+                # Create the tree node
+                noteitem = self.AppendItem(item, noteID)
+                # Add the node's image and node data
+                nodedata = _NodeData(nodetype=noteNodeType, recNum=noteNum)  # Identify this as a Note node
+                self.SetPyData(noteitem, nodedata)                  # Associate this data with the node
+                self.set_image(noteitem, "Note16")
+
+    def add_lazy_collection_node(self, parentItem, collNo, collID, parentCollNo):
+        """ Add a Collection node whose contents will be loaded when it is expanded """
+        # Create the tree node
+        item = self.AppendItem(parentItem, collID)
+        # Identify this as a Collection node whose children have not yet been loaded
+        nodedata = _NodeData(nodetype='CollectionNode', recNum=collNo, parent=parentCollNo, childrenLoaded=False)
+        # Associate this data with the node
+        self.SetPyData(item, nodedata)
+        # Select the proper image
+        self.set_image(item, "Collection16")
+        # Show the expand button, as we don't know yet whether the Collection has any contents
+        self.SetItemHasChildren(item, True)
+        return item
+
+    def populate_collection_node(self, collItem):
+        """ Load the nested Collections, Quotes, Clips, Snapshots, and Notes for one Collection node of a lazy Database Tree """
+        # Get the Collection Number from the node data
+        collNo = self.GetPyData(collItem).recNum
+        # We need to keep track of the nodes so we can add Notes quickly, just like create_collections_node() does.
+        mapDict = {'Clip' : {}, 'Snapshot' : {}, 'Quote' : {}}
+
+        # Add the nested Collections, which are themselves lazy
+        for (nestedCollNo, nestedCollID, parentCollNo) in DBInterface.list_of_collections(collNo):
+            self.add_lazy_collection_node(collItem, nestedCollNo, nestedCollID, parentCollNo)
+
+        # Add the Clips in this Collection
+        for (clipNo, clipID, clipCollNo, sourceNo, sortOrder) in DBInterface.list_of_clips(collectionNum=collNo):
+            # Create the tree node
+            clip_item = self.AppendItem(collItem, clipID)
+            # Create the node data and assign the node's image
+            nodedata = _NodeData(nodetype='ClipNode', recNum=clipNo, parent=clipCollNo, sortOrder=sortOrder, sourceObj=sourceNo)       # Identify this as a Clip node
+            self.SetPyData(clip_item, nodedata)                           # Associate this data with the node
+            self.set_image(clip_item, "Clip16")
+            # Add the new node to the map dictionary
+            mapDict['Clip'][clipNo] = clip_item
+
+        # If we're in a Pro version, not the Basic Version ...
+        if TransanaConstants.proVersion:
+            # Add the Quotes in this Collection
+            for (quoteNum, quoteID, collNum, sourceDoc, sortOrder) in DBInterface.list_of_quotes(collectionNum=collNo):
+                # Create the tree node
+                quote_item = self.AppendItem(collItem, quoteID)
+                # Create the node data and assign the node's image
+                nodedata = _NodeData(nodetype='QuoteNode', recNum=quoteNum, parent=collNum, sortOrder=sortOrder, sourceObj=sourceDoc)
+                self.SetPyData(quote_item, nodedata)                           # Associate this data with the node
+                self.set_image(quote_item, "Quote16")
+                # Add the new node to the map dictionary
+                mapDict['Quote'][quoteNum] = quote_item
+
+            # Add the Snapshots in this Collection
+            for (snapshotNo, snapshotID, snapshotCollNo, sortOrder) in DBInterface.list_of_snapshots(collectionNum=collNo):
+                # Create the tree node
+                snapshot_item = self.AppendItem(collItem, snapshotID)
+                # Create the node data and assign the node's image
+                nodedata = _NodeData(nodetype='SnapshotNode', recNum=snapshotNo, parent=snapshotCollNo, sortOrder=sortOrder)       # Identify this as a Snapshot node
+                self.SetPyData(snapshot_item, nodedata)                           # Associate this data with the node
+                self.set_image(snapshot_item, "Snapshot16")
+                # Add the new node to the map dictionary
+                mapDict['Snapshot'][snapshotNo] = snapshot_item
+
+        # Sort the Collection's children
+        self.SortChildren(collItem)
+
+        # Now add the Notes for this Collection and its Quotes, Clips, and Snapshots
+        for (noteNum, noteID, libraryNum, episodeNum, transcriptNum, collectNum, clipNum, snapshotNum, documentNum, quoteNum) in \
+            DBInterface.list_of_node_notes(CollectionNode=True, CollectionNum=collNo):
+            # Find the correct Collection, Clip, Snapshot, or Quote node
+            if collectNum > 0:
+                item = collItem
+                noteNodeType = 'CollectionNoteNode'
+            elif (clipNum > 0) and mapDict['Clip'].has_key(clipNum):
+                item = mapDict['Clip'][clipNum]
+                noteNodeType = 'ClipNoteNode'
+            elif (snapshotNum > 0) and TransanaConstants.proVersion and mapDict['Snapshot'].has_key(snapshotNum):
+                item = mapDict['Snapshot'][snapshotNum]
+                noteNodeType = 'SnapshotNoteNode'
+            elif (quoteNum > 0) and TransanaConstants.proVersion and mapDict['Quote'].has_key(quoteNum):
+                item = mapDict['Quote'][quoteNum]
+                noteNodeType = 'QuoteNoteNode'
+            else:
+                noteNodeType = 'UNSUPPORTEDNoteNode'
+            # If the Note Node is one of the supported note node types ...
+            if noteNodeType != 'UNSUPPORTEDNoteNode':
+                # Create the tree node
+                noteitem = self.AppendItem(item, noteID)
+                # Add the node's image and node data
+                nodedata = _NodeData(nodetype=noteNodeType, recNum=noteNum)  # Identify this as a Note node
+                self.SetPyData(noteitem, nodedata)                  # Associate this data with the node
+                self.set_image(noteitem, "Note16")
+
+    def populate_keyword_node(self, kwItem):
+        """ Load the Keyword Examples for one Keyword node of a lazy Database Tree """
+        # The Keyword Group is stored in the node data's parent, and the Keyword is the node's text
+        kwg = self.GetPyData(kwItem).parent
+        kw = self.GetItemText(kwItem)
+        # Iterate through this Keyword's examples
+        for (episodeNum, clipNum, snapshotNum, exKwg, exKw, example) in DBInterface.list_of_keyword_examples(kwg, kw):
+            # Load the indicated clip.  We can speed the load by not loading the Clip Transcript(s)
+            exampleClip = Clip.Clip(clipNum, skipText=True)
+            # Create the tree node
+            example_item = self.AppendItem(kwItem, exampleClip.id)
+            # Identify this as a Keyword Example node
+            nodedata = _NodeData(nodetype='KeywordExampleNode', recNum=exampleClip.number, parent=exampleClip.collection_num)
+            self.SetPyData(example_item, nodedata)              # Associate this data with the node
+            self.set_image(example_item, "Clip16")
+        # Keep the examples in alphabetical order
+        self.SortChildren(kwItem)
+
     def add_note_nodes(self, note_ids, item, **parent_num):
         """ Add the notes specified in note_ids to item """
         if len(note_ids) > 0:
@@ -3318,6 +3623,8 @@ class _DBTreeCtrl(wx.TreeCtrl):
 
 
         indexPos = 0
+        # Track whether we loaded any lazy tree nodes from the database while looking for the right spot
+        loadedFromDB = False
 
         for node in nodeData:
 
@@ -3329,6 +3636,20 @@ class _DBTreeCtrl(wx.TreeCtrl):
 
             notDone = True
 
+            # In a lazy tree, the children of the current node may not have been loaded yet.  Loading them from
+            # the database will also load the record we're adding, so we must not add it a second time.
+            if self.lazyTree and self.PopulateNode(currentNode):
+                loadedFromDB = True
+            if loadedFromDB and (nodeListPos == len(nodeData) - 1):
+                existingNode = self.FindChildNode(currentNode, nodeType, node, nodeRecNum)
+                if existingNode != None:
+                    # If we're supposed to expand the node ...
+                    if expandNode:
+                        # ... expand it!
+                        self.Expand(currentNode)
+                    self.Refresh()
+                    return
+
             if DEBUG:
                 print "Getting children for ", self.GetItemText(currentNode)
                 
@@ -3784,8 +4105,8 @@ class _DBTreeCtrl(wx.TreeCtrl):
                          'SearchQuoteNode', 'SearchSnapshotNode' ]:
             # ... get the item's parent
             tmpNode = currentNode  # self.GetItemParent(currentNode)
-            # ... and sort the parent
-            self.SortChildren(tmpNode)
+            # ... and sort the parent (once per batch, if we're in a batch update)
+            self.SortNode(tmpNode)
         # Refresh the Tree
         self.Refresh()
 
@@ -4379,7 +4700,8 @@ class _DBTreeCtrl(wx.TreeCtrl):
         tmpMenu += (_("Batch Episode Creation"), _("Add Library Note"), _("Delete Library"), _("Library Report"))
         if TransanaConstants.proVersion:
             tmpMenu += (_("Library Word Frequency Report"), _("Library Keyword Sequence Map"), _("Library Keyword Bar Graph"),
-                        _("Library Keyword Percentage Graph"))
+                        _("Library Keyword Percentage Graph"), _("Library Keyword Co-occurrence Report"),
+                        _("Library Keyword Co-occurrence Export"))
         tmpMenu += (_("Analytic Data Export"), _("Library Properties"))
         self.create_menu("LibraryNode",
                          tmpMenu,
@@ -4635,6 +4957,8 @@ class _DBTreeCtrl(wx.TreeCtrl):
 
     def OnLibraryRootCommand(self, evt):
         """Handle selections for root Library menu."""
+        # import Transana's Word Frequency Report when it is first needed, rather than at start-up
+        import WordFrequencyReport
         n = evt.GetId() - self.cmd_id_start["LibraryRootNode"]
         
         if n == 0:      # Add Library
@@ -4649,17 +4973,24 @@ class _DBTreeCtrl(wx.TreeCtrl):
   
     def OnLibraryCommand(self, evt):
         """Handle menu selections for Library objects."""
+        # import the modules this method uses when they are first needed, rather than at start-up
+        import SpreadsheetDataImport
+        import BatchFileProcessor
+        import ReportGenerator
+        import WordFrequencyReport
+        import LibraryMap
         n = evt.GetId() - self.cmd_id_start["LibraryNode"]
         # If we're in the Basic version, we need to adjust the menu numbers
         # for Add Document (1), Import Spreadsheet Data (3), Batch Document Creation (4), Library Keyword Sequence Map (10),
-        # Library Keyword Bar Graph (11), and Library Keyword Percentage Graph (12)
+        # Library Keyword Bar Graph (11), Library Keyword Percentage Graph (12), Library Keyword Co-occurrence Report (13),
+        # and Library Keyword Co-occurrence Export (14)
         if not TransanaConstants.proVersion:
             if (n >= 1):
                 n += 1
             if (n >= 3):
                 n += 2
             if (n >= 9):
-                n += 4
+                n += 6
 
         # Get the list of selected items
         selItems = self.GetSelections()
@@ -5331,10 +5662,20 @@ class _DBTreeCtrl(wx.TreeCtrl):
         elif n == 12:    # Library Map -- Percentage Mode
             LibraryMap.LibraryMap(self, unicode(_("Library Keyword Percentage Graph"), 'utf8'), selData.recNum, library_name, 3, controlObject = self.parent.ControlObject)
 
-        elif n == 13:    # Analytic Data Export
+        elif n == 13:    # Library Keyword Co-occurrence Report
+            # import the Keyword Co-occurrence module (and numpy) when it is first needed, rather than at start-up
+            import KeywordCooccurrence
+            KeywordCooccurrence.KeywordCooccurrenceReport(selData.recNum, library_name, controlObject = self.parent.ControlObject)
+
+        elif n == 14:    # Library Keyword Co-occurrence Export
+            # import the Keyword Co-occurrence module (and numpy) when it is first needed, rather than at start-up
+            import KeywordCooccurrence
+            KeywordCooccurrence.KeywordCooccurrenceExport(self, selData.recNum)
+
+        elif n == 15:    # Analytic Data Export
             self.AnalyticDataExport(libraryNum = selData.recNum)
             
-        elif n == 14:    # Library Properties
+        elif n == 16:    # Library Properties
             library = Library.Library()
             # FIXME: Gracefully handle when we can't load the Library.
             # (yes, this can happen.  for example if another user changes
@@ -5348,6 +5689,9 @@ class _DBTreeCtrl(wx.TreeCtrl):
  
     def OnDocumentCommand(self, evt):
         """Handle selections for Document menu."""
+        # import the modules this method uses when they are first needed, rather than at start-up
+        import ReportGenerator
+        import WordFrequencyReport
         n = evt.GetId() - self.cmd_id_start['DocumentNode']
 
         # If we're in the Basic version, we need to adjust the menu numbers
@@ -5688,6 +6032,9 @@ class _DBTreeCtrl(wx.TreeCtrl):
 
     def OnEpisodeCommand(self, evt):
         """Handle menu selections for Episode objects."""
+        # import the modules this method uses when they are first needed, rather than at start-up
+        import ReportGenerator
+        import WordFrequencyReport
         n = evt.GetId() - self.cmd_id_start["EpisodeNode"]
         # If we're in the Basic version, we need to adjust the menu numbers
         # for Open Multiple Transcripts (3)
@@ -6059,6 +6406,8 @@ class _DBTreeCtrl(wx.TreeCtrl):
 
     def OnTranscriptCommand(self, evt):
         """ Handle menuy selections for Transcript menu """
+        # import Transana's Word Frequency Report when it is first needed, rather than at start-up
+        import WordFrequencyReport
         n = evt.GetId() - self.cmd_id_start['TranscriptNode']
         # If we're in the Basic version, we need to adjust the menu numbers
         # for Open Additional Transcript (2)
@@ -6264,6 +6613,9 @@ class _DBTreeCtrl(wx.TreeCtrl):
 
     def OnCollRootCommand(self, evt):
         """Handle selections for root Collection menu."""
+        # import the modules this method uses when they are first needed, rather than at start-up
+        import ReportGenerator
+        import WordFrequencyReport
         n = evt.GetId() - self.cmd_id_start['CollectionsRootNode']
 
         if not TransanaConstants.proVersion:
@@ -6357,6 +6709,11 @@ class _DBTreeCtrl(wx.TreeCtrl):
     
     def OnCollectionCommand(self, evt):
         """Handle menu selections for Collection objects."""
+        # import the modules this method uses when they are first needed, rather than at start-up
+        import BatchFileProcessor
+        import ReportGenerator
+        import WordFrequencyReport
+        import PlayAllClips
         n = evt.GetId() - self.cmd_id_start['CollectionNode']
         # If we're in the Basic version, we need to adjust the menu numbers
         # for Add Quote (3), Add Multi-transcript Clip (5), Add Snapshot (6), and Batch Snapshot Creation (7)
@@ -7469,6 +7826,8 @@ class _DBTreeCtrl(wx.TreeCtrl):
 
     def OnClipCommand(self, evt):
         """Handle selections for the Clip menu."""
+        # import Transana's Media Conversion tool when it is first needed, rather than at start-up
+        import MediaConvert
         n = evt.GetId() - self.cmd_id_start['ClipNode']
         # If we're in the Basic version, we need to adjust the menu numbers
         # for Add Quote (4) Add Multi-transcript Clip (6) and Add Snapshot (7)
@@ -9005,6 +9364,9 @@ class _DBTreeCtrl(wx.TreeCtrl):
 
     def OnKwRootCommand(self, evt):
         """Handle selections for the root Keyword group menu."""
+        # import the modules this method uses when they are first needed, rather than at start-up
+        import KWManager
+        import KeywordSummaryReport
         n = evt.GetId() - self.cmd_id_start["KeywordRootNode"]
 
         # Get the list of selected items
@@ -9072,6 +9434,8 @@ class _DBTreeCtrl(wx.TreeCtrl):
   
     def OnKwGroupCommand(self, evt):
         """Handle selections for the root Keyword group menu."""
+        # import Transana's Keyword Summary Report when it is first needed, rather than at start-up
+        import KeywordSummaryReport
         n = evt.GetId() - self.cmd_id_start["KeywordGroupNode"]
         # Get the list of selected items
         selItems = self.GetSelections()
@@ -9294,6 +9658,8 @@ class _DBTreeCtrl(wx.TreeCtrl):
         elif n == 3:    # Delete this keyword
             # Create a flag for Yes To All
             YesToAll = False
+            # Create a list of the Keywords the user confirms should be deleted.  They are all deleted at once.
+            keywordsToDelete = []
             # For each Keyword in the selected items ...
             for item in selItems:
                 # ... grab the individual item ...
@@ -9334,47 +9700,61 @@ class _DBTreeCtrl(wx.TreeCtrl):
                         # ... that counts as a Yes
                         result = wx.ID_YES
                 if result == wx.ID_YES:
+                    # Get the full Node Branch by climbing it to one level above the root
+                    nodeList = (self.GetItemText(sel),)
+                    while (self.GetItemParent(sel) != self.GetRootItem()):
+                        sel = self.GetItemParent(sel)
+                        nodeList = (self.GetItemText(sel),) + nodeList
+                    # Remember the Keyword to be deleted
+                    keywordsToDelete.append((kw_group, kw_name, nodeList))
+
+            # If there are Keywords to delete ...
+            if len(keywordsToDelete) > 0:
+                try:
+                    # Delete the Keywords, as a single transaction
+                    DBInterface.delete_keywords([(kw_group, kw_name) for (kw_group, kw_name, nodeList) in keywordsToDelete])
+                    # Don't update the tree on screen until all the nodes have been removed
+                    self.BeginBatchUpdate()
                     try:
-                        # Delete the Keyword
-                        DBInterface.delete_keyword(kw_group, kw_name)
-                        # Get the full Node Branch by climbing it to one level above the root
-                        nodeList = (self.GetItemText(sel),)
-                        while (self.GetItemParent(sel) != self.GetRootItem()):
-                            sel = self.GetItemParent(sel)
-                            nodeList = (self.GetItemText(sel),) + nodeList
-                        # Call the DB Tree's delete_Node method.
-                        self.delete_Node(nodeList, 'KeywordNode')
-                        # We need to update the Keyword Visualization! (Well, maybe not, but I don't know how to tell!)
-                        self.parent.ControlObject.UpdateKeywordVisualization()
-
-                        # We need to update all open Snapshot Windows based on the change in this Keyword
+                        for (kw_group, kw_name, nodeList) in keywordsToDelete:
+                            # Call the DB Tree's delete_Node method.  This tells other users about each Keyword with the
+                            # usual Delete Node message, which every version understands.  They apply the messages in batches.
+                            self.delete_Node(nodeList, 'KeywordNode')
+                    finally:
+                        self.EndBatchUpdate()
+                    # We need to update the Keyword Visualization! (Well, maybe not, but I don't know how to tell!)
+                    self.parent.ControlObject.UpdateKeywordVisualization()
+
+                    # We need to update all open Snapshot Windows based on the change in these Keywords
+                    for (kw_group, kw_name, nodeList) in keywordsToDelete:
                         self.parent.ControlObject.UpdateSnapshotWindows('Update', evt, kw_group, kw_name)
-                                
-                        # Even if this computer doesn't need to update the keyword visualization others, might need to.
-                        if not TransanaConstants.singleUserVersion:
-                            # We need to update the Keyword Visualization no matter what here, when deleting a keyword
-                            if DEBUG:
-                                print 'Message to send = "UKV %s %s %s"' % ('None', 0, 0)
-                                
-                            if TransanaGlobal.chatWindow != None:
-                                TransanaGlobal.chatWindow.SendMessage("UKV %s %s %s" % ('None', 0, 0))
-                    # Handle exceptions
-                    except:
+
+                    # Now let's communicate with other Transana instances if we're in Multi-user mode
+                    if not TransanaConstants.singleUserVersion:
                         if DEBUG:
-                            print "Exception %s: %s" % (sys.exc_info()[0], sys.exc_info()[1])
-                            import traceback
-                            traceback.print_exc(file=sys.stdout)
-                            
-                        # Display the Exception Message, allow "continue" flag to remain true
-                        errmsg = sys.exc_info()[1]
-                        # If this is a TransanaExceptions.GeneralError, we need the "explanation" parameter!  This should already be Unicode!
-                        if hasattr(errmsg, 'explanation'):
-                            errmsg = errmsg.explanation
-                        elif hasattr(errmsg, 'args'):
-                            errmsg = errmsg.args
-                        errordlg = Dialogs.ErrorDialog(None, errmsg)
-                        errordlg.ShowModal()
-                        errordlg.Destroy()
+                            print 'Message to send = "UKV %s %s %s"' % ('None', 0, 0)
+
+                        if TransanaGlobal.chatWindow != None:
+                            # Even if this computer doesn't need to update the keyword visualization others, might need to.
+                            # We need to update the Keyword Visualization no matter what here, when deleting a keyword
+                            TransanaGlobal.chatWindow.SendMessage("UKV %s %s %s" % ('None', 0, 0))
+                # Handle exceptions
+                except:
+                    if DEBUG:
+                        print "Exception %s: %s" % (sys.exc_info()[0], sys.exc_info()[1])
+                        import traceback
+                        traceback.print_exc(file=sys.stdout)
+                        
+                    # Display the Exception Message, allow "continue" flag to remain true
+                    errmsg = sys.exc_info()[1]
+                    # If this is a TransanaExceptions.GeneralError, we need the "explanation" parameter!  This should already be Unicode!
+                    if hasattr(errmsg, 'explanation'):
+                        errmsg = errmsg.explanation
+                    elif hasattr(errmsg, 'args'):
+                        errmsg = errmsg.args
+                    errordlg = Dialogs.ErrorDialog(None, errmsg)
+                    errordlg.ShowModal()
+                    errordlg.Destroy()
 
         elif n == 4:    # Create Quick Quote
             try:
@@ -9678,6 +10058,9 @@ class _DBTreeCtrl(wx.TreeCtrl):
 
     def OnSearchResultsCommand(self, event):
         """Handle selections for the Search Results menu."""
+        # import the modules this method uses when they are first needed, rather than at start-up
+        import ReportGenerator
+        import PlayAllClips
         n = event.GetId() - self.cmd_id_start["SearchResultsNode"]
 
         # Get the list of selected items
@@ -9768,6 +10151,9 @@ class _DBTreeCtrl(wx.TreeCtrl):
 
     def OnSearchLibraryCommand(self, evt):
         """Handle menu selections for Search Library objects."""
+        # import the modules this method uses when they are first needed, rather than at start-up
+        import ReportGenerator
+        import WordFrequencyReport
         n = evt.GetId() - self.cmd_id_start["SearchLibraryNode"]
 
         if not TransanaConstants.proVersion:
@@ -9808,6 +10194,9 @@ class _DBTreeCtrl(wx.TreeCtrl):
  
     def OnSearchDocumentCommand(self, evt):
         """Handle menu selections for Search Document objects."""
+        # import the modules this method uses when they are first needed, rather than at start-up
+        import ReportGenerator
+        import WordFrequencyReport
         n = evt.GetId() - self.cmd_id_start["SearchDocumentNode"]
 
         if not TransanaConstants.proVersion:
@@ -9873,6 +10262,9 @@ class _DBTreeCtrl(wx.TreeCtrl):
 
     def OnSearchEpisodeCommand(self, evt):
         """Handle menu selections for Search Episode objects."""
+        # import the modules this method uses when they are first needed, rather than at start-up
+        import ReportGenerator
+        import WordFrequencyReport
         n = evt.GetId() - self.cmd_id_start["SearchEpisodeNode"]
 
         if not TransanaConstants.proVersion:
@@ -9937,6 +10329,8 @@ class _DBTreeCtrl(wx.TreeCtrl):
 
     def OnSearchTranscriptCommand(self, evt):
         """ Handle menuy selections for Search Transcript menu """
+        # import Transana's Word Frequency Report when it is first needed, rather than at start-up
+        import WordFrequencyReport
         n = evt.GetId() - self.cmd_id_start["SearchTranscriptNode"]
 
         if not TransanaConstants.proVersion:
@@ -9968,6 +10362,10 @@ class _DBTreeCtrl(wx.TreeCtrl):
 
     def OnSearchCollectionCommand(self, evt):
         """Handle menu selections for Search Collection objects."""
+        # import the modules this method uses when they are first needed, rather than at start-up
+        import ReportGenerator
+        import WordFrequencyReport
+        import PlayAllClips
         n = evt.GetId() - self.cmd_id_start["SearchCollectionNode"]
 
         if not TransanaConstants.proVersion:
@@ -11929,6 +12327,8 @@ class _DBTreeCtrl(wx.TreeCtrl):
 
     def DocumentKeywordMapReport(self, documentNum, libraryName, documentName):
         """ Produce a Keyword Map Report for the specified Library & Document """
+        # import Transana's Keyword Map when it is first needed, rather than at start-up
+        import KeywordMapClass
         # Create a Keyword Map Report (not embedded)
         frame = KeywordMapClass.KeywordMap(self, -1, _("Transana Document Keyword Map Report"), embedded=False, controlObject = self.parent.ControlObject)
         # Now set it up, passing in the Library and Episode to be displayed
@@ -11936,6 +12336,8 @@ class _DBTreeCtrl(wx.TreeCtrl):
 
     def EpisodeKeywordMapReport(self, episodeNum, libraryName, episodeName):
         """ Produce a Keyword Map Report for the specified Library & Episode """
+        # import Transana's Keyword Map when it is first needed, rather than at start-up
+        import KeywordMapClass
         # Create a Keyword Map Report (not embedded)
         frame = KeywordMapClass.KeywordMap(self, -1, _("Transana Episode Keyword Map Report"), embedded=False, controlObject = self.parent.ControlObject)
         # Now set it up, passing in the Library and Episode to be displayed
@@ -11943,6 +12345,8 @@ class _DBTreeCtrl(wx.TreeCtrl):
 
     def CollectionKeywordMapReport(self, collNum):
         """ Produce a Collection Keyword Map Report for the specified Collection """
+        # import Transana's Keyword Map when it is first needed, rather than at start-up
+        import KeywordMapClass
         # Create a Keyword Map Report (not embedded)
         frame = KeywordMapClass.KeywordMap(self, -1, _("Transana Collection Keyword Map Report"), embedded=False, controlObject = self.parent.ControlObject)
         # Now set it up, passing in the Library and Episode to be displayed
@@ -11983,6 +12387,8 @@ class _DBTreeCtrl(wx.TreeCtrl):
             
     def AnalyticDataExport(self, libraryNum = 0, documentNum = 0, episodeNum = 0, collectionNum = 0):
         """ Implements the Analytic Data Export routine """
+        # import Transana's Analytic Data Export when it is first needed, rather than at start-up
+        import AnalyticDataExport
         # Create the Analytic Data Export dialog box, passing the appropriate parameter
         if libraryNum > 0:
             clipExport = AnalyticDataExport.AnalyticDataExport(self, -1, libraryNum = libraryNum)
@@ -42,6 +42,8 @@ import Dialogs
 import Misc
 # import Transana's Note Object
 import Note
+# import Transana's Quote Index
+import QuoteIndex
 # import Transana's Library Object
 import Library
 # import Transana's Constants
@@ -68,7 +70,7 @@ class Document(DataObject.DataObject):
             self.db_load_by_name(libraryID, documentID)
         else:
             self.library_id = ''
-            self.quote_dict = {}
+            self.quote_dict = QuoteIndex.QuoteIndex()
         # For Partial Transcript Editing, create a data structure for storing the transcript information by LINE
         self.lines = []
         # Initialize a paragraph counter
@@ -811,8 +813,9 @@ class Document(DataObject.DataObject):
 
     def clear_quotes(self):
         """ Clear the Quote List """
-        # Clear the Quote List
-        self.quote_dict = {}
+        # Clear the Quote List.  The Quote List is indexed by position, so the Quotes at a position in the
+        # Document can be found quickly.
+        self.quote_dict = QuoteIndex.QuoteIndex()
 
     def refresh_quotes(self):
         # Clear the Quote List
@@ -37,6 +37,8 @@ import ClipKeywordObject
 import DataObject
 # import Transana's Database Interface
 import DBInterface
+# import Transana's Episode Segment Index
+import EpisodeSegmentIndex
 # import Transana's Miscellaneous Functions
 import Misc
 # import Transana's Note Object
@@ -447,6 +449,8 @@ class Episode(DataObject.DataObject):
                 c.execute('COMMIT')
             # Close the Database Cursor
             c.close()
+            # Displayed Episode Items may have changed, so the Episode Segment Indexes must be reloaded
+            EpisodeSegmentIndex.Invalidate()
             
     def db_delete(self, use_transactions=1):
         """Delete this object record from the database."""
@@ -531,6 +535,8 @@ class Episode(DataObject.DataObject):
         except:
             raise
 
+        # Displayed Episode Items may have changed, so the Episode Segment Indexes must be reloaded
+        EpisodeSegmentIndex.Invalidate()
         return result
 
     def clear_keywords(self):
@@ -0,0 +1,127 @@
+# Copyright (C) 2002 - 2017 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+""" This module implements an in-memory index of the Clips and Snapshots created from an Episode, used by
+    the Episode Items and Selected Items tabs of the Data Window.  The index is loaded with a few queries
+    and holds only the data those tabs display, so finding the items that cover a media position while
+    the media plays does not require any database access.  Saving or deleting a Library, Episode, Clip,
+    Snapshot, Collection, or Keyword, closing the database, or a change reported by the Message Server,
+    calls Invalidate(), which causes every index to be reloaded the next time it is used.  Other cached
+    Episode data, such as the Library Map's, uses GetGeneration() to detect the same changes. """
+
+__author__ = 'David Woods <dwoods@transana.com>'
+
+# import Python's bisect module
+import bisect
+
+# import Transana's Database Interface
+import DBInterface
+
+# Each change to the data an index holds increments the generation.  An index that was loaded
+# in an earlier generation is out of date.
+_generation = 0
+
+def Invalidate():
+    """ Signal that Episode, Clip, Snapshot, Collection, or Keyword data has changed, so all indexes must be reloaded """
+    global _generation
+    _generation += 1
+
+def GetGeneration():
+    """ Return the current generation.  Cached data loaded in an earlier generation is out of date. """
+    return _generation
+
+
+class EpisodeSegmentIndex(object):
+    """ The Clips (and optionally Snapshots) of one Episode, sorted by position, with their display data """
+
+    def __init__(self, episodeNum, includeSnapshots=True):
+        """ Load the index for the Episode """
+        self.episodeNum = episodeNum
+        self.includeSnapshots = includeSnapshots
+        # Remember the generation the index was loaded in
+        self.generation = _generation
+        # A list of item dictionaries, sorted by start time, stop time, and node string
+        self.items = []
+        # The start time of each item, in the same order, for searching
+        self.starts = []
+        # The sorted, unique start and stop times of all items.  Between two adjacent boundaries, the
+        # same items always cover the media position.
+        self.bounds = []
+        # A cache of the items covering each interval between boundaries, indexed by boundary position
+        self.segments = {}
+        self.Load()
+
+    def Load(self):
+        """ Load the Episode's Clip and Snapshot data from the database """
+        # Build the node string for every Collection at once, rather than loading each Collection's parents
+        collections = {}
+        for (collectNum, collectID, parentNum) in DBInterface.list_of_all_collections():
+            collections[collectNum] = (collectID, parentNum)
+        nodeStrings = {}
+        # Get the Keywords for all of the Episode's Clips and Snapshots in one query
+        keywords = DBInterface.list_of_item_keywords_by_episode(self.episodeNum)
+        items = []
+        for clip in DBInterface.list_of_clips_by_episode(self.episodeNum):
+            nodeString = self._GetNodeString(clip['CollectNum'], collections, nodeStrings) + ' > ' + clip['ClipID']
+            items.append({'Type' : 'Clip', 'Number' : clip['ClipNum'], 'Start' : clip['ClipStart'],
+                          'Stop' : clip['ClipStop'], 'NodeString' : nodeString,
+                          'Keywords' : keywords.get(('Clip', clip['ClipNum']), []), 'Coding' : []})
+        if self.includeSnapshots:
+            # Get the Coded Keywords for all of the Episode's Snapshots in one query
+            coding = DBInterface.list_of_snapshot_coding_by_episode(self.episodeNum)
+            for snapshot in DBInterface.list_of_snapshots_by_episode(self.episodeNum):
+                nodeString = self._GetNodeString(snapshot['CollectNum'], collections, nodeStrings) + ' > ' + snapshot['SnapshotID']
+                items.append({'Type' : 'Snapshot', 'Number' : snapshot['SnapshotNum'], 'Start' : snapshot['SnapshotStart'],
+                              'Stop' : snapshot['SnapshotStop'], 'NodeString' : nodeString,
+                              'Keywords' : keywords.get(('Snapshot', snapshot['SnapshotNum']), []),
+                              'Coding' : coding.get(snapshot['SnapshotNum'], [])})
+        # Sort the items the way the Data Window has always displayed them
+        items.sort(key=lambda item: (item['Start'], item['Stop'], item['NodeString'].upper()))
+        self.items = items
+        self.starts = [item['Start'] for item in items]
+        bounds = set(self.starts)
+        bounds.update([item['Stop'] for item in items])
+        self.bounds = sorted(bounds)
+        self.segments = {}
+
+    def _GetNodeString(self, collectNum, collections, nodeStrings):
+        """ Return the node string for a Collection, as Collection.GetNodeString() would, using the
+            pre-loaded Collection data """
+        if not nodeStrings.has_key(collectNum):
+            (collectID, parentNum) = collections[collectNum]
+            if parentNum != 0:
+                nodeStrings[collectNum] = self._GetNodeString(parentNum, collections, nodeStrings) + ' > ' + collectID
+            else:
+                nodeStrings[collectNum] = collectID
+        return nodeStrings[collectNum]
+
+    def IsCurrent(self):
+        """ Returns False if the data may have changed since the index was loaded """
+        return self.generation == _generation
+
+    def Query(self, timeCode=None):
+        """ Return a tuple of the positions in self.items of the items that cover timeCode, that is, that
+            start at or before timeCode and stop after it.  If timeCode is None, all items are returned. """
+        if timeCode == None:
+            return tuple(range(len(self.items)))
+        # Find the interval between boundaries that contains the time code
+        segment = bisect.bisect_right(self.bounds, timeCode)
+        # If we haven't been in this interval before ...
+        if not self.segments.has_key(segment):
+            # ... only items that start at or before the time code can cover it
+            self.segments[segment] = tuple([loop for loop in range(bisect.bisect_right(self.starts, timeCode))
+                                            if self.items[loop]['Stop'] > timeCode])
+        return self.segments[segment]
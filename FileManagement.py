@@ -46,6 +46,7 @@ import paramiko
 # Import Transana modules
 import DBInterface       # Import Transana's Database Interface
 import Dialogs           # Import Transana's Dialog Boxes
+import FileSynchronizer  # Manifest-based synchronization engine for Copy All New
 import Misc              # import Transana's Miscellaneous functions
 import LocalFileTransfer # LOCAL File Transfer Progres Box and File Transfer Logic
 import sFTPConnection    # sFTP Connection Parameters dialog box
@@ -1450,9 +1451,12 @@ class FileManagement(wx.Dialog):
                 prompt = unicode(prompt, 'utf8')
             # Display the prompt
             self.SetStatusText(prompt % (sourceFile, destDir))
-            # Check if the destination file already exists.  If NOT ...
-            if not os.path.exists(os.path.join(destDir, fileName)):
-                if os.stat(sourceFile)[6] < 5000000:
+            # See if the destination file was left by an interrupted copy, which we can resume
+            partialCopy = os.path.exists(os.path.join(destDir, fileName)) and \
+                          LocalFileTransfer.IsPartialCopy(sourceFile, os.path.join(destDir, fileName))
+            # Check if the destination file already exists.  If NOT, or if it's a partial copy ...
+            if not os.path.exists(os.path.join(destDir, fileName)) or partialCopy:
+                if (os.stat(sourceFile)[6] < 5000000) and not partialCopy:
                     # copy the file to the destination path
                     shutil.copyfile(sourceFile, os.path.join(destDir, fileName))
                 else:
@@ -2043,8 +2047,15 @@ class FileManagement(wx.Dialog):
             destFilter = self.filterLeft
 
         # Now COPY the FILES.
+        # Unless the SRB is involved, use the manifest-based synchronizer, which only copies what has changed
+        if (self.connectionType != 'SRB') or ((sourceLbl == self.LOCAL_LABEL) and (destLbl == self.LOCAL_LABEL)):
+            # If the synchronization can't be done ...
+            if not self.SynchWithManifests(sourceLbl, sourcePath, destLbl, destPath):
+                # ... reset the cursor to the Arrow and stop
+                self.SetCursor(wx.StockCursor(wx.CURSOR_ARROW))
+                return
         # If our SOURCE is LOCAL ...
-        if sourceLbl == self.LOCAL_LABEL:
+        elif sourceLbl == self.LOCAL_LABEL:
 
             # We can't just call os.walk() while copying files.  This causes directories worth of files to be
             # copies recursively if you copy something into one of it's own sub-directories.  Instead, let's
@@ -2296,7 +2307,109 @@ class FileManagement(wx.Dialog):
         self.RefreshFileList(destLbl, destPath, destFile, destFilter)
         # Reset the cursor to the Arrow
         self.SetCursor(wx.StockCursor(wx.CURSOR_ARROW))
-       
+
+    def SynchWithManifests(self, sourceLbl, sourcePath, destLbl, destPath):
+        """ Copy new and changed files from the SOURCE tree to the DEST tree by comparing manifests of the two
+            trees and transferring only the differences.  Returns False if the synchronization can't be done. """
+        # If our SOURCE and DEST are both REMOTE ...
+        if (sourceLbl != self.LOCAL_LABEL) and (destLbl != self.LOCAL_LABEL):
+            # Inform the user
+            prompt = _("Copying files from one directory to another on an sFTP server is not supported.")
+            dlg = Dialogs.InfoDialog(self, prompt)
+            dlg.ShowModal()
+            dlg.Destroy()
+            return False
+
+        # Build the manifests of the SOURCE and DEST trees
+        self.SetStatusText(_('Comparing files ...'))
+        try:
+            if sourceLbl == self.LOCAL_LABEL:
+                sourceManifest = FileSynchronizer.BuildLocalManifest(sourcePath)
+            else:
+                sourceManifest = FileSynchronizer.BuildSFTPManifest(self.sFTPClient, sourcePath)
+            if destLbl == self.LOCAL_LABEL:
+                destManifest = FileSynchronizer.BuildLocalManifest(destPath)
+            else:
+                destManifest = FileSynchronizer.BuildSFTPManifest(self.sFTPClient, destPath)
+        # If an IOError is raised ...
+        except exceptions.IOError, e:
+            # Display the error message text
+            tmpDlg = Dialogs.ErrorDialog(self, "%s" % e)
+            tmpDlg.ShowModal()
+            tmpDlg.Destroy()
+            return False
+        # Figure out what needs to be copied
+        (dirsToCreate, filesToCopy) = FileSynchronizer.ComputeDelta(sourceManifest, destManifest)
+
+        # Create the missing DEST directories.  (Parents come before their children in the list.)
+        for relPath in dirsToCreate:
+            if destLbl == self.LOCAL_LABEL:
+                if not os.path.exists(FileSynchronizer.LocalPath(destPath, relPath)):
+                    os.mkdir(FileSynchronizer.LocalPath(destPath, relPath))
+            else:
+                self.sFTPClient.mkdir(FileSynchronizer.RemotePath(destPath, relPath))
+
+        # If everything is up to date, we're done
+        if len(filesToCopy) == 0:
+            self.SetStatusText(_('All files are up to date.'))
+            return True
+
+        # Build the list of transfers, and select the transfer method
+        jobs = []
+        totalBytes = 0
+        for (relPath, size, offset) in filesToCopy:
+            if sourceLbl == self.LOCAL_LABEL:
+                source = FileSynchronizer.LocalPath(sourcePath, relPath)
+            else:
+                source = FileSynchronizer.RemotePath(sourcePath, relPath)
+            if destLbl == self.LOCAL_LABEL:
+                dest = FileSynchronizer.LocalPath(destPath, relPath)
+            else:
+                dest = FileSynchronizer.RemotePath(destPath, relPath)
+            jobs.append((source, dest, offset))
+            totalBytes += size - offset
+        # LOCAL to LOCAL
+        if (sourceLbl == self.LOCAL_LABEL) and (destLbl == self.LOCAL_LABEL):
+            pool = FileSynchronizer.SyncWorkerPool(FileSynchronizer.CopyLocalFile)
+        # LOCAL to REMOTE.  Each worker gets its own sFTP channel on our connection.
+        elif sourceLbl == self.LOCAL_LABEL:
+            pool = FileSynchronizer.SyncWorkerPool(FileSynchronizer.UploadSFTPFile,
+                                                   lambda: paramiko.SFTPClient.from_transport(self.sFTPTransport))
+        # REMOTE to LOCAL
+        else:
+            pool = FileSynchronizer.SyncWorkerPool(FileSynchronizer.DownloadSFTPFile,
+                                                   lambda: paramiko.SFTPClient.from_transport(self.sFTPTransport))
+        # Start the transfers
+        pool.Start(jobs)
+
+        # Create a Progress Dialog
+        prompt = unicode(_('Copying %d of %d files'), 'utf8')
+        dlg = wx.ProgressDialog(_("Copy All New"), prompt % (0, len(jobs)) + '\n' + ' ' * 80, 100, self,
+                                style=wx.PD_CAN_ABORT | wx.PD_APP_MODAL | wx.PD_ELAPSED_TIME | wx.PD_REMAINING_TIME)
+        # While the transfers are running ...
+        while pool.IsRunning():
+            time.sleep(0.2)
+            # Calculate the percentage done, holding it below 100 until the transfers finish
+            percent = min(int(pool.bytesTransferred * 100.0 / max(totalBytes, 1)), 99)
+            # Update the Progress Dialog, which also lets the user press Cancel
+            (keepGoing, skip) = dlg.Update(percent, prompt % (pool.filesCopied, len(jobs)) + '\n' + pool.currentFile)
+            if not keepGoing:
+                pool.Cancel()
+        dlg.Destroy()
+
+        # If any transfers failed ...
+        if len(pool.errors) > 0:
+            # ... list them for the user
+            msg = unicode(_('The following files could not be copied:'), 'utf8')
+            for (fileName, errMsg) in pool.errors:
+                msg += u'\n%s  %s' % (fileName, errMsg)
+            tmpDlg = Dialogs.ErrorDialog(self, msg)
+            tmpDlg.ShowModal()
+            tmpDlg.Destroy()
+        # Update the status to indicate the copy is done
+        self.SetStatusText(_('Copy complete.'))
+        return True
+
     def DeleteFile(self, lbl, path, filename):
         """ Delete the specified file """
         # Set cursor to hourglass
@@ -0,0 +1,301 @@
+# Copyright (C) 2002 - 2017 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+""" This module implements the file synchronization engine behind the File Management window's
+    "Copy All New" buttons.  A manifest of file sizes and modification times (and, optionally, MD5 hashes)
+    is built for each side in a single pass, the difference between them is computed, and only new,
+    changed, or partially copied files are transferred, using a small pool of worker threads.
+    Partially copied files are resumed rather than copied again. """
+
+__author__ = 'David Woods <dwoods@transana.com>'
+
+DEBUG = False
+if DEBUG:
+    print "FileSynchronizer DEBUG is ON!!"
+
+# import Python's os module
+import os
+# import Python's Queue module
+import Queue
+# import Python's stat module
+import stat
+# import Python's sys module
+import sys
+# import Python's threading module
+import threading
+
+# import Transana's Local File Transfer, which has the local file copy engine
+import LocalFileTransfer
+
+# The number of bytes copied at a time
+CHUNK_SIZE = 1048576
+# The number of files transferred at the same time
+SYNC_WORKERS = 4
+# File systems such as FAT only store modification times to the nearest 2 seconds
+MTIME_TOLERANCE = 2
+
+
+def IsHidden(name):
+    """ Hidden system files and directories (starting with a dot) are not synchronized """
+    return name[0] in ['.', '/']
+
+def JoinRelativePath(relPath, name):
+    """ Add a file or directory name to a manifest's relative path.  Manifest paths always use "/". """
+    if relPath == '':
+        return name
+    return relPath + '/' + name
+
+def LocalPath(rootPath, relPath):
+    """ Convert a manifest's relative path to a full local path """
+    if relPath == '':
+        return rootPath
+    return os.path.join(rootPath, *relPath.split('/'))
+
+def RemotePath(rootPath, relPath):
+    """ Convert a manifest's relative path to a full path on the sFTP server """
+    if relPath == '':
+        return rootPath
+    if rootPath[-1] == '/':
+        return rootPath + relPath
+    return rootPath + '/' + relPath
+
+def BuildLocalManifest(rootPath, useHash=False):
+    """ Build a manifest of the directories and files below rootPath on the local file system.
+        Returns (dirs, files), where dirs is a list of relative directory paths, parents before children,
+        and files is a dictionary of relative file path : (size, modification time, MD5 hash or None).
+        Hidden files and directories are skipped, as they are by BuildSFTPManifest(). """
+    dirs = []
+    files = {}
+    for (path, dirNames, fileNames) in os.walk(rootPath):
+        # Determine this directory's path relative to the root
+        relPath = path[len(rootPath):].strip(os.sep).replace(os.sep, '/')
+        # Skip hidden directories, and don't look inside them
+        dirNames[:] = [dirName for dirName in dirNames if not IsHidden(dirName)]
+        for dirName in dirNames:
+            dirs.append(JoinRelativePath(relPath, dirName))
+        for fileName in fileNames:
+            # Skip hidden system files
+            if IsHidden(fileName):
+                continue
+            fullPath = os.path.join(path, fileName)
+            try:
+                fileStat = os.stat(fullPath)
+            # Files that disappear or can't be read are left out of the manifest
+            except OSError:
+                continue
+            if useHash:
+                hashValue = LocalFileTransfer.FileChecksum(fullPath)
+            else:
+                hashValue = None
+            files[JoinRelativePath(relPath, fileName)] = (fileStat.st_size, int(fileStat.st_mtime), hashValue)
+    return (dirs, files)
+
+def BuildSFTPManifest(sftpClient, rootPath):
+    """ Build a manifest of the directories and files below rootPath on an sFTP server.  Each directory
+        is listed once, with file sizes and times included in the listing.  Hidden files (starting with
+        a dot) are skipped.  Returns (dirs, files) in the same form as BuildLocalManifest(), without hashes. """
+    dirs = []
+    files = {}
+    # Directories still to be listed, as relative paths
+    pending = ['']
+    while len(pending) > 0:
+        relPath = pending.pop(0)
+        for attr in sftpClient.listdir_attr(RemotePath(rootPath, relPath)):
+            name = attr.filename
+            # Skip hidden system files
+            if IsHidden(name):
+                continue
+            childPath = JoinRelativePath(relPath, name)
+            if stat.S_ISDIR(attr.st_mode):
+                dirs.append(childPath)
+                pending.append(childPath)
+            elif stat.S_ISREG(attr.st_mode):
+                files[childPath] = (attr.st_size, int(attr.st_mtime), None)
+    return (dirs, files)
+
+def ComputeDelta(sourceManifest, destManifest):
+    """ Compare two manifests.  Returns (dirsToCreate, filesToCopy), where dirsToCreate lists the relative
+        paths of directories missing from the destination, parents first, and filesToCopy lists
+        (relative path, size, resume offset) for each file that is missing from the destination or differs
+        from the source.  A destination file that is smaller than the source but newer than it was
+        left by an interrupted copy, so it is resumed from its current size. """
+    (sourceDirs, sourceFiles) = sourceManifest
+    (destDirs, destFiles) = destManifest
+    # Find the directories that need to be created
+    destDirSet = set(destDirs)
+    dirsToCreate = [relPath for relPath in sourceDirs if not relPath in destDirSet]
+    filesToCopy = []
+    for relPath in sorted(sourceFiles.keys()):
+        (size, mtime, hashValue) = sourceFiles[relPath]
+        # If the file doesn't exist at the destination, copy all of it
+        if not destFiles.has_key(relPath):
+            filesToCopy.append((relPath, size, 0))
+            continue
+        (destSize, destMtime, destHash) = destFiles[relPath]
+        # If we have hashes for both files, they tell us whether the contents match
+        if (hashValue != None) and (destHash != None) and (hashValue == destHash):
+            continue
+        # The destination was written after the source was last changed
+        destIsNewer = (destMtime + MTIME_TOLERANCE >= mtime)
+        # A newer destination file of the same size is up to date, unless the hashes say otherwise
+        if (destSize == size) and destIsNewer and ((hashValue == None) or (destHash == None)):
+            continue
+        # A newer destination file that is smaller than the source is a partial copy, which we can resume
+        if (destSize < size) and destIsNewer:
+            filesToCopy.append((relPath, size, destSize))
+        # Otherwise, the file has changed, and we copy all of it
+        else:
+            filesToCopy.append((relPath, size, 0))
+    return (dirsToCreate, filesToCopy)
+
+def _CopyStream(inFile, outFile, pool):
+    """ Copy from one open file to another in chunks, reporting progress to the pool.  Returns False if the pool
+        was cancelled before the copy finished. """
+    while not pool.cancelled:
+        data = inFile.read(CHUNK_SIZE)
+        if not data:
+            return True
+        outFile.write(data)
+        pool.AddBytes(len(data))
+    return False
+
+def CopyLocalFile(connection, source, dest, offset, pool):
+    """ Copy a file on the local file system, starting at offset.  connection is not used. """
+    return LocalFileTransfer.CopyFile(source, dest, offset, pool.AddBytes, lambda: pool.cancelled)
+
+def UploadSFTPFile(sftpClient, source, dest, offset, pool):
+    """ Copy a local file to the sFTP server, starting at offset """
+    inFile = open(source, 'rb')
+    try:
+        # If we're resuming, add to the end of the partial file
+        if offset > 0:
+            outFile = sftpClient.open(dest, 'r+')
+            outFile.truncate(offset)
+            outFile.seek(offset)
+            inFile.seek(offset)
+        else:
+            outFile = sftpClient.open(dest, 'w')
+        try:
+            # Don't wait for the server to acknowledge each write
+            outFile.set_pipelined(True)
+            return _CopyStream(inFile, outFile, pool)
+        finally:
+            outFile.close()
+    finally:
+        inFile.close()
+
+def DownloadSFTPFile(sftpClient, source, dest, offset, pool):
+    """ Copy a file from the sFTP server to the local file system, starting at offset """
+    inFile = sftpClient.open(source, 'r')
+    try:
+        if offset > 0:
+            inFile.seek(offset)
+            outFile = open(dest, 'r+b')
+            outFile.truncate(offset)
+            outFile.seek(offset)
+        else:
+            outFile = open(dest, 'wb')
+        try:
+            # Request the file's data ahead of when we read it
+            inFile.prefetch()
+            return _CopyStream(inFile, outFile, pool)
+        finally:
+            outFile.close()
+    finally:
+        inFile.close()
+
+
+class SyncWorkerPool(object):
+    """ A bounded pool of worker threads that transfers files.  copyFunc(connection, source, dest, offset, pool)
+        does the transfer.  If connectFunc is given, each worker calls it to get its own connection (an sFTP
+        channel, for example), which is passed to copyFunc and closed when the worker is done. """
+
+    def __init__(self, copyFunc, connectFunc=None, workers=SYNC_WORKERS):
+        """ Initialize the Worker Pool """
+        self.copyFunc = copyFunc
+        self.connectFunc = connectFunc
+        self.workers = workers
+        # The jobs waiting to be run
+        self.queue = Queue.Queue()
+        # A lock that protects the progress information
+        self.lock = threading.Lock()
+        self.threads = []
+        self.cancelled = False
+        self.bytesTransferred = 0
+        self.filesCopied = 0
+        # The file most recently started, for progress reporting
+        self.currentFile = ''
+        # A list of (source file, error message) for the transfers that failed
+        self.errors = []
+
+    def Start(self, jobs):
+        """ Start transferring.  jobs is a list of (source, dest, offset). """
+        for job in jobs:
+            self.queue.put(job)
+        for loop in range(min(self.workers, len(jobs))):
+            thread = threading.Thread(target=self._Worker)
+            # Don't let a stalled transfer keep Transana from closing
+            thread.setDaemon(True)
+            thread.start()
+            self.threads.append(thread)
+
+    def IsRunning(self):
+        """ Returns True while any worker is still running """
+        for thread in self.threads:
+            if thread.isAlive():
+                return True
+        return False
+
+    def Cancel(self):
+        """ Stop the transfers.  Files being transferred are left partially copied, to be resumed later. """
+        self.cancelled = True
+
+    def AddBytes(self, count):
+        """ Record that count bytes have been transferred """
+        self.lock.acquire()
+        self.bytesTransferred += count
+        self.lock.release()
+
+    def _Worker(self):
+        """ Run transfers from the queue until it is empty or the pool is cancelled """
+        connection = None
+        try:
+            if self.connectFunc != None:
+                connection = self.connectFunc()
+            while not self.cancelled:
+                try:
+                    (source, dest, offset) = self.queue.get_nowait()
+                except Queue.Empty:
+                    break
+                self.lock.acquire()
+                self.currentFile = source
+                self.lock.release()
+                try:
+                    if self.copyFunc(connection, source, dest, offset, self):
+                        self.lock.acquire()
+                        self.filesCopied += 1
+                        self.lock.release()
+                except (IOError, OSError), e:
+                    self.lock.acquire()
+                    self.errors.append((source, '%s' % e))
+                    self.lock.release()
+        except:
+            # If the worker can't connect, report it rather than losing the error in the thread
+            self.lock.acquire()
+            self.errors.append(('', '%s' % sys.exc_info()[1]))
+            self.lock.release()
+        if connection != None:
+            connection.close()
@@ -0,0 +1,374 @@
+# Copyright (C) 2002 - 2017 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+""" This module implements a cache of reduced-size copies of image files, kept in the 'imagecache' folder
+    of the user's Transana profile folder.  Reports and transcripts that show a large image at a smaller
+    size ask for the image at the size they need.  The first time, the full image is loaded and rescaled
+    with high quality, and the rescaled copy is saved.  After that, only the smaller copy is loaded.
+    Copies can also be made ahead of time by background threads, using Prefetch().
+
+    Each copy is named for the image file's path, modification time, and file size, followed by the full
+    image size and the copy's size.  A changed image file never matches an old copy, and old copies are
+    removed when a copy of the changed file is saved.  The cache is limited to MAX_CACHE_SIZE bytes.  When a
+    new copy takes it over the limit, the copies that were used least recently are removed. """
+
+__author__ = 'David Woods <dwoods@transana.com>'
+
+DEBUG = False
+if DEBUG:
+    print "ImageCache DEBUG is ON!!"
+
+# import Python's hashlib module
+import hashlib
+# import Python's multiprocessing module, to determine the number of processors
+import multiprocessing
+# import Python's os module
+import os
+# import Python's Queue module, to distribute copies among worker threads
+import Queue
+# import Python's sys module
+import sys
+# import Python's threading module
+import threading
+# import Python's time module
+import time
+
+# import wxPython
+import wx
+
+# import Transana's Globals
+import TransanaGlobal
+
+# Copies are made in the background by at most this many worker threads
+MAX_THREADS = 2
+# The largest total size, in bytes, of the copies in the cache
+MAX_CACHE_SIZE = 200 * 1024 * 1024
+
+# A lock for the module's shared data, which is used by the worker threads
+_lock = threading.Lock()
+# The cache file names, indexed by the path key of the image file they were made from.  Loaded when first needed.
+_index = None
+# The [last use time, file size] of each cache file, indexed by name.  Loaded with _index.
+_files = None
+# The copy requests waiting for a worker thread
+_requests = Queue.Queue()
+# The state of each Prefetch() request.  None means the request is waiting, and a threading.Event means a worker
+# thread is making the copy.  The Event is set when it's done.
+_pending = {}
+# The worker threads
+_threads = []
+
+
+def GetCacheDir():
+    """ Return the image cache folder, creating it if needed """
+    cacheDir = os.path.join(TransanaGlobal.configData.GetDefaultProfilePath(), 'imagecache')
+    if not os.path.exists(cacheDir):
+        try:
+            os.makedirs(cacheDir)
+        # Another thread may have created it
+        except OSError:
+            pass
+    return cacheDir
+
+def GetImage(filename, maxWidth=0, maxHeight=0, scale=0.0):
+    """ Return a wx.Image of the image file at the size needed to show it in a box maxWidth by maxHeight pixels,
+        or at scale times its full size, and the (width, height) of the full image.  A maxWidth, maxHeight, or scale
+        of 0 is not a limit, and the image is never enlarged.  The caller owns the image, which will not be Ok if
+        the image file can't be loaded. """
+    # Each request is identified by its parameters
+    request = _Request(filename, maxWidth, maxHeight, scale)
+    # Initialize the Event for a copy a worker thread is making
+    event = None
+    _lock.acquire()
+    try:
+        # If the copy has been requested from the worker threads ...
+        if _pending.has_key(request):
+            # ... and no worker thread has started it, we'll make it here instead
+            if _pending[request] == None:
+                del(_pending[request])
+            # If a worker thread is making the copy, we'll wait for it
+            else:
+                event = _pending[request]
+    finally:
+        _lock.release()
+    if event != None:
+        event.wait()
+    # If the copy is cached, load it
+    result = _LoadCopy(request)
+    # If it's not, make it
+    if result == None:
+        result = _MakeCopy(request)
+    return result
+
+def Prefetch(filename, maxWidth=0, maxHeight=0, scale=0.0):
+    """ Have a worker thread make the copy of the image file that GetImage() with the same parameters will need,
+        if it is not already cached """
+    global _threads
+    request = _Request(filename, maxWidth, maxHeight, scale)
+    _lock.acquire()
+    try:
+        # If the copy has already been requested, there's nothing to do
+        if _pending.has_key(request):
+            return
+        _pending[request] = None
+        _requests.put(request)
+        # Start another worker thread, if we can use one
+        _threads = [thread for thread in _threads if thread.isAlive()]
+        if len(_threads) < min(multiprocessing.cpu_count(), MAX_THREADS):
+            thread = ImageCacheThread()
+            thread.start()
+            _threads.append(thread)
+    finally:
+        _lock.release()
+
+
+class ImageCacheThread(threading.Thread):
+    """ Image Cache worker thread.  Makes copies for Prefetch() requests until there are none left. """
+    def __init__(self):
+        # Initialize the Thread object
+        threading.Thread.__init__(self)
+        # Don't keep Transana from closing
+        self.setDaemon(True)
+
+    def run(self):
+        while True:
+            # Get the next request, if there is one
+            try:
+                request = _requests.get_nowait()
+            except Queue.Empty:
+                break
+            _lock.acquire()
+            try:
+                # If GetImage() has taken the request, or another worker thread is already making the copy
+                # (because the request was made again after GetImage() took it), skip it
+                if (not _pending.has_key(request)) or (_pending[request] != None):
+                    continue
+                # Signal that we're making the copy
+                event = threading.Event()
+                _pending[request] = event
+            finally:
+                _lock.release()
+            try:
+                # Missing image files are reported by GetImage(), not here
+                if os.path.exists(request[0]):
+                    # If the copy isn't cached ...
+                    result = _LoadCopy(request)
+                    if result == None:
+                        # ... make it
+                        result = _MakeCopy(request)
+                    # We don't need the image here
+                    result[0].Destroy()
+            except:
+                if DEBUG:
+                    print "ImageCacheThread.run():", request, sys.exc_info()[0], sys.exc_info()[1]
+            finally:
+                # Signal that the request is done.  The Event is always set, so GetImage() never waits forever.
+                _lock.acquire()
+                try:
+                    _pending.pop(request, None)
+                finally:
+                    _lock.release()
+                    event.set()
+
+
+def _Request(filename, maxWidth, maxHeight, scale):
+    """ Return the (path, maxWidth, maxHeight, scale) tuple that identifies a request """
+    return (os.path.abspath(filename), int(maxWidth), int(maxHeight), float(scale))
+
+def _SourceKeys(filename):
+    """ Return the path key for the image file and the key for the current version of the file, or
+        (None, None) if the file can't be found """
+    try:
+        fileStat = os.stat(filename)
+    except OSError:
+        return (None, None)
+    # Hash the path, so the cache file names don't depend on the characters allowed in file names
+    if isinstance(filename, unicode):
+        filename = filename.encode('utf8')
+    pathKey = hashlib.md5(filename).hexdigest()
+    return (pathKey, '%s_%d_%d' % (pathKey, int(fileStat.st_mtime), fileStat.st_size))
+
+def _ParseName(name):
+    """ Return the source key, full image size, and copy size from a cache file name, or None if the name
+        is not a cache file name """
+    try:
+        (pathKey, mtime, fileSize, fullSize, size) = name[:-4].split('_')
+        return ('%s_%s_%s' % (pathKey, mtime, fileSize),
+                tuple(map(int, fullSize.split('x'))), tuple(map(int, size.split('x'))))
+    except ValueError:
+        return None
+
+def _GetIndex():
+    """ Return the index of cache file names, loading it from the cache folder if needed.  The caller must
+        hold the lock. """
+    global _index, _files
+    if _index == None:
+        _index = {}
+        _files = {}
+        cacheDir = GetCacheDir()
+        for name in os.listdir(cacheDir):
+            if name.endswith('.png') and (_ParseName(name) != None):
+                try:
+                    # Copies are touched when they are used, so the modification time is the last use time
+                    fileStat = os.stat(os.path.join(cacheDir, name))
+                except OSError:
+                    continue
+                _index.setdefault(name.split('_')[0], []).append(name)
+                _files[name] = [fileStat.st_mtime, fileStat.st_size]
+    return _index
+
+def _GetCopies(pathKey, sourceKey):
+    """ Return the full image size, if it is known, and a dictionary of the cache file names of the copies of
+        the current version of an image file, indexed by size """
+    _lock.acquire()
+    try:
+        names = list(_GetIndex().get(pathKey, []))
+    finally:
+        _lock.release()
+    fullSize = None
+    copies = {}
+    for name in names:
+        (nameSourceKey, nameFullSize, size) = _ParseName(name)
+        if nameSourceKey == sourceKey:
+            fullSize = nameFullSize
+            copies[size] = name
+    return (fullSize, copies)
+
+def _GetSize(fullSize, maxWidth, maxHeight, scale):
+    """ Return the size an image of fullSize is shown at, or None if it is shown at full size """
+    (width, height) = fullSize
+    if (width <= 0) or (height <= 0):
+        return None
+    factor = 1.0
+    if scale > 0.0:
+        factor = scale
+    if maxWidth > 0:
+        factor = min(factor, float(maxWidth) / float(width))
+    if maxHeight > 0:
+        factor = min(factor, float(maxHeight) / float(height))
+    # Images are never enlarged
+    if factor >= 1.0:
+        return None
+    return (max(1, int(round(width * factor))), max(1, int(round(height * factor))))
+
+def _LoadCopy(request):
+    """ Return (image, full size) for a request from the cache, or None if the copy is not cached """
+    (filename, maxWidth, maxHeight, scale) = request
+    (pathKey, sourceKey) = _SourceKeys(filename)
+    if sourceKey == None:
+        return None
+    (fullSize, copies) = _GetCopies(pathKey, sourceKey)
+    # If we don't know the image's full size, we don't know what size copy to look for
+    if fullSize == None:
+        return None
+    size = _GetSize(fullSize, maxWidth, maxHeight, scale)
+    # If the full image is needed, load it
+    if size == None:
+        image = wx.Image(filename)
+    # If we have a copy of the right size, load it
+    elif copies.has_key(size):
+        copyName = os.path.join(GetCacheDir(), copies[size])
+        image = wx.Image(copyName, wx.BITMAP_TYPE_PNG)
+        # Note the use, so the copy is kept over copies that haven't been used as recently
+        _lock.acquire()
+        try:
+            if _files.has_key(copies[size]):
+                _files[copies[size]][0] = time.time()
+        finally:
+            _lock.release()
+        try:
+            os.utime(copyName, None)
+        except OSError:
+            pass
+    else:
+        return None
+    # If the cached copy can't be loaded, it will have to be made again
+    if not image.IsOk():
+        image.Destroy()
+        return None
+    return (image, fullSize)
+
+def _MakeCopy(request):
+    """ Load the full image for a request, rescale it, and save the copy in the cache.  Returns (image, full size). """
+    (filename, maxWidth, maxHeight, scale) = request
+    # Note the file's keys before loading it, so a file that changes while it's being loaded isn't mis-labelled
+    (pathKey, sourceKey) = _SourceKeys(filename)
+    image = wx.Image(filename)
+    if not image.IsOk():
+        return (image, (0, 0))
+    fullSize = (image.GetWidth(), image.GetHeight())
+    size = _GetSize(fullSize, maxWidth, maxHeight, scale)
+    # If the image is shown at a smaller size ...
+    if size != None:
+        # ... rescale it.  Use slower high quality rescale.
+        image.Rescale(size[0], size[1], quality=wx.IMAGE_QUALITY_HIGH)
+        # If we know the file's keys, save the copy
+        if sourceKey != None:
+            _SaveCopy(image, pathKey, sourceKey, fullSize, size)
+    return (image, fullSize)
+
+def _SaveCopy(image, pathKey, sourceKey, fullSize, size):
+    """ Save a copy of an image in the cache, and remove copies of earlier versions of the image file and, if the
+        cache is over MAX_CACHE_SIZE, the copies used least recently """
+    name = '%s_%dx%d_%dx%d.png' % ((sourceKey,) + fullSize + size)
+    cacheDir = GetCacheDir()
+    # Write to a temporary file first, so another thread or another copy of Transana never reads a partial copy
+    tempName = os.path.join(cacheDir, '%s.%d.tmp' % (name, threading.currentThread().ident))
+    try:
+        if not image.SaveFile(tempName, wx.BITMAP_TYPE_PNG):
+            return
+        fileSize = os.path.getsize(tempName)
+        try:
+            os.rename(tempName, os.path.join(cacheDir, name))
+        # If the copy already exists (on Windows), another thread made it
+        except OSError:
+            os.remove(tempName)
+    except (IOError, OSError):
+        if DEBUG:
+            print "ImageCache._SaveCopy(): unable to save", name
+        return
+    _lock.acquire()
+    try:
+        # Copies of other versions of the image file will never be used again
+        index = _GetIndex()
+        oldNames = [oldName for oldName in index.get(pathKey, []) if not oldName.startswith(sourceKey + '_')]
+        names = [oldName for oldName in index.get(pathKey, []) if oldName.startswith(sourceKey + '_')]
+        if name not in names:
+            names.append(name)
+        index[pathKey] = names
+        for oldName in oldNames:
+            _files.pop(oldName, None)
+        _files[name] = [time.time(), fileSize]
+        # If the cache is too big, remove the copies used least recently, but never the new copy
+        total = sum([copySize for (lastUse, copySize) in _files.values()])
+        if total > MAX_CACHE_SIZE:
+            for (lastUse, oldName) in sorted([(_files[copyName][0], copyName) for copyName in _files.keys()]):
+                if total <= MAX_CACHE_SIZE:
+                    break
+                if oldName != name:
+                    total -= _files.pop(oldName)[1]
+                    oldPathKey = oldName.split('_')[0]
+                    index[oldPathKey].remove(oldName)
+                    if len(index[oldPathKey]) == 0:
+                        del(index[oldPathKey])
+                    oldNames.append(oldName)
+    finally:
+        _lock.release()
+    for oldName in oldNames:
+        try:
+            os.remove(os.path.join(cacheDir, oldName))
+        except OSError:
+            pass
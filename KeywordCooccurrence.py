@@ -0,0 +1,400 @@
+# Copyright (C) 2002 - 2017 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+""" This module implements the Keyword Co-occurrence analysis for a Library.  KeywordCooccurrence loads the
+    Library's coded Clips, Snapshots, and Quotes into numpy arrays and calculates how often each Keyword is
+    applied, how much media time and document text each Keyword covers, and how much each pair of Keywords
+    overlaps.  The results are displayed by KeywordCooccurrenceReport and written to a tab-delimited file by
+    KeywordCooccurrenceExport(). """
+
+__author__ = 'David Woods <dwoods@transana.com>'
+
+DEBUG = False
+if DEBUG:
+    print "KeywordCooccurrence DEBUG is ON!!"
+
+# import Python's codecs module to make writing UTF-8 text files easier
+import codecs
+# import Python's os module
+import os
+# import numpy
+import numpy
+# import wxPython
+import wx
+
+# import Transana's Database interface
+import DBInterface
+# import Transana's Dialog Boxes
+import Dialogs
+# Import Transana's Text Report infrastructure
+import TextReport
+# Import Transana's Global variables
+import TransanaGlobal
+# import Transana's Miscellaneous functions
+import Misc
+
+# The largest number of overlapping interval pairs processed at one time.  This limits the memory used
+# when Keywords overlap a great deal.
+PAIR_BATCH_SIZE = 1000000
+# The number of Keyword pairs listed in the report
+REPORT_PAIRS = 100
+
+
+def MergeIntervals(sources, keywords, starts, stops):
+    """ Merge the overlapping or touching intervals that share a source (Episode or Document) and a Keyword,
+        so that no part of a source is counted twice for a Keyword.  All parameters are numpy arrays of the same
+        length.  Returns (sources, keywords, starts, stops) for the merged intervals, sorted by source and start. """
+    if len(starts) == 0:
+        return (sources, keywords, starts, stops)
+    # Sort by source, then Keyword, then start
+    order = numpy.lexsort((starts, keywords, sources))
+    sources = sources[order]
+    keywords = keywords[order]
+    starts = starts[order]
+    stops = stops[order]
+    # Find where each source / Keyword group begins
+    newGroup = numpy.ones(len(starts), dtype=bool)
+    newGroup[1:] = (sources[1:] != sources[:-1]) | (keywords[1:] != keywords[:-1])
+    # Calculate the running maximum stop within each group.  Adding a group offset larger than any time span
+    # keeps one group's values from carrying into the next.
+    span = int(stops.max() - starts.min()) + 1
+    offsets = (numpy.cumsum(newGroup) - 1).astype(numpy.int64) * span
+    runningStops = numpy.maximum.accumulate(stops - starts.min() + offsets) - offsets + starts.min()
+    # An interval starts a new merged interval if it starts a group or starts after everything before it has stopped
+    newRun = newGroup.copy()
+    newRun[1:] |= starts[1:] > runningStops[:-1]
+    runStarts = numpy.flatnonzero(newRun)
+    mergedStops = numpy.maximum.reduceat(stops, runStarts)
+    # Put the merged intervals in source, start order
+    order = numpy.lexsort((starts[runStarts], sources[runStarts]))
+    return (sources[runStarts][order], keywords[runStarts][order], starts[runStarts][order], mergedStops[order])
+
+def OverlapPairs(sources, keywords, starts, stops, keywordCount):
+    """ Find every pair of merged intervals (from MergeIntervals()) that overlap within a source.  Returns
+        (pair codes, pair counts, overlap lengths), where the pair code for Keywords a < b is a * keywordCount + b,
+        pair counts is the number of overlapping interval pairs, and overlap lengths is their total overlap. """
+    if len(starts) == 0:
+        return (numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0))
+    # Combine source and position into a single sortable key.  Intervals are sorted by this key.
+    base = starts.min()
+    span = int(stops.max() - base) + 1
+    startKeys = sources.astype(numpy.int64) * span + (starts - base)
+    stopKeys = sources.astype(numpy.int64) * span + (stops - base)
+    # Interval i overlaps the intervals that follow it, up to the first one that starts at or after it stops
+    lastOverlap = numpy.searchsorted(startKeys, stopKeys, side='left')
+    counts = numpy.maximum(lastOverlap - numpy.arange(1, len(starts) + 1), 0)
+    codes = []
+    pairCounts = []
+    overlaps = []
+    # Process the intervals in batches that produce a limited number of pairs
+    cumulative = numpy.cumsum(counts)
+    batchStart = 0
+    while batchStart < len(starts):
+        # Find how many intervals fit in the batch, always taking at least one
+        previous = cumulative[batchStart - 1] if batchStart > 0 else 0
+        batchEnd = max(int(numpy.searchsorted(cumulative, previous + PAIR_BATCH_SIZE, side='right')), batchStart + 1)
+        batchCounts = counts[batchStart:batchEnd]
+        total = int(batchCounts.sum())
+        if total > 0:
+            # Build the (i, j) index pairs for the batch without a Python loop
+            first = numpy.repeat(numpy.arange(batchStart, batchEnd), batchCounts)
+            runOffsets = numpy.repeat(numpy.cumsum(batchCounts) - batchCounts, batchCounts)
+            second = first + 1 + (numpy.arange(total) - runOffsets)
+            # Intervals are in start order, so the second interval starts inside the first one
+            overlap = numpy.minimum(stops[first], stops[second]) - starts[second]
+            keywordA = numpy.minimum(keywords[first], keywords[second]).astype(numpy.int64)
+            keywordB = numpy.maximum(keywords[first], keywords[second]).astype(numpy.int64)
+            # Total the batch by Keyword pair
+            (batchCodes, inverse) = numpy.unique(keywordA * keywordCount + keywordB, return_inverse=True)
+            codes.append(batchCodes)
+            pairCounts.append(numpy.bincount(inverse))
+            overlaps.append(numpy.bincount(inverse, weights=overlap))
+        batchStart = batchEnd
+    if len(codes) == 0:
+        return (numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0))
+    # Combine the batch totals
+    (allCodes, inverse) = numpy.unique(numpy.concatenate(codes), return_inverse=True)
+    return (allCodes,
+            numpy.bincount(inverse, weights=numpy.concatenate(pairCounts)).astype(numpy.int64),
+            numpy.bincount(inverse, weights=numpy.concatenate(overlaps)))
+
+
+class KeywordCooccurrence(object):
+    """ Keyword frequency, coverage, and co-occurrence data for a Library.  Media positions (Clips and Snapshots)
+        are in milliseconds and document positions (Quotes) are in characters, so they are totalled separately. """
+
+    def __init__(self, libraryNum):
+        """ Load and calculate the Keyword data for the Library """
+        self.libraryNum = libraryNum
+        # A sorted list of (Keyword Group, Keyword).  Keywords are referred to by their position in this list.
+        self.keywords = []
+        # The number of Clips, Snapshots, and Quotes each Keyword is applied to
+        self.frequency = numpy.zeros(0, dtype=numpy.int64)
+        # The media time (in ms) and the document text (in characters) each Keyword covers, with overlaps removed
+        self.mediaDuration = numpy.zeros(0)
+        self.textLength = numpy.zeros(0)
+        # The Keyword pairs that overlap, as parallel arrays.  pairA < pairB are positions in self.keywords.
+        # pairCount is the number of overlapping passages, and pairMedia and pairText are the overlap sizes.
+        self.pairA = numpy.zeros(0, dtype=numpy.int64)
+        self.pairB = numpy.zeros(0, dtype=numpy.int64)
+        self.pairCount = numpy.zeros(0, dtype=numpy.int64)
+        self.pairMedia = numpy.zeros(0)
+        self.pairText = numpy.zeros(0)
+        self.Calculate(self.LoadSegments())
+
+    def LoadSegments(self):
+        """ Get the Library's coded Clips, Snapshots, and Quotes from the database.  Returns a dictionary of
+            'media' and 'text' segments, each as numpy arrays of (source, Keyword, start, stop), with one
+            entry for each Keyword applied to each item. """
+        # Clips and Whole Snapshots have Episode positions.  Quotes have Document positions.
+        queries = (('media', """SELECT cl.EpisodeNum, cl.ClipStart, cl.ClipStop, ck.KeywordGroup, ck.Keyword
+                                  FROM Episodes2 e, Clips2 cl, ClipKeywords2 ck
+                                  WHERE e.SeriesNum = %s AND
+                                        cl.EpisodeNum = e.EpisodeNum AND
+                                        ck.ClipNum = cl.ClipNum"""),
+                   ('media', """SELECT sn.EpisodeNum, sn.SnapshotTimeCode, sn.SnapshotTimeCode + sn.SnapshotDuration,
+                                       ck.KeywordGroup, ck.Keyword
+                                  FROM Episodes2 e, Snapshots2 sn, ClipKeywords2 ck
+                                  WHERE e.SeriesNum = %s AND
+                                        sn.EpisodeNum = e.EpisodeNum AND
+                                        ck.SnapshotNum = sn.SnapshotNum"""),
+                   ('text', """SELECT qp.DocumentNum, qp.StartChar, qp.EndChar, ck.KeywordGroup, ck.Keyword
+                                 FROM Documents2 d, QuotePositions2 qp, ClipKeywords2 ck
+                                 WHERE d.LibraryNum = %s AND
+                                       qp.DocumentNum = d.DocumentNum AND
+                                       ck.QuoteNum = qp.QuoteNum"""))
+        # Assign each Keyword a number as we find it
+        keywordNums = {}
+        # The decoded (Keyword Group, Keyword) for each Keyword
+        decoded = {}
+        rows = {'media' : ([], [], [], []), 'text' : ([], [], [], [])}
+        dbCursor = DBInterface.get_db().cursor()
+        for (segmentType, query) in queries:
+            dbCursor.execute(DBInterface.FixQuery(query), (self.libraryNum, ))
+            (sources, keywords, starts, stops) = rows[segmentType]
+            for (source, start, stop, kwg, kw) in dbCursor.fetchall():
+                if not keywordNums.has_key((kwg, kw)):
+                    keywordNums[(kwg, kw)] = len(keywordNums)
+                    decoded[(kwg, kw)] = (DBInterface.ProcessDBDataForUTF8Encoding(kwg), DBInterface.ProcessDBDataForUTF8Encoding(kw))
+                sources.append(source)
+                keywords.append(keywordNums[(kwg, kw)])
+                starts.append(start)
+                stops.append(stop)
+        dbCursor.close()
+        # Put the Keywords in alphabetical order, and renumber the segments to match
+        keywordList = keywordNums.keys()
+        keywordList.sort(key=lambda keyPair: decoded[keyPair])
+        renumber = numpy.zeros(len(keywordList), dtype=numpy.int64)
+        for (loop, keyPair) in enumerate(keywordList):
+            renumber[keywordNums[keyPair]] = loop
+        self.keywords = [decoded[keyPair] for keyPair in keywordList]
+        segments = {}
+        for segmentType in rows.keys():
+            (sources, keywords, starts, stops) = rows[segmentType]
+            segments[segmentType] = (numpy.array(sources, dtype=numpy.int64),
+                                     renumber[numpy.array(keywords, dtype=numpy.int64)],
+                                     numpy.array(starts, dtype=numpy.int64),
+                                     numpy.array(stops, dtype=numpy.int64))
+        return segments
+
+    def Calculate(self, segments):
+        """ Calculate Keyword frequency, coverage, and co-occurrence from the segments returned by LoadSegments() """
+        keywordCount = len(self.keywords)
+        self.frequency = numpy.zeros(keywordCount, dtype=numpy.int64)
+        self.mediaDuration = numpy.zeros(keywordCount)
+        self.textLength = numpy.zeros(keywordCount)
+        # If nothing has been coded, there's nothing to calculate
+        if keywordCount == 0:
+            return
+        pairResults = {}
+        for segmentType in ['media', 'text']:
+            (sources, keywords, starts, stops) = segments[segmentType]
+            # Count the items each Keyword is applied to, including items with no length
+            self.frequency += numpy.bincount(keywords, minlength=keywordCount)
+            # Items with no length can't overlap anything
+            hasLength = stops > starts
+            merged = MergeIntervals(sources[hasLength], keywords[hasLength], starts[hasLength], stops[hasLength])
+            # Total the coverage of each Keyword
+            coverage = numpy.bincount(merged[1], weights=merged[3] - merged[2], minlength=keywordCount)
+            if segmentType == 'media':
+                self.mediaDuration = coverage
+            else:
+                self.textLength = coverage
+            pairResults[segmentType] = OverlapPairs(merged[0], merged[1], merged[2], merged[3], keywordCount)
+        # Combine the media and text overlaps into a single list of Keyword pairs
+        (codes, inverse) = numpy.unique(numpy.concatenate((pairResults['media'][0], pairResults['text'][0])), return_inverse=True)
+        # If no Keywords overlap, the pair arrays stay empty
+        if len(codes) == 0:
+            return
+        mediaCount = len(pairResults['media'][0])
+        self.pairA = codes // keywordCount
+        self.pairB = codes % keywordCount
+        self.pairCount = numpy.bincount(inverse, weights=numpy.concatenate((pairResults['media'][1], pairResults['text'][1])),
+                                        minlength=len(codes)).astype(numpy.int64)
+        self.pairMedia = numpy.bincount(inverse[:mediaCount], weights=pairResults['media'][2], minlength=len(codes))
+        self.pairText = numpy.bincount(inverse[mediaCount:], weights=pairResults['text'][2], minlength=len(codes))
+
+    def GetMatrix(self, values='count'):
+        """ Return the symmetric Keyword by Keyword co-occurrence matrix.  values is 'count', 'media', or 'text'.
+            The diagonal holds each Keyword's frequency or coverage.  (For thousands of Keywords, this matrix is
+            large.  The pair arrays hold the same data.) """
+        keywordCount = len(self.keywords)
+        if values == 'media':
+            (pairValues, diagonal) = (self.pairMedia, self.mediaDuration)
+        elif values == 'text':
+            (pairValues, diagonal) = (self.pairText, self.textLength)
+        else:
+            (pairValues, diagonal) = (self.pairCount, self.frequency)
+        matrix = numpy.zeros((keywordCount, keywordCount), dtype=numpy.asarray(pairValues).dtype)
+        matrix[self.pairA, self.pairB] = pairValues
+        matrix[self.pairB, self.pairA] = pairValues
+        matrix[numpy.arange(keywordCount), numpy.arange(keywordCount)] = diagonal
+        return matrix
+
+    def GetTopPairs(self, count=None):
+        """ Return the positions in the pair arrays, ordered by number of overlapping passages and then by overlap """
+        order = numpy.lexsort((-self.pairText, -self.pairMedia, -self.pairCount))
+        if count != None:
+            order = order[:count]
+        return order
+
+    def Export(self, fileName):
+        """ Write the Keyword data to a tab-delimited UTF-8 file, with a Keyword table followed by a Keyword pair table """
+        f = codecs.open(fileName, 'w', 'utf8')
+        try:
+            f.write(unicode(_('Keyword Group\tKeyword\tFrequency\tMedia Duration (sec)\tText Length (chars)'), 'utf8') + '\n')
+            for (loop, (kwg, kw)) in enumerate(self.keywords):
+                f.write(u'%s\t%s\t%d\t%0.3f\t%d\n' % (kwg, kw, self.frequency[loop], self.mediaDuration[loop] / 1000.0, self.textLength[loop]))
+            f.write('\n')
+            f.write(unicode(_('Keyword Group\tKeyword\tKeyword Group\tKeyword\tOverlaps\tMedia Overlap (sec)\tText Overlap (chars)'), 'utf8') + '\n')
+            for loop in self.GetTopPairs():
+                (kwg1, kw1) = self.keywords[self.pairA[loop]]
+                (kwg2, kw2) = self.keywords[self.pairB[loop]]
+                f.write(u'%s\t%s\t%s\t%s\t%d\t%0.3f\t%d\n' % (kwg1, kw1, kwg2, kw2, self.pairCount[loop],
+                                                              self.pairMedia[loop] / 1000.0, self.pairText[loop]))
+        finally:
+            f.close()
+
+
+class KeywordCooccurrenceReport(wx.Object):
+    """ This class creates and displays the Keyword Co-occurrence Report for a Library """
+    def __init__(self, libraryNum, libraryName, controlObject=None):
+        """ Create the Keyword Co-occurrence Report """
+        self.libraryName = libraryName
+        # Remember the Control Object, if any
+        self.ControlObject = controlObject
+        # Specify the Report Title
+        self.title = unicode(_("Library Keyword Co-occurrence Report"), 'utf8')
+        # Set the cursor to Wait while we load and calculate the data
+        TransanaGlobal.menuWindow.SetCursor(wx.StockCursor(wx.CURSOR_WAIT))
+        try:
+            self.data = KeywordCooccurrence(libraryNum)
+        finally:
+            TransanaGlobal.menuWindow.SetCursor(wx.StockCursor(wx.CURSOR_ARROW))
+        self.report = TextReport.TextReport(None, title=self.title, displayMethod=self.OnDisplay,
+                                            helpContext="Library Keyword Co-occurrence Report")
+        # If a Control Object has been passed in ...
+        if self.ControlObject != None:
+            # ... register this report with the Control Object (which adds it to the Windows Menu)
+            self.ControlObject.AddReportWindow(self.report)
+            # Register the Control Object with the Report
+            self.report.ControlObject = self.ControlObject
+        # Trigger the ReportText method that causes the report to be displayed.
+        self.report.CallDisplay()
+
+    def OnDisplay(self, reportText):
+        """ This method, required by TextReport, populates the TextReport. """
+        # Set the Style for the Heading
+        reportText.SetTxtStyle(fontFace='Courier New', fontSize=16, fontBold=True, fontUnderline=True)
+        # Add the Title to the page
+        reportText.WriteText(self.title)
+        # Center the title, and add spacing after.
+        reportText.SetTxtStyle(parLeftIndent = 0, parRightIndent = 0,
+                               parAlign=wx.TEXT_ALIGNMENT_CENTER, parSpacingAfter = 0)
+        reportText.Newline()
+        # Add the Library Name as the subtitle
+        reportText.SetTxtStyle(fontSize=10, fontBold=False, fontUnderline=False, parSpacingAfter = 20)
+        prompt = unicode(_("Library: %s"), 'utf8')
+        reportText.WriteText(prompt % self.libraryName)
+        reportText.Newline()
+
+        # If there's no coding, say so
+        if len(self.data.keywords) == 0:
+            reportText.SetTxtStyle(fontSize=12, parAlign=wx.TEXT_ALIGNMENT_LEFT)
+            reportText.WriteText(unicode(_("No Keywords have been applied in this Library."), 'utf8'))
+            reportText.Newline()
+            return
+
+        # Keyword Frequency section
+        reportText.SetTxtStyle(fontSize=12, fontBold=True, parAlign=wx.TEXT_ALIGNMENT_LEFT, parSpacingBefore = 20, parSpacingAfter = 0)
+        reportText.WriteText(unicode(_("Keyword Frequency"), 'utf8'))
+        reportText.Newline()
+        # Use tab stops for the columns
+        reportText.SetTxtStyle(fontSize=10, fontBold=False, parSpacingBefore = 0, parTabs=[1000, 1300, 1600])
+        reportText.WriteText(unicode(_("Keyword\tItems\tMedia\tText"), 'utf8'))
+        reportText.Newline()
+        for (loop, (kwg, kw)) in enumerate(self.data.keywords):
+            reportText.WriteText(u'%s : %s\t%d\t%s\t%d' % (kwg, kw, self.data.frequency[loop],
+                                                          Misc.time_in_ms_to_str(int(self.data.mediaDuration[loop])),
+                                                          self.data.textLength[loop]))
+            reportText.Newline()
+
+        # Keyword Co-occurrence section
+        reportText.SetTxtStyle(fontSize=12, fontBold=True, parSpacingBefore = 20, parTabs=[])
+        prompt = unicode(_("Most Frequently Overlapping Keywords (top %d)"), 'utf8')
+        reportText.WriteText(prompt % REPORT_PAIRS)
+        reportText.Newline()
+        reportText.SetTxtStyle(fontSize=10, fontBold=False, parSpacingBefore = 0, parTabs=[1300, 1600, 1900])
+        reportText.WriteText(unicode(_("Keywords\tOverlaps\tMedia\tText"), 'utf8'))
+        reportText.Newline()
+        for loop in self.data.GetTopPairs(REPORT_PAIRS):
+            (kwg1, kw1) = self.data.keywords[self.data.pairA[loop]]
+            (kwg2, kw2) = self.data.keywords[self.data.pairB[loop]]
+            reportText.WriteText(u'%s : %s + %s : %s\t%d\t%s\t%d' % (kwg1, kw1, kwg2, kw2, self.data.pairCount[loop],
+                                                                    Misc.time_in_ms_to_str(int(self.data.pairMedia[loop])),
+                                                                    self.data.pairText[loop]))
+            reportText.Newline()
+
+
+def KeywordCooccurrenceExport(parent, libraryNum):
+    """ Ask the user for a file name and export the Library's Keyword Co-occurrence data as tab-delimited text """
+    # Create a File Dialog for saving a text file
+    dlg = wx.FileDialog(parent, wildcard=_(u'Text Files (*.txt)|*.txt'), style=wx.SAVE)
+    # Display the dialog and get the user input
+    if dlg.ShowModal() == wx.ID_OK:
+        # Get the File name.  Mac doesn't automatically append the file extension.  Do it if necessary.
+        fname = dlg.GetPath()
+        if not fname.upper().endswith('.TXT'):
+            fname += '.txt'
+        # Check to see if the file already exists ...
+        if os.path.exists(fname):
+            # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
+            prompt = unicode(_('A file named "%s" already exists.  Do you want to replace it?'), 'utf8')
+            dlg2 = Dialogs.QuestionDialog(None, prompt % fname)
+            dlg2.CentreOnScreen()
+            replace = (dlg2.LocalShowModal() == wx.ID_YES)
+            dlg2.Destroy()
+        else:
+            replace = True
+        if replace:
+            # Set the cursor to Wait while we load, calculate, and save the data
+            TransanaGlobal.menuWindow.SetCursor(wx.StockCursor(wx.CURSOR_WAIT))
+            try:
+                KeywordCooccurrence(libraryNum).Export(fname)
+            finally:
+                TransanaGlobal.menuWindow.SetCursor(wx.StockCursor(wx.CURSOR_ARROW))
+    # Destroy the File Dialog
+    dlg.Destroy()
@@ -29,6 +29,7 @@ import wx
 from TransanaExceptions import *
 import DBInterface
 import Dialogs
+import EpisodeSegmentIndex
 import Misc
 import TransanaConstants
 import TransanaGlobal
@@ -95,235 +96,13 @@ class Keyword(object):
 
     def checkEpisodesClipsSnapshotsForLocks(self):
         """ Checks Episodes, Clips, and Snapshots to see if a Keyword record is free of related locks """
-        # If we're in Unicode mode, we need to encode the parameter so that the query will work right.
-        if 'unicode' in wx.PlatformInfo:
-            originalKeywordGroup = self.originalKeywordGroup.encode(TransanaGlobal.encoding)
-            originalKeyword = self.originalKeyword.encode(TransanaGlobal.encoding)
+        # Check Documents, Episodes, Quotes, Clips, and Snapshots that contain the Keyword, with one query per table
+        locks = DBInterface.list_keyword_locks([(self.originalKeywordGroup, self.originalKeyword)], includeKeywords=False)
+        if len(locks) != 0:
+            LockName = locks[0][2]
+            return (len(locks), LockName)
         else:
-            originalKeywordGroup = self.originalKeywordGroup
-            originalKeyword = self.originalKeyword
-
-        # query the lock status for Documents that contain the Keyword 
-        query = """SELECT c.RecordLock FROM Keywords2 a, ClipKeywords2 b, Documents2 c
-                     WHERE a.KeywordGroup = %s AND
-                           a.Keyword = %s AND
-                           a.KeywordGroup = b.KeywordGroup AND
-                           a.Keyword = b.Keyword AND
-                           b.DocumentNum <> 0 AND
-                           b.DocumentNum = c.DocumentNum AND
-                           (c.RecordLock <> '' AND
-                            c.RecordLock IS NOT NULL)"""
-        values = (originalKeywordGroup, originalKeyword)
-        c = DBInterface.get_db().cursor()
-        query = DBInterface.FixQuery(query)
-        c.execute(query, values)
-        result = c.fetchall()
-        RecordCount = len(result)
-        c.close()
-
-
-        # If no Document that contain the record are locked, check the lock status of Episodes that contain the Keyword
-        if RecordCount == 0:
-            # query the lock status for Episodes that contain the Keyword 
-            query = """SELECT c.RecordLock FROM Keywords2 a, ClipKeywords2 b, Episodes2 c
-                         WHERE a.KeywordGroup = %s AND
-                               a.Keyword = %s AND
-                               a.KeywordGroup = b.KeywordGroup AND
-                               a.Keyword = b.Keyword AND
-                               b.EpisodeNum <> 0 AND
-                               b.EpisodeNum = c.EpisodeNum AND
-                               (c.RecordLock <> '' AND
-                                c.RecordLock IS NOT NULL)"""
-            values = (originalKeywordGroup, originalKeyword)
-            c = DBInterface.get_db().cursor()
-            query = DBInterface.FixQuery(query)
-            c.execute(query, values)
-            result = c.fetchall()
-            RecordCount = len(result)
-            c.close()
-
-        # If no Documents or Episodes that contain the record are locked, check the lock status of Quotes that
-        # contain the Keyword
-        if RecordCount == 0:
-            # query the lock status for Quotes that contain the Keyword 
-            query = """SELECT c.RecordLock FROM Keywords2 a, ClipKeywords2 b, Quotes2 c
-                         WHERE a.KeywordGroup = %s AND
-                               a.Keyword = %s AND
-                               a.KeywordGroup = b.KeywordGroup AND
-                               a.Keyword = b.Keyword AND
-                               b.QuoteNum <> 0 AND
-                               b.QuoteNum = c.QuoteNum AND
-                               (c.RecordLock <> '' AND
-                                c.RecordLock IS NOT NULL)"""
-            values = (originalKeywordGroup, originalKeyword)
-            c = DBInterface.get_db().cursor()
-            query = DBInterface.FixQuery(query)
-            c.execute(query, values)
-            result = c.fetchall()
-            RecordCount = len(result)
-            c.close()
-
-        # If no Documents, Episodes, or Quotes that contain the record are locked, check the lock status of
-        # Clips that contain the Keyword
-        if RecordCount == 0:
-            # query the lock status for Clips that contain the Keyword 
-            query = """SELECT c.RecordLock FROM Keywords2 a, ClipKeywords2 b, Clips2 c
-                         WHERE a.KeywordGroup = %s AND
-                               a.Keyword = %s AND
-                               a.KeywordGroup = b.KeywordGroup AND
-                               a.Keyword = b.Keyword AND
-                               b.ClipNum <> 0 AND
-                               b.ClipNum = c.ClipNum AND
-                               (c.RecordLock <> '' AND
-                                c.RecordLock IS NOT NULL)"""
-            values = (originalKeywordGroup, originalKeyword)
-            c = DBInterface.get_db().cursor()
-            query = DBInterface.FixQuery(query)
-            c.execute(query, values)
-            result = c.fetchall()
-            RecordCount = len(result)
-            c.close()
-
-        # If no Documents, Episodes, Quotes, or Clips that contain the record are locked, check the lock status
-        # of Snapshots that contain the Keyword for Whole Snapshot coding
-        if RecordCount == 0:
-            # query the lock status for Snapshots that contain the Keyword 
-            query = """SELECT c.RecordLock FROM Keywords2 a, ClipKeywords2 b, Snapshots2 c
-                         WHERE a.KeywordGroup = %s AND
-                               a.Keyword = %s AND
-                               a.KeywordGroup = b.KeywordGroup AND
-                               a.Keyword = b.Keyword AND
-                               b.SnapshotNum <> 0 AND
-                               b.SnapshotNum = c.SnapshotNum AND
-                               (c.RecordLock <> '' AND
-                                c.RecordLock IS NOT NULL)"""
-            values = (originalKeywordGroup, originalKeyword)
-            c = DBInterface.get_db().cursor()
-            query = DBInterface.FixQuery(query)
-            c.execute(query, values)
-            result = c.fetchall()
-            RecordCount = len(result)
-            c.close()
-
-        # If no Documents, Episodes, Quotes, Clips, or whole Snapshots that contain the record are locked,
-        # check the lock status of Snapshots that contain the Keyword for Snapshot Coding
-        if RecordCount == 0:
-            # query the lock status for Snapshots that contain the Keyword 
-            query = """SELECT c.RecordLock FROM Keywords2 a, SnapshotKeywords2 b, Snapshots2 c
-                         WHERE a.KeywordGroup = %s AND
-                               a.Keyword = %s AND
-                               a.KeywordGroup = b.KeywordGroup AND
-                               a.Keyword = b.Keyword AND
-                               b.SnapshotNum <> 0 AND
-                               b.SnapshotNum = c.SnapshotNum AND
-                               (c.RecordLock <> '' AND
-                                c.RecordLock IS NOT NULL)"""
-            values = (originalKeywordGroup, originalKeyword)
-            c = DBInterface.get_db().cursor()
-            query = DBInterface.FixQuery(query)
-            c.execute(query, values)
-            result = c.fetchall()
-            RecordCount = len(result)
-            c.close()
-
-        if RecordCount != 0:
-            LockName = result[0][0]
-            return (RecordCount, LockName)
-        else:
-            return (RecordCount, None)
-        
-    def removeDuplicatesForMerge(self):
-        """  When merging keywords, we need to remove instances of the OLD keyword that already exist in
-             Documents, Episodes, Quotes, Clips, or Snapshots that also contain the NEW keyword.  (Doing
-             it this way reduces overhead.) """
-        # If we're in Unicode mode, we need to encode the parameter so that the query will work right.
-        if 'unicode' in wx.PlatformInfo:
-            # Encode strings to UTF8 before saving them.  The easiest way to handle this is to create local
-            # variables for the data.  We don't want to change the underlying object values.  Also, this way,
-            # we can continue to use the Unicode objects where we need the non-encoded version. (error messages.)
-            originalKeywordGroup = self.originalKeywordGroup.encode(TransanaGlobal.encoding)
-            originalKeyword = self.originalKeyword.encode(TransanaGlobal.encoding)
-            keywordGroup = self.keywordGroup.encode(TransanaGlobal.encoding)
-            keyword = self.keyword.encode(TransanaGlobal.encoding)
-        else:
-            originalKeywordGroup = self.originalKeywordGroup
-            originalKeyword = self.originalKeyword
-            keywordGroup = self.keywordGroup
-            keyword = self.keyword
-
-        # Look for Episodes, Clips, and Whole-Snapshots that have BOTH the original and the merge keywords
-        query = """SELECT a.EpisodeNum, a.DocumentNum, a.ClipNum, a.QuoteNum, a.SnapshotNum, a.KeywordGroup, a.Keyword
-                     FROM ClipKeywords2 a, ClipKeywords2 b
-                     WHERE a.KeywordGroup = %s AND
-                           a.Keyword = %s AND
-                           b.KeywordGroup = %s AND
-                           b.Keyword = %s AND
-                           a.EpisodeNum = b.EpisodeNum AND
-                           a.DocumentNum = b.DocumentNum AND
-                           a.ClipNum = b.ClipNum AND
-                           a.QuoteNum = b.QuoteNum AND
-                           a.SnapshotNum = b.SnapshotNum"""
-        values = (originalKeywordGroup, originalKeyword, keywordGroup, keyword)
-        c = DBInterface.get_db().cursor()
-        query = DBInterface.FixQuery(query)
-        c.execute(query, values)
-        # Remember the list of what would become duplicate entries
-        result = c.fetchall()
-
-        # Prepare a query for deleting the duplicate
-        query = """ DELETE FROM ClipKeywords2
-                      WHERE EpisodeNum = %s AND
-                            DocumentNum = %s AND
-                            ClipNum = %s AND
-                            QuoteNum = %s AND 
-                            SnapshotNum = %s AND
-                            KeywordGroup = %s AND
-                            Keyword = %s """
-        query = DBInterface.FixQuery(query)
-        # Go through the list of duplicates ...
-        for line in result:
-            # ... and delete the original keyword listing, leaving the other (merge) record untouched.
-            values = (line[0], line[1], line[2], line[3], line[4], line[5], line[6])
-            c.execute(query, values)
-
-        # For Snapshot Coding, we don't want to LOSE any of the drawn shapes, so we rename the OLD
-        # Keyword Records to match the new Keyword Records
-        query = """UPDATE SnapshotKeywords2
-                     SET KeywordGroup = %s,
-                         Keyword = %s
-                     WHERE KeywordGroup = %s AND
-                           Keyword = %s """
-        values = (keywordGroup, keyword, originalKeywordGroup, originalKeyword)
-        query = DBInterface.FixQuery(query)
-        c.execute(query, values)
-            
-        # Look for Snapshots that have STYLES for BOTH the original and the merge keywords
-        query = """SELECT * FROM SnapshotKeywordStyles2 a, SnapshotKeywordStyles2 b
-                     WHERE a.KeywordGroup = %s AND
-                           a.Keyword = %s AND
-                           b.KeywordGroup = %s AND
-                           b.Keyword = %s AND
-                           a.SnapshotNum = b.SnapshotNum """
-        values = (originalKeywordGroup, originalKeyword, keywordGroup, keyword)
-        query = DBInterface.FixQuery(query)
-        c.execute(query, values)
-        # Remember the list of what would become duplicate entries
-        result = c.fetchall()
-
-        # Prepare a query for deleting the duplicate
-        query = """ DELETE FROM SnapshotKeywordStyles2
-                      WHERE SnapshotNum = %s AND
-                            KeywordGroup = %s AND
-                            Keyword = %s """
-        query = DBInterface.FixQuery(query)
-        # Go through the list of duplicates ...
-        for line in result:
-            # ... and delete the original keyword listing, leaving the other (merge) record untouched.
-            values = (line[0], line[1], line[2])
-            c.execute(query, values)
-            
-        c.close()
-        
+            return (0, None)
 
     def lock_record(self):
         """Lock a record.  If the lock is unable to be obtained, a
@@ -556,99 +335,52 @@ that would corrupt the record that is currently locked by %s.  Please try again
                 raise SaveError(tempstr  % (self.originalKeywordGroup, self.originalKeyword, LockName))
             
             else:
-                c = DBInterface.get_db().cursor()
-                # If we're merging keywords ...
-                if mergeKeywords:
-                    # We'd better do this as a Transaction!
-                    query = 'BEGIN'
-                    c.execute(query)
-                    # ... then we remove duplicate keywords and we DON'T rename the keyword
-                    self.removeDuplicatesForMerge()
-                # If we're NOT merging keywords ...
-                else:
-                    # update the record record with new values
-                    query = """
-                    UPDATE Keywords2
-                        SET KeywordGroup = %s,
-                            Keyword = %s,
-                            Definition = %s,
-                            LineColorName = %s,
-                            LineColorDef = %s,
-                            DrawMode = %s,
-                            LineWidth = %s,
-                            LineStyle = %s
-                        WHERE KeywordGroup = %s AND
-                              Keyword = %s
-                    """
-                    values = values + (originalKeywordGroup, originalKeyword)
-                    query = DBInterface.FixQuery(query)
-                    c.execute(query, values)
-
-                # If the Keyword Group or Keyword has changed, we need to update all ClipKeyword records too.
-                if ((originalKeywordGroup != keywordGroup) or \
-                    (originalKeyword != keyword)):
-                    query = """
-                    UPDATE ClipKeywords2
-                        SET KeywordGroup = %s,
-                            Keyword = %s
-                        WHERE KeywordGroup = %s AND
-                              Keyword = %s
-                    """
-                    values = (keywordGroup, keyword, originalKeywordGroup, originalKeyword)
-                    query = DBInterface.FixQuery(query)
-                    c.execute(query, values)
-
-                # If the Keyword Group or Keyword has changed, we need to update all Snapshot Keyword records too.
-                if ((originalKeywordGroup != keywordGroup) or \
-                    (originalKeyword != keyword)):
-                    query = """
-                    UPDATE SnapshotKeywords2
-                        SET KeywordGroup = %s,
-                            Keyword = %s
-                        WHERE KeywordGroup = %s AND
-                              Keyword = %s
-                    """
-                    values = (keywordGroup, keyword, originalKeywordGroup, originalKeyword)
-                    query = DBInterface.FixQuery(query)
-                    c.execute(query, values)
-
-                # If the Keyword Group or Keyword has changed, we need to update all Snapshot Keyword Style records too.
-                if ((originalKeywordGroup != keywordGroup) or \
-                    (originalKeyword != keyword)):
-                    query = """
-                    UPDATE SnapshotKeywordStyles2
-                        SET KeywordGroup = %s,
-                            Keyword = %s
-                        WHERE KeywordGroup = %s AND
-                              Keyword = %s
-                    """
-                    values = (keywordGroup, keyword, originalKeywordGroup, originalKeyword)
-                    query = DBInterface.FixQuery(query)
-                    c.execute(query, values)
-
-                # If we're merging Keywords, we need to DELETE the original keyword and end the transaction
-                if mergeKeywords:
-                    # Since we've already taken care of the Clip Keywords, we can just delete the keyword!
-                    query = """ DELETE FROM Keywords2
-                                  WHERE KeywordGroup = %s AND
-                                        Keyword = %s"""
-                    values = (originalKeywordGroup, originalKeyword)
-                    query = DBInterface.FixQuery(query)
-                    c.execute(query, values)
-                    # If we make it this far, we can commit the transaction, 'cause we're done.
-                    query = 'COMMIT'
-                    c.execute(query)
-##                if TransanaConstants.DBInstalled in ['sqlite3']:
-##                    c.commit()
-                c.close()
+                # Rename or merge the Keyword everywhere it is used as a single transaction.  We've already checked
+                # for locks, so the DBInterface functions don't need to.
+                DBInterface.RunInTransaction(self._db_save_changes, mergeKeywords, values)
                 # If the save is successful, we need to update the "original" values to reflect the new record key.
                 # Otherwise, we can't unlock the proper record, among other things.
                 self.originalKeywordGroup = self.keywordGroup
                 self.originalKeyword = self.keyword
                 
+        # Displayed Episode Items may have changed, so the Episode Segment Indexes must be reloaded
+        EpisodeSegmentIndex.Invalidate()
         # We need to signal if the we need to update (or delete) the keyword listing in the database tree.
         return not mergeKeywords
 
+    def _db_save_changes(self, mergeKeywords, values):
+        """ Save changes to an existing Keyword.  db_save() runs this inside a transaction. """
+        # If we're merging keywords ...
+        if mergeKeywords:
+            # ... then the original Keyword is replaced by the existing one everywhere it is used, and deleted.
+            # We DON'T rename or update the keyword record.
+            DBInterface.merge_keywords([(self.originalKeywordGroup, self.originalKeyword)], self.keywordGroup, self.keyword, checkLocks=False)
+        # If we're NOT merging keywords ...
+        else:
+            # If the Keyword Group or Keyword has changed, we need to rename the Keyword record and all ClipKeyword,
+            # Snapshot Keyword, and Snapshot Keyword Style records too.
+            DBInterface.rename_keywords([((self.originalKeywordGroup, self.originalKeyword), (self.keywordGroup, self.keyword))], checkLocks=False)
+            # update the record record with new values
+            query = """
+            UPDATE Keywords2
+                SET KeywordGroup = %s,
+                    Keyword = %s,
+                    Definition = %s,
+                    LineColorName = %s,
+                    LineColorDef = %s,
+                    DrawMode = %s,
+                    LineWidth = %s,
+                    LineStyle = %s
+                WHERE KeywordGroup = %s AND
+                      Keyword = %s
+            """
+            # The record now has the new Keyword Group and Keyword
+            values = values + values[:2]
+            c = DBInterface.get_db().cursor()
+            query = DBInterface.FixQuery(query)
+            c.execute(query, values)
+            c.close()
+
     def db_delete(self, use_transactions=1):
         """Delete this object record from the database.  Raises
         RecordLockedError exception if record is locked and unable to be
@@ -36,6 +36,8 @@ import Dialogs
 import Document
 # import Transana's Episode object
 import Episode
+# import Transana's Episode Segment Index
+import EpisodeSegmentIndex
 # Import Transana's Note object
 import Note
 # import Transana's Constants
@@ -260,6 +262,8 @@ class Library(DataObject.DataObject):
         # 'local' data is out of date.  re-sync
         if (self.number == 0):
             self.db_load_by_name(self.id)
+        # Displayed Episode Items may have changed, so the Episode Segment Indexes must be reloaded
+        EpisodeSegmentIndex.Invalidate()
 
     def db_delete(self, use_transactions=1):
         """Delete this object record from the database.  Raises
@@ -337,6 +341,8 @@ class Library(DataObject.DataObject):
             raise e
         except:
             raise
+        # Displayed Episode Items may have changed, so the Episode Segment Indexes must be reloaded
+        EpisodeSegmentIndex.Invalidate()
         return result
 
 
@@ -38,6 +38,8 @@ from KeywordMapPrintoutClass import MyPrintout
 import DBInterface
 # Import Transana's Dialogs
 import Dialogs
+# import Transana's Episode Segment Index, which tracks changes to Episode data
+import EpisodeSegmentIndex
 # Import Transana's Filter Dialog
 import FilterDialog
 # import Transana's Keyword Object
@@ -49,6 +51,11 @@ import TransanaImages
 # import Transana Miscellaneous functions
 import Misc
 
+# The Library data loaded by ProcessSeries(), by (Library Number, Clip Number), so re-opening a map doesn't
+# require the data to be loaded again.  Each entry remembers the EpisodeSegmentIndex generation it was loaded
+# in, and is not used once the data has changed.
+_seriesDataCache = {}
+
 # Declare Control IDs
 # Menu Item and Toolbar Item for File > Filter
 M_FILE_FILTER        =  wx.NewId()
@@ -794,22 +801,40 @@ class LibraryMap(wx.Frame):
         return Num, Interval
 
     def ProcessSeries(self):
+        """ Populate the Episode, Keyword, Clip, and Snapshot lists for the Library """
+        # If we've already loaded this Library's data, and it hasn't changed since, we can use it again.
+        cacheKey = (self.seriesNum, self.clipNum)
+        if _seriesDataCache.has_key(cacheKey) and (_seriesDataCache[cacheKey]['generation'] == EpisodeSegmentIndex.GetGeneration()):
+            seriesData = _seriesDataCache[cacheKey]
+        # Otherwise ...
+        else:
+            # ... load the data and remember it
+            seriesData = self.LoadSeriesData()
+            _seriesDataCache[cacheKey] = seriesData
 
         # Initialize Media Length to 0
         self.MediaLength = 0
-        # Initialize all the data Lists to empty
+        # Initialize all the data Lists.  We make copies of the cached lists, as the Filter Dialog changes them.
         self.episodeList = []
         self.filteredEpisodeList = []
-        self.clipList = []
-        self.clipFilterList = []
-        self.snapshotList = []
-        self.snapshotFilterList = []
-        self.unfilteredKeywordList = []
-        self.filteredKeywordList = []
-
-        if self.reportType == 2:
-            epLengths = {}
-
+        for (EpisodeID, SeriesID, EpisodeLength) in seriesData['episodes']:
+            self.episodeList.append((EpisodeID, SeriesID, True))
+            if (EpisodeLength > self.MediaLength):
+                self.MediaLength = EpisodeLength
+                self.endTime = self.MediaLength
+            # Remember the Episode's length
+            self.episodeLengths[(EpisodeID, SeriesID)] = EpisodeLength
+        self.clipList = list(seriesData['clipList'])
+        self.clipFilterList = list(seriesData['clipFilterList'])
+        self.snapshotList = list(seriesData['snapshotList'])
+        self.snapshotFilterList = list(seriesData['snapshotFilterList'])
+        self.unfilteredKeywordList = [(kwg, kw, True) for (kwg, kw) in seriesData['keywords']]
+        self.filteredKeywordList = list(seriesData['keywords'])
+
+    def LoadSeriesData(self):
+        """ Load the Library's Episode, Keyword, Clip, and Snapshot data from the database.  Rather than querying
+            each Episode separately, the data for all the Library's Episodes is loaded with one query each for
+            Episodes, Clip Keywords, Whole Snapshot Keywords, and Snapshot Coding Keywords. """
         # Get Series Number, Episode Number, Media File Name, and Length
         SQLText = """SELECT e.EpisodeNum, e.EpisodeID, e.SeriesNum, e.MediaFile, e.EpLength, s.SeriesID
                        FROM Episodes2 e, Series2 s
@@ -820,145 +845,98 @@ class LibraryMap(wx.Frame):
         SQLText = DBInterface.FixQuery(SQLText)
         # Execute the query
         self.DBCursor.execute(SQLText, (self.seriesNum, ))
-
+        # A list of (Episode Number, Episode ID, Library ID, Episode Length), in Episode ID order
+        episodes = []
         for (EpisodeNum, EpisodeID, SeriesNum, MediaFile, EpisodeLength, SeriesID) in self.DBCursor.fetchall():
             EpisodeID = DBInterface.ProcessDBDataForUTF8Encoding(EpisodeID)
             SeriesID = DBInterface.ProcessDBDataForUTF8Encoding(SeriesID)
-            MediaFile = DBInterface.ProcessDBDataForUTF8Encoding(MediaFile)
-
-            self.episodeList.append((EpisodeID, SeriesID, True))
-
-            if (EpisodeLength > self.MediaLength):
-                self.MediaLength = EpisodeLength
-                self.endTime = self.MediaLength
-
-            # Remember the Episode's length
-            self.episodeLengths[(EpisodeID, SeriesID)] = EpisodeLength
-
-            # Get the list of Keywords to be displayed
-            SQLText = """SELECT ck.KeywordGroup, ck.Keyword
-                           FROM Clips2 cl, ClipKeywords2 ck
-                           WHERE cl.EpisodeNum = %s AND
-                                 cl.ClipNum = ck.ClipNum
-                           GROUP BY ck.keywordgroup, ck.keyword
-                           ORDER BY KeywordGroup, Keyword, ClipStart"""
-            # Adjust the query for sqlite if needed
-            SQLText = DBInterface.FixQuery(SQLText)
-            self.DBCursor.execute(SQLText, (EpisodeNum, ))
-
-            for (kwg, kw) in self.DBCursor.fetchall():
-                kwg = DBInterface.ProcessDBDataForUTF8Encoding(kwg)
-                kw = DBInterface.ProcessDBDataForUTF8Encoding(kw)
-                if not (kwg, kw) in self.filteredKeywordList:
-                    self.filteredKeywordList.append((kwg, kw))
-                if not (kwg, kw, True) in self.unfilteredKeywordList:
-                    self.unfilteredKeywordList.append((kwg, kw, True))
-
-            # Get the list of WHOLE SNAPSHOT Keywords to be displayed
-            SQLText = """SELECT ck.KeywordGroup, ck.Keyword
-                           FROM Snapshots2 sn, ClipKeywords2 ck
-                           WHERE sn.EpisodeNum = %s AND
-                                 sn.SnapshotNum = ck.SnapshotNum
-                           GROUP BY ck.keywordgroup, ck.keyword
-                           ORDER BY KeywordGroup, Keyword, SnapshotTimeCode"""
-            # Adjust the query for sqlite if needed
-            SQLText = DBInterface.FixQuery(SQLText)
-            self.DBCursor.execute(SQLText, (EpisodeNum, ))
-            for (kwg, kw) in self.DBCursor.fetchall():
-                kwg = DBInterface.ProcessDBDataForUTF8Encoding(kwg)
-                kw = DBInterface.ProcessDBDataForUTF8Encoding(kw)
-                if not (kwg, kw) in self.filteredKeywordList:
-                    self.filteredKeywordList.append((kwg, kw))
-                if not (kwg, kw, True) in self.unfilteredKeywordList:
-                    self.unfilteredKeywordList.append((kwg, kw, True))
-
-            # Get the list of SNAPSHOT CODING Keywords to be displayed
-            SQLText = """SELECT ck.KeywordGroup, ck.Keyword
-                           FROM Snapshots2 sn, SnapshotKeywords2 ck
-                           WHERE sn.EpisodeNum = %s AND
-                                 sn.SnapshotNum = ck.SnapshotNum
-                           GROUP BY ck.keywordgroup, ck.keyword
-                           ORDER BY KeywordGroup, Keyword, SnapshotTimeCode"""
-            # Adjust the query for sqlite if needed
-            SQLText = DBInterface.FixQuery(SQLText)
-            self.DBCursor.execute(SQLText, (EpisodeNum, ))
-            for (kwg, kw) in self.DBCursor.fetchall():
-                kwg = DBInterface.ProcessDBDataForUTF8Encoding(kwg)
-                kw = DBInterface.ProcessDBDataForUTF8Encoding(kw)
-                if not (kwg, kw) in self.filteredKeywordList:
-                    self.filteredKeywordList.append((kwg, kw))
-                if not (kwg, kw, True) in self.unfilteredKeywordList:
-                    self.unfilteredKeywordList.append((kwg, kw, True))
-
-            # Sort the Keyword List
-            self.unfilteredKeywordList.sort()
-
-            # Create the Keyword Placement lines to be displayed.  We need them to be in ClipStart, ClipNum order so colors will be
-            # distributed properly across bands.
-            SQLText = """SELECT ck.KeywordGroup, ck.Keyword, cl.ClipStart, cl.ClipStop, cl.ClipNum, cl.ClipID, cl.CollectNum
-                           FROM Clips2 cl, ClipKeywords2 ck
-                           WHERE cl.EpisodeNum = %s AND
-                                 cl.ClipNum = ck.ClipNum
-                           ORDER BY ClipStart, cl.ClipNum, KeywordGroup, Keyword"""
-            # Adjust the query for sqlite if needed
-            SQLText = DBInterface.FixQuery(SQLText)
-            self.DBCursor.execute(SQLText, (EpisodeNum, ))
-            for (kwg, kw, clipStart, clipStop, clipNum, clipID, collectNum) in self.DBCursor.fetchall():
-                kwg = DBInterface.ProcessDBDataForUTF8Encoding(kwg)
-                kw = DBInterface.ProcessDBDataForUTF8Encoding(kw)
-                clipID = DBInterface.ProcessDBDataForUTF8Encoding(clipID)
-                # If we're dealing with an Episode, self.clipNum will be None and we want all clips.
-                # If we're dealing with a Clip, we only want to deal with THIS clip!
-                if (self.clipNum == None) or (clipNum == self.clipNum):
-                    self.clipList.append((kwg, kw, clipStart, clipStop, clipNum, clipID, collectNum, EpisodeID, SeriesID))
-
-                    if not ((clipID, collectNum, True) in self.clipFilterList):
-                        self.clipFilterList.append((clipID, collectNum, True))
-
-            # Create the WHOLE SNAPSHOT Keyword Placement lines to be displayed.  We need them to be in SnapshotTimeCode, SnapshotNum order so colors will be
-            # distributed properly across bands.
-            SQLText = """SELECT ck.KeywordGroup, ck.Keyword, sn.SnapshotTimeCode, sn.SnapshotDuration, sn.SnapshotNum, sn.SnapshotID, sn.CollectNum
-                           FROM Snapshots2 sn, ClipKeywords2 ck
-                           WHERE sn.EpisodeNum = %s AND
-                                 sn.SnapshotNum = ck.SnapshotNum
-                           ORDER BY SnapshotTimeCode, sn.SnapshotNum, KeywordGroup, Keyword"""
-            # Adjust the query for sqlite if needed
-            SQLText = DBInterface.FixQuery(SQLText)
-            self.DBCursor.execute(SQLText, (EpisodeNum, ))
-            for (kwg, kw, SnapshotTimeCode, SnapshotDuration, SnapshotNum, SnapshotID, collectNum) in self.DBCursor.fetchall():
-                kwg = DBInterface.ProcessDBDataForUTF8Encoding(kwg)
-                kw = DBInterface.ProcessDBDataForUTF8Encoding(kw)
-                SnapshotID = DBInterface.ProcessDBDataForUTF8Encoding(SnapshotID)
-                # If we're dealing with an Episode, self.clipNum will be None and we want all clips.
-                # If we're dealing with a Clip, we only want to deal with THIS clip!
-                if (self.clipNum == None):
-                    self.snapshotList.append((kwg, kw, SnapshotTimeCode, SnapshotTimeCode + SnapshotDuration, SnapshotNum, SnapshotID, collectNum, EpisodeID, SeriesID))
-                    if not ((SnapshotID, collectNum, True) in self.snapshotFilterList):
-                        self.snapshotFilterList.append((SnapshotID, collectNum, True))
-
-            # Create the SNAPSHOT CODING Keyword Placement lines to be displayed.  We need them to be in SnapshotTimeCode, SnapshotNum order so colors will be
-            # distributed properly across bands.
-            SQLText = """SELECT ck.KeywordGroup, ck.Keyword, sn.SnapshotTimeCode, sn.SnapshotDuration, sn.SnapshotNum, sn.SnapshotID, sn.CollectNum
-                           FROM Snapshots2 sn, SnapshotKeywords2 ck
-                           WHERE sn.EpisodeNum = %s AND
+            episodes.append((EpisodeNum, EpisodeID, SeriesID, EpisodeLength))
+
+        # The same Keywords and Item IDs appear in many rows.  Only decode each one once.
+        decoded = {}
+        def Decode(value):
+            if not decoded.has_key(value):
+                decoded[value] = DBInterface.ProcessDBDataForUTF8Encoding(value)
+            return decoded[value]
+
+        # The set of Keywords used in the Library's Clips and Snapshots
+        keywords = set()
+
+        # Get the Clip Keyword Placement lines for all the Library's Episodes.  We need them to be in ClipStart, ClipNum
+        # order within each Episode so colors will be distributed properly across bands.
+        SQLText = """SELECT cl.EpisodeNum, ck.KeywordGroup, ck.Keyword, cl.ClipStart, cl.ClipStop, cl.ClipNum, cl.ClipID, cl.CollectNum
+                       FROM Episodes2 e, Clips2 cl, ClipKeywords2 ck
+                       WHERE e.SeriesNum = %s AND
+                             cl.EpisodeNum = e.EpisodeNum AND
+                             cl.ClipNum = ck.ClipNum
+                       ORDER BY cl.EpisodeNum, ClipStart, cl.ClipNum, KeywordGroup, Keyword"""
+        # Adjust the query for sqlite if needed
+        SQLText = DBInterface.FixQuery(SQLText)
+        self.DBCursor.execute(SQLText, (self.seriesNum, ))
+        # Group the Clip rows by Episode Number
+        clipRows = {}
+        for (EpisodeNum, kwg, kw, clipStart, clipStop, clipNum, clipID, collectNum) in self.DBCursor.fetchall():
+            kwg = Decode(kwg)
+            kw = Decode(kw)
+            keywords.add((kwg, kw))
+            # If we're dealing with an Episode, self.clipNum will be None and we want all clips.
+            # If we're dealing with a Clip, we only want to deal with THIS clip!
+            if (self.clipNum == None) or (clipNum == self.clipNum):
+                if not clipRows.has_key(EpisodeNum):
+                    clipRows[EpisodeNum] = []
+                clipRows[EpisodeNum].append((kwg, kw, clipStart, clipStop, clipNum, Decode(clipID), collectNum))
+
+        # Get the WHOLE SNAPSHOT and SNAPSHOT CODING Keyword Placement lines for all the Library's Episodes.  We need them to be
+        # in SnapshotTimeCode, SnapshotNum order within each Episode so colors will be distributed properly across bands.
+        snapshotRows = {}
+        for keywordTable in ['ClipKeywords2', 'SnapshotKeywords2']:
+            SQLText = """SELECT sn.EpisodeNum, ck.KeywordGroup, ck.Keyword, sn.SnapshotTimeCode, sn.SnapshotDuration, sn.SnapshotNum, sn.SnapshotID, sn.CollectNum
+                           FROM Episodes2 e, Snapshots2 sn, %s ck
+                           WHERE e.SeriesNum = %%s AND
+                                 sn.EpisodeNum = e.EpisodeNum AND
                                  sn.SnapshotNum = ck.SnapshotNum
-                           ORDER BY SnapshotTimeCode, sn.SnapshotNum, KeywordGroup, Keyword"""
+                           ORDER BY sn.EpisodeNum, SnapshotTimeCode, sn.SnapshotNum, KeywordGroup, Keyword""" % keywordTable
             # Adjust the query for sqlite if needed
             SQLText = DBInterface.FixQuery(SQLText)
-            self.DBCursor.execute(SQLText, (EpisodeNum, ))
-            for (kwg, kw, SnapshotTimeCode, SnapshotDuration, SnapshotNum, SnapshotID, collectNum) in self.DBCursor.fetchall():
-                kwg = DBInterface.ProcessDBDataForUTF8Encoding(kwg)
-                kw = DBInterface.ProcessDBDataForUTF8Encoding(kw)
-                SnapshotID = DBInterface.ProcessDBDataForUTF8Encoding(SnapshotID)
-                # If we're dealing with an Episode, self.clipNum will be None and we want all clips.
-                # If we're dealing with a Clip, we only want to deal with THIS clip!
+            self.DBCursor.execute(SQLText, (self.seriesNum, ))
+            for (EpisodeNum, kwg, kw, SnapshotTimeCode, SnapshotDuration, SnapshotNum, SnapshotID, collectNum) in self.DBCursor.fetchall():
+                kwg = Decode(kwg)
+                kw = Decode(kw)
+                keywords.add((kwg, kw))
+                # If we're dealing with an Episode, self.clipNum will be None and we want all snapshots.
+                # If we're dealing with a Clip, we don't want any snapshots.
                 if (self.clipNum == None):
-                    self.snapshotList.append((kwg, kw, SnapshotTimeCode, SnapshotTimeCode + SnapshotDuration, SnapshotNum, SnapshotID, collectNum, EpisodeID, SeriesID))
-                    if not ((SnapshotID, collectNum, True) in self.snapshotFilterList):
-                        self.snapshotFilterList.append((SnapshotID, collectNum, True))
-
-        # Sort the Keyword List
-        self.filteredKeywordList.sort()
+                    if not snapshotRows.has_key(EpisodeNum):
+                        snapshotRows[EpisodeNum] = []
+                    snapshotRows[EpisodeNum].append((kwg, kw, SnapshotTimeCode, SnapshotTimeCode + SnapshotDuration, SnapshotNum, Decode(SnapshotID), collectNum))
+
+        # Assemble the Clip and Snapshot lists in Episode order.  The Filter lists hold each item once, in the order
+        # the items first appear.  Sets tell us which items are already there.
+        clipList = []
+        clipFilterList = []
+        clipFilterSet = set()
+        snapshotList = []
+        snapshotFilterList = []
+        snapshotFilterSet = set()
+        for (EpisodeNum, EpisodeID, SeriesID, EpisodeLength) in episodes:
+            for (kwg, kw, clipStart, clipStop, clipNum, clipID, collectNum) in clipRows.get(EpisodeNum, []):
+                clipList.append((kwg, kw, clipStart, clipStop, clipNum, clipID, collectNum, EpisodeID, SeriesID))
+                if not ((clipID, collectNum) in clipFilterSet):
+                    clipFilterSet.add((clipID, collectNum))
+                    clipFilterList.append((clipID, collectNum, True))
+            for (kwg, kw, snapshotStart, snapshotStop, SnapshotNum, SnapshotID, collectNum) in snapshotRows.get(EpisodeNum, []):
+                snapshotList.append((kwg, kw, snapshotStart, snapshotStop, SnapshotNum, SnapshotID, collectNum, EpisodeID, SeriesID))
+                if not ((SnapshotID, collectNum) in snapshotFilterSet):
+                    snapshotFilterSet.add((SnapshotID, collectNum))
+                    snapshotFilterList.append((SnapshotID, collectNum, True))
+
+        return {'generation' : EpisodeSegmentIndex.GetGeneration(),
+                'episodes' : [(EpisodeID, SeriesID, EpisodeLength) for (EpisodeNum, EpisodeID, SeriesID, EpisodeLength) in episodes],
+                'keywords' : sorted(keywords),
+                'clipList' : clipList,
+                'clipFilterList' : clipFilterList,
+                'snapshotList' : snapshotList,
+                'snapshotFilterList' : snapshotFilterList}
 
     def UpdateKeywordVisualization(self):
         """ Update the Keyword Visualization following something that could have changed it. """
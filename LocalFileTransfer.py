@@ -26,6 +26,9 @@ import string
 import sys
 import threading
 import ctypes
+import ctypes.util
+import errno
+import hashlib
 # import Python exceptions
 import exceptions
 import time
@@ -34,6 +37,137 @@ import FileManagement
 import TransanaGlobal
 
 
+# The number of bytes the kernel is asked to copy at a time.  This is how often progress is reported
+# and Cancel is checked.
+KERNEL_CHUNK_SIZE = 8388608
+# The buffer size used when the kernel can't copy for us
+BUFFER_SIZE = 4194304
+
+# On Linux, load the C library so we can use the copy_file_range() and sendfile() system calls, which copy
+# data between files inside the kernel without passing it through Python.
+_libc = None
+if sys.platform.startswith('linux'):
+    try:
+        _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+    except OSError:
+        _libc = None
+
+def _KernelCopyFunctions():
+    """ Return a list of (name, function(inFd, outFd, count)) for the zero-copy system calls this system has,
+        best first.  Each function copies from the current position of inFd to the current position of outFd. """
+    functions = []
+    if _libc == None:
+        return functions
+    # copy_file_range() (glibc 2.27 and later) can share or clone blocks on file systems that support it
+    if hasattr(_libc, 'copy_file_range'):
+        copy_file_range = _libc.copy_file_range
+        copy_file_range.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int, ctypes.c_void_p, ctypes.c_size_t, ctypes.c_uint]
+        copy_file_range.restype = ctypes.c_ssize_t
+        functions.append(('copy_file_range', lambda inFd, outFd, count: copy_file_range(inFd, None, outFd, None, count, 0)))
+    # sendfile() can copy between regular files on Linux 2.6.33 and later
+    if hasattr(_libc, 'sendfile'):
+        sendfile = _libc.sendfile
+        sendfile.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_void_p, ctypes.c_size_t]
+        sendfile.restype = ctypes.c_ssize_t
+        functions.append(('sendfile', lambda inFd, outFd, count: sendfile(outFd, inFd, None, count)))
+    return functions
+
+def _KernelCopy(copyFunc, inFd, outFd, count, progressCallback, cancelCheck):
+    """ Copy count bytes using a zero-copy system call.  Returns True if the copy finished, False if it was
+        cancelled, or None if the system call can't be used for these files. """
+    copied = 0
+    while copied < count:
+        if (cancelCheck != None) and cancelCheck():
+            return False
+        result = copyFunc(inFd, outFd, min(KERNEL_CHUNK_SIZE, count - copied))
+        if result < 0:
+            err = ctypes.get_errno()
+            # If the call isn't supported for these files (different file systems, an old kernel, etc.) before
+            # anything has been copied, let the caller try another method
+            if (copied == 0) and (err in [errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF]):
+                return None
+            raise OSError(err, os.strerror(err))
+        # If the source file got shorter, we're done
+        if result == 0:
+            break
+        copied += result
+        if progressCallback != None:
+            progressCallback(result)
+    return True
+
+def _BufferedCopy(inFile, outFile, progressCallback, cancelCheck):
+    """ Copy the rest of inFile to outFile using a large buffer.  Returns True if the copy finished,
+        False if it was cancelled. """
+    while True:
+        if (cancelCheck != None) and cancelCheck():
+            return False
+        data = inFile.read(BUFFER_SIZE)
+        if not data:
+            return True
+        outFile.write(data)
+        if progressCallback != None:
+            progressCallback(len(data))
+
+def FileChecksum(filename):
+    """ Return the MD5 checksum of a file's contents """
+    md5 = hashlib.md5()
+    f = open(filename, 'rb')
+    try:
+        while True:
+            data = f.read(BUFFER_SIZE)
+            if not data:
+                break
+            md5.update(data)
+    finally:
+        f.close()
+    return md5.hexdigest()
+
+def IsPartialCopy(source, dest):
+    """ Determine whether dest was left by an interrupted copy of source, that is, whether it is smaller than
+        source and was written after source was last changed. """
+    try:
+        return (os.path.getsize(dest) < os.path.getsize(source)) and (os.path.getmtime(dest) >= os.path.getmtime(source))
+    except OSError:
+        return False
+
+def CopyFile(source, dest, offset=0, progressCallback=None, cancelCheck=None, verify=False):
+    """ Copy the file source to the file dest, starting at offset so an interrupted copy can be resumed.
+        On Linux the copy is done in the kernel, with copy_file_range() or sendfile().  Elsewhere, or if those
+        can't be used, it is done with a large buffer.
+        progressCallback(bytes) is called as each block is copied, and cancelCheck() is called between
+        blocks.  If it returns True, the copy stops, leaving a partial file that can be resumed.
+        If verify is True, the checksums of the two files are compared when the copy is done, and IOError is
+        raised if they don't match.  Returns True if the copy finished, False if it was cancelled. """
+    inFile = open(source, 'rb')
+    try:
+        # If we're resuming, keep what has already been copied
+        if offset > 0:
+            outFile = open(dest, 'r+b')
+            outFile.truncate(offset)
+        else:
+            outFile = open(dest, 'wb')
+        try:
+            inFile.seek(offset)
+            outFile.seek(offset)
+            complete = None
+            # Try the zero-copy system calls first
+            for (name, copyFunc) in _KernelCopyFunctions():
+                complete = _KernelCopy(copyFunc, inFile.fileno(), outFile.fileno(), os.fstat(inFile.fileno()).st_size - offset,
+                                       progressCallback, cancelCheck)
+                if complete != None:
+                    break
+            # If they couldn't be used, copy with a buffer
+            if complete == None:
+                complete = _BufferedCopy(inFile, outFile, progressCallback, cancelCheck)
+        finally:
+            outFile.close()
+    finally:
+        inFile.close()
+    # If requested, confirm that the copy matches the original
+    if complete and verify and (FileChecksum(source) != FileChecksum(dest)):
+        raise IOError(unicode(_('The copy of "%s" does not match the original.'), 'utf8') % source)
+    return complete
+
 # Define a Notification Event for Thread notification
 EVT_THREAD_COMPLETE_ID = wx.NewId()
 
@@ -55,27 +189,39 @@ class ThreadComplete(wx.PyEvent):
 # Thread for copying files
 class ThreadedFileCopy(threading.Thread):
     """ Threaded File Copy Class."""
-    def __init__(self, notify_window, inFile, outDir):
+    def __init__(self, notify_window, inFile, outFile, offset=0, verify=False):
         """Initialize the File Copy Thread Class."""
         threading.Thread.__init__(self)
         self._notify_window = notify_window
         self._inFile = inFile
-        self._outDir = outDir
+        self._outFile = outFile
+        self._offset = offset
+        self._verify = verify
+        # The error message, if the copy fails
+        self.error = None
         # Start the thread
         self.start()
 
     def run(self):
         """Run the File Copy Thread."""
-        # Copy the file as quickly as possible
-        shutil.copy(self._inFile, self._outDir)
+        try:
+            # Copy the file as quickly as possible, reporting progress to the dialog and stopping if it is cancelled
+            if CopyFile(self._inFile, self._outFile, self._offset, self._notify_window.OnProgress,
+                        lambda: self._notify_window.cancelled, self._verify):
+                # Copy the file permissions, as shutil.copy() does
+                shutil.copymode(self._inFile, self._outFile)
+        except (IOError, OSError), e:
+            self.error = '%s' % e
         # Signal that the copy is DONE
         wx.PostEvent(self._notify_window, ThreadComplete())
 
 
 class LocalFileTransfer(wx.Dialog):
     """ This object displays a progress dialog for file transfers on the local file system. """
-    def __init__(self, parent, title, copyFrom, copyTo):
-        """ Set up the Dialog Box and all GUI Widgets. """
+    def __init__(self, parent, title, copyFrom, copyTo, resume=True, verify=False):
+        """ Set up the Dialog Box and all GUI Widgets.  If resume is True and the destination file was left by an
+            interrupted copy, the copy picks up where it left off.  If verify is True, checksums are compared
+            when the copy is done. """
         if (os.path.exists(copyFrom)):
             # Set up local variables
             self.parent = parent
@@ -200,7 +346,14 @@ class LocalFileTransfer(wx.Dialog):
             self.timer.Start(500)
 
             self.size1 = os.stat(copyFrom)[6]
-            self.threadedFileCopy = ThreadedFileCopy(self, copyFrom, copyTo)
+            # If we should resume an interrupted copy, start from the end of what was copied before
+            if resume and os.path.exists(self.destFileStr) and IsPartialCopy(copyFrom, self.destFileStr):
+                self.startOffset = os.stat(self.destFileStr)[6]
+            else:
+                self.startOffset = 0
+            # The number of bytes copied so far, updated by the copy thread
+            self.bytesTransferred = self.startOffset
+            self.threadedFileCopy = ThreadedFileCopy(self, copyFrom, self.destFileStr, self.startOffset, verify)
 
             # Show the form
             self.ShowModal()
@@ -223,12 +376,13 @@ class LocalFileTransfer(wx.Dialog):
         secs = time % 60
         return (hours, mins, secs)
 
+    def OnProgress(self, count):
+        """ Called by the copy thread as each block of the file is copied """
+        self.bytesTransferred += count
+
     def UpdateDisplay(self, event):
         """ Update the Transfer Dialog Box labels and progress bar """
-        if os.path.exists(self.destFileStr):
-            bytesTransferred = os.stat(self.destFileStr)[6]
-        else:
-            return
+        bytesTransferred = self.bytesTransferred
 
         # Display Number of Bytes tranferred
         if 'unicode' in wx.PlatformInfo:
@@ -255,8 +409,8 @@ class LocalFileTransfer(wx.Dialog):
         self.lblElapsedTime.SetLabel(prompt % (hours, mins, secs))
         if elapsedTime > 0:
             # Calculate the Transfer Speed.  (Dividing by 1024 gives k/sec rather than bytes/sec).
-            # (kilobytes transferred divided by elapsed time = rate of transfer in k/sec)
-            speed = (bytesTransferred / 1024.0) / elapsedTime
+            # (kilobytes transferred in this session divided by elapsed time = rate of transfer in k/sec)
+            speed = ((bytesTransferred - self.startOffset) / 1024.0) / elapsedTime
             if speed > 0:
                 # Estimate the amount of time it will take to transfer the remaining data.
                 # (kilobytes of data remaining divided by the transfer speed = time remaining for transfer in seconds)
@@ -296,6 +450,13 @@ class LocalFileTransfer(wx.Dialog):
     def OnFileCopyComplete(self, event):
         """ Process this when the Threaded File Copy Complete event is triggered """
         self.timer.Stop()
+        # If the copy failed ...
+        if self.threadedFileCopy.error != None:
+            # ... tell the user, and treat it like a cancelled transfer
+            self.cancelled = True
+            dlg = Dialogs.ErrorDialog(self, self.threadedFileCopy.error)
+            dlg.ShowModal()
+            dlg.Destroy()
         self.threadedFileCopy = None
         # self.Show(False) doesn't work, as the Mac fails to move forward.  EndModal seems to work.
         self.EndModal(True)
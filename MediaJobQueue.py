@@ -0,0 +1,226 @@
+# Copyright (C) 2002 - 2017 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+""" This module implements a persistent job queue for batch media processing (audio extraction and
+    media conversion).  The queue is saved to disk as it changes, so a batch that is interrupted when
+    Transana closes can be resumed later.  Jobs are run in priority order, failed jobs are retried, and
+    files whose source media has not changed since they were last processed are skipped. """
+
+__author__ = 'David Woods <dwoods@transana.com>'
+
+DEBUG = False
+if DEBUG:
+    print "MediaJobQueue DEBUG is ON!!"
+
+# import Python's cPickle module
+import cPickle
+# import Python's os module
+import os
+# import Python's time module
+import time
+
+# Job Status values
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+# The number of times a job is attempted before it is marked as failed
+MAX_ATTEMPTS = 3
+
+
+class MediaJobQueue(object):
+    """ A persistent, prioritized queue of media processing jobs.  Each job is a dictionary with the keys
+        source, dest, mode, processCommand, priority, status, attempts, and errors. """
+
+    def __init__(self, filename):
+        """ Initialize the queue, loading any jobs saved in filename by an earlier session. """
+        # Remember the file name used to save the queue
+        self.filename = filename
+        # The list of jobs
+        self.jobs = []
+        # A dictionary of (source modification time, source size) for completed destination files,
+        # used to skip files that are up to date
+        self.completed = {}
+        # A counter that keeps jobs with the same priority in the order they were added
+        self.sequence = 0
+        # Load the saved queue, if there is one
+        self.Load()
+        # Initialize the throughput statistics for this session
+        self.ResetStatistics()
+
+    def Load(self):
+        """ Load the saved queue from disk """
+        # If there's no saved queue, there's nothing to load
+        if not os.path.exists(self.filename):
+            return
+        try:
+            f = open(self.filename, 'rb')
+            try:
+                data = cPickle.load(f)
+            finally:
+                f.close()
+        # If the saved queue can't be read, we start over with an empty queue
+        except (IOError, EOFError, cPickle.UnpicklingError, ValueError, KeyError):
+            if DEBUG:
+                print "MediaJobQueue.Load(): unable to read", self.filename
+            return
+        self.jobs = data.get('jobs', [])
+        self.completed = data.get('completed', {})
+        self.sequence = data.get('sequence', 0)
+        # Jobs that were running when Transana closed were interrupted, so they need to be run again.
+        for job in self.jobs:
+            if job['status'] == JOB_RUNNING:
+                job['status'] = JOB_PENDING
+
+    def Save(self):
+        """ Save the queue to disk """
+        data = {'jobs' : self.jobs, 'completed' : self.completed, 'sequence' : self.sequence}
+        # Write to a temporary file first so that an interruption can't leave a damaged queue file behind
+        tempFilename = self.filename + '.tmp'
+        try:
+            f = open(tempFilename, 'wb')
+            try:
+                cPickle.dump(data, f, cPickle.HIGHEST_PROTOCOL)
+            finally:
+                f.close()
+            # Windows won't rename over an existing file
+            if os.path.exists(self.filename):
+                os.remove(self.filename)
+            os.rename(tempFilename, self.filename)
+        except (IOError, OSError):
+            if DEBUG:
+                print "MediaJobQueue.Save(): unable to write", self.filename
+
+    def ResetStatistics(self):
+        """ Reset the throughput statistics """
+        self.startTime = time.time()
+        self.filesProcessed = 0
+        self.filesSkipped = 0
+        self.filesFailed = 0
+        self.bytesProcessed = 0
+
+    def AddJob(self, source, dest, mode='AudioExtraction', processCommand=None, priority=0):
+        """ Add a job to the queue.  Jobs with LOWER priority numbers are run first.  If there is already
+            an unfinished job for the same source and destination, its priority is updated instead. """
+        for job in self.jobs:
+            if (job['source'] == source) and (job['dest'] == dest) and (job['status'] in [JOB_PENDING, JOB_RUNNING]):
+                job['priority'] = min(job['priority'], priority)
+                return job
+        self.sequence += 1
+        job = {'source' : source,
+               'dest' : dest,
+               'mode' : mode,
+               'processCommand' : processCommand,
+               'priority' : priority,
+               'sequence' : self.sequence,
+               'status' : JOB_PENDING,
+               'attempts' : 0,
+               'errors' : []}
+        self.jobs.append(job)
+        return job
+
+    def PendingJobs(self):
+        """ Return the jobs waiting to be run, in the order they will be run """
+        jobs = [job for job in self.jobs if job['status'] == JOB_PENDING]
+        jobs.sort(key=lambda job: (job['priority'], job['sequence']))
+        return jobs
+
+    def RunningJobs(self):
+        """ Return the jobs currently being run """
+        return [job for job in self.jobs if job['status'] == JOB_RUNNING]
+
+    def NextJob(self):
+        """ Return the next job to run, or None if there are no pending jobs """
+        jobs = self.PendingJobs()
+        if len(jobs) > 0:
+            return jobs[0]
+        return None
+
+    def SourceSignature(self, source):
+        """ Return the (modification time, size) of a source file, or None if it can't be read """
+        try:
+            st = os.stat(source)
+        except OSError:
+            return None
+        return (int(st.st_mtime), st.st_size)
+
+    def IsUpToDate(self, job):
+        """ Determine whether a job's destination file is up to date with its source file """
+        # If the destination doesn't exist, it certainly isn't up to date
+        if not os.path.exists(job['dest']):
+            return False
+        # If we have processed this destination before, it's up to date only if the source hasn't changed since.
+        if self.completed.has_key(job['dest']):
+            return self.completed[job['dest']] == self.SourceSignature(job['source'])
+        # If we didn't create the destination, it's up to date if it's newer than the source.
+        try:
+            return os.path.getmtime(job['dest']) >= os.path.getmtime(job['source'])
+        except OSError:
+            return False
+
+    def JobSkipped(self, job):
+        """ Remove a job whose destination file is already up to date """
+        self.jobs.remove(job)
+        self.filesSkipped += 1
+        self.Save()
+
+    def JobStarted(self, job):
+        """ Signal that a job has been started """
+        job['status'] = JOB_RUNNING
+        job['attempts'] += 1
+        self.Save()
+
+    def JobCancelled(self, job):
+        """ Remove a job the user cancelled """
+        if job in self.jobs:
+            self.jobs.remove(job)
+        self.Save()
+
+    def JobFinished(self, job, success, errors=[]):
+        """ Signal that a job has finished.  Successful jobs are removed from the queue and their source
+            information is remembered.  Failed jobs are retried until they reach MAX_ATTEMPTS.
+            Returns True if the job will be retried. """
+        retry = False
+        if success:
+            # Remember the source file information so we can skip this file next time if it hasn't changed
+            signature = self.SourceSignature(job['source'])
+            if signature != None:
+                self.completed[job['dest']] = signature
+                self.bytesProcessed += signature[1]
+            self.filesProcessed += 1
+            self.jobs.remove(job)
+        else:
+            job['errors'] = errors
+            # If we haven't run out of attempts, put the job back in the queue
+            if job['attempts'] < MAX_ATTEMPTS:
+                job['status'] = JOB_PENDING
+                retry = True
+            else:
+                job['status'] = JOB_FAILED
+                self.filesFailed += 1
+        self.Save()
+        return retry
+
+    def ClearFailedJobs(self):
+        """ Remove jobs that have failed from the queue """
+        self.jobs = [job for job in self.jobs if job['status'] != JOB_FAILED]
+        self.Save()
+
+    def GetThroughput(self):
+        """ Return (files per minute, megabytes per second) for the jobs processed this session """
+        elapsed = max(time.time() - self.startTime, 0.001)
+        return (self.filesProcessed * 60.0 / elapsed, self.bytesProcessed / 1048576.0 / elapsed)
@@ -36,30 +36,12 @@ import gettext
 import webbrowser
 # import wxPython
 import wx
-# Import Transana About Box
-import About
 # import Transana Database Interface
 import DBInterface
 # import the Transana Dialogs
 import Dialogs
-# import Transana File Management System
-import FileManagement
 # Import Transana Menu Setup
 import MenuSetup
-# Import Transana's Missing Files module
-import MissingFiles
-# import Transana's Notes Browser
-import NotesBrowser
-# import Database Import
-import XMLImport
-# import Database Import
-import XMLExport
-# import the Color Configuration utility
-import ColorConfig
-# import Batch Waveform Generator, now called the Batch File Processor
-import BatchFileProcessor
-# Import Transana Options Settings 
-import OptionsSettings
 # Import Transana's Constants
 import TransanaConstants
 # Import Transana Globals
@@ -79,8 +61,6 @@ if not TransanaConstants.singleUserVersion:
     import ChatWindow
 # import Transana Record Lock Utility
 import RecordLock
-# import Media Conversion Tool
-import MediaConvert
 
 # Language-specific labels for the different languages.  
 ENGLISH_LABEL = 'English'
@@ -1050,6 +1030,8 @@ class MenuWindow(wx.Frame):  # wx.MDIParentFrame
 
     def OnFileManagement(self, event):
         """ Implements the FileManagement Menu command """
+        # import Transana File Management System when it is first needed, rather than at start-up
+        import FileManagement
         # if no file management window is defined 
         if self.fileManagementWindow == None:
             # Create a File Management Window
@@ -1346,6 +1328,8 @@ class MenuWindow(wx.Frame):  # wx.MDIParentFrame
 
     def OnNotesBrowser(self, event):
         """ Notes Browser """
+        # import Transana's Notes Browser when it is first needed, rather than at start-up
+        import NotesBrowser
         # If the Notes Browser is NOT already open ...
         if self.ControlObject.NotesBrowserWindow == None:
             # Instantiate a Notes Browser window
@@ -1368,6 +1352,8 @@ class MenuWindow(wx.Frame):  # wx.MDIParentFrame
 
     def OnMediaConversion(self, event):
         """ Handler for Tools > Media Conversion """
+        # import Media Conversion Tool when it is first needed, rather than at start-up
+        import MediaConvert
         # Create a Media Convert dialog
         mediaConv = MediaConvert.MediaConvert(self)
         # Show the dialog
@@ -1379,6 +1365,8 @@ class MenuWindow(wx.Frame):  # wx.MDIParentFrame
 
     def OnMissingFiles(self, event):
         """ Handler for Tools > Find Missing Files """
+        # Import Transana's Missing Files module when it is first needed, rather than at start-up
+        import MissingFiles
         # Create a Missing Files Dialog
         mfDlg = MissingFiles.MissingFiles(self, _('Find Missing Files'), self.ControlObject)
         # Show the Missing Files Dialog modally
@@ -1388,6 +1376,8 @@ class MenuWindow(wx.Frame):  # wx.MDIParentFrame
 
     def OnImportDatabase(self, event):
         """ Import Database """
+        # import Database Import when it is first needed, rather than at start-up
+        import XMLImport
          # If the current database is not empty, we need to tell the user.
         if not DBInterface.IsDatabaseEmpty():
             prompt = _('Your current database is not empty.') + '\n\n' + \
@@ -1438,6 +1428,8 @@ class MenuWindow(wx.Frame):  # wx.MDIParentFrame
 
     def OnExportDatabase(self, event):
         """ Export Database """
+        # import Database Export when it is first needed, rather than at start-up
+        import XMLExport
         # Create an Export Database dialog
         temp = XMLExport.XMLExport(self.ControlObject.TranscriptWindow.dlg, -1, _('Transana Data Export'))
         # Set up the confirmation loop signal variable
@@ -1548,6 +1540,8 @@ class MenuWindow(wx.Frame):  # wx.MDIParentFrame
 
     def OnColorConfig(self, event):
         """ Graphics Color Configuration """
+        # import the Color Configuration utility when it is first needed, rather than at start-up
+        import ColorConfig
         # Create a Color Configuration Dialog
         temp = ColorConfig.ColorConfig(self)
         # Show the Dialog
@@ -1557,6 +1551,8 @@ class MenuWindow(wx.Frame):  # wx.MDIParentFrame
 
     def OnBatchWaveformGenerator(self, event):
         """ Batch Waveform Generator """
+        # import the Batch File Processor when it is first needed, rather than at start-up
+        import BatchFileProcessor
         # Create a Batch Waveform Dialog
         temp = BatchFileProcessor.BatchFileProcessor(self, mode="waveform")
         # Get User input
@@ -1602,6 +1598,8 @@ class MenuWindow(wx.Frame):  # wx.MDIParentFrame
 
     def OnOptionsSettings(self, event):
         """ Handler for Options > Settings """
+        # Import Transana Options Settings when it is first needed, rather than at start-up
+        import OptionsSettings
         # Assume that nothing will happen to trigger shutting down Transana
         self.shutDown = False
         # Remember the old Tab Size and Word Wrap values
@@ -2224,6 +2222,8 @@ class MenuWindow(wx.Frame):  # wx.MDIParentFrame
             
     def OnHelpAbout(self, evt):
         """ Handler for Help > About menu command """
+        # Import Transana About Box when it is first needed, rather than at start-up
+        import About
         # Display the About Box
         About.AboutBox()
 
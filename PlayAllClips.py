@@ -15,7 +15,8 @@
 #
 
 """ This module implements the PlayAllClips class, which is a controller window that handles
-    the "Play All Clips" in a Collection function. """
+    the "Play All Clips" in a Collection function, and the ClipPlaylist class, which prepares the
+    clips to be played ahead of time. """
 
 __author__ = 'David Woods <dwoods@transana.com>'
 
@@ -54,6 +55,60 @@ ID_BTNCANCEL         = wx.NewId()
 ID_BTNNEXT           = wx.NewId()
 
 
+class ClipPlaylist(object):
+    """ The list of clips Play All Clips will play.  The Collection labels for the whole list are resolved up front,
+        and the next Clip (with its transcripts) is loaded while the current one plays, so moving from one clip
+        to the next doesn't have to wait for the database. """
+
+    def __init__(self, clipList):
+        """ Initialize the Playlist.  clipList is a list of (Clip Number, Clip ID, Collection Number). """
+        self.clipList = clipList
+        # Get all Collections in a single query, as a dictionary of Collection Number : (Collection ID, Parent Number)
+        collections = {}
+        for (collNum, collID, parentNum) in DBInterface.list_of_all_collections():
+            collections[collNum] = (collID, parentNum)
+        # Build the Collection label for each Collection that has clips in the list
+        self.collectionLabels = {}
+        for (clipNum, clipID, collNum) in self.clipList:
+            if not self.collectionLabels.has_key(collNum):
+                self.collectionLabels[collNum] = self._BuildCollectionLabel(collections, collNum)
+        # A dictionary of playlist position : Clip object for clips that have been loaded ahead of time
+        self.prefetched = {}
+
+    def _BuildCollectionLabel(self, collections, collNum):
+        """ Build the nested Collection label, in the form of Collection.GetNodeString() """
+        nodes = []
+        while collections.has_key(collNum):
+            (collID, collNum) = collections[collNum]
+            nodes.insert(0, collID)
+        return ' > '.join(nodes)
+
+    def GetCollectionLabel(self, index):
+        """ Return the Collection label for the clip at position index in the playlist """
+        return self.collectionLabels.get(self.clipList[index][2], '')
+
+    def Prefetch(self, index):
+        """ Load the Clip at position index ahead of time, if it hasn't been loaded already """
+        # Only the next clip is kept, so drop anything else that was loaded
+        for key in self.prefetched.keys():
+            if key != index:
+                del(self.prefetched[key])
+        if (index < len(self.clipList)) and (not self.prefetched.has_key(index)):
+            try:
+                self.prefetched[index] = Clip.Clip(self.clipList[index][0])
+            # If the Clip can't be loaded now (it was deleted by another user in MU), GetClip() will report it.
+            except TransanaExceptions.RecordNotFoundError:
+                pass
+
+    def GetClip(self, index):
+        """ Return the Clip object for the clip at position index, using the pre-loaded Clip if there is one """
+        if self.prefetched.has_key(index):
+            clipObj = self.prefetched[index]
+            del(self.prefetched[index])
+            return clipObj
+        return Clip.Clip(self.clipList[index][0])
+
+
 class PlayAllClips(wx.Dialog):  # (wx.MDIChildFrame)
     """This object is responsible for controlling media playback when
     the "Play all Clips in a Collection" feature is selected.  It includes
@@ -323,6 +378,8 @@ class PlayAllClips(wx.Dialog):  # (wx.MDIChildFrame)
 
         # Point to the first clip in the list as the clip that should be played
         self.clipNowPlaying = 0
+        # Prepare the Playlist, which resolves the clip information we need up front
+        self.playlist = ClipPlaylist(self.clipList)
 
         # Add a Timer.  The timer checks to see if the clip that is playing has stopped, which
         # is the signal that it is time to load the next clip
@@ -377,13 +434,15 @@ class PlayAllClips(wx.Dialog):  # (wx.MDIChildFrame)
 
         # The original code doesn't work with the new video player infrastructure.  This is an attempt to start over.
 
-        # If the clip is playing, we don't do anything!
+        # If the clip is playing, the only thing we do is load the next clip while this one plays.
         if self.ControlObject.IsPlaying():
 
             if DEBUG:
                 print "Clip is playing."
             
             self.HasStartedPlaying = True
+            # clipNowPlaying already points to the NEXT clip.  Load it now, if it hasn't been loaded yet.
+            self.playlist.Prefetch(self.clipNowPlaying)
 
         # If a Clip is in the process of loading, we don't need to do anything but wait for it to finish loading
         elif self.ControlObject.IsLoading():
@@ -404,15 +463,13 @@ class PlayAllClips(wx.Dialog):  # (wx.MDIChildFrame)
             if DEBUG:
                 print "Clip isn't playing, paused, or loading.  We need to load the next clip!", self.clipNowPlaying, self.clipList[self.clipNowPlaying]
 
-            # Load the Collection the next Clip is from
-            tempColl = Collection.Collection(self.clipList[self.clipNowPlaying][2])
-            # Add a label that identifies the Collection
+            # Add a label that identifies the Collection the next Clip is from
             if 'unicode' in wx.PlatformInfo:
                 # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
                 prompt = unicode(_("Collection: %s"), 'utf8')
             else:
                 prompt = _("Collection: %s")
-            self.lblCollection.SetLabel(prompt % tempColl.GetNodeString())
+            self.lblCollection.SetLabel(prompt % self.playlist.GetCollectionLabel(self.clipNowPlaying))
             # If we're in PRESENT_ALL presentation mode ...
             if self.ControlObject.MenuWindow.menuBar.optionsmenu.IsChecked(MenuSetup.MENU_OPTIONS_PRESENT_ALL):
                 # Let's wrap the Collection Name to fit inside the window.  (Needed with the GetNodeString() change.)
@@ -440,9 +497,17 @@ class PlayAllClips(wx.Dialog):  # (wx.MDIChildFrame)
             try:
                 # Loading a Clip is slow.  Let's stop the timer, so it doesn't cause problems.  (It was with QuickTime video on Windows.)
                 self.playAllClipsTimer.Stop()
+                # Get the next Clip, which has usually been loaded while the previous clip was playing
+                clipObj = self.playlist.GetClip(self.clipNowPlaying)
+                # If the next clip uses the same media as this one, the media players will just be re-positioned,
+                # so the clip doesn't need the extra load time.
+                if self.ControlObject.UsesLoadedMedia(clipObj):
+                    loadTime = TIMER_INTERVAL
+                else:
+                    loadTime = TIMER_INTERVAL + EXTRA_LOAD_TIME
                 # Try to Load the next clip into the ControlObject
-                if not self.ControlObject.LoadClipByNumber(self.clipList[self.clipNowPlaying][0]):
-                    # If the Media File has been moved, this failed.  Try one more time.
+                if not self.ControlObject.LoadClipByNumber(self.clipList[self.clipNowPlaying][0], clipObj=clipObj):
+                    # If the Media File has been moved, this failed.  Try one more time, re-loading the Clip in case it was updated.
                     if not self.ControlObject.LoadClipByNumber(self.clipList[self.clipNowPlaying][0]):
                         # if it fails a second time, signal that Play All Clips should be stopped
                         # by setting the Clip List Pointer to the end of the list
@@ -456,7 +521,7 @@ class PlayAllClips(wx.Dialog):  # (wx.MDIChildFrame)
                 self.ControlObject.ShowDataTab(1)
 
                 # Now that the clip is loading, re-start the timer.  the extra 1.5 seconds give the clip time to load.
-                self.playAllClipsTimer.Start(TIMER_INTERVAL + EXTRA_LOAD_TIME)
+                self.playAllClipsTimer.Start(loadTime)
 
             # If a Clip cannot be found ...  (This should only happen in MU if a clip is deleted by another user.)
             except TransanaExceptions.RecordNotFoundError:
@@ -0,0 +1,427 @@
+# Copyright (C) 2002 - 2017 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+""" Generates synthetic Transana projects for load and scale testing.  Libraries, Episodes, Documents,
+    Transcripts (wxRichTextCtrl XML with time codes), Collections, Clips (with Clip Transcripts), Quotes,
+    Snapshots, Notes and Keywords are added to the current database with bulk inserts, one transaction per
+    Library.  The data comes from a random number seed, so the same seed always produces the same project.
+
+    Usage:  python ProjectGenerator.py [name=count ...] [seed=n] [database.db]
+
+      With the sqlite version of Transana, a new database file is created.  With the MySQL versions, the
+      Transana login dialog is displayed, and the project is added to the database selected there.
+      The counts that can be set (see GENERATOR_SIZE) are libraries, then episodes, documents, collections,
+      snapshots and notes per Library, transcripts per Episode, clips per Transcript, quotes per Document,
+      keywords in total, and itemKeywords, the keywords applied to each Episode, Document, Clip, Quote and
+      Snapshot.  For example, "python ProjectGenerator.py libraries=50 clips=100 big.db". """
+
+__author__ = 'David Woods <dwoods@transana.com>'
+
+DEBUG = False
+if DEBUG:
+    print "ProjectGenerator DEBUG is ON!!"
+
+# import wxPython
+import wx
+if __name__ == '__main__':
+    # Define the "_" method, pointing it to wxPython's GetTranslation method
+    __builtins__._ = wx.GetTranslation
+
+# import Python's os module
+import os
+# import Python's random module
+import random
+# import Python's sys module
+import sys
+
+# import Transana's Database Interface
+import DBInterface
+# import Transana's Constants
+import TransanaConstants
+# import Transana's Global Variables
+import TransanaGlobal
+
+# The default project size
+GENERATOR_SIZE = {'libraries' : 5,
+                  'episodes' : 10,
+                  'transcripts' : 1,
+                  'clips' : 10,
+                  'documents' : 5,
+                  'quotes' : 10,
+                  'collections' : 5,
+                  'snapshots' : 2,
+                  'notes' : 10,
+                  'keywords' : 100,
+                  'itemKeywords' : 3}
+# The default random number seed
+GENERATOR_SEED = 1
+# The number of paragraphs in each generated Transcript and Document
+PARAGRAPHS = 40
+# The number of paragraphs in each generated Clip Transcript
+CLIP_PARAGRAPHS = 3
+# The words used in generated text, UTF-8 encoded
+WORDS = ['the', 'student', 'teacher', 'said', 'answer', 'problem', 'because', 'think', 'we', 'group',
+         'geometry', 'angle', 'triangle', 'shape', 'measure', 'explain', 'why', 'how', 'really', 'and',
+         'caf\xc3\xa9', 'na\xc3\xafve', 'r\xc3\xa9sum\xc3\xa9', '\xe6\x95\xb0\xe6\x8d\xae', 'it\'s', '2.5', '1,000']
+
+# The start and end of a wxRichTextCtrl XML document
+XML_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<richtext version="1.0.0.0" xmlns="http://www.wxwidgets.org">
+  <paragraphlayout textcolor="#000000" bgcolor="#FFFFFF" fontsize="12" fontstyle="90" fontweight="90" fontunderlined="0" fontface="Courier New" alignment="1" leftindent="0" leftsubindent="0" rightindent="0" parspacingafter="10" parspacingbefore="0" linespacing="10">
+"""
+XML_FOOTER = """  </paragraphlayout>
+</richtext>
+"""
+# A paragraph that starts with a time code, which is the time code character in time code format followed by
+# the time in hidden format.  (See RichTextEditCtrl_RTC.StripTimeCodes().)
+XML_TIMECODE_PARAGRAPH = """    <paragraph>
+      <text textcolor="#FF0000" bgcolor="#FFFFFF" fontsize="14" fontstyle="90" fontweight="90" fontunderlined="0" fontface="Courier New">\xc2\xa4</text>
+      <text textcolor="#FFFFFF" bgcolor="#FFFFFF" fontsize="1" fontstyle="90" fontweight="90" fontunderlined="0" fontface="Times New Roman">&lt;%d&gt;</text>
+      <text textcolor="#000000" bgcolor="#FFFFFF" fontsize="12" fontstyle="90" fontweight="90" fontunderlined="0" fontface="Courier New">%s</text>
+    </paragraph>
+"""
+# A paragraph of plain text
+XML_PARAGRAPH = """    <paragraph>
+      <text textcolor="#000000" bgcolor="#FFFFFF" fontsize="12" fontstyle="90" fontweight="90" fontunderlined="0" fontface="Courier New">%s</text>
+    </paragraph>
+"""
+
+# The fields written to each table, and the field (if any) that gets the SERVER's time stamp
+TABLE_FIELDS = {'Series2' : (('SeriesNum', 'SeriesID', 'SeriesComment', 'SeriesOwner', 'DefaultKeywordGroup'), None),
+                'Episodes2' : (('EpisodeNum', 'EpisodeID', 'SeriesNum', 'TapingDate', 'MediaFile', 'EpLength', 'EpComment'), None),
+                'Transcripts2' : (('TranscriptNum', 'TranscriptID', 'EpisodeNum', 'SourceTranscriptNum', 'ClipNum', 'SortOrder',
+                                   'Transcriber', 'ClipStart', 'ClipStop', 'Comment', 'MinTranscriptWidth', 'RTFText', 'PlainText'),
+                                  'LastSaveTime'),
+                'Documents2' : (('DocumentNum', 'DocumentID', 'LibraryNum', 'Author', 'Comment', 'ImportedFile', 'ImportDate',
+                                 'DocumentLength', 'XMLText', 'PlainText'), 'LastSaveTime'),
+                'Collections2' : (('CollectNum', 'CollectID', 'ParentCollectNum', 'CollectComment', 'CollectOwner',
+                                   'DefaultKeywordGroup'), None),
+                'Clips2' : (('ClipNum', 'ClipID', 'CollectNum', 'EpisodeNum', 'MediaFile', 'ClipStart', 'ClipStop', 'ClipOffset',
+                             'Audio', 'ClipComment', 'SortOrder'), None),
+                'Quotes2' : (('QuoteNum', 'QuoteID', 'CollectNum', 'SourceDocumentNum', 'SortOrder', 'Comment', 'XMLText',
+                              'PlainText'), 'LastSaveTime'),
+                'QuotePositions2' : (('QuoteNum', 'DocumentNum', 'StartChar', 'EndChar'), None),
+                'Snapshots2' : (('SnapshotNum', 'SnapshotID', 'CollectNum', 'ImageFile', 'ImageScale', 'ImageCoordsX', 'ImageCoordsY',
+                                 'ImageSizeW', 'ImageSizeH', 'EpisodeNum', 'TranscriptNum', 'SnapshotTimeCode', 'SnapshotDuration',
+                                 'SnapshotComment', 'SortOrder'), 'LastSaveTime'),
+                'Notes2' : (('NoteNum', 'NoteID', 'SeriesNum', 'EpisodeNum', 'CollectNum', 'ClipNum', 'SnapshotNum', 'TranscriptNum',
+                             'DocumentNum', 'QuoteNum', 'NoteTaker', 'NoteText'), None),
+                'Keywords2' : (('KeywordGroup', 'Keyword', 'Definition', 'LineColorName', 'LineColorDef', 'DrawMode', 'LineWidth',
+                                'LineStyle'), None),
+                'ClipKeywords2' : (('EpisodeNum', 'DocumentNum', 'ClipNum', 'QuoteNum', 'SnapshotNum', 'KeywordGroup', 'Keyword',
+                                    'Example'), None),
+                'SnapshotKeywords2' : (('SnapshotNum', 'KeywordGroup', 'Keyword', 'x1', 'y1', 'x2', 'y2', 'visible'), None)}
+# The order in which the tables are written, parents before children
+TABLE_ORDER = ['Series2', 'Episodes2', 'Transcripts2', 'Documents2', 'Collections2', 'Clips2', 'Quotes2', 'QuotePositions2',
+               'Snapshots2', 'Notes2', 'Keywords2', 'ClipKeywords2', 'SnapshotKeywords2']
+# The record number field of each table that has one
+TABLE_KEYS = {'Series2' : 'SeriesNum', 'Episodes2' : 'EpisodeNum', 'Transcripts2' : 'TranscriptNum', 'Documents2' : 'DocumentNum',
+              'Collections2' : 'CollectNum', 'Clips2' : 'ClipNum', 'Quotes2' : 'QuoteNum', 'Snapshots2' : 'SnapshotNum',
+              'Notes2' : 'NoteNum'}
+
+
+def GenerateText(rnd, minWords, maxWords):
+    """ Return a UTF-8 encoded string of between minWords and maxWords random words """
+    return ' '.join([rnd.choice(WORDS) for loop in range(rnd.randint(minWords, maxWords))])
+
+def GenerateTranscript(rnd, startTime, endTime, paragraphs=PARAGRAPHS):
+    """ Return (XML text, plain text) for a Transcript running from startTime to endTime, with a time code
+        at the start of each paragraph """
+    xmlText = [XML_HEADER]
+    plainText = []
+    for paraNum in range(paragraphs):
+        text = GenerateText(rnd, 10, 60)
+        xmlText.append(XML_TIMECODE_PARAGRAPH % (startTime + (endTime - startTime) * paraNum / paragraphs, text))
+        plainText.append(text)
+    xmlText.append(XML_FOOTER)
+    return (''.join(xmlText), '\n'.join(plainText))
+
+def GenerateDocument(rnd, paragraphs=PARAGRAPHS):
+    """ Return (XML text, plain text, paragraph positions) for a Document.  The paragraph positions are a list of
+        the (start, end) character positions of each paragraph in the plain text, for positioning Quotes. """
+    xmlText = [XML_HEADER]
+    plainText = []
+    positions = []
+    position = 0
+    for paraNum in range(paragraphs):
+        text = GenerateText(rnd, 10, 60)
+        xmlText.append(XML_PARAGRAPH % text)
+        plainText.append(text)
+        # Positions are counted in characters, not UTF-8 bytes
+        length = len(text.decode('utf8'))
+        positions.append((position, position + length))
+        # Allow for the newline between paragraphs
+        position += length + 1
+    xmlText.append(XML_FOOTER)
+    return (''.join(xmlText), '\n'.join(plainText), positions)
+
+def CreateSQLiteDatabase(dbName):
+    """ Create an empty Transana database in the sqlite file dbName, with all of Transana's tables and
+        indexes, and make it the database DBInterface uses.  Returns the database connection. """
+    dbConn = DBInterface.ConnectSQLite(dbName)
+    # Make this the database that DBInterface.get_db() returns
+    DBInterface._dbref = dbConn
+    # Set the Max Allowed Packet setting for use with sqlite, as DBInterface.get_db() does when it opens an sqlite database
+    TransanaGlobal.max_allowed_packet = 2147483647
+    # The table creation queries need the table type flag, which DBInterface.establish_db_exists() sets when
+    # it opens a database.  It has no meaning for sqlite, so set it the way establish_db_exists() does.
+    TransanaGlobal.hasInnoDB = True
+    dbCursor = dbConn.cursor()
+    dbCursor.execute("CREATE TABLE IF NOT EXISTS ConfigInfo (KeyVal VARCHAR(25), Value VARCHAR(255), PRIMARY KEY (KeyVal))")
+    # Mark the database as a current version database, as establish_db_exists() does for a new database
+    dbCursor.execute("INSERT INTO ConfigInfo (KeyVal, Value) VALUES ('DBVersion', '301')")
+    for createQuery in [DBInterface.CreateLibraryTableQuery, DBInterface.CreateEpisodesTableQuery, DBInterface.CreateTranscriptsTableQuery,
+                        DBInterface.CreateCollectionsTableQuery, DBInterface.CreateClipsTableQuery, DBInterface.CreateSnapshotsTableQuery,
+                        DBInterface.CreateDocumentsTableQuery, DBInterface.CreateQuotesTableQuery, DBInterface.CreateQuotePositionsTableQuery,
+                        DBInterface.CreateNotesTableQuery, DBInterface.CreateKeywordsTableQuery, DBInterface.CreateClipKeywordsTableQuery,
+                        DBInterface.CreateSnapshotKeywordsTableQuery, DBInterface.CreateSnapshotKeywordStylesTableQuery,
+                        DBInterface.CreateCoreDataTableQuery, DBInterface.CreateFiltersTableQuery, DBInterface.CreateAdditionalVidsTableQuery,
+                        DBInterface.CreateSynonymsTableQuery]:
+        dbCursor.execute(createQuery(2))
+    DBInterface.CreateSecondaryIndexes(dbCursor)
+    dbCursor.close()
+    return dbConn
+
+
+class ProjectGenerator(object):
+    """ Adds a generated project to the current database.  Record numbers start after the largest ones already
+        in use, so a project can be added to a database that already holds data. """
+
+    def __init__(self, size=GENERATOR_SIZE, seed=GENERATOR_SEED):
+        """ Initialize the Project Generator.  size is a dictionary of counts (see GENERATOR_SIZE).  Counts
+            that are left out use the default values. """
+        self.size = GENERATOR_SIZE.copy()
+        self.size.update(size)
+        self.rnd = random.Random(seed)
+        # The rows waiting to be written, by table
+        self.rows = {}
+        # The number of rows written to each table
+        self.counts = dict([(table, 0) for table in TABLE_ORDER])
+        # The next record number to use in each table
+        self.nextNum = {}
+        # The (Keyword Group, Keyword) pairs used by the project
+        self.keywords = []
+        # The next sort order value for each Collection
+        self.sortOrders = {}
+
+    def Generate(self, progressCallback=None):
+        """ Generate the project.  If progressCallback is given, it is called with (libraries done, total libraries)
+            after each Library is written.  Returns a dictionary of the number of records written to each table. """
+        self._GetNextNumbers()
+        self._GenerateKeywords()
+        self._Flush()
+        for libraryIndex in range(self.size['libraries']):
+            self._GenerateLibrary()
+            # Each Library is written in its own transaction, so memory use doesn't grow with the project size
+            self._Flush()
+            if progressCallback != None:
+                progressCallback(libraryIndex + 1, self.size['libraries'])
+        return self.counts
+
+    def _GetNextNumbers(self):
+        """ Find the first unused record number in each table """
+        dbCursor = DBInterface.get_db().cursor()
+        for (table, keyField) in TABLE_KEYS.items():
+            dbCursor.execute('SELECT MAX(%s) FROM %s' % (keyField, table))
+            maxNum = dbCursor.fetchone()[0]
+            # An empty table returns None
+            if maxNum == None:
+                maxNum = 0
+            self.nextNum[table] = maxNum + 1
+        dbCursor.close()
+
+    def _NewNum(self, table):
+        """ Return the next record number for a table """
+        num = self.nextNum[table]
+        self.nextNum[table] += 1
+        return num
+
+    def _Add(self, table, row):
+        """ Add a row to be written to a table """
+        if not self.rows.has_key(table):
+            self.rows[table] = []
+        self.rows[table].append(row)
+
+    def _Flush(self):
+        """ Write all the waiting rows in a single transaction, with one bulk insert per table """
+        def InsertAll():
+            for table in TABLE_ORDER:
+                if self.rows.has_key(table):
+                    (fields, timeStampField) = TABLE_FIELDS[table]
+                    DBInterface.BulkInsert(table, fields, self.rows[table], timeStampField)
+        DBInterface.RunInTransaction(InsertAll)
+        for table in self.rows.keys():
+            self.counts[table] += len(self.rows[table])
+        self.rows = {}
+
+    def _NextSortOrder(self, collectNum):
+        """ Return the next sort order value for an item added to a Collection """
+        self.sortOrders[collectNum] = self.sortOrders.get(collectNum, 0) + 1
+        return self.sortOrders[collectNum]
+
+    def _AddKeywords(self, episodeNum=0, documentNum=0, clipNum=0, quoteNum=0, snapshotNum=0):
+        """ Apply randomly chosen keywords to a record.  Returns the keywords applied. """
+        keywords = self.rnd.sample(self.keywords, min(self.size['itemKeywords'], len(self.keywords)))
+        for (kwg, kw) in keywords:
+            self._Add('ClipKeywords2', (episodeNum, documentNum, clipNum, quoteNum, snapshotNum, kwg, kw, '0'))
+        return keywords
+
+    def _GenerateKeywords(self):
+        """ Generate the Keywords, skipping any the database already has """
+        dbCursor = DBInterface.get_db().cursor()
+        dbCursor.execute('SELECT KeywordGroup, Keyword FROM Keywords2')
+        existing = set([(kwg, kw) for (kwg, kw) in dbCursor.fetchall()])
+        dbCursor.close()
+        for kwNum in range(self.size['keywords']):
+            keyword = ('Group %02d' % (kwNum / 10), 'Keyword %03d' % kwNum)
+            self.keywords.append(keyword)
+            if not keyword in existing:
+                self._Add('Keywords2', keyword + (GenerateText(self.rnd, 5, 15), '', '', '', 0, ''))
+
+    def _GenerateLibrary(self):
+        """ Generate one Library and everything in it """
+        rnd = self.rnd
+        libraryNum = self._NewNum('Series2')
+        libraryID = 'Library %d' % libraryNum
+        self._Add('Series2', (libraryNum, libraryID, GenerateText(rnd, 3, 10), 'Generator', 'Group 00'))
+        # The first Collection shares the Library's name.  The others are nested inside it.
+        collectNums = []
+        for collectionIndex in range(max(self.size['collections'], 1)):
+            collectNum = self._NewNum('Collections2')
+            if collectionIndex == 0:
+                (collectionID, parentNum) = (libraryID, 0)
+            else:
+                (collectionID, parentNum) = ('Collection %d' % collectNum, collectNums[0])
+            self._Add('Collections2', (collectNum, collectionID, parentNum, GenerateText(rnd, 3, 10), 'Generator', 'Group 00'))
+            collectNums.append(collectNum)
+        # Lists of (table, record number) that Notes can be attached to
+        noteTargets = [('Series2', libraryNum)] + [('Collections2', collectNum) for collectNum in collectNums]
+
+        for episodeIndex in range(self.size['episodes']):
+            episodeNum = self._NewNum('Episodes2')
+            episodeLength = rnd.randint(600000, 3600000)
+            mediaFile = 'media%d.mp4' % episodeNum
+            self._Add('Episodes2', (episodeNum, 'Episode %d' % episodeNum, libraryNum, '2017-01-01', mediaFile, episodeLength,
+                                    GenerateText(rnd, 3, 10)))
+            self._AddKeywords(episodeNum=episodeNum)
+            noteTargets.append(('Episodes2', episodeNum))
+            transcriptNums = []
+            for transcriptIndex in range(self.size['transcripts']):
+                transcriptNum = self._NewNum('Transcripts2')
+                (xmlText, plainText) = GenerateTranscript(rnd, 0, episodeLength)
+                self._Add('Transcripts2', (transcriptNum, 'Transcript %d' % transcriptNum, episodeNum, 0, 0, 0, 'Generator',
+                                           0, episodeLength, '', 0, xmlText, plainText))
+                transcriptNums.append(transcriptNum)
+                noteTargets.append(('Transcripts2', transcriptNum))
+                for clipIndex in range(self.size['clips']):
+                    clipNum = self._NewNum('Clips2')
+                    clipStart = rnd.randint(0, episodeLength - 60000)
+                    clipStop = clipStart + rnd.randint(5000, 60000)
+                    collectNum = rnd.choice(collectNums)
+                    self._Add('Clips2', (clipNum, 'Clip %d' % clipNum, collectNum, episodeNum, mediaFile, clipStart, clipStop,
+                                         0, 1, GenerateText(rnd, 3, 10), self._NextSortOrder(collectNum)))
+                    # Each Clip has a Clip Transcript taken from the Episode Transcript
+                    clipTranscriptNum = self._NewNum('Transcripts2')
+                    (xmlText, plainText) = GenerateTranscript(rnd, clipStart, clipStop, CLIP_PARAGRAPHS)
+                    self._Add('Transcripts2', (clipTranscriptNum, 'Clip %d' % clipNum, episodeNum, transcriptNum, clipNum, 0,
+                                               'Generator', clipStart, clipStop, '', 0, xmlText, plainText))
+                    self._AddKeywords(clipNum=clipNum)
+                    noteTargets.append(('Clips2', clipNum))
+            for snapshotIndex in range(self.size['snapshots']):
+                snapshotNum = self._NewNum('Snapshots2')
+                collectNum = rnd.choice(collectNums)
+                if len(transcriptNums) > 0:
+                    transcriptNum = transcriptNums[0]
+                else:
+                    transcriptNum = 0
+                self._Add('Snapshots2', (snapshotNum, 'Snapshot %d' % snapshotNum, collectNum, 'image%d.jpg' % snapshotNum,
+                                         1.0, 0.0, 0.0, 800, 600, episodeNum, transcriptNum, rnd.randint(0, episodeLength),
+                                         0, GenerateText(rnd, 3, 10), self._NextSortOrder(collectNum)))
+                # Snapshot keywords are drawn as rectangles on the image
+                for (kwg, kw) in self._AddKeywords(snapshotNum=snapshotNum):
+                    (x1, y1) = (rnd.randint(0, 700), rnd.randint(0, 500))
+                    self._Add('SnapshotKeywords2', (snapshotNum, kwg, kw, x1, y1, x1 + rnd.randint(10, 100), y1 + rnd.randint(10, 100), '1'))
+                noteTargets.append(('Snapshots2', snapshotNum))
+
+        for documentIndex in range(self.size['documents']):
+            documentNum = self._NewNum('Documents2')
+            (xmlText, plainText, positions) = GenerateDocument(rnd)
+            self._Add('Documents2', (documentNum, 'Document %d' % documentNum, libraryNum, 'Generator', GenerateText(rnd, 3, 10),
+                                     '', '2017-01-01 00:00:00', len(plainText.decode('utf8')), xmlText, plainText))
+            self._AddKeywords(documentNum=documentNum)
+            noteTargets.append(('Documents2', documentNum))
+            for quoteIndex in range(self.size['quotes']):
+                quoteNum = self._NewNum('Quotes2')
+                collectNum = rnd.choice(collectNums)
+                # Each Quote is one paragraph of its Document
+                paraNum = rnd.randint(0, len(positions) - 1)
+                text = plainText.split('\n')[paraNum]
+                self._Add('Quotes2', (quoteNum, 'Quote %d' % quoteNum, collectNum, documentNum, self._NextSortOrder(collectNum),
+                                      GenerateText(rnd, 3, 10), XML_HEADER + XML_PARAGRAPH % text + XML_FOOTER, text))
+                self._Add('QuotePositions2', (quoteNum, documentNum) + positions[paraNum])
+                self._AddKeywords(quoteNum=quoteNum)
+                noteTargets.append(('Quotes2', quoteNum))
+
+        # Notes are attached to randomly chosen records in the Library
+        noteFields = ['Series2', 'Episodes2', 'Collections2', 'Clips2', 'Snapshots2', 'Transcripts2', 'Documents2', 'Quotes2']
+        for noteIndex in range(self.size['notes']):
+            noteNum = self._NewNum('Notes2')
+            (table, recNum) = rnd.choice(noteTargets)
+            nums = tuple([(table == noteField) and recNum or 0 for noteField in noteFields])
+            self._Add('Notes2', (noteNum, 'Note %d' % noteNum) + nums + ('Generator', GenerateText(rnd, 20, 200)))
+
+
+if __name__ == '__main__':
+    # Get the counts, the seed and the database file name from the command line
+    size = {}
+    seed = GENERATOR_SEED
+    dbName = None
+    for arg in sys.argv[1:]:
+        if '=' in arg:
+            (name, count) = arg.split('=', 1)
+            if name == 'seed':
+                seed = int(count)
+            elif GENERATOR_SIZE.has_key(name):
+                size[name] = int(count)
+            else:
+                print __doc__
+                sys.exit(1)
+        else:
+            dbName = arg
+    # Create a wx.App, which wxPython needs before the Configuration Data can be loaded
+    app = wx.App(False)
+    # import Transana's Configuration Data (only needed here)
+    import ConfigData
+    TransanaGlobal.configData = ConfigData.ConfigData()
+    # If we're using sqlite ...
+    if TransanaConstants.DBInstalled in ['sqlite3']:
+        # ... we need a new database file
+        if (dbName == None) or os.path.exists(dbName):
+            print "Please specify a new database file name."
+            sys.exit(1)
+        CreateSQLiteDatabase(dbName)
+    # If we're using MySQL, the user logs in to the database that gets the project
+    elif not DBInterface.establish_db_exists():
+        sys.exit(1)
+
+    def ReportProgress(done, total):
+        """ Report progress to the console """
+        print "Library %d of %d" % (done, total)
+
+    counts = ProjectGenerator(size, seed).Generate(ReportProgress)
+    for table in TABLE_ORDER:
+        print "%-20s %10d" % (table, counts[table])
+    DBInterface.close_db()
@@ -30,6 +30,8 @@ import sys
 import Clip
 # import Transana's Database interface
 import DBInterface
+# import Transana's Episode Segment Index
+import EpisodeSegmentIndex
 # import Transana's Miscellaneous functions
 import Misc
 # import Transana's Quote object
@@ -519,7 +521,8 @@ class PropagateClipChanges(wx.Dialog):
             # Iterate through the list of Quotes, loading the objects, locking what can be locked, and noting what cannot
             # be locked.
             for obj in objList:
-                dataObj = Quote.Quote(num = obj[0])
+                # The Quote's text isn't needed, as it is replaced
+                dataObj = Quote.Quote(num = obj[0], skipText=True)
                 try:
                     dataObj.lock_record()
                     unlockedObjects[dataObj.number] = dataObj
@@ -536,21 +539,12 @@ class PropagateClipChanges(wx.Dialog):
 
             # ... otherwise we have to handle requests from multiple transcripts ...
             else:
-                # Initialize the objList
-                objList = []
-                # Iterate through all the transcripts from the original clip
-                for objListTranscriptIndex in range(len(originalObj.transcripts)):
-                    # Request clips that are copies of the current clip for the indicated transcript
-                    tempobjList = DBInterface.list_of_clip_copies(originalObj.id, originalObj.transcripts[objListTranscriptIndex].source_transcript, originalObj.transcripts[objListTranscriptIndex].clip_start, originalObj.transcripts[objListTranscriptIndex].clip_stop)
-                    # Iterate through the clips in this list
-                    for objListData in tempobjList:
-                        needToAdd = True
-                        for objListData2 in objList:
-                            if objListData[:3] == objListData2[:3]:
-                                needToAdd = False
-                                break
-                        if needToAdd:
-                            objList.append(objListData)
+                # Build the lineage (source transcript, start, and stop) of all the transcripts from the original clip
+                lineage = []
+                for tr in originalObj.transcripts:
+                    lineage.append((tr.source_transcript, tr.clip_start, tr.clip_stop))
+                # Request clips that are copies of the current clip for any of its transcripts.  Each clip is listed once.
+                objList = DBInterface.list_of_clip_copies_by_lineage(originalObj.id, lineage)
 
             # If we have NO Transcript Index ...
             if sourceTranscriptIndex == -1:
@@ -589,10 +583,24 @@ class PropagateClipChanges(wx.Dialog):
             self.memo.AppendText(prompt % originalObj.id)
         # If there are data objects to process ...
         else:
-            # Let's start a database Transaction
-            # First, let's get a database cursor
-            dbCursor = DBInterface.get_db().cursor()
-            dbCursor.execute('BEGIN')
+            # Changes are not saved as each object is processed.  Instead, the changes the user accepts are saved for all
+            # objects at once, in a single transaction, after all objects have been processed.  If the user presses
+            # CANCEL, nothing needs to be undone in the database.
+            # The objects to be saved, by object number
+            updatedObjects = {}
+            # The new text of the Clip Transcripts to be saved, by transcript number
+            transcriptUpdates = {}
+            # The new keywords of the Clips whose keywords are replaced, by clip number
+            keywordUpdates = {}
+            # If the object ID has changed, find the Collections where an object with the new ID already exists.
+            # Objects in these Collections cannot be updated.
+            if newObjID != originalObj.id:
+                idConflicts = DBInterface.list_of_collections_with_item_id(newObjID, [dataObj.collection_num for dataObj in unlockedObjects.values()])
+            else:
+                idConflicts = {}
+            # Get the Keyword Examples for all the Clips at once.  We don't want to lose this information in the propagation.
+            if objType == 'Clip':
+                keywordExamplesByClip = DBInterface.list_keyword_examples_for_clips(unlockedObjects.keys())
             # We need to track MU Messages to be sent.  This way, if the CANCEL button is pressed, we can skip the messages!
             messageCache = []
             
@@ -611,6 +619,7 @@ class PropagateClipChanges(wx.Dialog):
                         recordLockedPrompt = unicode(_('ERROR: Quote "%s" in Collection "%s" is locked and cannot be updated.'), 'utf8')
                         saveErrorPrompt = unicode(_('ERROR: Save error "%s" for Quote "%s" in Collection "%s"'), 'utf8')
                         cancelMessageText = _("Quote Change Propagation was cancelled.  Therefore, no Quotes were updated.")
+                        duplicateIDPrompt = unicode(_('A Clip or Quote named "%s" already exists in this Collection.'), 'utf8')
                         
                         # If the Quote was NOT locked when we started ...
                         if unlockedObjects.has_key(obj[0]):
@@ -633,6 +642,9 @@ class PropagateClipChanges(wx.Dialog):
                                     acceptAll = True
                             # If the user presses "Update" (OK) or has pressed "Update All" ...
                             if acceptAll or (results == wx.ID_OK):
+                                # If the Quote's Collection already has an object with the new ID, the Quote can't be updated
+                                if idConflicts.has_key(dataObj.collection_num):
+                                    raise TransanaExceptions.SaveError, duplicateIDPrompt % newObjID
                                 # update the Quote ID
                                 dataObj.id = newObjID
                                 # substitute the new transcript text for the old text
@@ -645,8 +657,8 @@ class PropagateClipChanges(wx.Dialog):
                                     # ... add it as a non-example keyword
                                     dataObj.add_keyword(clipKeyword.keywordGroup, clipKeyword.keyword)
 
-                                # Save the Quote
-                                dataObj.db_save(use_transactions=False)
+                                # Remember the Quote.  It gets saved with the other Quotes once all Quotes have been processed.
+                                updatedObjects[dataObj.number] = dataObj
 
                                 # Finally, indicate success in the Report
                                 prompt = unicode(_('Quote "%s" in Collection "%s" has been updated.'), 'utf8')
@@ -665,14 +677,16 @@ class PropagateClipChanges(wx.Dialog):
                                 # ... we should STOP processing Quotes!  So stop iterating!
                                 break
 
-                            # unlock the Quote, regardless of how it is processed
-                            dataObj.unlock_record()
+                            # unlock the Quote, unless it still needs to be saved
+                            if not updatedObjects.has_key(dataObj.number):
+                                dataObj.unlock_record()
 
                     elif objType == 'Clip':
                         
                         recordLockedPrompt = unicode(_('ERROR: Clip "%s" in Collection "%s" is locked and cannot be updated.'), 'utf8')
                         saveErrorPrompt = unicode(_('ERROR: Save error "%s" for Clip "%s" in Collection "%s"'), 'utf8')
                         cancelMessageText = _("Clip Change Propagation was cancelled.  Therefore, no clips were updated.")
+                        duplicateIDPrompt = unicode(_('A Clip or Quote named "%s" already exists in this Collection.'), 'utf8')
 
                         # If the Clip was NOT locked when we started ...
                         if unlockedObjects.has_key(obj[0]):
@@ -740,13 +754,18 @@ class PropagateClipChanges(wx.Dialog):
                                         acceptAll = True
                                 # If the user presses "Update" (OK) or has pressed "Update All" ...
                                 if acceptAll or (results == wx.ID_OK):
-                                    # Get a list of Keyword Examples for the current clip.  We don't want to lose this information in the propagation.
-                                    keywordExamples = DBInterface.list_all_keyword_examples_for_a_clip(obj[0])
+                                    # Get the list of Keyword Examples for the current clip.
+                                    keywordExamples = keywordExamplesByClip.get(obj[0], [])
+                                    # If the Clip's Collection already has an object with the new ID, the Clip can't be updated
+                                    if idConflicts.has_key(dataObj.collection_num):
+                                        raise TransanaExceptions.SaveError, duplicateIDPrompt % newObjID
                                     # update the Clip ID
                                     dataObj.id = newObjID
                                     # substitute the new transcript text for the old text
                                     dataObj.transcripts[key].text = trIndex[key]['tr']
                                     dataObj.transcripts[key].plaintext = trIndex[key]['pl']
+                                    # Remember the transcript's new text for saving
+                                    transcriptUpdates[dataObj.transcripts[key].number] = (trIndex[key]['tr'], trIndex[key]['pl'])
                                     if (sourceTranscriptIndex > -1) or (key == 0):
                                         # Clear the old keywords from the clip
                                         dataObj.clear_keywords()
@@ -771,9 +790,11 @@ class PropagateClipChanges(wx.Dialog):
                                                 prompt = unicode(_('Clip "%s" in collection "%s" retained keyword "%s : %s" because it is a keyword example.'), 'utf8') + u'\n\n'
                                                 # Add the prompt to the memo to communicate this to the user.
                                                 self.memo.AppendText(prompt % (oldDataID, dataObj.GetNodeString(False), kw[0], kw[1]))
+                                        # Remember the Clip's new keywords for saving
+                                        keywordUpdates[dataObj.number] = [(kw.keywordGroup, kw.keyword, kw.example) for kw in dataObj.keyword_list]
 
-                                    # Save the Clip
-                                    dataObj.db_save(use_transactions=False)
+                                    # Remember the Clip.  It gets saved with the other Clips once all Clips have been processed.
+                                    updatedObjects[dataObj.number] = dataObj
 
                                     # Finally, indicate success in the Report
                                     prompt = unicode(_('Transcript %d of clip "%s" in collection "%s" has been updated.'), 'utf8')
@@ -792,8 +813,9 @@ class PropagateClipChanges(wx.Dialog):
                                     # ... we should STOP processing Clips!  So stop iterating!
                                     break
                                 
-                            # unlock the clip, regardless of how it is processed
-                            dataObj.unlock_record()
+                            # unlock the clip, unless it still needs to be saved
+                            if not updatedObjects.has_key(dataObj.number):
+                                dataObj.unlock_record()
                                 
                     # Initialize the Chat Message
                     msg = ""
@@ -869,9 +891,6 @@ class PropagateClipChanges(wx.Dialog):
                             if TransanaGlobal.chatWindow != None:
                                 messageCache.append("RN %s" % msg)
 
-                    # See if the Keyword visualization needs to be updated.
-                    parent.ControlObject.UpdateKeywordVisualization()
-                            
                     # Now let's communicate with other Transana instances if we're in Multi-user mode
                     if not TransanaConstants.singleUserVersion:
                         if objType == 'Quote':
@@ -914,125 +933,155 @@ class PropagateClipChanges(wx.Dialog):
                     # ... we should STOP processing Clips!  So stop iterating!
                     break
 
-            # If the user pressed Cancel ...
-            if results == wx.ID_CANCEL:
-                # ... undo Data Object changes in the database ...
-                dbCursor.execute("ROLLBACK")
-
-                # If the user presses Cancel, we have to reverse the changes that have already been made to the
-                # user interface (local and MU).  This probably isn't a great model (change, then undo if Cancelled),
-                # but cancel should be rare.
-                # So first, iterate through the Undo list to see what records need to be undone.
-                for undoRec in undoData:
-
-                    # If the record is a Quote or a Clip record ...
-                    if undoRec[0] in ['Quote', 'Clip']:
-                        # ... assemble the node list based on the values in the Undo record
-                        nodeList = (_("Collections"),) + undoRec[5] + (undoRec[3],)
-                        if undoRec[0] == 'Quote':
-                            # Rename the correct Tree node
-                            parent.tree.rename_Node(nodeList, 'QuoteNode', undoRec[4])
-                            msg = "QuoteNode"
-                        elif undoRec[0] == 'Clip':
-                            # Rename the correct Tree node
-                            parent.tree.rename_Node(nodeList, 'ClipNode', undoRec[4])
-                            msg = "ClipNode"
-
-                        # If we're in the Multi-User mode, we need to send a message about the change
-                        if not TransanaConstants.singleUserVersion:
-                            # The first parameter is the Node Type.  The second one is the UNTRANSLATED root node.
-                            # This must be untranslated to avoid problems in mixed-language environments.
-                            # Prepend these on the Messsage
-                            msg += " >|< Collections >|< "
-                            for node in nodeList[1:]:
-                                # Prepend the new Node's name on the Message with the appropriate seperator
-                                msg += node + ' >|< ' 
-                            # Begin constructing the message with the old and new names for the node
-                            msg += undoRec[4]
-
-                            if DEBUG:
-                                print 'Message to send = "RN %s"' % msg.encode('latin1')
-                                print
-
-                            # Cache the Rename Node message for later processing
-                            if TransanaGlobal.chatWindow != None:
-                                messageCache.append("RN %s" % msg)
-
-                    # If the record is a Keyword Example record ...
-                    elif undoRec[0] == 'KWE':
-                        # .. Build the Keyword Example Node List for the OLD Clip ID
-                        nodeList = (_('Keywords'), undoRec[5], undoRec[6], undoRec[3])
-                        # Select the Keyword Example Node
-                        exampleNode = parent.tree.select_Node(nodeList, 'KeywordExampleNode')
-                        # Update the Keyword Example Node to the NEW Clip ID
-                        parent.tree.SetItemText(exampleNode, undoRec[4])
-                        # If we're in the Multi-User mode, we need to send a message about the change
+            # If the user didn't press Cancel and accepted changes ...
+            if (results != wx.ID_CANCEL) and (len(updatedObjects) > 0):
+                # ... save all the accepted changes in a single transaction
+                try:
+                    if objType == 'Quote':
+                        DBInterface.RunInTransaction(DBInterface.propagate_quote_changes, newObjID, updatedObjects.keys(), newText,
+                                                     newPlainText, [(kw.keywordGroup, kw.keyword) for kw in newKeywordList])
+                    elif objType == 'Clip':
+                        DBInterface.RunInTransaction(DBInterface.propagate_clip_changes, newObjID, updatedObjects.keys(),
+                                                     transcriptUpdates, keywordUpdates)
+                        # Displayed Episode Items may have changed, so the Episode Segment Indexes must be reloaded
+                        EpisodeSegmentIndex.Invalidate()
+                # If the changes can't be saved, none of them have been.  The changes to the interface have to be
+                # undone, just as if the user had pressed Cancel.
+                except TransanaExceptions.SaveError, e:
+                    results = wx.ID_CANCEL
+                    cancelMessageText = e.reason + u'\n\n' + unicode(cancelMessageText, 'utf8')
+                # A database error means none of the changes have been saved either, and is handled the same way
+                except DBInterface.DBError, e:
+                    results = wx.ID_CANCEL
+                    cancelMessageText = u'%s\n\n' % e + unicode(cancelMessageText, 'utf8')
+
+            # The records locked for saving must be unlocked, even if something goes wrong
+            try:
+                # If the user pressed Cancel ...
+                if results == wx.ID_CANCEL:
+                    # If the user presses Cancel, we have to reverse the changes that have already been made to the
+                    # user interface (local and MU).  This probably isn't a great model (change, then undo if Cancelled),
+                    # but cancel should be rare.
+                    # So first, iterate through the Undo list to see what records need to be undone.
+                    for undoRec in undoData:
+
+                        # If the record is a Quote or a Clip record ...
+                        if undoRec[0] in ['Quote', 'Clip']:
+                            # ... assemble the node list based on the values in the Undo record
+                            nodeList = (_("Collections"),) + undoRec[5] + (undoRec[3],)
+                            if undoRec[0] == 'Quote':
+                                # Rename the correct Tree node
+                                parent.tree.rename_Node(nodeList, 'QuoteNode', undoRec[4])
+                                msg = "QuoteNode"
+                            elif undoRec[0] == 'Clip':
+                                # Rename the correct Tree node
+                                parent.tree.rename_Node(nodeList, 'ClipNode', undoRec[4])
+                                msg = "ClipNode"
+
+                            # If we're in the Multi-User mode, we need to send a message about the change
+                            if not TransanaConstants.singleUserVersion:
+                                # The first parameter is the Node Type.  The second one is the UNTRANSLATED root node.
+                                # This must be untranslated to avoid problems in mixed-language environments.
+                                # Prepend these on the Messsage
+                                msg += " >|< Collections >|< "
+                                for node in nodeList[1:]:
+                                    # Prepend the new Node's name on the Message with the appropriate seperator
+                                    msg += node + ' >|< ' 
+                                # Begin constructing the message with the old and new names for the node
+                                msg += undoRec[4]
+
+                                if DEBUG:
+                                    print 'Message to send = "RN %s"' % msg.encode('latin1')
+                                    print
+
+                                # Cache the Rename Node message for later processing
+                                if TransanaGlobal.chatWindow != None:
+                                    messageCache.append("RN %s" % msg)
+
+                        # If the record is a Keyword Example record ...
+                        elif undoRec[0] == 'KWE':
+                            # .. Build the Keyword Example Node List for the OLD Clip ID
+                            nodeList = (_('Keywords'), undoRec[5], undoRec[6], undoRec[3])
+                            # Select the Keyword Example Node
+                            exampleNode = parent.tree.select_Node(nodeList, 'KeywordExampleNode')
+                            # Update the Keyword Example Node to the NEW Clip ID
+                            parent.tree.SetItemText(exampleNode, undoRec[4])
+                            # If we're in the Multi-User mode, we need to send a message about the change
+                            if not TransanaConstants.singleUserVersion:
+                                # Begin constructing the message with the old and new names for the node
+                                msg = " >|< %s >|< %s" % (undoRec[2], undoRec[3])
+                                # Get the full Node Branch by climbing it to two levels above the root
+                                while (parent.tree.GetItemParent(parent.tree.GetItemParent(exampleNode)) != parent.tree.GetRootItem()):
+                                    # Update the selected node indicator
+                                    exampleNode = parent.tree.GetItemParent(exampleNode)
+                                    # Prepend the new Node's name on the Message with the appropriate seperator
+                                    msg = ' >|< ' + parent.tree.GetItemText(exampleNode) + msg
+                                # The first parameter is the Node Type.  The second one is the UNTRANSLATED root node.
+                                # This must be untranslated to avoid problems in mixed-language environments.
+                                # Prepend these on the Messsage
+                                msg = "KeywordExampleNode >|< Keywords" + msg
+
+                                if DEBUG:
+                                    print 'Message to send = "RN %s"' % msg
+
+                                # Cache the Rename Node message for later processing
+                                if TransanaGlobal.chatWindow != None:
+                                    messageCache.append("RN %s" % msg)
+
+                        # Now let's communicate with other Transana instances if we're in Multi-user mode
                         if not TransanaConstants.singleUserVersion:
-                            # Begin constructing the message with the old and new names for the node
-                            msg = " >|< %s >|< %s" % (undoRec[2], undoRec[3])
-                            # Get the full Node Branch by climbing it to two levels above the root
-                            while (parent.tree.GetItemParent(parent.tree.GetItemParent(exampleNode)) != parent.tree.GetRootItem()):
-                                # Update the selected node indicator
-                                exampleNode = parent.tree.GetItemParent(exampleNode)
-                                # Prepend the new Node's name on the Message with the appropriate seperator
-                                msg = ' >|< ' + parent.tree.GetItemText(exampleNode) + msg
-                            # The first parameter is the Node Type.  The second one is the UNTRANSLATED root node.
-                            # This must be untranslated to avoid problems in mixed-language environments.
-                            # Prepend these on the Messsage
-                            msg = "KeywordExampleNode >|< Keywords" + msg
+                            # Build the message to update Keyword Visualizations.
+                            msg = '%s %d' % (objType, undoRec[1])
 
                             if DEBUG:
-                                print 'Message to send = "RN %s"' % msg
+                                print 'Message to send = "UKL %s"' % msg
 
-                            # Cache the Rename Node message for later processing
                             if TransanaGlobal.chatWindow != None:
-                                messageCache.append("RN %s" % msg)
-
-                    # Now let's communicate with other Transana instances if we're in Multi-user mode
-                    if not TransanaConstants.singleUserVersion:
-                        # Build the message to update Keyword Visualizations.
-                        msg = '%s %d' % (objType, undoRec[1])
-
-                        if DEBUG:
-                            print 'Message to send = "UKL %s"' % msg
-
-                        if TransanaGlobal.chatWindow != None:
-                            # Cache the Update Keywords messages for later processing
-                            messageCache.append("UKL %s" % msg)
-                            messageCache.append("UKV %s %s" % (msg, undoRec[2]))
+                                # Cache the Update Keywords messages for later processing
+                                messageCache.append("UKL %s" % msg)
+                                messageCache.append("UKV %s %s" % (msg, undoRec[2]))
                 
-                # ... and inform the user that the changes were cancelled.  To avoid confusion, clear the report information already generated.
-                self.memo.Clear()
-                self.memo.AppendText(cancelMessageText)
-
-                # Get each locked object ...
-                for dataObj in unlockedObjects.values():
-                    # ... unlock the records
-#                    if dataObj._isLocked:
-                    dataObj.unlock_record()
+                    # ... and inform the user that the changes were cancelled.  To avoid confusion, clear the report information already generated.
+                    self.memo.Clear()
+                    self.memo.AppendText(cancelMessageText)
+
+                    # Get each locked object ...
+                    for dataObj in unlockedObjects.values():
+                        # ... unlock the records
+    #                    if dataObj._isLocked:
+                        dataObj.unlock_record()
+
+                # If the user pressed anything except Cancel ...
+                else:
+                    # Get each locked object ...
+                    for dataObj in lockedObjects.values():
+                        # ... indicate that in the report.
+                        prompt = recordLockedPrompt
+                        self.memo.AppendText(prompt % (dataObj.id, dataObj.GetNodeString(False)) + '\n\n')
+
+                    # Unlock the objects that have been saved
+                    for dataObj in updatedObjects.values():
+                        dataObj.unlock_record()
 
-            # If the user pressed anything except Cancel ...
-            else:
-                # Get each locked object ...
-                for dataObj in lockedObjects.values():
-                    # ... indicate that in the report.
-                    prompt = recordLockedPrompt
-                    self.memo.AppendText(prompt % (dataObj.id, dataObj.GetNodeString(False)) + '\n\n')
+                    # See if the Keyword visualization needs to be updated.
+                    parent.ControlObject.UpdateKeywordVisualization()
 
-                # ... commit the changes to the database
-                dbCursor.execute("COMMIT")
+                    # If we're in MU and have a chat window ...
+                    if TransanaGlobal.chatWindow != None:
+                        # Iterate through the cached messages
+                        for message in messageCache:
+                            # Send the messages one at a time
+                            TransanaGlobal.chatWindow.SendMessage(message)
+                    # If the current clip needs to be updated ...
+                    if CurrentClipToUpdate != 0:
+                        # ... then update the current clip to the latest data
+                        parent.ControlObject.LoadClipByNumber(CurrentClipToUpdate)
+            finally:
+                # Unlock the objects that were to be saved, if they haven't already been unlocked
+                for dataObj in updatedObjects.values():
+                    if dataObj.isLocked:
+                        dataObj.unlock_record()
 
-                # If we're in MU and have a chat window ...
-                if TransanaGlobal.chatWindow != None:
-                    # Iterate through the cached messages
-                    for message in messageCache:
-                        # Send the messages one at a time
-                        TransanaGlobal.chatWindow.SendMessage(message)
-                # If the current clip needs to be updated ...
-                if CurrentClipToUpdate != 0:
-                    # ... then update the current clip to the latest data
-                    parent.ControlObject.LoadClipByNumber(CurrentClipToUpdate)
-                    
         # Update the contents of the memo
         self.memo.Update()
         # Finally, we can show the dialog so the user can see the report!
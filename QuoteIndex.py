@@ -0,0 +1,192 @@
+# Copyright (C) 2002 - 2017 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+""" This module implements the QuoteIndex class, which holds the positions of the Quotes in an open Document.
+    A QuoteIndex is a dictionary of (StartChar, EndChar) values indexed by Quote Number, the Document's
+    quote_dict.  It also keeps the Quotes sorted by StartChar, along with the largest EndChar for each block
+    of sorted Quotes, so the Quotes that cover a position or selection in the Document can be found without
+    looking at every Quote, and without going to the database. """
+
+__author__ = 'David Woods <dwoods@transana.com>'
+
+DEBUG = False
+if DEBUG:
+    print "QuoteIndex DEBUG is ON!!"
+
+# import Python's bisect module
+import bisect
+
+# The number of sorted Quotes in each block
+BLOCK_SIZE = 64
+
+
+class QuoteIndex(dict):
+    """ A dictionary of Quote positions, (StartChar, EndChar), indexed by Quote Number, that can find the
+        Quotes that cover a position or selection """
+    def __init__(self):
+        # Initialize the dictionary
+        dict.__init__(self)
+        # (StartChar, Quote Number) for each Quote, sorted
+        self.starts = []
+        # The largest EndChar in each block of BLOCK_SIZE sorted Quotes.  None when it needs to be rebuilt.
+        self.blockMaxEnds = None
+        # The Quote Numbers of Quotes that editing has left ending before they start
+        self.inverted = set()
+
+    def __setitem__(self, quoteNum, positions):
+        """ Add or update a Quote's positions """
+        # If the Quote is already in the index, remove its old StartChar entry
+        if self.has_key(quoteNum):
+            self.starts.pop(bisect.bisect_left(self.starts, (self[quoteNum][0], quoteNum)))
+        # Add the Quote
+        dict.__setitem__(self, quoteNum, positions)
+        bisect.insort(self.starts, (positions[0], quoteNum))
+        self._NoteInverted(quoteNum, positions)
+        # The block EndChar values need to be rebuilt
+        self.blockMaxEnds = None
+
+    def __delitem__(self, quoteNum):
+        """ Remove a Quote """
+        self.starts.pop(bisect.bisect_left(self.starts, (self[quoteNum][0], quoteNum)))
+        dict.__delitem__(self, quoteNum)
+        self.inverted.discard(quoteNum)
+        # The block EndChar values need to be rebuilt
+        self.blockMaxEnds = None
+
+    def pop(self, quoteNum, *args):
+        """ Remove a Quote and return its positions """
+        if self.has_key(quoteNum):
+            positions = self[quoteNum]
+            del(self[quoteNum])
+            return positions
+        return dict.pop(self, quoteNum, *args)
+
+    def update(self, other):
+        """ Add or update the Quotes in another dictionary """
+        for quoteNum in other.keys():
+            self[quoteNum] = other[quoteNum]
+
+    def clear(self):
+        """ Remove all Quotes """
+        dict.clear(self)
+        self.starts = []
+        self.blockMaxEnds = None
+        self.inverted = set()
+
+    def GetQuotesAt(self, textPos=-1, textSel=(-2, -2)):
+        """ Return the Quote Numbers, sorted by StartChar, of the Quotes that cover a position or selection, using the
+            same rules as DBInterface.list_of_quotes_by_document().  If no position is given, all Quotes are returned. """
+        # A position is a selection that starts and ends at the same place
+        if (textPos != -1) and (textSel == (-2, -2)):
+            textSel = (textPos, textPos)
+        # If there is no position, return all Quotes
+        if textSel == (-2, -2):
+            return [quoteNum for (start, quoteNum) in self.starts]
+        # A Quote that starts before the selection is included if it ends after the selection starts
+        results = [self.starts[x][1] for x in self._FindEndsAfter(bisect.bisect_left(self.starts, (textSel[0],)), textSel[0])]
+        # Quotes that start in the selection are included if they end in the selection or extend past it
+        for x in range(bisect.bisect_left(self.starts, (textSel[0],)), bisect.bisect_left(self.starts, (textSel[1] + 1,))):
+            (start, quoteNum) = self.starts[x]
+            end = self[quoteNum][1]
+            if (end <= textSel[1]) or ((start < textSel[1]) and (end > textSel[1])):
+                results.append(quoteNum)
+        # A Quote that ends before it starts is also included if it starts after the selection but ends in it
+        for quoteNum in self.inverted:
+            if (self[quoteNum][0] > textSel[1]) and (self[quoteNum][1] <= textSel[1]):
+                results.append(quoteNum)
+        # If we added any of these, put the results back in StartChar order
+        if len(results) > 0 and (self[results[-1]][0] > textSel[1]):
+            results.sort(key=lambda quoteNum: (self[quoteNum][0], quoteNum))
+        return results
+
+    def AdjustPositions(self, position, selection, sizeChange):
+        """ Shift the Quote positions to reflect an edit of the Document of sizeChange characters at position, with
+            no selection (-2, -2), or over selection.  Only the Quotes at or after the edit are changed. """
+        # If we have NO SELECTION, Quotes that start or end at or after the Cursor Position are affected
+        if selection == (-2, -2):
+            editStart = position
+        # If we have a SELECTION, Quotes that start or end at or after the Selection Start are affected
+        else:
+            editStart = selection[0]
+        # The Quotes that start before the edit are already in order
+        firstStart = bisect.bisect_left(self.starts, (editStart,))
+        # Of these, only the ones that end at or after the edit are affected.  Those that start at or after
+        # the edit are all affected.
+        affected = self._FindEndsAfter(firstStart, editStart - 1) + range(firstStart, len(self.starts))
+        for x in affected:
+            quoteNum = self.starts[x][1]
+            (start, end) = self[quoteNum]
+            # If we have NO SELECTION ...
+            if selection == (-2, -2):
+                # If the Quote Start is at or after the Cursor Position ...
+                if start >= position:
+                    # ... adjust the start position by the change in size
+                    start += sizeChange
+                # If the Quote End is at or after the Cursor Position ...
+                # (We *MUST* maintain a quote size of at least one character!!)
+                if (end >= position) and (end - start > 1):
+                    # ... adjust the end position by the change in size
+                    end += sizeChange
+            # If we have a SELECTION ...
+            else:
+                # If the Quote Start is at or after the Selection End ...
+                if start >= selection[1]:
+                    # ... adjust the start position by the change in size
+                    start += sizeChange
+                # ELSE if the Quote Start is INSIDE the Selection ...
+                elif (start >= selection[0]) and (start < selection[1]):
+                    # ... move it to the start of the Selection
+                    start = selection[0]
+                # If the Quote End is at or after the Selection End ...
+                # (We *MUST* maintain a quote size of at least one character!!)
+                if (end >= selection[1]) and (end - start > 1):
+                    # ... adjust the end position by the change in size
+                    end += sizeChange
+                # ELSE if the Quote End is INSIDE the Selection ...
+                elif (end >= selection[0]) and (end < selection[1]):
+                    # ... adjust the end position by the change in size of the portion of the
+                    # selection inside the Quote's range
+                    end += sizeChange + (selection[1] - end)
+            dict.__setitem__(self, quoteNum, (start, end))
+            self.starts[x] = (start, quoteNum)
+            self._NoteInverted(quoteNum, (start, end))
+        # If any Quote was changed, a deletion may have moved Quotes ahead of others.  The list is still almost
+        # sorted, so sorting it again is quick.
+        if len(affected) > 0:
+            self.starts.sort()
+            self.blockMaxEnds = None
+
+    def _NoteInverted(self, quoteNum, positions):
+        """ Keep track of whether a Quote ends before it starts """
+        if positions[1] < positions[0]:
+            self.inverted.add(quoteNum)
+        else:
+            self.inverted.discard(quoteNum)
+
+    def _FindEndsAfter(self, count, pos):
+        """ Return the indexes of the Quotes, among the first count sorted Quotes, that end after pos """
+        # If needed, rebuild the largest EndChar in each block of sorted Quotes
+        if self.blockMaxEnds == None:
+            ends = [self[quoteNum][1] for (start, quoteNum) in self.starts]
+            self.blockMaxEnds = [max(ends[x:x + BLOCK_SIZE]) for x in range(0, len(ends), BLOCK_SIZE)]
+        results = []
+        # Skip the blocks where no Quote ends after pos
+        for block in range((count + BLOCK_SIZE - 1) / BLOCK_SIZE):
+            if self.blockMaxEnds[block] > pos:
+                for x in range(block * BLOCK_SIZE, min((block + 1) * BLOCK_SIZE, count)):
+                    if self[self.starts[x][1]][1] > pos:
+                        results.append(x)
+        return results
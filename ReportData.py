@@ -0,0 +1,491 @@
+# Copyright (C) 2002 - 2017 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+""" This module assembles the data for the Quote, Clip, and Snapshot reports produced by the Report Generator.
+    Rather than loading each Collection, Quote, Clip, Snapshot, Note and Transcript as the report is written,
+    the Collection tree is walked in memory and the items, keywords, notes and transcript text are loaded
+    with a few queries for the whole report.  The results are plain records, with the same attribute names
+    as the Transana objects they replace, which the Report Generator then writes out.  The time taken by
+    each stage is recorded in stageTimes. """
+
+__author__ = 'David Woods <dwoods@transana.com>'
+
+DEBUG = False
+if DEBUG:
+    print "ReportData DEBUG is ON!!"
+
+# import wxPython
+import wx
+
+# import Python's os module
+import os
+# import Python's time module
+import time
+
+# import Transana's Database Interface
+import DBInterface
+# import Transana's Snapshot object
+import Snapshot
+# import Transana's Global Variables
+import TransanaGlobal
+
+
+def _DecodeText(text):
+    """ Convert XML or RTF text from the database the way the Quote and Transcript objects do """
+    # determine encoding, fix if needed
+    if type(text).__name__ == 'array':
+        if text.typecode == 'u':
+            text = text.tounicode()
+        else:
+            text = text.tostring()
+    if ('unicode' in wx.PlatformInfo) and (type(text).__name__ == 'str'):
+        # check to see if we're working with RTF
+        try:
+            if text[2:5].encode('utf8') == u'rtf':
+                # convert the data to unicode just to be safe.
+                text = unicode(text, 'utf-8')
+        except UnicodeDecodeError:
+            pass
+    return text
+
+def _DecodeString(value):
+    """ Convert a string from the database for Unicode, if needed """
+    if 'unicode' in wx.PlatformInfo:
+        value = DBInterface.ProcessDBDataForUTF8Encoding(value)
+    return value
+
+def _MediaFilename(filename):
+    """ Add the Video Root Path to a media or image file name that uses it, as the Clip and Snapshot objects do """
+    filename = filename.replace('\\', '/')
+    # Detection of the use of the Video Root Path is platform-dependent.
+    if wx.Platform == "__WXMSW__":
+        # On Windows, check for a colon in the position, which signals the presence or absence of a drive letter
+        useVideoRoot = (filename[1:2] != ':') and (filename[:2] != '//')
+    else:
+        # On Mac OS-X and *nix, check for a slash in the first position for the root folder designation
+        useVideoRoot = (filename[:1] != '/')
+    # If we are using the Video Root Path, add it to the Filename
+    if useVideoRoot:
+        filename = TransanaGlobal.configData.videoPath.replace('\\', '/') + filename
+    return filename.replace('/', os.sep)
+
+
+class ReportCollection(object):
+    """ The data for one Collection in a report """
+
+    def __init__(self, number, id, parent, comment):
+        self.number = number
+        self.id = id
+        self.parent = parent
+        self.comment = comment
+        # The full nested Collection path, set once all the Collections are loaded
+        self.nodeString = id
+
+    def GetNodeString(self):
+        """ Returns a string that delineates the full nested collection structure, as Collection.GetNodeString() does """
+        return self.nodeString
+
+
+class ReportDocument(object):
+    """ The source Document data shown for a Quote in a report """
+
+    def __init__(self, number, id, library_id, imported_file, import_date):
+        self.number = number
+        self.id = id
+        self.library_id = library_id
+        self.imported_file = imported_file
+        self.import_date = import_date
+
+
+class ReportTranscript(object):
+    """ The data for one Clip Transcript in a report """
+
+    def __init__(self, number, source_transcript, text):
+        self.number = number
+        self.source_transcript = source_transcript
+        # The ID of the source Episode Transcript, or None if it has been deleted
+        self.source_transcript_id = None
+        # The Clip Transcript's text, which is only loaded if it will be shown
+        self.text = text
+
+
+class ReportItem(object):
+    """ The data for one Quote, Clip, or Snapshot in a report.  The attributes used by the report have the same
+        names as the attributes of the Quote, Clip, and Snapshot objects. """
+
+    def __init__(self, objType, number, id, collection_num, comment):
+        self.type = objType
+        self.number = number
+        self.id = id
+        self.collection_num = collection_num
+        self.comment = comment
+        # Quote data.  document is None if the source Document has been deleted.
+        self.source_document_num = 0
+        self.document = None
+        self.start_char = 0
+        self.end_char = 0
+        self.text = None
+        # Clip and Snapshot data
+        self.episode_num = 0
+        self.series_id = ''
+        self.episode_id = ''
+        # Clip data
+        self.media_filename = ''
+        self.additional_media_files = []
+        self.clip_start = 0
+        self.clip_stop = 0
+        self.transcripts = []
+        # Snapshot data
+        self.image_filename = ''
+        self.episode_start = 0
+        self.episode_duration = 0
+        self.transcript_num = 0
+        self.transcript_id = ''
+
+
+class ReportData(object):
+    """ Assembles the data for a Quote, Clip, and Snapshot report with a few queries """
+
+    def __init__(self):
+        """ Initialize the Report Data.  Nothing is loaded until it is requested. """
+        # A list of (stage name, seconds) in the order the stages ran
+        self.stageTimes = []
+        # Collection Number : ReportCollection, for all Collections
+        self.collections = {}
+        # Parent Collection Number : list of child Collection Numbers, sorted by Collection ID
+        self.children = {}
+        # (Object Type, Object Number) : ReportItem, or a Snapshot object if full Snapshots were requested
+        self.items = {}
+        # (Object Type, Object Number) : list of (Keyword Group, Keyword, Example)
+        self.keywords = {}
+        # Snapshot Number : list of (Keyword Group, Keyword) for the Snapshot's visible Detail Coding
+        self.detailKeywords = {}
+        # (Object Type, Object Number) : list of (Note ID, Note Text)
+        self.notes = {}
+
+    def _AddStageTime(self, stageName, startTime):
+        """ Record the time taken by a stage that began at startTime """
+        self.stageTimes.append((stageName, time.time() - startTime))
+        if DEBUG:
+            print "ReportData: %-30s %8.4f" % self.stageTimes[-1]
+
+    def AddStageTime(self, stageName, seconds):
+        """ Record the time taken by a stage that happens outside of the Report Data, such as writing the report """
+        self.stageTimes.append((stageName, seconds))
+
+    def GetTotalTime(self):
+        """ Return the total time of all the stages recorded """
+        return sum([seconds for (stageName, seconds) in self.stageTimes])
+
+    def _FetchForNumbers(self, query, numbers):
+        """ Execute query, which contains "IN (%s)", for up to DBInterface.IN_LIST_SIZE of the numbers at a time,
+            and return all the rows """
+        rows = []
+        dbCursor = DBInterface.get_db().cursor()
+        numbers = list(numbers)
+        for start in range(0, len(numbers), DBInterface.IN_LIST_SIZE):
+            numberList = tuple(numbers[start:start + DBInterface.IN_LIST_SIZE])
+            # Adjust the query for sqlite if needed
+            dbCursor.execute(DBInterface.FixQuery(query % ', '.join(['%s'] * len(numberList))), numberList)
+            rows += DBInterface.fetchall_named(dbCursor)
+        dbCursor.close()
+        return rows
+
+    def LoadCollections(self):
+        """ Load all Collections, with their comments and full node strings, in one query """
+        startTime = time.time()
+        self.collections = {}
+        self.children = {}
+        query = """ SELECT CollectNum, CollectID, ParentCollectNum, CollectComment FROM Collections2
+                      ORDER BY CollectID """
+        dbCursor = DBInterface.get_db().cursor()
+        dbCursor.execute(query)
+        for row in DBInterface.fetchall_named(dbCursor):
+            # Root Collections may have a NULL parent
+            parent = row['ParentCollectNum']
+            if parent == None:
+                parent = 0
+            comment = row['CollectComment']
+            if comment == None:
+                comment = u''
+            self.collections[row['CollectNum']] = ReportCollection(row['CollectNum'], _DecodeString(row['CollectID']),
+                                                                   parent, _DecodeString(comment))
+            # Children are added in Collection ID order, as DBInterface.list_of_collections() returns them
+            if not self.children.has_key(parent):
+                self.children[parent] = []
+            self.children[parent].append(row['CollectNum'])
+        dbCursor.close()
+        # Build the node strings from the top of the tree down
+        pending = list(self.children.get(0, []))
+        while len(pending) > 0:
+            collectNum = pending.pop()
+            for childNum in self.children.get(collectNum, []):
+                self.collections[childNum].nodeString = self.collections[collectNum].nodeString + ' > ' + self.collections[childNum].id
+                pending.append(childNum)
+        self._AddStageTime('Load collections', startTime)
+
+    def GetCollectionNums(self, collectNum, nested):
+        """ Return the Collection Number passed in, and if nested is True all of its nested Collections, in the
+            order the Database Tree shows them.  Collection Number 0 is the root of the tree, and has no items. """
+        if collectNum == 0:
+            collectNums = []
+        else:
+            collectNums = [collectNum]
+        if nested:
+            # Walk the tree depth-first.  Each Collection's children go at the FRONT of the pending list.
+            pending = list(self.children.get(collectNum, []))
+            while len(pending) > 0:
+                collectNums.append(pending[0])
+                pending = self.children.get(pending[0], []) + pending[1:]
+        return collectNums
+
+    def GetCollectionItems(self, collectNum, nested, includeQuotesAndSnapshots=True):
+        """ Return the report's major list, a list of (Object Type, Object Number, Object ID, Collection Number)
+            for the items in a Collection, and in its nested Collections if nested is True.  Items are in
+            Sort Order within each Collection. """
+        if len(self.collections) == 0:
+            self.LoadCollections()
+        startTime = time.time()
+        collectNums = self.GetCollectionNums(collectNum, nested)
+        queries = [('Clip', "SELECT ClipNum, ClipID, CollectNum, SortOrder FROM Clips2 WHERE CollectNum IN (%s) ORDER BY SortOrder, ClipID")]
+        if includeQuotesAndSnapshots:
+            queries += [('Quote', "SELECT QuoteNum, QuoteID, CollectNum, SortOrder FROM Quotes2 WHERE CollectNum IN (%s) ORDER BY SortOrder, QuoteID"),
+                        ('Snapshot', "SELECT SnapshotNum, SnapshotID, CollectNum, SortOrder FROM Snapshots2 WHERE CollectNum IN (%s) ORDER BY SortOrder, SnapshotID")]
+        # Collection Number : {Sort Order : item}.  As in the original per-Collection report, an item replaces an
+        # earlier one with the same Sort Order, and Clips, then Quotes, then Snapshots are added.
+        itemsByCollection = {}
+        for (objType, query) in queries:
+            for row in self._FetchForNumbers(query, collectNums):
+                if not itemsByCollection.has_key(row['CollectNum']):
+                    itemsByCollection[row['CollectNum']] = {}
+                itemsByCollection[row['CollectNum']][row['SortOrder']] = \
+                    (objType, row[objType + 'Num'], _DecodeString(row[objType + 'ID']), row['CollectNum'])
+        majorList = []
+        for num in collectNums:
+            items = itemsByCollection.get(num, {})
+            order = items.keys()
+            order.sort()
+            for sortOrder in order:
+                majorList.append(items[sortOrder])
+        self._AddStageTime('Load collection items', startTime)
+        return majorList
+
+    def _NumbersByType(self, itemKeys):
+        """ Split a list of (Object Type, Object Number) into a dictionary of Object Type : list of unique Object Numbers """
+        numbers = {}
+        for (objType, objNum) in itemKeys:
+            if not numbers.has_key(objType):
+                numbers[objType] = {}
+            numbers[objType][objNum] = True
+        for objType in numbers.keys():
+            numbers[objType] = numbers[objType].keys()
+        return numbers
+
+    def LoadKeywords(self, itemKeys, detailKeywords=False):
+        """ Load the Keywords for a list of (Object Type, Object Number), where the Object Type is 'Document',
+            'Episode', 'Quote', 'Clip' or 'Snapshot'.  Returns a dictionary of (Object Type, Object Number) : list of
+            (Keyword Group, Keyword, Example), in the same order as DBInterface.list_of_keywords().  If detailKeywords
+            is True, the Snapshots' visible Detail Coding is also loaded into self.detailKeywords. """
+        startTime = time.time()
+        numbers = self._NumbersByType(itemKeys)
+        for (objType, objNums) in numbers.items():
+            for objNum in objNums:
+                self.keywords[(objType, objNum)] = []
+            query = """ SELECT %sNum, KeywordGroup, Keyword, Example FROM ClipKeywords2
+                          WHERE %sNum IN (%%s)
+                          ORDER BY KeywordGroup, Keyword """ % (objType, objType)
+            for row in self._FetchForNumbers(query, objNums):
+                self.keywords[(objType, row[objType + 'Num'])].append((_DecodeString(row['KeywordGroup']),
+                                                                       _DecodeString(row['Keyword']),
+                                                                       row['Example']))
+        self._AddStageTime('Load keywords', startTime)
+        if detailKeywords and numbers.has_key('Snapshot'):
+            startTime = time.time()
+            for snapshotNum in numbers['Snapshot']:
+                self.detailKeywords[snapshotNum] = []
+            query = """ SELECT SnapshotNum, KeywordGroup, Keyword FROM SnapshotKeywords2
+                          WHERE visible = 1 AND
+                                SnapshotNum IN (%s)
+                          GROUP BY SnapshotNum, KeywordGroup, Keyword
+                          ORDER BY KeywordGroup, Keyword """
+            for row in self._FetchForNumbers(query, numbers['Snapshot']):
+                self.detailKeywords[row['SnapshotNum']].append((_DecodeString(row['KeywordGroup']), _DecodeString(row['Keyword'])))
+            self._AddStageTime('Load snapshot detail keywords', startTime)
+        return self.keywords
+
+    def LoadNotes(self, itemKeys):
+        """ Load the Notes for a list of (Object Type, Object Number), where the Object Type is 'Collection',
+            'Quote', 'Clip' or 'Snapshot', into self.notes.  Notes are sorted by Note ID. """
+        startTime = time.time()
+        columns = {'Collection' : 'CollectNum', 'Quote' : 'QuoteNum', 'Clip' : 'ClipNum', 'Snapshot' : 'SnapshotNum'}
+        for (objType, objNums) in self._NumbersByType(itemKeys).items():
+            for objNum in objNums:
+                self.notes[(objType, objNum)] = []
+            query = """ SELECT %s, NoteID, NoteText FROM Notes2
+                          WHERE %s IN (%%s)
+                          ORDER BY NoteID """ % (columns[objType], columns[objType])
+            for row in self._FetchForNumbers(query, objNums):
+                # Convert the Note Text the way the Note object does
+                text = row['NoteText']
+                if type(text).__name__ == 'array':
+                    if text.typecode == 'u':
+                        text = text.tounicode()
+                    else:
+                        text = text.tostring()
+                self.notes[(objType, row[columns[objType]])].append((_DecodeString(row['NoteID']), _DecodeString(text)))
+        self._AddStageTime('Load notes', startTime)
+
+    def LoadItems(self, itemKeys, quoteText=False, transcriptText=False, fullSnapshots=False):
+        """ Load the data the report shows for a list of (Object Type, Object Number) into self.items.  Quote text
+            and Clip Transcript text are only loaded if quoteText or transcriptText is True.  If fullSnapshots is
+            True, Snapshot objects are loaded, as drawing a Snapshot's image or coding key requires one. """
+        if len(self.collections) == 0:
+            self.LoadCollections()
+        startTime = time.time()
+        numbers = self._NumbersByType(itemKeys)
+        # Episode Numbers and Transcript Numbers whose IDs are needed
+        episodeNums = {}
+        transcriptNums = {}
+
+        if numbers.has_key('Quote'):
+            if quoteText:
+                textColumn = ', a.XMLText'
+            else:
+                textColumn = ''
+            query = """ SELECT a.QuoteNum, QuoteID, CollectNum, SourceDocumentNum, Comment, StartChar, EndChar%s
+                          FROM Quotes2 a, QuotePositions2 b
+                          WHERE a.QuoteNum = b.QuoteNum AND
+                                a.QuoteNum IN (%%s) """ % textColumn
+            documentNums = {}
+            for row in self._FetchForNumbers(query, numbers['Quote']):
+                item = ReportItem('Quote', row['QuoteNum'], _DecodeString(row['QuoteID']), row['CollectNum'], _DecodeString(row['Comment']))
+                item.source_document_num = row['SourceDocumentNum']
+                item.start_char = row['StartChar']
+                item.end_char = row['EndChar']
+                if quoteText:
+                    item.text = _DecodeText(row['XMLText'])
+                self.items[('Quote', item.number)] = item
+                documentNums[item.source_document_num] = True
+            # Load the source Documents.  A Quote whose Document has been deleted keeps a document of None.
+            query = """ SELECT DocumentNum, DocumentID, SeriesID, ImportedFile, ImportDate
+                          FROM Documents2 a, Series2 b
+                          WHERE a.LibraryNum = b.SeriesNum AND
+                                DocumentNum IN (%s) """
+            documents = {}
+            for row in self._FetchForNumbers(query, documentNums.keys()):
+                documents[row['DocumentNum']] = ReportDocument(row['DocumentNum'], _DecodeString(row['DocumentID']),
+                                                               _DecodeString(row['SeriesID']),
+                                                               _DecodeString(row['ImportedFile']), row['ImportDate'])
+            for quoteNum in numbers['Quote']:
+                if self.items.has_key(('Quote', quoteNum)):
+                    item = self.items[('Quote', quoteNum)]
+                    item.document = documents.get(item.source_document_num, None)
+
+        if numbers.has_key('Clip'):
+            query = """ SELECT ClipNum, ClipID, CollectNum, EpisodeNum, MediaFile, ClipStart, ClipStop, ClipComment
+                          FROM Clips2
+                          WHERE ClipNum IN (%s) """
+            for row in self._FetchForNumbers(query, numbers['Clip']):
+                item = ReportItem('Clip', row['ClipNum'], _DecodeString(row['ClipID']), row['CollectNum'], _DecodeString(row['ClipComment']))
+                item.episode_num = row['EpisodeNum']
+                item.media_filename = _MediaFilename(_DecodeString(row['MediaFile']))
+                item.clip_start = row['ClipStart']
+                item.clip_stop = row['ClipStop']
+                item.additional_media_files = []
+                self.items[('Clip', item.number)] = item
+                episodeNums[item.episode_num] = True
+            query = """ SELECT ClipNum, MediaFile FROM AdditionalVids2
+                          WHERE ClipNum IN (%s)
+                          ORDER BY AddVidNum """
+            for row in self._FetchForNumbers(query, numbers['Clip']):
+                if self.items.has_key(('Clip', row['ClipNum'])):
+                    self.items[('Clip', row['ClipNum'])].additional_media_files.append({'filename' : _MediaFilename(_DecodeString(row['MediaFile']))})
+            if transcriptText:
+                textColumn = ', RTFText'
+            else:
+                textColumn = ''
+            query = """ SELECT TranscriptNum, ClipNum, SourceTranscriptNum%s FROM Transcripts2
+                          WHERE ClipNum IN (%%s)
+                          ORDER BY SortOrder """ % textColumn
+            for row in self._FetchForNumbers(query, numbers['Clip']):
+                if self.items.has_key(('Clip', row['ClipNum'])):
+                    if transcriptText:
+                        text = _DecodeText(row['RTFText'])
+                    else:
+                        text = None
+                    self.items[('Clip', row['ClipNum'])].transcripts.append(ReportTranscript(row['TranscriptNum'], row['SourceTranscriptNum'], text))
+                    transcriptNums[row['SourceTranscriptNum']] = True
+
+        if numbers.has_key('Snapshot'):
+            if fullSnapshots:
+                # Drawing a Snapshot's image or coding key needs the complete Snapshot object
+                for snapshotNum in numbers['Snapshot']:
+                    self.items[('Snapshot', snapshotNum)] = Snapshot.Snapshot(snapshotNum, suppressEpisodeError = True)
+            else:
+                query = """ SELECT SnapshotNum, SnapshotID, CollectNum, ImageFile, EpisodeNum, TranscriptNum,
+                                   SnapshotTimeCode, SnapshotDuration, SnapshotComment
+                              FROM Snapshots2
+                              WHERE SnapshotNum IN (%s) """
+                for row in self._FetchForNumbers(query, numbers['Snapshot']):
+                    item = ReportItem('Snapshot', row['SnapshotNum'], _DecodeString(row['SnapshotID']), row['CollectNum'],
+                                      _DecodeString(row['SnapshotComment']))
+                    item.image_filename = _MediaFilename(_DecodeString(row['ImageFile']))
+                    item.episode_num = row['EpisodeNum']
+                    item.transcript_num = row['TranscriptNum']
+                    # A Snapshot without an Episode has no position in the Episode
+                    if item.episode_num > 0:
+                        item.episode_start = row['SnapshotTimeCode']
+                        item.episode_duration = row['SnapshotDuration']
+                    self.items[('Snapshot', item.number)] = item
+                    episodeNums[item.episode_num] = True
+                    transcriptNums[item.transcript_num] = True
+
+        # Look up the Library and Episode IDs of the Clips' and Snapshots' Episodes
+        query = """ SELECT EpisodeNum, EpisodeID, SeriesID
+                      FROM Episodes2 a, Series2 b
+                      WHERE a.SeriesNum = b.SeriesNum AND
+                            EpisodeNum IN (%s) """
+        episodes = {}
+        for row in self._FetchForNumbers(query, [num for num in episodeNums.keys() if num > 0]):
+            episodes[row['EpisodeNum']] = (_DecodeString(row['SeriesID']), _DecodeString(row['EpisodeID']))
+        # Look up the IDs of the Clips' source Transcripts and the Snapshots' Transcripts
+        query = "SELECT TranscriptNum, TranscriptID FROM Transcripts2 WHERE TranscriptNum IN (%s)"
+        transcripts = {}
+        for row in self._FetchForNumbers(query, [num for num in transcriptNums.keys() if num > 0]):
+            transcripts[row['TranscriptNum']] = _DecodeString(row['TranscriptID'])
+        for objType in ['Clip', 'Snapshot']:
+            for objNum in numbers.get(objType, []):
+                item = self.items.get((objType, objNum), None)
+                # Snapshot objects have already looked up their own Episode and Transcript
+                if not isinstance(item, ReportItem):
+                    continue
+                if episodes.has_key(item.episode_num):
+                    (item.series_id, item.episode_id) = episodes[item.episode_num]
+                elif objType == 'Snapshot':
+                    # A Snapshot whose Episode has been deleted has no Episode or Transcript information
+                    item.episode_num = 0
+                    item.transcript_num = 0
+                    item.episode_start = 0
+                    item.episode_duration = 0
+                if objType == 'Clip':
+                    for tr in item.transcripts:
+                        tr.source_transcript_id = transcripts.get(tr.source_transcript, None)
+                elif (item.episode_num > 0) and (item.transcript_num > 0):
+                    if transcripts.has_key(item.transcript_num):
+                        item.transcript_id = transcripts[item.transcript_num]
+                    else:
+                        item.transcript_num = 0
+        self._AddStageTime('Load items', startTime)
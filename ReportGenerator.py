@@ -30,6 +30,8 @@ import locale
 import string
 # import Python's sys module
 import sys
+# import Python's time module
+import time
 # import the python xml-sax module
 import xml.sax
 # import wxPython
@@ -38,10 +40,6 @@ import wx
 import wx.richtext as richtext
 # Import Transana's BarChart Module
 import BarChartGraphic
-# Import Transana's Clip object
-import Clip
-# import Transana's Collection Object
-import Collection
 # Import Transana's Database Interface
 import DBInterface
 # Import Transana's Dialog Boxes
@@ -56,16 +54,12 @@ import FilterDialog
 import KeywordObject as Keyword
 # Import Transana's Miscellaneous functions
 import Misc
-# Import Transana's Note object
-import Note
 # import the Transana XML-to-RTC Import Parser
 import PyXML_RTCImportParser
-# import Transana's Quote Object
-import Quote
+# import Transana's Report Data assembly
+import ReportData
 # Import Transana's Library Object
 import Library
-# import Transana's Snapshot Object
-import Snapshot
 # Import Transana's Snapshot Window for loading images
 import SnapshotWindow
 # Import Transana's Text Report infrastructure
@@ -76,8 +70,6 @@ import TransanaConstants
 import TransanaExceptions
 # import Transana's Global variables
 import TransanaGlobal
-# import Transana's Transcript Object
-import Transcript
 # import Transana's Transcript Editor - Rich Text Ctrl version
 import TranscriptEditor_RTC
 
@@ -253,9 +245,12 @@ class ReportGenerator(wx.Object):
         self.snapshotFilterList = []
         # Define the Keyword Filter List as well, which does NOT differ based on report type
         self.keywordFilterList = []
+        # The (stage name, seconds) times of the most recent display of the report
+        self.stageTimes = []
         # To speed report creation, freeze GUI updates based on changes to the report text
         self.report.reportText.Freeze()
-        # Trigger the ReportText method that causes the report to be displayed.
+        # Trigger the ReportText method that causes the report to be displayed.  The first part of the report
+        # is built now, and the rest is built in batches by the TextReport.
         self.report.CallDisplay()
         # Now that we're done, remove the freeze
         self.report.reportText.Thaw()
@@ -263,9 +258,13 @@ class ReportGenerator(wx.Object):
     def OnDisplay(self, reportText):
         """ This method, required by TextReport, populates the TextReport.  The reportText parameter is
             the wxSTC control from the TextReport object.  It needs to be in the report parent because
-            the TextReport doesn't know anything about the actual data.  """
+            the TextReport doesn't know anything about the actual data.  This is a generator, which yields
+            the percentage of the report written after each item so the TextReport can show the report
+            while it is being built.  """
         # Create minorList as a blank Dictionary Object
         minorList = {}
+        # The report's data is assembled in bulk by a Report Data object, which also times each stage
+        reportData = ReportData.ReportData()
         # We need variables to count the number of quotes displayed and to accumulate their total length.
         self.quoteCount = 0
         self.quoteTotalLength = 0
@@ -329,8 +328,6 @@ class ReportGenerator(wx.Object):
             if self.collection.number == 0:
                 # The global report has no subtitle.
                 self.subtitle = ''
-                # We initialize the major list to an empty list for the global report
-                majorList = []
             # A non-empty collection signals a scoped report.
             else:
                 # Add a subtitle and ...
@@ -340,88 +337,14 @@ class ReportGenerator(wx.Object):
                 else:
                     prompt = _("Collection: %s")
                 self.subtitle = prompt % self.collection.GetNodeString()
-                
-                # initialize the Major List of report elements.  Clips and Snapshots will be sorted and included.
-                majorList = []
-                # initialize a Dictionary for all Report Artifacts (for sorting!)
-                tmpDict = {}
-                
-                # Get a list of all Clips in the Collection.
-                tmpClipList = DBInterface.list_of_clips_by_collectionnum(self.collection.number, includeSortOrder=True)
-                # For each Clip ...
-                for x in tmpClipList:
-                    # ... add the Clip to the Dictionary with the Sort Order as the key and with the Object Type added
-                    tmpDict[x[3]] = (('Clip',) + x)
-
-                if TransanaConstants.proVersion:
-                    # Get a list of all Quotes in the Collection.
-                    tmpQuoteList = DBInterface.list_of_quotes_by_collectionnum(self.collection.number, includeSortOrder=True)
-                    # For each Quote ...
-                    for x in tmpQuoteList:
-                        # ... add the Quote to the Dictionary with the Sort Order as the key and with the Object Type added
-                        tmpDict[x[3]] = (('Quote',) + x[:-1])
-
-                    # Get a list of all Snapshots in the Collection.
-                    tmpSnapshotList = DBInterface.list_of_snapshots_by_collectionnum(self.collection.number, includeSortOrder=True)
-                    # For each Snapshot ...
-                    for x in tmpSnapshotList:
-                        # ... add the Snapshot to the Dictionary with the Sort Order as the key and with the Object Type added
-                        tmpDict[x[3]] = (('Snapshot',) + x)
-                        
-                # Get the Dictionary's Keys
-                order = tmpDict.keys()
-                # Sort the Dictionary's Keys
-                order.sort()
-                # For each element in the sorted list of Keys ...
-                for x in order:
-                    # Add the elemnt to the Major List.
-                    majorList.append(tmpDict[x][:-1])
+
+            # Assemble the items in the Collection, and in its nested Collections if we're supposed to show Nested
+            # Collection data, in the order of the Database Tree.  The global report (Collection 0) has no items of
+            # its own.  The Collection tree is walked in memory and the items are loaded with a few queries.
+            majorList = reportData.GetCollectionItems(self.collection.number, self.showNested, TransanaConstants.proVersion)
 
             # If we're supposed to show Nested Collection data ...
             if self.showNested:
-                # ... we first need to get the nested collections for the top level
-                nestedCollections = DBInterface.list_of_collections(self.collection.number)
-                # As long as there are entries in the list of nested collections that haven't been processed ...
-                while len(nestedCollections) > 0:
-                    # ... extract the data from the top of the nested collection list ...
-                    (collNum, collName, parentCollNum) = nestedCollections[0]
-                    # ... and remove that entry from the list.
-                    del(nestedCollections[0])
-                    # initialize a Dictionary for all Report Artifacts (for sorting!)
-                    tmpDict = {}
-                    # Get a list of all Clips in the Collection.
-                    tmpClipList = DBInterface.list_of_clips_by_collectionnum(collNum, includeSortOrder=True)
-                    # For each Clip ...
-                    for x in tmpClipList:
-                        # ... add the Clip to the Dictionary with the Sort Order as the key and with the Object Type added
-                        tmpDict[x[3]] = (('Clip',) + x)
-                    if TransanaConstants.proVersion:
-                        # Get a list of all Quotes in the Collection.
-                        tmpQuoteList = DBInterface.list_of_quotes_by_collectionnum(collNum, includeSortOrder=True)
-                        # For each Quote ...
-                        for x in tmpQuoteList:
-                            # ... add the Quote to the Dictionary with the Sort Order as the key and with the Object Type added
-                            tmpDict[x[3]] = (('Quote',) + x[:-1])
-                        # Get a list of all Snapshots in the Collection.
-                        tmpSnapshotList = DBInterface.list_of_snapshots_by_collectionnum(collNum, includeSortOrder=True)
-                        # For each Snapshot ...
-                        for x in tmpSnapshotList:
-                            # ... add the Snapshot to the Dictionary with the Sort Order as the key and with the Object Type added
-                            tmpDict[x[3]] = (('Snapshot',) + x)
-                    # Get the Dictionary's Keys
-                    order = tmpDict.keys()
-                    # Sort the Dictionary's Keys
-                    order.sort()
-                    # For each element in the sorted list of Keys ...
-                    for x in order:
-                        # Add the elemnt to the Major List.
-                        majorList.append(tmpDict[x][:-1])
-
-                    # Then get the nested collections under the new collection and add them to the Nested Collection list
-                    # They get added at the FRONT of the list so that the report will mirror the organization of the
-                    # database Tree.
-                    nestedCollections = DBInterface.list_of_collections(collNum) + nestedCollections
-
                 # If we have 100 or fewer records, only show the Keyword Summary if Keywords are being shown.
                 if len(majorList) <= 100:
                     self.showKeywordSummary = self.showKeywords
@@ -429,16 +352,14 @@ class ReportGenerator(wx.Object):
                 else:
                     self.showKeywordSummary = True
 
+            # Load the Keywords for all the Clips and Snapshots in the majorList at once
+            itemKeywords = reportData.LoadKeywords([(objType, objNo) for (objType, objNo, objName, collNo) in majorList],
+                                                   detailKeywords=populateFilterList)
             # Put all the Keywords for the Clips and Snapshots in the majorList in the minorList.
             # Start by iterating through the Major List
             for (objType, objNo, objName, collNo) in majorList:
                 # Create a Minor List dictionary entry, indexed to clip or snapshot number, for the keywords.
-                if objType == 'Quote':
-                    minorList[(objType, objNo)] = DBInterface.list_of_keywords(Quote = objNo)
-                elif objType == 'Clip':
-                    minorList[(objType, objNo)] = DBInterface.list_of_keywords(Clip = objNo)
-                elif objType == 'Snapshot':
-                    minorList[(objType, objNo)] = DBInterface.list_of_keywords(Snapshot = objNo)
+                minorList[(objType, objNo)] = itemKeywords[(objType, objNo)]
                 # If we're populating Filter Lists ...
                 if populateFilterList:
                     # If we have a Quote ...
@@ -465,7 +386,7 @@ class ReportGenerator(wx.Object):
                     # If we have a Snapshot ...
                     if objType == 'Snapshot':
                         # ... get a list of the Snapshot's Detail Coding
-                        tmpList = DBInterface.list_of_snapshot_detail_keywords(Snapshot = objNo)
+                        tmpList = reportData.detailKeywords[objNo]
                         # For each Keyword Group : Keyword pair ...
                         for (kwg, kw) in tmpList:
                             # ... check to see if the entry is NOT already in the list ...
@@ -517,12 +438,14 @@ class ReportGenerator(wx.Object):
                 # Add the elemnt to the Major List.
                 majorList.append(tmpDict[x])
 
+            # Load the Keywords for all the Quotes in the majorList at once
+            itemKeywords = reportData.LoadKeywords([('Quote', item['QuoteNum']) for item in majorList if item['Type'] == 'Quote'])
             # Put all the Keywords for the Quotes and Snapshots in the majorList in the minorList.
             # Start by iterating through the Major List
             for item in majorList:
                 # Create a Minor List dictionary entry, indexed to quote or snapshot number, for the keywords.
                 if item['Type'] == 'Quote':
-                    minorList[(item['Type'], item['QuoteNum'])] = DBInterface.list_of_keywords(Quote = item['QuoteNum'])
+                    minorList[(item['Type'], item['QuoteNum'])] = itemKeywords[(item['Type'], item['QuoteNum'])]
 ##                elif item['Type'] == 'Snapshot':
 ##                    minorList[(item['Type'], item['SnapshotNum'])] = DBInterface.list_of_keywords(Snapshot = item['SnapshotNum'])
                 # If we're populating Filter Lists ...
@@ -606,14 +529,17 @@ class ReportGenerator(wx.Object):
                 # Add the elemnt to the Major List.
                 majorList.append(tmpDict[x])
 
+            # Load the Keywords for all the Clips and Snapshots in the majorList at once
+            itemKeywords = reportData.LoadKeywords([(item['Type'], item[item['Type'] + 'Num']) for item in majorList],
+                                                   detailKeywords=populateFilterList)
             # Put all the Keywords for the Clips and Snapshots in the majorList in the minorList.
             # Start by iterating through the Major List
             for item in majorList:
                 # Create a Minor List dictionary entry, indexed to clip or snapshot number, for the keywords.
                 if item['Type'] == 'Clip':
-                    minorList[(item['Type'], item['ClipNum'])] = DBInterface.list_of_keywords(Clip = item['ClipNum'])
+                    minorList[(item['Type'], item['ClipNum'])] = itemKeywords[(item['Type'], item['ClipNum'])]
                 elif item['Type'] == 'Snapshot':
-                    minorList[(item['Type'], item['SnapshotNum'])] = DBInterface.list_of_keywords(Snapshot = item['SnapshotNum'])
+                    minorList[(item['Type'], item['SnapshotNum'])] = itemKeywords[(item['Type'], item['SnapshotNum'])]
                 # If we're populating Filter Lists ...
                 if populateFilterList:
                     # If we have a Snapshot ...
@@ -640,7 +566,7 @@ class ReportGenerator(wx.Object):
                     # If we have a Snapshot ...
                     if item['Type'] == 'Snapshot':
                         # ... get a list of the Snapshot's Detail Coding
-                        tmpList = DBInterface.list_of_snapshot_detail_keywords(Snapshot = item['SnapshotNum'])
+                        tmpList = reportData.detailKeywords[item['SnapshotNum']]
                         # For each Keyword Group : Keyword pair ...
                         for (kwg, kw) in tmpList:
                             # ... check to see if the entry is NOT already in the list ...
@@ -673,6 +599,8 @@ class ReportGenerator(wx.Object):
             keys = tempDict.keys()
             # Sort the keys so the report will be displayed in the correct order
             keys.sort()
+            # Load the Keywords for all the Documents and Episodes at once
+            itemKeywords = reportData.LoadKeywords([tempDict[key][:2] for key in keys])
             # For each Key in the data list ...
             for key in keys:
                 # ... get the data object's Name from the dictionary Key ...
@@ -684,11 +612,11 @@ class ReportGenerator(wx.Object):
                 # If we have a Document ...
                 if objType == 'Document':
                     # Put all the Keywords for the Document in the majorList in the minorList
-                    minorList[(objType, objNum)] = DBInterface.list_of_keywords(Document = objNum)
+                    minorList[(objType, objNum)] = itemKeywords[(objType, objNum)]
                 # If we have an Episode ...
                 elif objType == 'Episode':
                     # Put all the Keywords for the Episodes in the majorList in the minorList
-                    minorList[(objType, objNum)] = DBInterface.list_of_keywords(Episode = objNum)
+                    minorList[(objType, objNum)] = itemKeywords[(objType, objNum)]
                 # If we're populating the Filter Lists ...
                 if populateFilterList:
                     if objType == 'Document':
@@ -766,16 +694,18 @@ class ReportGenerator(wx.Object):
 ##            print
 
             # Once we have the Episodes in the majorList, we can gather their keywords into the minorList.
+            # Load the Keywords for all the Documents and Episodes at once
+            itemKeywords = reportData.LoadKeywords([(objType, EpNo) for (objType, EpNo, epName, epParentNo) in majorList])
             # Start by iterating through the Major List
             for (objType, EpNo, epName, epParentNo) in majorList:
                 # If we have a Document ...
                 if objType == 'Document':
                     # Get all the keywords for the indicated Document and add them to the Minor List, keyed to the Document Name.
-                    minorList[('Document', EpNo)] = DBInterface.list_of_keywords(Document = EpNo)
+                    minorList[('Document', EpNo)] = itemKeywords[('Document', EpNo)]
                 # If we have an Episode ...
                 elif objType == 'Episode':
                     # Get all the keywords for the indicated Episode and add them to the Minor List, keyed to the Episode Name.
-                    minorList[('Episode', EpNo)] = DBInterface.list_of_keywords(Episode = EpNo)
+                    minorList[('Episode', EpNo)] = itemKeywords[('Episode', EpNo)]
                 # If we're populating the Filter Lists ...
                 if populateFilterList:
                     # ... Iterate through the keywords that were just added to the Minor List (only for this Key) ...
@@ -882,16 +812,14 @@ class ReportGenerator(wx.Object):
                     # ... get the next Child Item and continue the loop
                     (item, cookie) = self.treeCtrl.GetNextChild(currentNode, cookie)
 
+            # Load the Keywords for all the Clips and Snapshots in the majorList at once
+            itemKeywords = reportData.LoadKeywords([(objType, objNo) for (objType, objNo, objName, collNo) in majorList],
+                                                   detailKeywords=populateFilterList)
             # Put all the Keywords for the Clips and Snapshots in the majorList in the minorList.
             # Start by iterating through the Major List
             for (objType, objNo, objName, collNo) in majorList:
                 # Create a Minor List dictionary entry, indexed to clip or snapshot number, for the keywords.
-                if objType == 'Quote':
-                    minorList[(objType, objNo)] = DBInterface.list_of_keywords(Quote = objNo)
-                elif objType == 'Clip':
-                    minorList[(objType, objNo)] = DBInterface.list_of_keywords(Clip = objNo)
-                elif objType == 'Snapshot':
-                    minorList[(objType, objNo)] = DBInterface.list_of_keywords(Snapshot = objNo)
+                minorList[(objType, objNo)] = itemKeywords[(objType, objNo)]
                 # If we're populating Filter Lists ...
                 if populateFilterList:
                     # ... and iterate through that clip's keywords or the snapshot's whole snapshot keywords ...
@@ -904,7 +832,7 @@ class ReportGenerator(wx.Object):
                     # If we have a Snapshot ...
                     if objType == 'Snapshot':
                         # ... get a list of the Snapshot's Detail Coding
-                        tmpList = DBInterface.list_of_snapshot_detail_keywords(Snapshot = objNo)
+                        tmpList = reportData.detailKeywords[objNo]
                         # For each Keyword Group : Keyword pair ...
                         for (kwg, kw) in tmpList:
                             # ... check to see if the entry is NOT already in the list ...
@@ -957,7 +885,7 @@ class ReportGenerator(wx.Object):
         keywordLengths = {}
         # Because Snapshot records are coded two different ways, we need to be able to keep track of what
         # we've already counted in clipCount and ClipTotalTime so we don't count it twice.
-        self.itemsCounted = []
+        self.itemsCounted = {}
 
         # The majorList and minorList are constructed differently for the Episode and Document versions of the report,
         # and so the report must be built differently here too!
@@ -978,11 +906,53 @@ class ReportGenerator(wx.Object):
                 # Initialize workingCollection to an empty string, as we won't be using it.
                 workingCollection = ''
 
-            # If there are 20 or more items in the list, or at least 3 images ...
-            if (self.collection != None) and ((len(majorList) >= 20) or (len(self.snapshotFilterList) > 3)):
-                # ... create a Progress Dialog.  (The PARENT is needed to prevent the report being hidden
-                #     behind Transana!)
-                progress = wx.ProgressDialog(self.title, _('Assembling report contents'), parent=self.report)
+            # The Filter Lists are searched for every item, so search sets of them instead
+            documentFilterSet = set(self.documentFilterList)
+            snapshotFilterSet = set(self.snapshotFilterList)
+            quoteFilterSet = set(self.quoteFilterList)
+            filterSet = set(self.filterList)
+            # Find the items the Filter includes before anything is loaded, so no data is loaded and no
+            # report content is built for items the Filter excludes
+            shownItems = []
+            for (objType, objNo, objName, collNo) in majorList:
+                # If a Collection Name is passed in ...
+                if self.collection != None:
+                    # ... then our Filter comparison is based on Clip data
+                    filterVal = (objName, collNo, True)
+                # If a Library Name is passed in ...            
+                elif self.seriesName != None:
+                    # ... then our Filter comparison is based on Episode data
+                    filterVal = (objName, self.seriesName, True)
+                # If this report is called for a SearchLibraryResult ...
+                elif (self.searchSeries != None) and (self.treeCtrl != None):
+                    # ... then our Filter comparison is based on the search Library from the TreeCtrl
+                    filterVal = (objName, self.treeCtrl.GetItemText(self.searchSeries), True)
+                # If this report is called for a SearchCollectionResult ...
+                elif (self.searchColl != None) and (self.treeCtrl != None):
+                    # ... then our Filter comparison is based on Search Collection data
+                    filterVal = (objName, collNo, True)
+
+                # now that we have the filter comparison data, we see if it's actually in the Filter List.
+                if ((objType == 'Document') and (filterVal in documentFilterSet)) or \
+                   ((objType == 'Snapshot') and (filterVal in snapshotFilterSet)) or \
+                   ((objType == 'Quote')    and (filterVal in quoteFilterSet)) or \
+                   (filterVal in filterSet):
+                    shownItems.append((objType, objNo, objName, collNo))
+            # Index the shown items for the report loop
+            shownItemKeys = set([(objType, objNo) for (objType, objNo, objName, collNo) in shownItems])
+
+            # If we have Collection-based data, we show Collection information
+            if (self.collection != None) or ((self.searchColl != None) and (self.treeCtrl != None)):
+                collectNums = [collNo for (objType, objNo, objName, collNo) in shownItems]
+            else:
+                collectNums = []
+            # Load the data for all the report's Quotes, Clips, and Snapshots at once
+            self.LoadItemData(reportData, [(objType, objNo) for (objType, objNo, objName, collNo) in shownItems
+                                           if objType in ['Quote', 'Clip', 'Snapshot']], collectNums)
+            # Time the writing of the report separately from the loading of its data
+            writeStartTime = time.time()
+            # Count the items written, so the report's progress can be shown
+            itemsWritten = 0
 
             # Iterate through the major list
             for (objType, groupNo, group, parentCollNo) in majorList:
@@ -1007,32 +977,12 @@ class ReportGenerator(wx.Object):
                     except TypeError:
                         pass
 
-                # If a Collection Name is passed in ...
-                if self.collection != None:
-                    # ... then our Filter comparison is based on Clip data
-                    filterVal = (group, parentCollNo, True)
-                # If a Library Name is passed in ...            
-                elif self.seriesName != None:
-                    # ... then our Filter comparison is based on Episode data
-                    filterVal = (group, self.seriesName, True)
-                # If this report is called for a SearchLibraryResult ...
-                elif (self.searchSeries != None) and (self.treeCtrl != None):
-                    # ... then our Filter comparison is based on the search Library from the TreeCtrl
-                    filterVal = (group, self.treeCtrl.GetItemText(self.searchSeries), True)
-                # If this report is called for a SearchCollectionResult ...
-                elif (self.searchColl != None) and (self.treeCtrl != None):
-                    # ... then our Filter comparison is based on Search Collection data
-                    filterVal = (group, parentCollNo, True)
-
-                # now that we have the filter comparison data, we see if it's actually in the Filter List.
-                if ((objType == 'Document') and (filterVal in self.documentFilterList)) or \
-                   ((objType == 'Snapshot') and (filterVal in self.snapshotFilterList)) or \
-                   ((objType == 'Quote')    and (filterVal in self.quoteFilterList)) or \
-                   (filterVal in self.filterList):
+                # If the Filter includes this item ...
+                if (objType, groupNo) in shownItemKeys:
                     # If we have Collection-based data ...
                     if (self.collection != None) or ((self.searchColl != None) and (self.treeCtrl != None)):
                         # ... load the collection the current clip is in
-                        tempColl = Collection.Collection(parentCollNo)
+                        tempColl = reportData.collections[parentCollNo]
 
                         # Check to see if we're showing Collection headers, if we're showing nested collections (since
                         # there's no point showing collection headers if there aren't different collections!), and
@@ -1067,7 +1017,7 @@ class ReportGenerator(wx.Object):
                             # If we're supposed to show Collection Notes ...
                             if self.showCollectionNotes:
                                 # ... get a list of notes, including their object numbers
-                                notesList = DBInterface.list_of_notes(Collection=tempColl.number, includeNumber=True)
+                                notesList = reportData.notes[('Collection', tempColl.number)]
                                 # If there are notes for this Clip ...
                                 if (len(notesList) > 0):
                                     # Set the font for the Notes
@@ -1078,17 +1028,15 @@ class ReportGenerator(wx.Object):
                                     reportText.WriteText(_('Collection Notes:\n'))
 #                                    reportText.Newline()
                                     # Iterate throught the list of notes ...
-                                    for note in notesList:
-                                        # ... load each note ...
-                                        tempNote = Note.Note(note[0])
+                                    for (noteID, noteText) in notesList:
                                         reportText.SetTxtStyle(fontBold=useBold, parLeftIndent=127, parSpacingBefore = 0, parSpacingAfter = 0)
                                         # Add the note ID to the report
-                                        reportText.WriteText('%s\n' % tempNote.id)
+                                        reportText.WriteText('%s\n' % noteID)
 #                                        reportText.Newline()
                                         # Turn bold off.
                                         reportText.SetTxtStyle(fontBold=False, parLeftIndent=190)
                                         # Add the note text to the report (rstrip() prevents formatting problems when a note ends with blank lines)
-                                        reportText.WriteText('%s\n' % tempNote.text.rstrip())
+                                        reportText.WriteText('%s\n' % noteText.rstrip())
 #                                        reportText.Newline()
                             # Update the workingCollection variable with the data for the current collection so we'll
                             # be able to tell when the collection changes
@@ -1155,23 +1103,20 @@ class ReportGenerator(wx.Object):
                         reportText.WriteText('  %s\n' % (tempColl.GetNodeString(),))
                         # If we're looking at a Quote ...
                         if objType == 'Quote':
-                            # Get the full Quote data
-                            quoteObj = Quote.Quote(groupNo)
+                            # Get the Quote data
+                            quoteObj = reportData.items[('Quote', groupNo)]
                             tmpObj = quoteObj
-                            try:
-                                # If we have a Quote, load the Source Document!
-                                tmpDoc = Document.Document(num=tmpObj.source_document_num)
-                            except TransanaExceptions.RecordNotFoundError:
-                                tmpDoc = None
+                            # Get the Source Document data, which is None if the Document has been deleted
+                            tmpDoc = tmpObj.document
                         # If we're looking at a Clip ...
                         elif objType == 'Clip':
-                            # Get the full Clip data
-                            clipObj = Clip.Clip(groupNo)
+                            # Get the Clip data
+                            clipObj = reportData.items[('Clip', groupNo)]
                             tmpObj = clipObj
                         # If we're looking at a Snapshot ...
                         elif objType == 'Snapshot':
-                            # Get the full Snapshot data
-                            snapshotObj = Snapshot.Snapshot(groupNo, suppressEpisodeError = True)
+                            # Get the Snapshot data
+                            snapshotObj = reportData.items[('Snapshot', groupNo)]
                             tmpObj = snapshotObj
                         # If we're supposed to show the Media File Name ...
                         if self.showFile:
@@ -1362,22 +1307,8 @@ class ReportGenerator(wx.Object):
                                 # Iterate through the clips transcripts
                                 for tr in clipObj.transcripts:
                                     if self.showSourceInfo:
-                                        # Default the Episode Transcript to None in case the load fails
-                                        episodeTranscriptObj = None
-                                        # Begin exception handling
-                                        try:
-                                            # If the Clip Object has a defined Source Transcript ...
-                                            if tr.source_transcript > 0:
-                                                # ... try to load that source transcript
-                                                # To save time here, we can skip loading the actual transcript text, which can take time once we start dealing with images!
-                                                episodeTranscriptObj = Transcript.Transcript(tr.source_transcript, skipText=True)
-                                        # if the record is not found (orphaned Clip)
-                                        except TransanaExceptions.RecordNotFoundError:
-                                            # We don't need to do anything.
-                                            pass
-
-                                        # If an Episode Transcript was found ...
-                                        if episodeTranscriptObj != None:
+                                        # If an Episode Transcript was found ...  (The ID is None for an orphaned Clip.)
+                                        if tr.source_transcript_id != None:
                                             # Turn bold on.
                                             reportText.SetTxtStyle(fontSize = 10, fontFace = 'Courier New', fontBold = useBold,
                                                                    parLeftIndent = baseIndent + 63, parRightIndent = 0,
@@ -1387,7 +1318,7 @@ class ReportGenerator(wx.Object):
                                             # Turn bold off.
                                             reportText.SetTxtStyle(fontBold = False)
                                             # Add the data to the report, the Episode Transcript ID in this case
-                                            reportText.WriteText('  %s\n' % (episodeTranscriptObj.id,))
+                                            reportText.WriteText('  %s\n' % (tr.source_transcript_id,))
     #                                        reportText.Newline()
                                         # if no Episode Transcript is found, we have an orphan.
                                         else:
@@ -1651,7 +1582,7 @@ class ReportGenerator(wx.Object):
                                                 if tmpObj.episode_num > 0:
                                                     keywordTimes['%s : %s' % (key[0], key[1])] = tmpObj.episode_duration
                                             # Remember that THIS Snapshot with THIS Keyword HAS been counted now
-                                            self.itemsCounted.append(('Snapshot', tmpObj.number, key[0], key[1]))
+                                            self.itemsCounted[('Snapshot', tmpObj.number, key[0], key[1])] = True
                                         # Get the Graphic for the Coding Key
                                         tmpImage = SnapshotWindow.CodingKeyGraphic(tmpObj.keywordStyles[key])
                                         # Add the Image to the Report
@@ -1661,11 +1592,6 @@ class ReportGenerator(wx.Object):
                                         # Add the Shape Description and a Line Feed
                                         reportText.WriteText(')\n')
 
-                        # If there are 20 or more items in the list, or at least 3 images ...
-                        if (self.collection != None) and ((len(majorList) >= 20) or (len(self.snapshotFilterList) > 3)):
-                            # ... update the progress bar
-                            progress.Update(int(float(self.quoteCount + self.clipCount + self.snapshotCount) / float(len(majorList)) * 100))
-
                     # If we have a Library Report ...
                     else:
                         if objType == 'Episode':
@@ -1839,7 +1765,7 @@ class ReportGenerator(wx.Object):
                                             keywordTimes['%s : %s' % (keywordGroup, keyword)] = 0
                                             keywordLengths['%s : %s' % (keywordGroup, keyword)] = 0
                                         # Remember that THIS Episode with THIS Keyword HAS been counted now
-                                        self.itemsCounted.append((objType, tmpObj.number, keywordGroup, keyword))
+                                        self.itemsCounted[(objType, tmpObj.number, keywordGroup, keyword)] = True
                                 elif objType == 'Quote':
                                     # if THIS Quote with THIS Keyword has NOT already been counted ...
                                     if not (('Quote', tmpObj.number, keywordGroup, keyword) in self.itemsCounted):
@@ -1858,7 +1784,7 @@ class ReportGenerator(wx.Object):
                                             if (self.episodeName != None) or (self.collection != None) or (self.searchColl != None):
                                                 keywordLengths['%s : %s' % (keywordGroup, keyword)] += tmpObj.end_char - tmpObj.start_char
                                         # Remember that THIS Clip with THIS Keyword HAS been counted now
-                                        self.itemsCounted.append(('Quote', tmpObj.number, keywordGroup, keyword))
+                                        self.itemsCounted[('Quote', tmpObj.number, keywordGroup, keyword)] = True
                                 elif objType == 'Clip':
                                     # if THIS Clip with THIS Keyword has NOT already been counted ...
                                     if not (('Clip', clipObj.number, keywordGroup, keyword) in self.itemsCounted):
@@ -1877,7 +1803,7 @@ class ReportGenerator(wx.Object):
                                             if (self.episodeName != None) or (self.collection != None) or (self.searchColl != None):
                                                 keywordTimes['%s : %s' % (keywordGroup, keyword)] += clipObj.clip_stop - clipObj.clip_start
                                         # Remember that THIS Clip with THIS Keyword HAS been counted now
-                                        self.itemsCounted.append(('Clip', clipObj.number, keywordGroup, keyword))
+                                        self.itemsCounted[('Clip', clipObj.number, keywordGroup, keyword)] = True
                                 # If we have a Snapshot
                                 elif objType == 'Snapshot':
                                     # if THIS Snapshot with THIS Keyword has NOT already been counted ...
@@ -1896,7 +1822,7 @@ class ReportGenerator(wx.Object):
                                                ((self.episodeName != None) or (self.collection != None) or (self.searchColl != None)):
                                                 keywordTimes['%s : %s' % (keywordGroup, keyword)] += tmpObj.episode_duration
                                         # Remember that THIS Snapshot with THIS Keyword HAS been counted now
-                                        self.itemsCounted.append(('Snapshot', tmpObj.number, keywordGroup, keyword))
+                                        self.itemsCounted[('Snapshot', tmpObj.number, keywordGroup, keyword)] = True
                                 else:
                                     print "Line 1868", objType
 
@@ -1935,13 +1861,13 @@ class ReportGenerator(wx.Object):
                         notesList = []
                         # ... get a list of notes, including their object numbers
                         if self.showQuoteNotes and (objType == 'Quote'):
-                            notesList = DBInterface.list_of_notes(Quote=tmpObj.number, includeNumber=True)
+                            notesList = reportData.notes[('Quote', tmpObj.number)]
                             prompt = _('Quote Notes:\n')
                         elif self.showClipNotes and (objType == 'Clip'):
-                            notesList = DBInterface.list_of_notes(Clip=tmpObj.number, includeNumber=True)
+                            notesList = reportData.notes[('Clip', tmpObj.number)]
                             prompt = _('Clip Notes:\n')
                         elif self.showSnapshotNotes and (objType == 'Snapshot'):
-                            notesList = DBInterface.list_of_notes(Snapshot=tmpObj.number, includeNumber=True)
+                            notesList = reportData.notes[('Snapshot', tmpObj.number)]
                             prompt = _('Snapshot Notes:\n')
                         # If there are notes for this Clip ...
                         if len(notesList) > 0:
@@ -1954,16 +1880,14 @@ class ReportGenerator(wx.Object):
                             reportText.WriteText(prompt)
 #                            reportText.Newline()
                             # Iterate throught the list of notes ...
-                            for note in notesList:
-                                # ... load each note ...
-                                tempNote = Note.Note(note[0])
+                            for (noteID, noteText) in notesList:
                                 # Turn bold on.
                                 reportText.SetTxtStyle(fontBold = useBold,
                                                        parLeftIndent = baseIndent + 127, parRightIndent = 0,
                                                        parSpacingBefore = 0, parSpacingAfter = 0)
 
                                 # Add the note ID to the report
-                                reportText.WriteText('%s\n' % tempNote.id)
+                                reportText.WriteText('%s\n' % noteID)
 #                                reportText.Newline()
                                 # Turn bold off, format Note
                                 reportText.SetTxtStyle(fontBold = False,
@@ -1972,23 +1896,35 @@ class ReportGenerator(wx.Object):
 
                                 # Add the note text to the report
                                 # (rstrip() prevents formatting problems following a note with a blank line at the end!)
-                                reportText.WriteText('%s\n' % tempNote.text.rstrip())
+                                reportText.WriteText('%s\n' % noteText.rstrip())
 
 #                                reportText.Newline()
 
-            # If there are 20 or more items in the list, or at least 3 images ...
-            if (self.collection != None) and ((len(majorList) >= 20) or (len(self.snapshotFilterList) > 3)):
-                # Destroy the progress bar
-                progress.Destroy()
+                    # Let the TextReport show what has been written so far, with the report's progress.  The time
+                    # the report is paused is not part of the time taken to write it.
+                    itemsWritten += 1
+                    pauseTime = time.time()
+                    yield int(float(itemsWritten) / float(len(shownItems)) * 100)
+                    writeStartTime += time.time() - pauseTime
 
         # If this IS an Episode-based or Document-based report ...
         else:
 
-            # If there are 20 or more items in the list, or at least 3 images ...
-            if ((len(majorList) >= 20) or (len(self.snapshotFilterList) > 3)):
-                # ... create a Progress Dialog.  (The PARENT is needed to prevent the report being hidden
-                #     behind Transana!)
-                progress = wx.ProgressDialog(self.title, _('Assembling report contents'), parent=self.report)
+            # The Filter Lists are searched for every item, so search sets of them instead
+            filterSets = {'Quote' : set(self.quoteFilterList), 'Clip' : set(self.filterList), 'Snapshot' : set(self.snapshotFilterList)}
+            # Find the items the Filter includes before anything is loaded, so no data is loaded and no
+            # report content is built for items the Filter excludes
+            shownItemKeys = set()
+            for itemRecord in majorList:
+                if (itemRecord[itemRecord['Type'] + 'ID'], itemRecord['CollectNum'], True) in filterSets[itemRecord['Type']]:
+                    shownItemKeys.add((itemRecord['Type'], itemRecord[itemRecord['Type'] + 'Num']))
+
+            # Load the data for all the report's Quotes, Clips, and Snapshots at once
+            self.LoadItemData(reportData, list(shownItemKeys), [])
+            # Time the writing of the report separately from the loading of its data
+            writeStartTime = time.time()
+            # Count the items written, so the report's progress can be shown
+            itemsWritten = 0
 
             # If this is a Document Report ...
             if self.documentName != '':
@@ -2000,30 +1936,17 @@ class ReportGenerator(wx.Object):
             # Iterate through the major list
             for itemRecord in majorList:
                 if itemRecord['Type'] == 'Quote':
-                    # our Filter comparison is based on Quote data
-                    filterVal = (itemRecord['QuoteID'], itemRecord['CollectNum'], True)
-                    filterList = self.quoteFilterList
                     prompt = _('Quote')
-                    # Load the Quote Object
-                    tmpObj = Quote.Quote(num=itemRecord['QuoteNum'])
                 elif itemRecord['Type'] == 'Clip':
-                    # our Filter comparison is based on Clip data
-                    filterVal = (itemRecord['ClipID'], itemRecord['CollectNum'], True)
-                    filterList = self.filterList
                     prompt = _('Clip')
-                    # Load the Clip Object
-                    tmpObj = Clip.Clip(itemRecord['ClipNum'])
                 elif itemRecord['Type'] == 'Snapshot':
-                    # our Filter comparison is based on Clip data
-                    filterVal = (itemRecord['SnapshotID'], itemRecord['CollectNum'], True)                    
-                    filterList = self.snapshotFilterList
                     prompt = _('Snapshot')
-                    # Load the Snapshot Object
-                    tmpObj = Snapshot.Snapshot(itemRecord['SnapshotNum'], suppressEpisodeError = True)
-                # now that we have the filter comparison data, we see if it's actually in the Filter List.
-                if filterVal in filterList:
+                # If the Filter includes this item ...
+                if (itemRecord['Type'], itemRecord[itemRecord['Type'] + 'Num']) in shownItemKeys:
+                    # Load the Quote, Clip, or Snapshot Object
+                    tmpObj = reportData.items[(itemRecord['Type'], itemRecord[itemRecord['Type'] + 'Num'])]
                     # First, load the collection the current clip is in
-                    collectionObj = Collection.Collection(itemRecord['CollectNum'])
+                    collectionObj = reportData.collections[itemRecord['CollectNum']]
                     # Set the font for the heading.
                     reportText.SetTxtStyle(fontSize = 12, fontBold = True)
                     reportText.SetTxtStyle(parAlign = wx.TEXT_ALIGNMENT_LEFT,
@@ -2247,22 +2170,8 @@ class ReportGenerator(wx.Object):
                             # for each Clip transcript:
                             for tr in tmpObj.transcripts:
                                 if self.showSourceInfo:
-                                    # Default the Episode Transcript to None in case the load fails
-                                    episodeTranscriptObj = None
-                                    # Begin exception handling
-                                    try:
-                                        # If the Clip Object has a defined Source Transcript ...
-                                        if tr.source_transcript > 0:
-                                            # ... try to load that source transcript
-                                            # To save time here, we can skip loading the actual transcript text, which can take time once we start dealing with images!
-                                            episodeTranscriptObj = Transcript.Transcript(tr.source_transcript, skipText=True)
-                                    # if the record is not found (orphaned Clip)
-                                    except TransanaExceptions.RecordNotFoundError:
-                                        # We don't need to do anything.
-                                        pass
-
-                                    # If an Episode Transcript was found ...
-                                    if episodeTranscriptObj != None:
+                                    # If an Episode Transcript was found ...  (The ID is None for an orphaned Clip.)
+                                    if tr.source_transcript_id != None:
                                         # Set the font for the Clip Transcript Header
                                         reportText.SetTxtStyle(fontSize = 10, fontFace = 'Courier New', fontBold = useBold,
                                                                parLeftIndent = 63, parRightIndent = 0,
@@ -2273,7 +2182,7 @@ class ReportGenerator(wx.Object):
                                         # Turn bold off.
                                         reportText.SetTxtStyle(fontBold = False)
                                         # Add the data to the report, the Episode Transcript ID in this case
-                                        reportText.WriteText('  %s\n' % (episodeTranscriptObj.id,))
+                                        reportText.WriteText('  %s\n' % (tr.source_transcript_id,))
                                     # if no Episode Transcript is found, we have an orphan.
                                     else:
 
@@ -2538,7 +2447,7 @@ class ReportGenerator(wx.Object):
                                             if tmpObj.episode_num > 0:
                                                 keywordTimes['%s : %s' % (key[0], key[1])] += tmpObj.episode_duration
                                         # Remember that THIS Snapshot with THIS Keyword HAS been counted now
-                                        self.itemsCounted.append(('Snapshot', tmpObj.number, key[0], key[1]))
+                                        self.itemsCounted[('Snapshot', tmpObj.number, key[0], key[1])] = True
 
                                     # Get the Graphic for the Coding Key
                                     tmpImage = SnapshotWindow.CodingKeyGraphic(tmpObj.keywordStyles[key])
@@ -2615,7 +2524,7 @@ class ReportGenerator(wx.Object):
                                             keywordTimes['%s : %s' % (keywordGroup, keyword)] = 0
                                             keywordLengths['%s : %s' % (keywordGroup, keyword)] = tmpObj.end_char - tmpObj.start_char
                                         # Remember that THIS Quote with THIS Keyword HAS been counted now
-                                        self.itemsCounted.append(('Quote', tmpObj.number, keywordGroup, keyword))
+                                        self.itemsCounted[('Quote', tmpObj.number, keywordGroup, keyword)] = True
                                 # If we have a Clip ...
                                 elif itemRecord['Type'] == 'Clip':
                                     # if THIS Clip with THIS Keyword has NOT already been counted ...
@@ -2629,7 +2538,7 @@ class ReportGenerator(wx.Object):
                                             keywordTimes['%s : %s' % (keywordGroup, keyword)] = tmpObj.clip_stop - tmpObj.clip_start
                                             keywordLengths['%s : %s' % (keywordGroup, keyword)] = 0
                                         # Remember that THIS Clip with THIS Keyword HAS been counted now
-                                        self.itemsCounted.append(('Clip', tmpObj.number, keywordGroup, keyword))
+                                        self.itemsCounted[('Clip', tmpObj.number, keywordGroup, keyword)] = True
                                 # If we have a Snapshot ...
                                 elif itemRecord['Type'] == 'Snapshot':
                                     # if THIS Snapshot with THIS Keyword has NOT already been counted ...
@@ -2648,7 +2557,7 @@ class ReportGenerator(wx.Object):
                                                ((self.episodeName != None) or (self.collection != None) or (self.searchColl != None)):
                                                 keywordTimes['%s : %s' % (keywordGroup, keyword)] += tmpObj.episode_duration
                                         # Remember that THIS Snapshot with THIS Keyword HAS been counted now
-                                        self.itemsCounted.append(('Snapshot', tmpObj.number, keywordGroup, keyword))
+                                        self.itemsCounted[('Snapshot', tmpObj.number, keywordGroup, keyword)] = True
                                     
                     # if we are supposed to show Comments ...
                     if self.showComments:
@@ -2682,13 +2591,13 @@ class ReportGenerator(wx.Object):
                         notesList = []
                         # ... get a list of notes, including their object numbers
                         if self.showQuoteNotes and (itemRecord['Type'] == 'Quote'):
-                            notesList = DBInterface.list_of_notes(Quote=tmpObj.number, includeNumber=True)
+                            notesList = reportData.notes[('Quote', tmpObj.number)]
                             prompt = _('Quote Notes:\n')
                         elif self.showClipNotes and (itemRecord['Type'] == 'Clip'):
-                            notesList = DBInterface.list_of_notes(Clip=tmpObj.number, includeNumber=True)
+                            notesList = reportData.notes[('Clip', tmpObj.number)]
                             prompt = _('Clip Notes:\n')
                         elif self.showSnapshotNotes and (itemRecord['Type'] == 'Snapshot'):
-                            notesList = DBInterface.list_of_notes(Snapshot=tmpObj.number, includeNumber=True)
+                            notesList = reportData.notes[('Snapshot', tmpObj.number)]
                             prompt = _('Snapshot Notes:\n')
                         # If there are notes for this object ...
                         if len(notesList) > 0:
@@ -2699,36 +2608,29 @@ class ReportGenerator(wx.Object):
                             reportText.WriteText(prompt)
 #                            reportText.Newline()
                             # Iterate throught the list of notes ...
-                            for note in notesList:
-                                # ... load each note ...
-                                tempNote = Note.Note(note[0])
+                            for (noteID, noteText) in notesList:
                                 # Turn bold on.
                                 reportText.SetTxtStyle(fontBold = useBold, parLeftIndent = 127, parRightIndent = 127,
                                                        parSpacingBefore = 0, parSpacingAfter = 0)
                                 # Add the note ID to the report
-                                reportText.WriteText('%s\n' % tempNote.id)
+                                reportText.WriteText('%s\n' % noteID)
 #                                reportText.Newline()
                                 # Turn bold off.
                                 reportText.SetTxtStyle(fontBold = False, parLeftIndent = 190, parRightIndent = 127,
                                                        parSpacingBefore = 0, parSpacingAfter = 0)
                                 # Add the note text to the report (rstrip() prevents formatting problems when a note ends with blank lines)
-                                reportText.WriteText('%s\n' % tempNote.text.rstrip())
+                                reportText.WriteText('%s\n' % noteText.rstrip())
 #                                reportText.Newline()
 
-                    # If there are 20 or more items in the list, or at least 3 images ...
-                    if ((len(majorList) >= 20) or (len(self.snapshotFilterList) > 3)):
-                        # Determine the correct percentage figure ...
-                        val = min(100, int(float(self.quoteCount + self.clipCount + self.snapshotCount) / float(len(majorList)) * 100))
-                        # ... update the progress bar
-                        progress.Update(val)
-
                     reportText.WriteText('\n')
 #                    reportText.Newline()
 
-            # If there are 20 or more items in the list, or at least 3 images ...
-            if ((len(majorList) >= 20) or (len(self.snapshotFilterList) > 3)):
-                # Destroy the progress bar
-                progress.Destroy()
+                    # Let the TextReport show what has been written so far, with the report's progress.  The time
+                    # the report is paused is not part of the time taken to write it.
+                    itemsWritten += 1
+                    pauseTime = time.time()
+                    yield int(float(itemsWritten) / float(len(shownItemKeys)) * 100)
+                    writeStartTime += time.time() - pauseTime
 
         if 'wxMac' in wx.PlatformInfo:
             keyWidth = 50
@@ -2911,9 +2813,40 @@ class ReportGenerator(wx.Object):
                 # Add some whitespace
                 reportText.WriteText('\n\n')
 
+        # Record how long it took to write the report, and keep the time taken by each stage
+        reportData.AddStageTime('Write report', time.time() - writeStartTime)
+        self.stageTimes = reportData.stageTimes
+
+        if DEBUG:
+            for (stageName, seconds) in self.stageTimes:
+                print "ReportGenerator.OnDisplay(): %-30s %8.4f" % (stageName, seconds)
+            print "ReportGenerator.OnDisplay(): %-30s %8.4f" % ('Total', reportData.GetTotalTime())
+
         # Make the control read only, now that it's done
         reportText.SetReadOnly(True)
 
+    def LoadItemData(self, reportData, itemKeys, collectNums):
+        """ Load the data the report shows for a list of (Object Type, Object Number) for Quotes, Clips, and
+            Snapshots, including the Notes shown for them and for the Collections in collectNums, into the
+            Report Data object with a few queries """
+        # Snapshot images and coding keys are drawn from complete Snapshot objects
+        reportData.LoadItems(itemKeys, quoteText=self.showQuoteText, transcriptText=self.showTranscripts,
+                             fullSnapshots=(self.showSnapshotImage in [0, 1, 2]) or self.showSnapshotCoding)
+        # Determine which Notes are shown
+        noteKeys = []
+        if self.showCollectionNotes:
+            noteKeys += [('Collection', collectNum) for collectNum in collectNums]
+        for (objType, showNotes) in [('Quote', self.showQuoteNotes), ('Clip', self.showClipNotes), ('Snapshot', self.showSnapshotNotes)]:
+            if showNotes:
+                noteKeys += [(keyType, keyNum) for (keyType, keyNum) in itemKeys if keyType == objType]
+        reportData.LoadNotes(noteKeys)
+        # If Snapshot images are shown, the reduced-size copies of the images the report needs are made in the
+        # background while the report is written
+        if self.showSnapshotImage in [0, 1, 2]:
+            for (objType, objNum) in itemKeys:
+                if (objType == 'Snapshot') and reportData.items.has_key((objType, objNum)):
+                    SnapshotWindow.PrefetchImage(reportData.items[(objType, objNum)])
+
     def OnFilter(self, event):
         """ This method, required by TextReport, implements the call to the Filter Dialog.  It needs to be
             in the report parent because the TextReport doesn't know the appropriate filter parameters. """
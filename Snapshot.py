@@ -36,6 +36,8 @@ import DBInterface
 import Dialogs
 # Import Transana's Episode Object
 import Episode
+# import Transana's Episode Segment Index
+import EpisodeSegmentIndex
 # import Transana's Miscellaneous Functions
 import Misc
 # import Transana's Note Object
@@ -690,6 +692,8 @@ class Snapshot(DataObject.DataObject):
                     c.execute('COMMIT')
                 # Close the Database Cursor
                 c.close()
+                # Displayed Episode Items may have changed, so the Episode Segment Indexes must be reloaded
+                EpisodeSegmentIndex.Invalidate()
 
     def db_delete(self, use_transactions=True):
         """ Delete this object record from the database.  Parameter indicates if we should use DB Transactions """
@@ -741,6 +745,8 @@ class Snapshot(DataObject.DataObject):
             raise e
         except:
             raise
+        # Displayed Episode Items may have changed, so the Episode Segment Indexes must be reloaded
+        EpisodeSegmentIndex.Invalidate()
         return result
 
     def lock_record(self):
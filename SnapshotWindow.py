@@ -34,6 +34,8 @@ import Collection
 import Dialogs
 # import Transana's Database Interface
 import DBInterface
+# import Transana's Image Cache
+import ImageCache
 # Import Transana's Keyword Object
 import KeywordObject
 # import Transana's Keyword List Edit Form
@@ -63,6 +65,24 @@ MENU_POPUP_HIDE                =  wx.NewId()
 MENU_POPUP_SENDTOBACK          =  wx.NewId()
 MENU_POPUP_DELETE              =  wx.NewId()
 
+def GetHiddenImageSize(snapshot, width, height):
+    """ A hidden Snapshot Window, such as the one used to put a Snapshot in a report, only draws the Snapshot's
+        image at the Snapshot's scale, or fit to a window width by height pixels if the Snapshot has no scale.
+        Return the ImageCache parameters for an image of that size. """
+    # If the Snapshot has a defined scale, the image is drawn at that scale
+    if snapshot.image_scale > 0.0:
+        return {'scale' : snapshot.image_scale}
+    # Otherwise, the image is fit to the window
+    else:
+        return {'maxWidth' : width, 'maxHeight' : height}
+
+def PrefetchImage(snapshot):
+    """ Start making the reduced-size copy of a Snapshot's image that a hidden Snapshot Window will need """
+    # Snapshots without a defined window size use the default size, which needs a Snapshot Window to determine
+    if snapshot.image_size[0] > 0:
+        ImageCache.Prefetch(snapshot.image_filename, **GetHiddenImageSize(snapshot, snapshot.image_size[0], snapshot.image_size[1]))
+
+
 class SnapshotWindow(wx.Frame):
     """ This window displays still images and allows coding of those images. """
     def __init__(self, parent, id, title, snapshot, showWindow=True):
@@ -91,15 +111,6 @@ class SnapshotWindow(wx.Frame):
             errmsg = unicode(_("Image file not found:\n%s"), 'utf8')
             raise TransanaExceptions.ImageLoadError(errmsg % self.obj.image_filename)
 
-        # Load the image
-        self.bgImage = wx.Image(self.obj.image_filename)
-            
-        # Make sure the image is loaded, is not corrupt
-        if not self.bgImage.IsOk():
-            # If not, raise an exception
-            errmsg = unicode(_("Unable to load image file:\n%s\nThere may be a problem with the file, or you may\nhave too many Snapshots open."), 'utf8')
-            raise TransanaExceptions.ImageLoadError(errmsg % self.obj.image_filename)
-
         # If the image that is passed in has a defined window size ...
         if self.obj.image_size[0] > 0:
             # ... use that defined size
@@ -110,6 +121,25 @@ class SnapshotWindow(wx.Frame):
             # ... use the default image window size
             width = self.__size()[0]
             height = self.__size()[1]
+
+        # If we're showing the window ...
+        if self.showWindow:
+            # ... load the full image, which the user can zoom in on
+            self.bgImage = wx.Image(self.obj.image_filename)
+            # Note the full image size
+            self.bgImageSize = (self.bgImage.GetWidth(), self.bgImage.GetHeight())
+        # If the window is hidden ...
+        else:
+            # ... the image is only drawn at one size, so get a copy of that size from the Image Cache, with the
+            # full image size
+            (self.bgImage, self.bgImageSize) = ImageCache.GetImage(self.obj.image_filename, **GetHiddenImageSize(self.obj, width, height))
+            
+        # Make sure the image is loaded, is not corrupt
+        if not self.bgImage.IsOk():
+            # If not, raise an exception
+            errmsg = unicode(_("Unable to load image file:\n%s\nThere may be a problem with the file, or you may\nhave too many Snapshots open."), 'utf8')
+            raise TransanaExceptions.ImageLoadError(errmsg % self.obj.image_filename)
+
         # Initialize the Window Frame
         wx.Frame.__init__(self,parent,-1, title, pos = self.__pos(), size = (width, height), style=wx.DEFAULT_FRAME_STYLE|wx.NO_FULL_REPAINT_ON_RESIZE)
         # Set the background to WHITE
@@ -495,10 +525,11 @@ class SnapshotWindow(wx.Frame):
         # an exception on Zoom In with click and Wheel zooms, as well as with selection-based zoomed.  I contacted Chris
         # Barker, who wrote FloatCanvas, and he suggested I try ScaledBitmap2, which requires a 2-step creation process.
         # It seems to work.
-        # Add a Scaled Bitmap, converted from the loaded image, to the SnapshotWindow canvas
+        # Add a Scaled Bitmap, converted from the loaded image, to the SnapshotWindow canvas.  The image is placed and
+        # sized using the full image size, so a reduced-size copy of the image covers the same area as the full image.
         bgBitmapObj = FloatCanvas.ScaledBitmap2(self.bgImage,  # wx.BitmapFromImage(self.bgImage),
-                                               (0 - (float(self.bgImage.GetWidth()) / 2.0), (float(self.bgImage.GetHeight()) / 2.0)),
-                                               Height = self.bgImage.GetHeight(),
+                                               (0 - (float(self.bgImageSize[0]) / 2.0), (float(self.bgImageSize[1]) / 2.0)),
+                                               Height = self.bgImageSize[1],
                                                Position = "tl")
         self.canvas.AddObject(bgBitmapObj)
 
@@ -514,6 +545,9 @@ class SnapshotWindow(wx.Frame):
 
         # Initialize the Coding Object Number to the number of existing objects
         self.objectNum = len(self.obj.codingObjects)
+        # Initialize the dictionary of FloatCanvas objects on the canvas for the Coding Objects, indexed by
+        # Coding Object key.  Each entry is (FloatCanvas object, drawing state).  See FileRedraw().
+        self.drawObjects = {}
         # Initialize the variable that tracks the MouseDown position to None
         self.mouseDown = None
         # Initialize the variable that tracks the MouseUp position to None
@@ -814,9 +848,7 @@ class SnapshotWindow(wx.Frame):
             if len(self.obj.codingObjects) > 0:
                 # Freeze the image
                 self.canvas.Freeze()
-                # Clear the Image (without deleting coding)
-                self.FileClear(None)
-                # Redraw the coding
+                # Redraw the coding.  Only the objects for this keyword are replaced.
                 self.FileRedraw(None)
                 # Thaw the Image
                 self.canvas.Thaw()
@@ -1069,6 +1101,8 @@ class SnapshotWindow(wx.Frame):
 
         # Load the image
         self.bgImage = wx.Image(newSnapshot.image_filename)
+        # Note the full image size
+        self.bgImageSize = (self.bgImage.GetWidth(), self.bgImage.GetHeight())
             
         # Make sure the image is loaded, is not corrupt
         if not self.bgImage.IsOk():
@@ -1085,6 +1119,8 @@ class SnapshotWindow(wx.Frame):
 
         # Clear the Canvas to remove the previous Snapshot
         self.canvas.ClearAll()
+        # There are no longer any Coding Objects on the canvas
+        self.drawObjects = {}
 
         # Change the Window Name
         self.SetTitle(_("Snapshot").decode('utf8') + u' - ' + self.obj.GetNodeString(True))
@@ -1129,10 +1165,11 @@ class SnapshotWindow(wx.Frame):
         # an exception on Zoom In with click and Wheel zooms, as well as with selection-based zoomed.  I contacted Chris
         # Barker, who wrote FloatCanvas, and he suggested I try ScaledBitmap2, which requires a 2-step creation process.
         # It seems to work.
-        # Add a Scaled Bitmap, converted from the loaded image, to the SnapshotWindow canvas
+        # Add a Scaled Bitmap, converted from the loaded image, to the SnapshotWindow canvas.  The image is placed and
+        # sized using the full image size, so a reduced-size copy of the image covers the same area as the full image.
         bgBitmapObj = FloatCanvas.ScaledBitmap2(self.bgImage,  # wx.BitmapFromImage(self.bgImage),
-                                               (0 - (float(self.bgImage.GetWidth()) / 2.0), (float(self.bgImage.GetHeight()) / 2.0)),
-                                               Height = self.bgImage.GetHeight(),
+                                               (0 - (float(self.bgImageSize[0]) / 2.0), (float(self.bgImageSize[1]) / 2.0)),
+                                               Height = self.bgImageSize[1],
                                                Position = "tl")
         self.canvas.AddObject(bgBitmapObj)
 
@@ -1366,9 +1403,8 @@ class SnapshotWindow(wx.Frame):
 
         # If the image has changed ...    
         if changed:
-            # ... update the screen
+            # ... update the screen.  Only the objects for this keyword are added or removed.
             self.canvas.Freeze()
-            self.FileClear(None)
             self.FileRedraw(None)
             self.canvas.Thaw()
 
@@ -1489,6 +1525,12 @@ class SnapshotWindow(wx.Frame):
                     drawObj.Bind(FloatCanvas.EVT_FC_RIGHT_DOWN, self.OnItemRightDown)
                     drawObj.Bind(FloatCanvas.EVT_FC_ENTER_OBJECT, self.OnEnterObject)
                     drawObj.Bind(FloatCanvas.EVT_FC_LEAVE_OBJECT, self.OnLeaveObject)
+                    # If a draw object with this number is already on the canvas, it has been replaced
+                    if self.drawObjects.has_key(self.objectNum):
+                        self.drawObjects[self.objectNum][0].UnBindAll()
+                        self.canvas.RemoveObject(self.drawObjects[self.objectNum][0])
+                    # Remember the draw object, so FileRedraw() doesn't draw it again
+                    self.drawObjects[self.objectNum] = (drawObj, self.GetDrawState(self.obj.codingObjects[self.objectNum], {}))
                     # Increment the Draw Object counter
                     self.objectNum += 1
                     # Redraw the FloatCanvas
@@ -1564,9 +1606,8 @@ class SnapshotWindow(wx.Frame):
             # ... delete the appropriate Coding Object from the Snapshot
             del(self.obj.codingObjects[self.popupObject.ObjectNum])
 
-        # ... update the screen
+        # ... update the screen.  Only the popup's object is removed, or moved to the back.
         self.canvas.Freeze()
-        self.FileClear(None)
         self.FileRedraw(None)
         self.canvas.Thaw()
 
@@ -1589,6 +1630,8 @@ class SnapshotWindow(wx.Frame):
         self.UnbindEvents()
         # Initialize the FloatCanvas
         self.canvas.InitAll()
+        # There are no longer any Coding Objects on the canvas
+        self.drawObjects = {}
         # Re-bind the FloatCanvas events
         self.BindEvents()
         
@@ -1599,8 +1642,8 @@ class SnapshotWindow(wx.Frame):
 
         # Add a Scaled Bitmap, converted from the loaded image, to the SnapshotWindow canvas
         bgBitmapObj = FloatCanvas.ScaledBitmap2(wx.BitmapFromImage(self.bgImage),
-                                               (0 - (float(self.bgImage.GetWidth()) / 2.0), (float(self.bgImage.GetHeight()) / 2.0)),
-                                               Height = self.bgImage.GetHeight(),
+                                               (0 - (float(self.bgImageSize[0]) / 2.0), (float(self.bgImageSize[1]) / 2.0)),
+                                               Height = self.bgImageSize[1],
                                                Position = "tl")
         self.canvas.AddObject(bgBitmapObj)
 
@@ -1660,100 +1703,144 @@ class SnapshotWindow(wx.Frame):
         # Redraw the Snapshot
         self.FileRedraw(event)
 
+    def GetDrawState(self, obj, styleStates):
+        """ Return the state a Coding Object is drawn with:  its coordinates and its keyword's drawing style,
+            with the line color resolved.  styleStates caches the style part by (Keyword Group, Keyword), so
+            it is only worked out once per keyword during a redraw. """
+        # Get the Keyword Group : Keyword for the Coding Object
+        kwKey = (obj['keywordGroup'], obj['keyword'])
+        # If we haven't worked out this keyword's style yet ...
+        if not styleStates.has_key(kwKey):
+            # Get the Keyword Styles for the Keyword Group : Keyword from the Snapshot
+            keywordStyles = self.obj.keywordStyles[kwKey]
+            # If the Line Color's Name is in the defined graphics colors ...
+            if TransanaGlobal.transana_colorLookup.has_key(keywordStyles['lineColorName']):
+                # ... get the Color Definition by looking it up in the Global List.
+                #     (Thus, it will be correct even if the user changes the global color definitions!)
+                color = tuple(TransanaGlobal.transana_colorLookup[keywordStyles['lineColorName']])
+            # If the Color Name isn't in the defined graphics colors ...
+            else:
+                # ... use the Color Definition saved with the Snapshot's Keyword Styles
+                color = (int(keywordStyles['lineColorDef'][1:3], 16), int(keywordStyles['lineColorDef'][3:5], 16), int(keywordStyles['lineColorDef'][5:7], 16))
+            # Remember the drawing style
+            styleStates[kwKey] = (keywordStyles['drawMode'], color, int(keywordStyles['lineWidth']), keywordStyles['lineStyle'])
+        # The state is the keyword, the coordinates, and the drawing style
+        return kwKey + (obj['x1'], obj['y1'], obj['x2'], obj['y2']) + styleStates[kwKey]
+
+    def AddDrawObject(self, key, state):
+        """ Add the FloatCanvas object for a Coding Object to the canvas, using the drawing state from GetDrawState() """
+        # Unpack the drawing state
+        (kwg, kw, x1, y1, x2, y2, drawMode, color, lineWidth, lineStyle) = state
+        # Initialize the Draw Object to None
+        drawObj = None
+        # Set the Coding Color to the defined color definition
+        codingColor = wx.Colour(color[0], color[1], color[2])
+        # If we're drawing an Arrow ...
+        if drawMode == 'Arrow':
+            # Add the Arrow to the canvas
+            drawObj = self.canvas.AddArrowLine((x1, y1, x2, y2),
+                                               LineWidth = lineWidth,
+                                               LineColor = codingColor,
+                                               LineStyle = lineStyle,
+                                               ArrowHeadSize = 15,
+                                               ArrowHeadAngle = 60)
+
+        # If we're drawing a Line ...
+        elif drawMode == 'Line':
+            # Add the Line to the canvas
+            drawObj = self.canvas.AddArrowLine((x1, y1, x2, y2),
+                                               LineWidth = lineWidth,
+                                               LineColor = codingColor,
+                                               LineStyle = lineStyle,
+                                               ArrowHeadSize = 0)
+
+        # If we're drawing a Rectangle ...
+        elif drawMode == 'Rectangle':
+            # Add the Rectangle to the canvas
+            drawObj = self.canvas.AddRectangle((x1, y1), (x2 - x1, y2 - y1),
+                                               LineWidth = lineWidth,
+                                               LineColor = codingColor,
+                                               LineStyle = lineStyle)
+        
+        # If we're drawing an Ellipse ...
+        elif drawMode == 'Ellipse':
+            # Add the Ellipse to the canvas
+            drawObj = self.canvas.AddEllipse((x1, y1), (x2 - x1, y2 - y1),
+                                             LineWidth = lineWidth,
+                                             LineColor = codingColor,
+                                             LineStyle = lineStyle)
+
+        # If we have a valid draw object ...
+        if drawObj:
+            # Number the draw object
+            drawObj.ObjectNum = key
+            # Name the draw object
+            drawObj.Name = "%s : %s" % (kwg, kw)
+            # Specify the "Hit" size as slightly larger than the arrow line itself to make object selection easier
+            drawObj.HitLineWidth = self.lineWidth + 2
+            # Define the draw object's Left Click, Enter, and Leave events
+            drawObj.Bind(FloatCanvas.EVT_FC_RIGHT_DOWN, self.OnItemRightDown)
+            drawObj.Bind(FloatCanvas.EVT_FC_ENTER_OBJECT, self.OnEnterObject)
+            drawObj.Bind(FloatCanvas.EVT_FC_LEAVE_OBJECT, self.OnLeaveObject)
+            # Remember the draw object and the state it was drawn with
+            self.drawObjects[key] = (drawObj, state)
+
     def FileRedraw(self, event):
         """ Redraws the coding on an image.  This is used when the coding has changed to allow the screen
-            to reflect those changes. """
-        # If called from the Hide All Coding menu item ...
-        if not (event is None) and \
-           ((event.GetId() == MENU_FILE_HIDEALLCODING) or \
-            (('wxMac' in wx.PlatformInfo) and (event.GetId() == self.hideAllCodingButton.GetId()))):
-            # ... clear the screen (without deleting the Coding Objects)
-            self.FileClear(event)
+            to reflect those changes.  The FloatCanvas objects for the coding are kept between redraws, so
+            only objects that have been added, removed, hidden, shown, or re-styled are changed. """
         # Get the list of keys for the Coding Objects
         keys = self.obj.codingObjects.keys()
         # Sort the keys, since drawing order matters
         keys.sort()
-        # For each Coding Object ...
+        # If this was called from the Menu ...
+        if not (event is None):
+            # ... and it was the Show All Coding menu item ...
+            if ((event.GetId() == MENU_FILE_SHOWALLCODING) or \
+                (('wxMac' in wx.PlatformInfo) and (event.GetId() == self.showAllCodingButton.GetId()))):
+                # ... then set ALL objects to Visible
+                for key in keys:
+                    self.obj.codingObjects[key]['visible'] = True
+            # ... and it was the Hide All Coding menu item ...
+            elif ((event.GetId() == MENU_FILE_HIDEALLCODING) or \
+                  (('wxMac' in wx.PlatformInfo) and (event.GetId() == self.hideAllCodingButton.GetId()))):
+                # ... then set ALL object to NOT VISIBLE
+                for key in keys:
+                    self.obj.codingObjects[key]['visible'] = False
+
+        # Keyword drawing styles, worked out once per keyword for this redraw
+        styleStates = {}
+        # Determine the drawing state of each VISIBLE Coding Object
+        states = {}
         for key in keys:
-            # ... grab a reference to the current Coding object
-            obj = self.obj.codingObjects[key]
-            # If this was called from the Menu ...
-            if not (event is None):
-                # ... and it was the Show All Coding menu item ...
-                if ((event.GetId() == MENU_FILE_SHOWALLCODING) or \
-                    (('wxMac' in wx.PlatformInfo) and (event.GetId() == self.showAllCodingButton.GetId()))):
-                    # ... then set ALL objects to Visible
-                    obj['visible'] = True
-                # ... and it was the Hide All Coding menu item ...
-                elif ((event.GetId() == MENU_FILE_HIDEALLCODING) or \
-                      (('wxMac' in wx.PlatformInfo) and (event.GetId() == self.hideAllCodingButton.GetId()))):
-                    # ... then set ALL object to NOT VISIBLE
-                    obj['visible'] = False
-
-            # If the current object is supposed to be VISIBLE ...
-            if obj['visible']:
-                # Initialize the Draw Object to None
-                drawObj = None
-                # Get the Keyword Styles for the selected Keyword Group : Keyword from the Snapshot
-                keywordStyles = self.obj.keywordStyles[(obj['keywordGroup'], obj['keyword'])]
-                # If the Line Color's Name is in the defined graphics colors ...
-                if keywordStyles['lineColorName'] in TransanaGlobal.transana_colorLookup.keys():
-                    # ... get the Color Definition by looking it up in the Global List.
-                    #     (Thus, it will be correct even if the user changes the global color definitions!)
-                    color = TransanaGlobal.transana_colorLookup[keywordStyles['lineColorName']]
-                # If the Color Name isn't in the defined graphics colors ...
-                else:
-                    # ... use the Color Definition saved with the Snapshot's Keyword Styles
-                    color = (int(keywordStyles['lineColorDef'][1:3], 16), int(keywordStyles['lineColorDef'][3:5], 16), int(keywordStyles['lineColorDef'][5:7], 16))
-                # Set the Coding Color to the defined color definition
-                codingColor = wx.Colour(color[0], color[1], color[2])
-                # If we're drawing an Arrow ...
-                if keywordStyles['drawMode'] == 'Arrow':
-                    # Add the Arrow to the canvas
-                    drawObj = self.canvas.AddArrowLine((obj['x1'], obj['y1'], obj['x2'], obj['y2']),
-                                                       LineWidth = int(keywordStyles['lineWidth']),
-                                                       LineColor = codingColor,
-                                                       LineStyle = keywordStyles['lineStyle'],
-                                                       ArrowHeadSize = 15,
-                                                       ArrowHeadAngle = 60)
-
-                # If we're drawing a Line ...
-                elif keywordStyles['drawMode'] == 'Line':
-                    # Add the Line to the canvas
-                    drawObj = self.canvas.AddArrowLine((obj['x1'], obj['y1'], obj['x2'], obj['y2']),
-                                                       LineWidth = int(keywordStyles['lineWidth']),
-                                                       LineColor = codingColor,
-                                                       LineStyle = keywordStyles['lineStyle'],
-                                                       ArrowHeadSize = 0)
-
-                # If we're drawing a Rectangle ...
-                elif keywordStyles['drawMode'] == 'Rectangle':
-                    # Add the Rectangle to the canvas
-                    drawObj = self.canvas.AddRectangle((obj['x1'], obj['y1']), (obj['x2'] - obj['x1'], obj['y2'] - obj['y1']),
-                                                       LineWidth = int(keywordStyles['lineWidth']),
-                                                       LineColor = codingColor,
-                                                       LineStyle = keywordStyles['lineStyle'])
-                
-                # If we're drawing an Ellipse ...
-                elif keywordStyles['drawMode'] == 'Ellipse':
-                    # Add the Ellipse to the canvas
-                    drawObj = self.canvas.AddEllipse((obj['x1'], obj['y1']), (obj['x2'] - obj['x1'], obj['y2'] - obj['y1']),
-                                                     LineWidth = int(keywordStyles['lineWidth']),
-                                                     LineColor = codingColor,
-                                                     LineStyle = keywordStyles['lineStyle'])
-
-                # If we have a valid draw object ...
-                if drawObj:
-                    # Number the draw object
-                    drawObj.ObjectNum = key
-                    # Name the draw object
-                    drawObj.Name = "%s : %s" % (obj['keywordGroup'], obj['keyword'])
-                    # Specify the "Hit" size as slightly larger than the arrow line itself to make object selection easier
-                    drawObj.HitLineWidth = self.lineWidth + 2
-                    # Define the draw object's Left Click, Enter, and Leave events
-                    drawObj.Bind(FloatCanvas.EVT_FC_RIGHT_DOWN, self.OnItemRightDown)
-                    drawObj.Bind(FloatCanvas.EVT_FC_ENTER_OBJECT, self.OnEnterObject)
-                    drawObj.Bind(FloatCanvas.EVT_FC_LEAVE_OBJECT, self.OnLeaveObject)
+            if self.obj.codingObjects[key]['visible']:
+                states[key] = self.GetDrawState(self.obj.codingObjects[key], styleStates)
+
+        # Remove the objects that have been deleted, hidden, or changed from the canvas
+        for key in self.drawObjects.keys():
+            if (not states.has_key(key)) or (states[key] != self.drawObjects[key][1]):
+                (drawObj, state) = self.drawObjects.pop(key)
+                drawObj.UnBindAll()
+                self.canvas.RemoveObject(drawObj)
+
+        # Get the keys of the objects that need to be added to the canvas
+        newKeys = [key for key in keys if states.has_key(key) and not self.drawObjects.has_key(key)]
+        # If there are any ...
+        if len(newKeys) > 0:
+            # ... then objects already on the canvas that come after the first new one have to be moved
+            # in front of it, since drawing order matters
+            for key in keys:
+                if (key > newKeys[0]) and self.drawObjects.has_key(key):
+                    self.canvas.RemoveObject(self.drawObjects[key][0])
+            # Add the objects from the first new one on, in order
+            for key in keys:
+                if (key >= newKeys[0]) and states.has_key(key):
+                    # If the object is already on the canvas, re-add it in its place
+                    if self.drawObjects.has_key(key):
+                        self.canvas.AddObject(self.drawObjects[key][0])
+                    # Otherwise, create it
+                    else:
+                        self.AddDrawObject(key, states[key])
 
         # Hide All Codes was causing a zoomed-in image to shift.  This shifts it back!
         self.canvas.SendSizeEvent()
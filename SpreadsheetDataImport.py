@@ -57,6 +57,9 @@ import os
 # Import Python's sys module
 import sys
 
+# The number of participants whose Documents and Quotes are written to the database in each transaction
+IMPORT_BATCH_SIZE = 250
+
 
 class EditBoxFileDropTarget(wx.FileDropTarget):
     """ This simple derived class let's the user drop files onto an edit box """
@@ -766,8 +769,6 @@ class SpreadsheetDataImport(wiz.Wizard):
                 collection1.comment = unicode(_('Created during Spreadsheet Data Import for file "%s."'), 'utf8') % self.FileNamePage.txtSrcFileName.GetValue()
                 collection1.keyword_group = unicode(_('Auto-code'), 'utf8')
                 collection1.db_save()
-            # Signal that collections need to be added to the Database Tree
-            collectionsDisplayed = False
 
         # Get the Unique Identifier selected by the user
         id_col = self.ItemsToIncludePage.identifier.GetSelection() - 1
@@ -802,6 +803,46 @@ class SpreadsheetDataImport(wiz.Wizard):
             if DEBUG:
                 print "Prompts in Rows", ' Participants:', len(self.all_data), '  Questions:', len(self.all_data[0])
 
+        # Define and implement Demo Version limits.  (Documents are saved in bulk, so Document.db_save() can't check this.)
+        if TransanaConstants.demoVersion and (len(DBInterface.list_of_documents()) + numParticipants - 1 > TransanaConstants.maxDocuments):
+            prompt = unicode(_('The Transana Demonstration limits you to %d Document records.'), 'utf8')
+            errorDlg = Dialogs.ErrorDialog(self, prompt % TransanaConstants.maxDocuments)
+            errorDlg.ShowModal()
+            errorDlg.Destroy()
+            return
+        # Quotes are saved in bulk too, so Quote.db_save() can't check the Quote limit either.  Each participant
+        # gets one Quote per selected question.
+        if TransanaConstants.demoVersion and createQuote:
+            # Get a DB Cursor
+            c = DBInterface.get_db().cursor()
+            # Find out how many Quote records exist
+            c.execute('SELECT COUNT(QuoteNum) FROM Quotes2')
+            res = c.fetchone()
+            c.close()
+            if res[0] + (numParticipants - 1) * len(self.ItemsToIncludePage.questions.GetSelections()) > TransanaConstants.maxQuotes:
+                prompt = unicode(_('The Transana Demonstration limits you to %d Quote records.'), 'utf8')
+                errorDlg = Dialogs.ErrorDialog(self, prompt % TransanaConstants.maxQuotes)
+                errorDlg.ShowModal()
+                errorDlg.Destroy()
+                return
+
+        # Documents and Quotes are saved in batches using bulk inserts, so we check for duplicate names here rather
+        # than letting each save do it.  Get the IDs of the Documents and Episodes already in this Library.
+        existingIDs = set([docID for (docNum, docID, libNum) in DBInterface.list_of_documents(libraryNumber)])
+        existingIDs.update([episodeID for (episodeNum, episodeID, libNum) in DBInterface.list_of_episodes_for_series(library.id)])
+        # A dictionary of the Quote and Clip IDs in each Question Collection, by Collection Number
+        collectionItemIDs = {}
+        # A dictionary of the next Sort Order value for each Question Collection, by Collection Number
+        sortOrders = {}
+        # The Documents waiting to be saved, as a list of (Document, Quote List)
+        pending = []
+        # The Documents that have been saved, which need to be added to the Database Tree
+        saved = []
+        # The Keywords created during the import, which need to be added to the Database Tree
+        newKeywords = []
+        # The error message, if the import has to stop early
+        errorMsg = None
+
         # Note the number of questions in this spreadsheet file
         numQuestions = len(self.ItemsToIncludePage.questions.GetSelections())
         # Create a Progress Dialog to display progress through the questions for each participant
@@ -828,6 +869,12 @@ class SpreadsheetDataImport(wiz.Wizard):
             else:
                 participantID = self.strip_quotes(partID)
 
+            # Duplicate Document IDs, or Document IDs that match Episode IDs, within a Library are not allowed.
+            if participantID in existingIDs:
+                errorMsg = unicode(_('Problem saving Document %s.  Try using an empty Collection.'), 'utf8') % participantID
+                break
+            existingIDs.add(participantID)
+
             if DEBUG:
                 print "Participant %d of %d" % (participantCount - 1, numParticipants - 1)
 
@@ -868,6 +915,8 @@ class SpreadsheetDataImport(wiz.Wizard):
                     answer = self.strip_quotes(self.all_data[x][q])
                 # Increment Question Number (Numbering questions each time)
                 questionNum += 1
+                # Update the second (questions) progress indicator
+                progressDlg.Update(2, questionNum)
 
                 if DEBUG:
                     print '  ', participantID, 'of', numParticipants, " Q%05d" % questionNum, 'of', numQuestions
@@ -933,14 +982,25 @@ class SpreadsheetDataImport(wiz.Wizard):
                         finally:
                             # ... add it to the List of Collections
                             collections[questionNum] = collection2
+                            # ... note the Quotes and Clips it already contains ...
+                            collectionItemIDs[collection2.number] = set([item[1] for item in DBInterface.list_of_quotes_by_collectionnum(collection2.number)] + \
+                                                                        [item[1] for item in DBInterface.list_of_clips_by_collectionnum(collection2.number)])
+                            # ... and get its first available sort order value
+                            sortOrders[collection2.number] = DBInterface.getMaxSortOrder(collection2.number) + 1
 
                     # Determine the correct value for the sort order for THIS collection
-                    sortOrder = DBInterface.getMaxSortOrder(collection2.number) + 1
+                    sortOrder = sortOrders[collection2.number]
+                    sortOrders[collection2.number] += 1
 
                     # Create a new Quote
                     quote1 = Quote.Quote()
                     # Create a Quote ID from the Participant ID and the Question Number
                     quote1.id = participantID + unicode("  Q%04d" % questionNum, 'utf8')
+                    # Duplicate Quote IDs, or Quote IDs that match Clip IDs, within a Collection are not allowed.
+                    if quote1.id in collectionItemIDs[collection2.number]:
+                        errorMsg = unicode(_('Problem saving Question %s for %s.'), 'utf8') % (questionNum, participantID)
+                        break
+                    collectionItemIDs[collection2.number].add(quote1.id)
                     # Populate the Quote's Collection Number and Collection ID
                     quote1.collection_num = collection2.number
                     quote1.collection_id = collection2.id
@@ -998,6 +1058,10 @@ class SpreadsheetDataImport(wiz.Wizard):
                     # Add the quote to the Quote List.  Quotes will be completed and saved later.
                     quoteList.append(quote1)
 
+            # If a Quote could not be created, stop the import
+            if errorMsg != None:
+                break
+
             # Complete the Transana-XML document specification
             tmpDoc.text += """  </paragraphlayout>
 </richtext>
@@ -1057,13 +1121,8 @@ class SpreadsheetDataImport(wiz.Wizard):
                             keyword.definition = unicode(_('Created during Spreadsheet Data Import for file "%s."'), 'utf8') % self.FileNamePage.txtSrcFileName.GetValue()
                             # Try to save the keyword
                             keyword.db_save()
-                            # Add the new Keyword to the database tree
-                            self.treeCtrl.add_Node('KeywordNode', (_('Keywords'), keyword.keywordGroup, keyword.keyword), 0, keyword.keywordGroup)
-
-                            # Now let's communicate with other Transana instances if we're in Multi-user mode
-                            if not TransanaConstants.singleUserVersion:
-                                if TransanaGlobal.chatWindow != None:
-                                    TransanaGlobal.chatWindow.SendMessage("AK %s >|< %s" % (keyword.keywordGroup, keyword.keyword))
+                            # Remember the new Keyword so it can be added to the database tree
+                            newKeywords.append(keyword)
                     # If the Keyword Group HAS been defined ...
                     else:
                         # ... if the Keyword has NOT been defined ...
@@ -1082,35 +1141,76 @@ class SpreadsheetDataImport(wiz.Wizard):
                                 keyword.definition = unicode(_('Created during Spreadsheet Data Import for file "%s."'), 'utf8') % self.FileNamePage.txtSrcFileName.GetValue()
                                 # Try to save the Keyword
                                 keyword.db_save()
-                                # Add the new Keyword to the database tree
-                                self.treeCtrl.add_Node('KeywordNode', (_('Keywords'), keyword.keywordGroup, keyword.keyword), 0, keyword.keywordGroup)
-
-                                # Now let's communicate with other Transana instances if we're in Multi-user mode
-                                if not TransanaConstants.singleUserVersion:
-                                    if TransanaGlobal.chatWindow != None:
-                                        TransanaGlobal.chatWindow.SendMessage("AK %s >|< %s" % (keyword.keywordGroup, keyword.keyword))
+                                # Remember the new Keyword so it can be added to the database tree
+                                newKeywords.append(keyword)
 
-            # Prepare for a SaveError, just in case.  (The "finally" clause makes this necessary.)
-            saveError = False
-            # Try to save the new Document
+            # Documents and Quotes that are too large for the database would make their whole batch fail, so
+            # check them here, as Document.db_save() and Quote.db_save() do
             try:
-                tmpDoc.db_save()
-            # If there is a SaveError (duplicate name is most likely) ...
+                self.CheckImportSize(tmpDoc, quoteList)
             except TransanaExceptions.SaveError:
-                # Report the error to the user
                 prompt = unicode(_('Problem saving Document %s.  Try using an empty Collection.'), 'utf8')
-                errorDlg = Dialogs.ErrorDialog(self, prompt % participantID)
-                errorDlg.ShowModal()
-                errorDlg.Destroy()
-                # Note that we have a SaveError
-                saveError = True
-            
-            finally:
-                # If we had a SaveError ...
-                if saveError:
-                    # ... exit this module
-                    return
-                
+                errorMsg = prompt % participantID + u'\n%s' % sys.exc_info()[1].explanation
+                break
+
+            # Add the Document and its Quotes to the batch waiting to be saved
+            pending.append((tmpDoc, quoteList))
+            # If the batch is full ...
+            if len(pending) >= IMPORT_BATCH_SIZE:
+                # ... save it
+                errorMsg = self.SaveImportBatch(pending, libraryNumber, saved)
+                # If the batch could not be saved, stop the import
+                if errorMsg != None:
+                    break
+
+            if DEBUG:
+                print
+
+        # Save the last, partial batch.  If the import stopped early, the participants before the problem are still saved.
+        if len(pending) > 0:
+            batchErrorMsg = self.SaveImportBatch(pending, libraryNumber, saved)
+            if errorMsg == None:
+                errorMsg = batchErrorMsg
+
+        # Add the new records to the Database Tree in one pass, without redrawing the tree for each one
+        self.treeCtrl.Freeze()
+        try:
+            # For each new Keyword ...
+            for keyword in newKeywords:
+                # Add the new Keyword to the database tree
+                self.treeCtrl.add_Node('KeywordNode', (_('Keywords'), keyword.keywordGroup, keyword.keyword), 0, keyword.keywordGroup)
+
+                # Now let's communicate with other Transana instances if we're in Multi-user mode
+                if not TransanaConstants.singleUserVersion:
+                    if TransanaGlobal.chatWindow != None:
+                        TransanaGlobal.chatWindow.SendMessage("AK %s >|< %s" % (keyword.keywordGroup, keyword.keyword))
+
+            # If we're creating Quotes ...
+            if createQuote:
+                # Add the new Collection to the Database Tree
+                nodeData = (_('Collections'), collection1.id)
+                self.treeCtrl.add_Node('CollectionNode', nodeData, collection1.number, 0)
+
+                # Now let's communicate with other Transana instances if we're in Multi-user mode
+                if not TransanaConstants.singleUserVersion:
+                    if TransanaGlobal.chatWindow != None:
+                        TransanaGlobal.chatWindow.SendMessage("AC %s" % collection1.id)
+
+                # For each Question Collection in the List of Collections ...
+                for collectionKey in collections.keys():
+                    # ... get the Collection record ...
+                    collection = collections[collectionKey]
+                    # ... and add the new Collection to the Database Tree
+                    nodeData = (_('Collections'), collection1.id, collection.id)
+                    self.treeCtrl.add_Node('CollectionNode', nodeData, collection.number, collection.parent)
+
+                    # Now let's communicate with other Transana instances if we're in Multi-user mode
+                    if not TransanaConstants.singleUserVersion:
+                        if TransanaGlobal.chatWindow != None:
+                            TransanaGlobal.chatWindow.SendMessage("AC %s >|< %s" % (nodeData[-2], nodeData[-1]))
+
+            # For each Document that was saved ...
+            for (tmpDoc, quoteList) in saved:
                 # Add the new Document to the Database Tree
                 nodeData = (_('Libraries'), library.id, tmpDoc.id)
                 self.treeCtrl.add_Node('DocumentNode', nodeData, tmpDoc.number, library.number)
@@ -1120,73 +1220,18 @@ class SpreadsheetDataImport(wiz.Wizard):
                     if TransanaGlobal.chatWindow != None:
                         TransanaGlobal.chatWindow.SendMessage("AD %s >|< %s" % (nodeData[-2], nodeData[-1]))
 
-                # If we're creating Quotes ...
-                if createQuote:
-                    # ... and the Collections have not already been displayed ...
-                    if not collectionsDisplayed:
-                        # Get all items for the Collection and add them to the tree using add_Node!
-                        # Add the new Collection to the Database Tree
-                        nodeData = (_('Collections'), collection1.id)
-                        self.treeCtrl.add_Node('CollectionNode', nodeData, collection1.number, 0)
-
-                        # Now let's communicate with other Transana instances if we're in Multi-user mode
-                        if not TransanaConstants.singleUserVersion:
-                            if TransanaGlobal.chatWindow != None:
-                                TransanaGlobal.chatWindow.SendMessage("AC %s" % collection1.id)
-
-                        # For each Question Collection in the List of Collections ...
-                        for collectionKey in collections.keys():
-                            # ... get the Collection record ...
-                            collection = collections[collectionKey]
-                            # ... and add the new Collection to the Database Tree
-                            nodeData = (_('Collections'), collection1.id, collection.id)
-                            self.treeCtrl.add_Node('CollectionNode', nodeData, collection2.number, collection2.parent)
-
-                            # Now let's communicate with other Transana instances if we're in Multi-user mode
-                            if not TransanaConstants.singleUserVersion:
-                                if TransanaGlobal.chatWindow != None:
-                                    TransanaGlobal.chatWindow.SendMessage("AC %s >|< %s" % (nodeData[-2], nodeData[-1]))
-
-                        # We have not added the collections.  We don't need to do that again.
-                        collectionsDisplayed = True
-
-                    # Initialize a Quote Counter (for Progress Notification only)
-                    quoteNum = 0
-                    # For each Quote in the Quote List ...
-                    for quote in quoteList:
-                        # ... increment the Quote Counter
-                        quoteNum += 1
-
-                        if DEBUG:
-                            print "  Quote %d of %d" % (quoteNum, numQuestions)
-                        # Update the second (questions) progress indicator
-                        progressDlg.Update(2, quoteNum)
-
-                        # Add the Source Document Number to the Quote, now that the Document Number is known
-                        quote.source_document_num = tmpDoc.number
-                        # Start exception handling
-                        try:
-                            # Save the Quote
-                            quote.db_save()
-                        except TransanaExceptions.SaveError:
-                            prompt = unicode(_('Problem saving Question %s for %s.'), 'utf8')
-                            errorDlg = Dialogs.ErrorDialog(self, prompt % (quoteNum, participantID))
-                            errorDlg.ShowModal()
-                            errorDlg.Destroy()
-
-                            return
+                # For each Quote in the Document's Quote List ...
+                for quote in quoteList:
+                    # Add the new Quote to the Database Tree
+                    nodeData = (_('Collections'),) + collection1.GetNodeData() + (quote.collection_id, quote.id, )
+                    self.treeCtrl.add_Node('QuoteNode', nodeData, quote.number, quote.collection_num, sortOrder=quote.sort_order, avoidRecursiveYields=True)
 
-                        # Add the new Quote to the Database Tree
-                        nodeData = (_('Collections'),) + collection1.GetNodeData() + (quote.collection_id, quote.id, )
-                        self.treeCtrl.add_Node('QuoteNode', nodeData, quote.number, quote.collection_num, sortOrder=quote.sort_order, avoidRecursiveYields=True)
-
-                        # Now let's communicate with other Transana instances if we're in Multi-user mode
-                        if not TransanaConstants.singleUserVersion:
-                            if TransanaGlobal.chatWindow != None:
-                                TransanaGlobal.chatWindow.SendMessage("AQ %s >|< %s >|< %s" % (collection1.id, quote.collection_id, quote.id))
-
-                if DEBUG:
-                    print
+                    # Now let's communicate with other Transana instances if we're in Multi-user mode
+                    if not TransanaConstants.singleUserVersion:
+                        if TransanaGlobal.chatWindow != None:
+                            TransanaGlobal.chatWindow.SendMessage("AQ %s >|< %s >|< %s" % (collection1.id, quote.collection_id, quote.id))
+        finally:
+            self.treeCtrl.Thaw()
 
         # If there are auto-codes ...
         if len(self.all_codes) > 0:
@@ -1199,6 +1244,93 @@ class SpreadsheetDataImport(wiz.Wizard):
         # Destroy the Progress Dialog box
         progressDlg.Destroy()
 
+        # If the import stopped early, tell the user why
+        if errorMsg != None:
+            errorDlg = Dialogs.ErrorDialog(self, errorMsg)
+            errorDlg.ShowModal()
+            errorDlg.Destroy()
+
+    def CheckImportSize(self, tmpDoc, quoteList):
+        """ Raise a SaveError if a Document or any of its Quotes is too large for the database """
+        if (len(tmpDoc.text) > TransanaGlobal.max_allowed_packet):   # 8388000
+            raise TransanaExceptions.SaveError, _("This document is too large for the database.  Please shorten it, split it into two parts\nor if you are importing an RTF document, remove some unnecessary RTF encoding.")
+        for quote in quoteList:
+            if (len(quote.text) > TransanaGlobal.max_allowed_packet):   # 8388000
+                raise TransanaExceptions.SaveError, _("This quote is too large for the database.  Please shorten it, split it into two parts\nor if you are importing an RTF document, remove some unnecessary RTF encoding.")
+
+    def SaveImportBatch(self, batch, libraryNumber, saved):
+        """ Save a batch of (Document, Quote List) in a single transaction.  The batch is emptied, and if it is
+            saved, its contents are added to the saved list.  Returns None, or an error message if the batch
+            could not be saved. """
+        errorMsg = None
+        try:
+            DBInterface.RunInTransaction(self.WriteImportBatch, batch, libraryNumber)
+            saved.extend(batch)
+        # If the batch could not be saved, the transaction has been rolled back
+        except:
+            prompt = unicode(_('Problem saving Document %s.  Try using an empty Collection.'), 'utf8')
+            errorMsg = prompt % batch[0][0].id + u'\n%s' % sys.exc_info()[1]
+        # Empty the batch
+        del batch[:]
+        return errorMsg
+
+    def WriteImportBatch(self, batch, libraryNumber):
+        """ Write a batch of (Document, Quote List) to the database with bulk inserts, rather than saving each
+            object separately.  The new Document and Quote numbers are recorded in the objects.  Duplicate
+            names must already have been ruled out, and the Keywords must already exist. """
+
+        def Encode(value):
+            """ Encode strings before saving them, as Document.db_save() and Quote.db_save() do """
+            if ('unicode' in wx.PlatformInfo) and (value != None):
+                return value.encode(TransanaGlobal.encoding)
+            return value
+
+        # Insert the Documents
+        importDate = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        rows = []
+        for (tmpDoc, quoteList) in batch:
+            rows.append((Encode(tmpDoc.id), tmpDoc.library_num, Encode(tmpDoc.author), Encode(tmpDoc.comment), Encode(tmpDoc.imported_file),
+                         tmpDoc.document_length, tmpDoc.text, Encode(tmpDoc.plaintext), importDate))
+        DBInterface.BulkInsert('Documents2',
+                               ('DocumentID', 'LibraryNum', 'Author', 'Comment', 'ImportedFile', 'DocumentLength', 'XMLText', 'PlainText', 'ImportDate'),
+                               rows, 'LastSaveTime')
+
+        # Get the numbers the database assigned to the new Documents with a single query
+        docNums = {}
+        for (docNum, docID, libNum) in DBInterface.list_of_documents(libraryNumber):
+            docNums[docID] = docNum
+        # Insert the Quotes, and collect the Document Keywords
+        keywordRows = []
+        rows = []
+        for (tmpDoc, quoteList) in batch:
+            tmpDoc.number = docNums[tmpDoc.id]
+            for kws in tmpDoc.keyword_list:
+                keywordRows.append((0, tmpDoc.number, 0, 0, 0, Encode(kws.keywordGroup), Encode(kws.keyword), kws.example))
+            for quote in quoteList:
+                # Add the Source Document Number to the Quote, now that the Document Number is known
+                quote.source_document_num = tmpDoc.number
+                rows.append((Encode(quote.id), quote.collection_num, quote.source_document_num, quote.sort_order, Encode(quote.comment),
+                             quote.text, Encode(quote.plaintext)))
+        DBInterface.BulkInsert('Quotes2', ('QuoteID', 'CollectNum', 'SourceDocumentNum', 'SortOrder', 'Comment', 'XMLText', 'PlainText'),
+                               rows, 'LastSaveTime')
+
+        # Get the numbers the database assigned to the new Quotes with a single query
+        quoteNums = {}
+        for (quoteNum, quoteID, collectNum, sourceDocNum) in DBInterface.list_of_quotes_by_source_documents([tmpDoc.number for (tmpDoc, quoteList) in batch]):
+            quoteNums[(collectNum, quoteID)] = quoteNum
+        # Insert the Quote Positions, and collect the Quote Keywords
+        rows = []
+        for (tmpDoc, quoteList) in batch:
+            for quote in quoteList:
+                quote.number = quoteNums[(quote.collection_num, quote.id)]
+                rows.append((quote.number, quote.source_document_num, quote.start_char, quote.end_char))
+                for kws in quote.keyword_list:
+                    keywordRows.append((0, 0, 0, quote.number, 0, Encode(kws.keywordGroup), Encode(kws.keyword), kws.example))
+        DBInterface.BulkInsert('QuotePositions2', ('QuoteNum', 'DocumentNum', 'StartChar', 'EndChar'), rows)
+        # Insert the Document and Quote Keywords
+        DBInterface.BulkInsert('ClipKeywords2', ('EpisodeNum', 'DocumentNum', 'ClipNum', 'QuoteNum', 'SnapshotNum', 'KeywordGroup', 'Keyword', 'Example'),
+                               keywordRows)
+
     def OnHelp(self, evt):
         """ Method to use when the Help Button is pressed """
         # If the Menu Window is defined ...
@@ -0,0 +1,136 @@
+# Copyright (C) 2002 - 2017 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+""" This module measures where Transana's start-up time goes.  ImportTimer records how long each module
+    takes to import, both in total and excluding the modules it imports itself.  PhaseTimer records how
+    long each phase of start-up takes, and is used by "python Transana.py --profile-startup".  This module
+    does not import wxPython, so it can be installed before anything else is imported. """
+
+__author__ = 'David Woods <dwoods@transana.com>'
+
+# import Python's __builtin__ module
+import __builtin__
+# import Python's sys module
+import sys
+# import Python's time module
+import time
+
+
+class ImportTimer(object):
+    """ Times the first import of each module by temporarily replacing Python's import function """
+
+    def __init__(self):
+        """ Initialize the Import Timer """
+        # A dictionary of module name : (total import time, import time excluding nested imports)
+        self.times = {}
+        # The time spent in nested imports, for each import that is in progress
+        self.stack = []
+        # Python's own import function, while ours is installed
+        self.originalImport = None
+
+    def Install(self):
+        """ Start timing imports """
+        if self.originalImport == None:
+            self.originalImport = __builtin__.__import__
+            __builtin__.__import__ = self._Import
+
+    def Uninstall(self):
+        """ Stop timing imports """
+        if self.originalImport != None:
+            __builtin__.__import__ = self.originalImport
+            self.originalImport = None
+
+    def _Import(self, name, globals=None, locals=None, fromlist=None, level=-1):
+        """ The replacement import function """
+        # Modules that are already loaded cost nothing, so don't time them
+        if sys.modules.has_key(name):
+            return self.originalImport(name, globals, locals, fromlist, level)
+        self.stack.append(0.0)
+        startTime = time.time()
+        try:
+            return self.originalImport(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.time() - startTime
+            nestedTime = self.stack.pop()
+            # Charge this import's time to the import that caused it
+            if len(self.stack) > 0:
+                self.stack[-1] += elapsed
+            if not self.times.has_key(name):
+                self.times[name] = (elapsed, elapsed - nestedTime)
+
+    def GetResults(self, count=None):
+        """ Return a list of (module name, total time, time excluding nested imports), most expensive first.
+            If count is given, only that many modules are returned. """
+        results = [(name, total, own) for (name, (total, own)) in self.times.items()]
+        results.sort(key=lambda result: result[2], reverse=True)
+        if count != None:
+            results = results[:count]
+        return results
+
+    def PrintResults(self, count=30):
+        """ Print the most expensive imports to the console """
+        print "%-40s %10s %10s" % ('Module', 'Total (s)', 'Self (s)')
+        for (name, total, own) in self.GetResults(count):
+            print "%-40s %10.4f %10.4f" % (name, total, own)
+
+
+class PhaseTimer(object):
+    """ Records the wall time taken by each phase of Transana's start-up """
+
+    # The time we want Transana to take to reach an interactive window, in seconds
+    TARGET_TIME = 2.0
+
+    def __init__(self):
+        """ Initialize the Phase Timer.  Timing starts when the Phase Timer is created. """
+        self.startTime = time.time()
+        # The time the last phase ended
+        self.lastTime = self.startTime
+        # A list of (phase name, seconds) in the order the phases ran
+        self.phases = []
+
+    def Mark(self, phaseName):
+        """ Signal the end of a phase, which started when the previous phase ended """
+        now = time.time()
+        self.phases.append((phaseName, now - self.lastTime))
+        self.lastTime = now
+
+    def GetTotal(self):
+        """ Return the time from the start of timing to the end of the last phase """
+        return self.lastTime - self.startTime
+
+    def WriteReport(self, filename, importTimer=None, count=20):
+        """ Write the phase times to a text file.  If an ImportTimer is passed, its count most
+            expensive imports are included. """
+        total = self.GetTotal()
+        f = open(filename, 'w')
+        try:
+            f.write("Transana Start-up Profile  %s\n\n" % time.asctime())
+            f.write("%-40s %10s %8s\n" % ('Phase', 'Time (s)', '%'))
+            for (phaseName, elapsed) in self.phases:
+                f.write("%-40s %10.3f %7.1f%%\n" % (phaseName, elapsed, elapsed * 100.0 / max(total, 0.001)))
+            f.write("%-40s %10.3f\n\n" % ('Time to interactive window', total))
+            if total <= self.TARGET_TIME:
+                f.write("Within the %0.1f second target.\n" % self.TARGET_TIME)
+            else:
+                f.write("%0.3f seconds over the %0.1f second target.\n" % (total - self.TARGET_TIME, self.TARGET_TIME))
+            # Phases that wait for the user, such as the database login dialog, are included in the times above.
+            f.write("(Times include any time spent waiting for the user to respond to a dialog.)\n")
+            if importTimer != None:
+                f.write("\n%-40s %10s %10s\n" % ('Module', 'Total (s)', 'Self (s)'))
+                for (name, moduleTotal, own) in importTimer.GetResults(count):
+                    f.write("%-40s %10.4f %10.4f\n" % (name, moduleTotal, own))
+        finally:
+            f.close()
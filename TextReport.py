@@ -25,6 +25,10 @@
 
        When the object has been created, you THEN need to call the CallDisplay() method to populate the report.
 
+       If the displayMethod is a generator, the report is streamed.  Each time the displayMethod yields (a
+       percentage complete, or None), the report may be updated on screen, so the report can be read while it is
+       being built.  The rest of the report is built in batches between GUI events, and it can be stopped.
+
        For example:
         
             self.report = TextReport(self, title=_("Test Report"), displayMethod=self.OnDisplay, filterMethod=self.OnFilter,
@@ -43,6 +47,8 @@ if DEBUG:
 import os, sys
 # import Python's time module
 import time
+# import Python's types module
+import types
 # load wxPython for GUI
 import wx
 # import the wx.richtext framework
@@ -81,6 +87,9 @@ import platform
 # Menu Item and Toolbar Item for File > Filter
 M_FILE_FILTER        =  wx.NewId()
 T_FILE_FILTER        =  wx.NewId()
+# Menu Item and Toolbar Item for File > Stop
+M_FILE_STOP          =  wx.NewId()
+T_FILE_STOP          =  wx.NewId()
 # Menu Item and Toolbar Item for File > Edit
 M_FILE_EDIT          =  wx.NewId()
 T_FILE_EDIT          =  wx.NewId()
@@ -109,6 +118,9 @@ T_HELP_HELP          =  wx.NewId()
 T_SEARCH_BACK        =  wx.NewId()
 T_SEARCH_FORWARD     =  wx.NewId()
 
+# The number of seconds a streamed report is built for between screen updates
+DISPLAY_BATCH_TIME = 0.25
+
 class TextReport(wx.Frame):
     """ This is the main class for the Text Report infrastrucure.
         This infrastructure provides report editing, RTF export, and print preview/print services for
@@ -135,6 +147,12 @@ class TextReport(wx.Frame):
         self.helpContext = helpContext
         self.displayMethod = displayMethod
         self.filterMethod = filterMethod
+        # If the report is being streamed, the generator that is building it
+        self.displayGenerator = None
+        # The timer that builds the next batch of a streamed report
+        self.displayTimer = None
+        # The tools that are disabled while a report is being streamed
+        self.streamDisabledTools = []
         # Default the Control Object to None
         self.ControlObject = None
         # Determine the screen size for setting the initial dialog size
@@ -154,6 +172,10 @@ class TextReport(wx.Frame):
         if self.filterMethod != None:
             # ... and create a Filter button on the tool bar.
             self.toolBar.AddTool(T_FILE_FILTER, TransanaImages.ArtProv_LISTVIEW.GetBitmap(), shortHelpString=_("Filter"))
+        # Add a Stop button to the Toolbar, for stopping a report that is being built
+        self.toolBar.AddTool(T_FILE_STOP, TransanaImages.StopLightRed.GetBitmap(), shortHelpString=_("Stop"))
+        # Disable the Stop button until a report is being built
+        self.toolBar.EnableTool(T_FILE_STOP, False)
         # Add an Edit button  to the Toolbar
         self.toolBar.AddTool(T_FILE_EDIT, TransanaImages.ReadOnly16.GetBitmap(), isToggle=True, shortHelpString=_('Edit/Read-only select'))
         # ... and create a Format button on the tool bar.
@@ -212,6 +234,10 @@ class TextReport(wx.Frame):
             if self.filterMethod != None:
                 # ... add a Filter item to the File menu
                 self.menuFile.Append(M_FILE_FILTER, _("&Filter"), _("Filter report contents"))
+            # Add "Stop" to the File Menu
+            self.menuFile.Append(M_FILE_STOP, _("&Stop"), _("Stop building the report"))
+            # Disable the Stop Menu Option
+            self.menuFile.Enable(M_FILE_STOP, False)
             # Add "Edit" to the File Menu
             self.menuFile.Append(M_FILE_EDIT, _("&Edit"), _("Edit the report manually"))
             # Add "Font" to the File Menu
@@ -261,6 +287,8 @@ class TextReport(wx.Frame):
         if self.filterMethod != None:
             wx.EVT_MENU(self, M_FILE_FILTER, self.OnFilter)                           # Attach File > Filter to a method
             wx.EVT_MENU(self, T_FILE_FILTER, self.OnFilter)                           # Attach Toolbar Filter to a method
+        wx.EVT_MENU(self, M_FILE_STOP, self.OnStop)                                   # Attach OnStop to File > Stop
+        wx.EVT_MENU(self, T_FILE_STOP, self.OnStop)                                   # Attach OnStop to Toolbar Stop
         wx.EVT_MENU(self, M_FILE_EDIT, self.OnEdit)                                   # Attach OnEdit to File > Edit
         wx.EVT_MENU(self, T_FILE_EDIT, self.OnEdit)                                   # Attach OnEdit to Toolbar Edit
         wx.EVT_MENU(self, M_FILE_FONT, self.OnFont)                                   # Attach OnFont to File > Font
@@ -359,21 +387,143 @@ class TextReport(wx.Frame):
             # ... but if we're not on the Mac, disable it!
             self.menuFile.Enable(M_FILE_FONT, False)
 
+        # If an earlier report is still being built, stop it
+        self.CancelDisplay()
         # Clear the Report
         self.reportText.ClearDoc()
         # If a Display Method has been defined ...
         if self.displayMethod != None:
             # ... call it.
-            self.displayMethod(self.reportText)
+            result = self.displayMethod(self.reportText)
+            # If the Display Method is a generator, it has not written anything yet.  It yields as it writes the report.
+            if isinstance(result, types.GeneratorType):
+                # Keep the generator, so the report can be built in batches
+                self.displayGenerator = result
+                # Disable the tools that need the complete report, and enable the Stop tool
+                self.EnableStreamTools(False)
+                # Build the first batch of the report now
+                self.ContinueDisplay()
         # Move the cursor to the beginning of the report
         self.reportText.GotoPos(0)
         # Bring the Report to the top so it will definitely be visible
         self.Raise()
 
+    def ContinueDisplay(self):
+        """ Build the next batch of a streamed report """
+        # This batch's timer has fired
+        self.displayTimer = None
+        # If the report has been stopped, there's nothing to do
+        if self.displayGenerator == None:
+            return
+        # Note where the user is looking and where the cursor is, so adding to the report doesn't move them
+        viewStart = self.reportText.GetViewStart()
+        insertionPoint = self.reportText.GetInsertionPoint()
+        # Disable GUI updates while adding to the report text
+        self.reportText.Freeze()
+        try:
+            # The report is always added to at the end, even if the user has clicked in it
+            self.reportText.SelectNone()
+            self.reportText.MoveEnd()
+            # The report is read-only between batches
+            self.reportText.SetReadOnly(False)
+            # Initialize the progress and the signal that the report is complete
+            progress = None
+            finished = False
+            startTime = time.time()
+            try:
+                # Build the report until the batch time is used up
+                while time.time() - startTime < DISPLAY_BATCH_TIME:
+                    progress = self.displayGenerator.next()
+            # When the Display Method ends, the report is complete
+            except StopIteration:
+                finished = True
+            # If building the report fails, it can't be continued
+            except:
+                self.displayGenerator = None
+                self.EnableStreamTools(True)
+                raise
+            # Restore the cursor and the scroll position
+            self.reportText.SetInsertionPoint(insertionPoint)
+            self.reportText.Scroll(viewStart[0], viewStart[1])
+        finally:
+            # Re-enable GUI Updates, which shows the batch
+            self.reportText.Thaw()
+        # If the report is complete ...
+        if finished:
+            # ... we're done with the generator ...
+            self.displayGenerator = None
+            # ... restore the report tools ...
+            self.EnableStreamTools(True)
+            # ... and clear the progress
+            self.SetStatusText('')
+        # If there's more to the report ...
+        else:
+            # ... make the report read-only until the next batch ...
+            self.reportText.SetReadOnly(True)
+            # ... show the progress, if we have it ...
+            if progress != None:
+                if 'unicode' in wx.PlatformInfo:
+                    # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
+                    prompt = unicode(_('Assembling report contents'), 'utf8')
+                else:
+                    prompt = _('Assembling report contents')
+                self.SetStatusText('%s  %d%%' % (prompt, progress))
+            # ... and build the next batch after pending GUI events have been handled
+            self.displayTimer = wx.CallLater(1, self.ContinueDisplay)
+
+    def CancelDisplay(self):
+        """ Stop building a streamed report, leaving what has been built so far """
+        # If the next batch is scheduled, don't build it
+        if self.displayTimer != None:
+            self.displayTimer.Stop()
+            self.displayTimer = None
+        # If the report is being built ...
+        if self.displayGenerator != None:
+            # ... end the generator ...
+            self.displayGenerator.close()
+            self.displayGenerator = None
+            # ... make sure the report is read-only ...
+            self.reportText.SetReadOnly(True)
+            # ... and restore the report tools
+            self.EnableStreamTools(True)
+            self.SetStatusText('')
+
+    def EnableStreamTools(self, enable):
+        """ While a report is streamed, disable the tools that need the complete report and enable
+            the Stop tool.  When it's done, restore the tools. """
+        # If we're disabling tools ...
+        if not enable:
+            # ... note which of the Edit, Save As, Print Preview, and Print tools are enabled now
+            self.streamDisabledTools = []
+            for (toolId, menuId) in [(T_FILE_EDIT, M_FILE_EDIT), (T_FILE_SAVEAS, M_FILE_SAVEAS),
+                                     (T_FILE_PRINTPREVIEW, M_FILE_PRINTPREVIEW), (T_FILE_PRINT, M_FILE_PRINT)]:
+                if self.toolBar.GetToolEnabled(toolId):
+                    self.streamDisabledTools.append((toolId, menuId))
+        # Disable or restore the tools
+        for (toolId, menuId) in self.streamDisabledTools:
+            self.toolBar.EnableTool(toolId, enable)
+            # The Menu does not exist on the Mac
+            if not '__WXMAC__' in wx.PlatformInfo:
+                self.menuFile.Enable(menuId, enable)
+        # The Stop tool is only enabled while the report is being built
+        self.toolBar.EnableTool(T_FILE_STOP, not enable)
+        if not '__WXMAC__' in wx.PlatformInfo:
+            self.menuFile.Enable(M_FILE_STOP, not enable)
+        # If the tools have been restored, forget them
+        if enable:
+            self.streamDisabledTools = []
+
+    def OnStop(self, event):
+        """ Stop building the report """
+        self.CancelDisplay()
+
     def OnFilter(self, event):
         """ Call the parent method (passed in during initialization) that implements the Filter Dialog """
         # If a Filter Method has been defined ...
         if (self.filterMethod != None):
+            # If a report is being built, pause it while the Filter Dialog is showing
+            if self.displayTimer != None:
+                self.displayTimer.Stop()
             # Set a variable that signals the desire to continue (or not)
             contin = True
             # ... if the user has edited the report ...
@@ -396,6 +546,9 @@ class TextReport(wx.Frame):
                 self.reportText.Thaw()
                 # Since edits were lost, we can reset the report edit indicator.
                 self.reportEdited = False
+            # If the report wasn't rebuilt, continue building it
+            elif self.displayTimer != None:
+                self.displayTimer.Start()
 
     def OnEdit(self, event):
         """ Toggle the report's Editability.  It is read-only initially. """
@@ -776,6 +929,8 @@ class TextReport(wx.Frame):
 
     def OnClose(self, event):
         """ Handle the Close Event """
+        # If the report is still being built, stop it
+        self.CancelDisplay()
         # If the report has a defined Control Object ...
         if self.ControlObject != None:
             # ... remove this report from the Menu Window's Window Menu
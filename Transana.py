@@ -50,6 +50,16 @@ __author__ = 'David Woods <dwoods@transana.com>, Nathaniel Case'
 
 
 import sys                          # import Python's sys module
+# If start-up profiling has been requested, start timing before anything else is imported
+if '--profile-startup' in sys.argv:
+    import StartupProfiler
+    startupPhases = StartupProfiler.PhaseTimer()
+    startupImports = StartupProfiler.ImportTimer()
+    startupImports.Install()
+    sys.argv.remove('--profile-startup')
+else:
+    startupPhases = None
+    startupImports = None
 try:
     import wx                           # import wxPython's wxWindows implementation
 except ImportError, e:
@@ -99,6 +109,22 @@ if DEBUG:
     print
 
 
+def MarkStartupPhase(phaseName):
+    """ Signal the end of a start-up phase, if start-up profiling is on """
+    if startupPhases != None:
+        startupPhases.Mark(phaseName)
+
+def WriteStartupProfile():
+    """ Write the start-up profile report, if start-up profiling is on """
+    if startupPhases != None:
+        startupImports.Uninstall()
+        filename = os.path.join(TransanaGlobal.configData.GetDefaultProfilePath(), 'Transana_Startup.txt')
+        startupPhases.WriteReport(filename, startupImports)
+        print "Start-up profile (%0.3f seconds) written to %s" % (startupPhases.GetTotal(), filename)
+
+MarkStartupPhase('Module imports')
+
+
 class Transana(wx.App):
     """This class contains the main Transana application definition and the 
     logic that instantiates all other objects."""
@@ -207,6 +233,8 @@ class Transana(wx.App):
             if TransanaGlobal.programDir != '':
                 os.chdir(TransanaGlobal.programDir)
 
+        MarkStartupPhase('Configuration load')
+
         import MenuWindow                      # import Menu Window Object
 
         sys.excepthook = transana_excepthook        # Define the system exception handler
@@ -224,6 +252,7 @@ class Transana(wx.App):
             programTitle += _(" - Demonstration")
         # Create the Menu Window
         TransanaGlobal.menuWindow = MenuWindow.MenuWindow(None, -1, programTitle)
+        MarkStartupPhase('Menu Window creation')
 
         # Create the global transana graphics colors, once the ConfigData object exists.
         TransanaGlobal.transana_graphicsColorList = TransanaGlobal.getColorDefs(TransanaGlobal.configData.colorConfigFilename)
@@ -306,6 +335,7 @@ class Transana(wx.App):
                     _("Unable to load Transana's splash screen image.  Installation error?")
 
         wx.Yield()
+        MarkStartupPhase('Splash screen')
 
         if DEBUG:
             print "Number of Monitors:", wx.Display.GetCount()
@@ -326,6 +356,7 @@ class Transana(wx.App):
         if not TransanaConstants.singleUserVersion:
             # ... import the Transana ChatWindow module
             import ChatWindow
+        MarkStartupPhase('Window module imports')
         
         # Initialize all main application Window Objects
 
@@ -479,6 +510,8 @@ class Transana(wx.App):
                 if DEBUG:
                     print "Done importing Files"
 
+        MarkStartupPhase('Database initialization')
+
         # We can only continue if we initialized the database OR are running MU.
         if connectionEstablished:
             # If a new database login fails three times, we need to close the program.
@@ -494,6 +527,7 @@ class Transana(wx.App):
                 # NOTE:  The Menu Window must be created first to server as a parent for the Username and Password Dialog
                 #        called up by DBInterface.
                 if DBInterface.establish_db_exists():
+                    MarkStartupPhase('Database connection')
 
                     if DEBUG:
                         print "Creating Data Window",
@@ -502,6 +536,7 @@ class Transana(wx.App):
                     # Data Window creation causes Username and Password Dialog to be displayed,
                     # so it should be created before the Video Window
                     self.dataWindow = DataWindow.DataWindow(TransanaGlobal.menuWindow)
+                    MarkStartupPhase('Data Window and database tree')
 
                     if DEBUG:
                         print self.dataWindow.GetSize()
@@ -543,6 +578,7 @@ class Transana(wx.App):
                     self.videoWindow.Register(ControlObject=self.ControlObject)
                     self.transcriptWindow.Register(ControlObject=self.ControlObject)
                     self.visualizationWindow.Register(ControlObject=self.ControlObject)
+                    MarkStartupPhase('Window creation')
 
                     # Set the Application Top Window to the Menu Window (wxPython)
                     self.SetTopWindow(TransanaGlobal.menuWindow)
@@ -609,6 +645,9 @@ class Transana(wx.App):
                     self.ControlObject.UpdateWindowPositions('Visualization', w + x + 1, YUpper = h + y + 1)
 
                     TransanaGlobal.resizingAll = False
+                    MarkStartupPhase('Window display')
+                    # The windows are now interactive, so this is the end of start-up
+                    WriteStartupProfile()
 
                     loggedOn = True
                 # If logon fails, inform user and offer to try again twice.
@@ -93,6 +93,9 @@ encoding = 'utf8'
 
 # We need to know the MySQL version to know if UTF-8 is supported.  Initialize that here.
 DBVersion = 0
+# We need to know if MySQL supports InnoDB tables to create tables.  DBInterface.establish_db_exists() sets this
+# when a database is opened.  It has no meaning for sqlite, but the table creation queries need it defined.
+hasInnoDB = False
 
 # We need to know if we are doing a global resize of windows so we can know whether to fire
 # OnSize events or not.  (This helps avoid recursive resize calls.)
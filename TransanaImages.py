@@ -18,12 +18,49 @@
 
 __author__ = 'David Woods <dwoods@transana.com>'
 
+# import wxPython's embedded image class
+from wx.lib.embeddedimage import PyEmbeddedImage as _PyEmbeddedImage
+
+
+class PyEmbeddedImage(_PyEmbeddedImage):
+    """ An embedded image that is decoded the first time it is requested and remembered after that.
+        wxPython's PyEmbeddedImage decodes the image data again on every GetBitmap() call. """
+
+    def __init__(self, data, isBase64=True):
+        """ Initialize the image.  Nothing is decoded until the image is requested. """
+        _PyEmbeddedImage.__init__(self, data, isBase64)
+        self._bitmap = None
+        self._icon = None
+        self._image = None
+
+    def GetBitmap(self):
+        """ Return the image as a wx.Bitmap, decoding it if this is the first request """
+        if self._bitmap == None:
+            self._bitmap = _PyEmbeddedImage.GetBitmap(self)
+        return self._bitmap
+
+    def GetIcon(self):
+        """ Return the image as a wx.Icon, decoding it if this is the first request """
+        if self._icon == None:
+            self._icon = _PyEmbeddedImage.GetIcon(self)
+        return self._icon
+
+    def GetImage(self):
+        """ Return the image as a wx.Image, decoding it if this is the first request.  wx.Image methods such as
+            Rescale() change the image itself, so each caller gets its own copy. """
+        if self._image == None:
+            self._image = _PyEmbeddedImage.GetImage(self)
+        return self._image.Copy()
+
+    # The base class's properties are bound to its own methods, so they need to be redefined
+    Bitmap = property(GetBitmap)
+    Icon = property(GetIcon)
+    Image = property(GetImage)
+
 #----------------------------------------------------------------------
-# This file was generated by C:\Program Files (x86)\Python 26-32\Scripts\img2py
+# The images below were generated by C:\Program Files (x86)\Python 26-32\Scripts\img2py
 #
 
-from wx.lib.embeddedimage import PyEmbeddedImage
-
 ArtProv_BACK = PyEmbeddedImage(
     "iVBORw0KGgoAAAANSUhEUgAAABAAAAAQCAYAAAAf8/9hAAAABHNCSVQICAgIfAhkiAAAAglJ"
     "REFUOI2Fk01IVFEYhp9z7r3jOFagNfgTjBEVLQqEMr2LIpooIi2NfiAIWtamSVdt3URETKsQ"
@@ -40,6 +40,8 @@ import Transcript
 import DragAndDropObjects
 # Import Transana's Dialogs
 import Dialogs
+# import Transana's Image Cache
+import ImageCache
 # import Transana's Document object
 import Document
 # Import Transana's Episode and Clip Objects 
@@ -2092,57 +2094,12 @@ class TranscriptEditor(RichTextEditCtrl):
             
             # If we have NO SELECTION ...
             if self.GetSelection() == (-2, -2):
-                # Iterate through the Quote Dictionary
-                for key in self.TranscriptObj.quote_dict:
-                    # If the Quote Start is at or after the Cursor Position ...
-                    if self.TranscriptObj.quote_dict[key][0] >= position:
-                        # ... adjust the start position by the change in size
-                        self.TranscriptObj.quote_dict[key] = \
-                           (self.TranscriptObj.quote_dict[key][0] + sizeChange,
-                            self.TranscriptObj.quote_dict[key][1])
-                    # If the Quote End is at or after the Cursor Position ...
-                    # (We *MUST* maintain a quote size of at least one character!!)
-                    if (self.TranscriptObj.quote_dict[key][1] >= position) and \
-                       (self.TranscriptObj.quote_dict[key][1] - self.TranscriptObj.quote_dict[key][0] > 1):
-                        # ... adjust the end position by the change in size
-                        self.TranscriptObj.quote_dict[key] = \
-                           (self.TranscriptObj.quote_dict[key][0],
-                            self.TranscriptObj.quote_dict[key][1] + sizeChange)
+                # Adjust the Quotes at or after the Cursor Position
+                self.TranscriptObj.quote_dict.AdjustPositions(position, (-2, -2), sizeChange)
             # If we have a SELECTION ...
             else:
-                # Iterate through the Quote Dictionary
-                for key in self.TranscriptObj.quote_dict:
-                    # If the Quote Start is at or after the Selection End ...
-                    if self.TranscriptObj.quote_dict[key][0] >= selection[1]:
-                        # ... adjust the start position by the change in size
-                        self.TranscriptObj.quote_dict[key] = \
-                           (self.TranscriptObj.quote_dict[key][0] + sizeChange,
-                            self.TranscriptObj.quote_dict[key][1])
-                    # ELSE if the Quote Start is INSIDE the Selection ...
-                    elif (self.TranscriptObj.quote_dict[key][0] >= selection[0]) and \
-                         (self.TranscriptObj.quote_dict[key][0] < selection[1]):
-                        # ... adjust the start position by the change in size of the portion of the
-                        # selection inside the Quote's range
-                        self.TranscriptObj.quote_dict[key] = \
-                           (selection[0],
-                            self.TranscriptObj.quote_dict[key][1])
-
-                    # If the Quote End is at or after the Selection End ...
-                    # (We *MUST* maintain a quote size of at least one character!!)
-                    if (self.TranscriptObj.quote_dict[key][1] >= selection[1]) and \
-                       (self.TranscriptObj.quote_dict[key][1] - self.TranscriptObj.quote_dict[key][0] > 1):
-                        # ... adjust the end position by the change in size
-                        self.TranscriptObj.quote_dict[key] = \
-                           (self.TranscriptObj.quote_dict[key][0],
-                            self.TranscriptObj.quote_dict[key][1] + sizeChange)
-                    # ELSE if the Quote End is INSIDE the Selection ...
-                    elif (self.TranscriptObj.quote_dict[key][1] >= selection[0]) and \
-                         (self.TranscriptObj.quote_dict[key][1] < selection[1]):
-                        # ... adjust the end position by the change in size of the portion of the
-                        # selection inside the Quote's range
-                        self.TranscriptObj.quote_dict[key] = \
-                           (self.TranscriptObj.quote_dict[key][0],
-                            self.TranscriptObj.quote_dict[key][1] + sizeChange + (selection[1] - self.TranscriptObj.quote_dict[key][1]))
+                # Adjust the Quotes at or after the start of the Selection
+                self.TranscriptObj.quote_dict.AdjustPositions(position, selection, sizeChange)
             # Restore the original cursor position
 ## Position hasn't changed(?), and this messes up no-selection font formatting!!
 ##            self.SetCurrentPos(position)
@@ -3569,32 +3526,23 @@ class TranscriptEditor(RichTextEditCtrl):
             dlg.Destroy()
         # If an image file name is provided one way or the other ...
         if imgFile != None:
-            # Create a wxImage from the file
-            image = wx.Image(imgFile)
+            # If "Limit Image Width" is set to True in Configuration ...
+            if TransanaGlobal.configData.maxTranscriptImageWidth == 1:
+                # We need the SMALLER of an arbitrary maximum image width of 1024 and the current Transcript Window size
+                # (Adjust width for scrollbar size!)
+                maxWidth = min(1024, (self.GetSize()[0] - 20.0) * 0.98)
+            # If "Limit Image Width" is UNCHECKED in Configuration ...
+            else:
+                # We need the current Transcript Window size
+                # (Adjust width for scrollbar size!)
+                maxWidth = (self.GetSize()[0] - 20.0) * 0.98
+            # It doesn't make sense to limit the image's height.
+            # When we have multiple transcripts, window heights can be VERY small!
+            # Get the image from the Image Cache, rescaled with high quality to fit in the current Transcript window
+            # (but never enlarged), and the original dimensions of the image
+            (image, (imgWidth, imgHeight)) = ImageCache.GetImage(imgFile, maxWidth=maxWidth)
             # If the image imported okay ...
             if image.IsOk():
-                # Get the original dimensions of the image
-                imgWidth = image.GetWidth()
-                imgHeight = image.GetHeight()
-                # If "Limit Image Width" is set to True in Configuration ...
-                if TransanaGlobal.configData.maxTranscriptImageWidth == 1:
-                    # We need the SMALLER of an arbitrary maximum image width of 1024 and the current Transcript Window size
-                    # (Adjust width for scrollbar size!)
-                    maxWidth = min(1024, float(imgWidth), (self.GetSize()[0] - 20.0) * 0.98)
-                # If "Limit Image Width" is UNCHECKED in Configuration ...
-                else:
-                    # We need the SMALLER of the current image size and the current Transcript Window size
-                    # (Adjust width for scrollbar size!)
-                    maxWidth = min(float(imgWidth), (self.GetSize()[0] - 20.0) * 0.98)
-                # It doesn't make sense to limit the image's height.
-                # When we have multiple transcripts, window heights can be VERY small!
-                maxHeight = imgHeight  # min(float(imgHeight), self.GetSize()[1] * 0.98)
-                # Determine the scaling factor for adjusting the image size
-                scaleFactor = min(maxWidth / float(imgWidth), maxHeight / float(imgHeight))
-                # If the image needs to be re-scaled ...
-                if scaleFactor != 1.0:
-                    # ... rescale the image to fit in the current Transcript window.  Use slower high quality rescale.
-                    image.Rescale(int(imgWidth * scaleFactor), int(imgHeight * scaleFactor), quality=wx.IMAGE_QUALITY_HIGH)
                 # Add the image to the transcript
                 self.WriteImage(image)
                 # If we know the Snapshot Number ...
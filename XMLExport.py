@@ -36,16 +36,89 @@ import RichTextEditCtrl
 import cPickle
 import datetime
 import pickle
+# import Python's multiprocessing module, to determine the number of processors available
+import multiprocessing
 import os
+# import Python's Queue module, to distribute export sections among worker threads
+import Queue
 # import Python's Regular Expresions
 import re
+import shutil
 import sys
+import tempfile
+import threading
 
 # Set the encoding for export.
 # Use UTF-8 regardless of the current encoding for consistency in the Transana XML files
 EXPORT_ENCODING = 'utf8'
 ENCODE_PROPERLY = True
 
+# Parallel Export uses at most this many worker threads, each with its own database connection
+PARALLEL_MAX_THREADS = 4
+# Sections that take the longest to export (Documents, Quotes, Transcripts, Notes) are started first
+PARALLEL_HEAVY_SECTIONS = [2, 6, 10, 16]
+
+class MainThreadRequired(Exception):
+    """ Raised by a Parallel Export worker thread when a record can only be exported on the main thread,
+        such as a transcript that must be converted using the invisible RichTextCtrl """
+    pass
+
+class NullProgress(object):
+    """ Stand-in for the Progress Dialog used by Parallel Export worker threads, which must not touch the GUI """
+    def Update(self, *args):
+        return (True, False)
+
+    def Refresh(self):
+        pass
+
+class SectionExportThread(threading.Thread):
+    """ Parallel Export worker thread.  Takes section numbers from sectionQueue, writes each section to a
+        temporary file using its own database connection, and reports (sectionNum, tempFileName, errorInfo)
+        on resultQueue.  tempFileName is None if the section must be written on the main thread. """
+    def __init__(self, exporter, sectionQueue, resultQueue, tempDir):
+        # Initialize the Thread object
+        threading.Thread.__init__(self)
+        self.exporter = exporter
+        self.sectionQueue = sectionQueue
+        self.resultQueue = resultQueue
+        self.tempDir = tempDir
+
+    def run(self):
+        # Open this thread's own database connection.  If we can't, leave the sections for the main thread.
+        db = DBInterface.get_independent_db()
+        if db == None:
+            return
+        # If we're using sqlite ...
+        if TransanaConstants.DBInstalled in ['sqlite3']:
+            # ... use unicode rather than strings, as the main export connection does
+            db.text_factory = unicode
+        progress = NullProgress()
+        try:
+            while True:
+                # Get the next section to export, if there is one
+                try:
+                    sectionNum = self.sectionQueue.get_nowait()
+                except Queue.Empty:
+                    break
+                # Create a temporary file for the section
+                (fd, tempFileName) = tempfile.mkstemp(suffix='.tmp', prefix='TransanaExport', dir=self.tempDir)
+                f = os.fdopen(fd, 'wb')
+                try:
+                    self.exporter.WriteSection(f, db, progress, sectionNum)
+                    f.close()
+                    self.resultQueue.put((sectionNum, tempFileName, None))
+                except MainThreadRequired:
+                    f.close()
+                    os.remove(tempFileName)
+                    self.resultQueue.put((sectionNum, None, None))
+                except:
+                    f.close()
+                    os.remove(tempFileName)
+                    self.resultQueue.put((sectionNum, None, sys.exc_info()))
+                    break
+        finally:
+            db.close()
+
 class XMLExport(Dialogs.GenForm):
     """ This window displays a variety of GUI Widgets. """
     def __init__(self,parent,id,title):
@@ -113,6 +186,13 @@ class XMLExport(Dialogs.GenForm):
         self.contentCtrl.SetSelection(0)
         h2.Add(self.contentCtrl, 1, wx.EXPAND | wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
         mainSizer.Add(h2, 0, wx.EXPAND)
+
+        # Parallel Export writes sections on worker threads with their own database connections.
+        # The embedded MySQL server only supports a single connection.
+        self.parallelCtrl = wx.CheckBox(self.panel, -1, _('Use multiple processors to speed export'))
+        self.parallelCtrl.SetValue((multiprocessing.cpu_count() > 1) and (TransanaConstants.DBInstalled not in ['MySQLdb-embedded']))
+        self.parallelCtrl.Enable(TransanaConstants.DBInstalled not in ['MySQLdb-embedded'])
+        mainSizer.Add(self.parallelCtrl, 0, wx.EXPAND | wx.ALL, 5)
         
         # Add a vertical spacer to the main sizer        
         mainSizer.Add((0, 5))
@@ -315,269 +395,22 @@ class XMLExport(Dialogs.GenForm):
                 f.write('    1.7\n')
             f.write('  </TransanaXMLVersion>\n')
 
-            if self.contentCtrl.GetSelection() == 0:
-
-                progress.Update(self.CalcPercent(1), _('Writing Library Records'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    SQLText = 'SELECT SeriesNum, SeriesID, SeriesComment, SeriesOwner, DefaultKeywordGroup FROM Series2'
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <SeriesFile>\n')
-                        for seriesRec in data:
-                            self.WriteSeriesRec(f, seriesRec)
-                        f.write('  </SeriesFile>\n')
-                    dbCursor.close()
-
-                progress.Update(self.CalcPercent(2), _('Writing Document Records  (This will seem slow because of the size of the Document Records.)'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    SQLText = 'SELECT DocumentNum, DocumentID, LibraryNum, Author, Comment, ImportedFile, ImportDate, DocumentLength, XMLText FROM Documents2'
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <DocumentFile>\n')
-                        for documentRec in data:
-                            self.WriteDocumentRec(f, progress, documentRec)
-                        f.write('  </DocumentFile>\n')
-                    dbCursor.close()
-
-                progress.Update(self.CalcPercent(3), _('Writing Episode Records'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    SQLText = 'SELECT EpisodeNum, EpisodeID, SeriesNum, TapingDate, MediaFile, EpLength, EpComment FROM Episodes2'
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <EpisodeFile>\n')
-                        for episodeRec in data:
-                            self.WriteEpisodeRec(f, episodeRec)
-                        f.write('  </EpisodeFile>\n')
-                    dbCursor.close()
-
-                progress.Update(self.CalcPercent(4), _('Writing Core Data Records'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    SQLText = """SELECT CoreDataNum, Identifier, Title, Creator, Subject, Description, Publisher,
-                                        Contributor, DCDate, DCType, Format, Source, Language, Relation, Coverage, Rights
-                                        FROM CoreData2"""
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <CoreDataFile>\n')
-                        for coreDataRec in data:
-                            self.WriteCoreDataRec(f, coreDataRec)
-                        f.write('  </CoreDataFile>\n')
-                    dbCursor.close()
-
-                progress.Update(self.CalcPercent(5), _('Writing Collection Records'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    SQLText = 'SELECT CollectNum, CollectID, ParentCollectNum, CollectComment, CollectOwner, DefaultKeywordGroup FROM Collections2'
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <CollectionFile>\n')
-                        for collectionRec in data:
-                            self.WriteCollectionRec(f, collectionRec)
-                        f.write('  </CollectionFile>\n')
-                    dbCursor.close()
-
-                progress.Update(self.CalcPercent(6), _('Writing Quote Records'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    SQLText = 'SELECT QuoteNum, QuoteID, CollectNum, SourceDocumentNum, SortOrder, Comment, XMLText FROM Quotes2'
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <QuoteFile>\n')
-                        for quoteRec in data:
-                            self.WriteQuoteRec(f, quoteRec)
-                        f.write('  </QuoteFile>\n')
-                    dbCursor.close()
-
-                progress.Update(self.CalcPercent(7), _('Writing Quote Position Records'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    SQLText = 'SELECT QuoteNum, DocumentNum, StartChar, EndChar FROM QuotePositions2'
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <QuotePositionFile>\n')
-                        for quotePosRec in data:
-                            self.WriteQuotePosRec(f, quotePosRec)
-                        f.write('  </QuotePositionFile>\n')
-                    dbCursor.close()
-
-                progress.Update(self.CalcPercent(8), _('Writing Clip Records'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    SQLText = 'SELECT ClipNum, ClipID, CollectNum, EpisodeNum, MediaFile, ClipStart, ClipStop, ClipOffset, Audio, '
-                    SQLText += 'ClipComment, SortOrder FROM Clips2'
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <ClipFile>\n')
-                        for clipRec in data:
-                            self.WriteClipRec(f, clipRec)
-                        f.write('  </ClipFile>\n')
-                    dbCursor.close()
-
-                progress.Update(self.CalcPercent(9), _('Writing Additional Media File Records'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    SQLText = 'SELECT AddVidNum, EpisodeNum, ClipNum, MediaFile, VidLength, Offset, Audio FROM AdditionalVids2'
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <AdditionalVidsFile>\n')
-                        for additionalMediaFileRec in data:
-                            self.WriteAdditionalMediaFileRec(f, additionalMediaFileRec)
-                        f.write('  </AdditionalVidsFile>\n')
-                    dbCursor.close()
-
-                progress.Update(self.CalcPercent(10), _('Writing Transcript Records  (This will seem slow because of the size of the Transcript Records.)'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    dbCursor2 = db.cursor()
-                    # Load Transcript Information WITHOUT RTFText content, which requires too much memory in some large database
-                    # NOTE:  This will probably be a bit slower, but won't crash on databases with many, many images.
-                    SQLText = 'SELECT TranscriptNum, TranscriptID, EpisodeNum, SourceTranscriptNum, ClipNum, SortOrder, Transcriber, '
-                    SQLText += 'ClipStart, ClipStop, Comment, MinTranscriptWidth FROM Transcripts2'
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <TranscriptFile>\n')
-                        for transcriptRec in data:
-                            # Now load the RTFText on a Transcript by Transcript basis (to use less memory)
-                            SQLText2 = 'SELECT RTFText FROM Transcripts2 WHERE TranscriptNum = %s'
-                            SQLText2 = DBInterface.FixQuery(SQLText2)
-                            dbCursor2.execute(SQLText2, (transcriptRec[0],))
-                            rtfText = dbCursor2.fetchone()
-                            # Add the RTFText to the Transcript Record
-                            transcriptRec = transcriptRec + rtfText
-                            # Write the Transcript Record to the Export File
-                            self.WriteTranscriptRec(f, progress, transcriptRec)
-                        f.write('  </TranscriptFile>\n')
-                    dbCursor.close()
-
-                progress.Update(self.CalcPercent(11), _('Writing Snapshot Records'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    SQLText = 'SELECT SnapshotNum, SnapshotID, CollectNum, ImageFile, ImageScale, ImageCoordsX, ImageCoordsY, '
-                    SQLText += 'ImageSizeW, ImageSizeH, EpisodeNum, TranscriptNum, SnapshotTimeCode, SnapshotDuration, '
-                    SQLText += 'SnapshotComment, SortOrder FROM Snapshots2'
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <SnapshotFile>\n')
-                        for snapshotRec in data:
-                            self.WriteSnapshotRec(f, snapshotRec)
-                        f.write('  </SnapshotFile>\n')
-                    dbCursor.close()
-
-            progress.Update(self.CalcPercent(12), _('Writing Keyword Records'))
-            if db != None:
-                dbCursor = db.cursor()
-                SQLText = 'SELECT KeywordGroup, Keyword, Definition, LineColorName, LineColorDef, DrawMode, LineWidth, LineStyle FROM Keywords2'
-                dbCursor.execute(SQLText)
-                data = dbCursor.fetchall()
-                if len(data) > 0:
-                    f.write('  <KeywordFile>\n')
-                    for keywordRec in data:
-                        self.WriteKeywordRec(f, keywordRec)
-                    f.write('  </KeywordFile>\n')
-                dbCursor.close()
-
-            if self.contentCtrl.GetSelection() == 0:
-
-                progress.Update(self.CalcPercent(13), _('Writing Clip Keyword Records'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    SQLText = 'SELECT EpisodeNum, DocumentNum, ClipNum, QuoteNum, SnapshotNum, KeywordGroup, Keyword, Example FROM ClipKeywords2'
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <ClipKeywordFile>\n')
-                        for clipKeywordRec in data:
-                            self.WriteClipKeywordRec(f, clipKeywordRec)
-                        f.write('  </ClipKeywordFile>\n')
-                    dbCursor.close()
-
-                progress.Update(self.CalcPercent(14), _('Writing Snapshot Keywords Records'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    SQLText = 'SELECT SnapshotNum, KeywordGroup, Keyword, x1, y1, x2, y2, visible FROM SnapshotKeywords2'
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <SnapshotKeywordFile>\n')
-                        for snapshotKeywordRec in data:
-                            self.WriteSnapshotKeywordRec(f, snapshotKeywordRec)
-                        f.write('  </SnapshotKeywordFile>\n')
-                    dbCursor.close()
-
-                progress.Update(self.CalcPercent(15), _('Writing Snapshot Coding Style Records'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    SQLText = 'SELECT SnapshotNum, KeywordGroup, Keyword, DrawMode, LineColorName, LineColorDef, LineWidth, LineStyle '
-                    SQLText += 'FROM SnapshotKeywordStyles2'
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <SnapshotKeywordStyleFile>\n')
-                        for snapshotKeywordStyleRec in data:
-                            self.WriteSnapshotKeywordStyleRec(f, snapshotKeywordStyleRec)
-                        f.write('  </SnapshotKeywordStyleFile>\n')
-                    dbCursor.close()
-
-                progress.Update(self.CalcPercent(16), _('Writing Note Records'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    SQLText = 'SELECT NoteNum, NoteID, SeriesNum, EpisodeNum, CollectNum, ClipNum, SnapshotNum, DocumentNum, '
-                    SQLText += 'QuoteNum, TranscriptNum, NoteTaker, NoteText FROM Notes2'
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <NoteFile>\n')
-                        for noteRec in data:
-                            self.WriteNoteRec(f, noteRec)
-                        f.write('  </NoteFile>\n')
-                    dbCursor.close()
-
-                progress.Update(self.CalcPercent(17), _('Writing Synonym Records'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    SQLText = 'SELECT SynonymGroup, Synonym FROM Synonyms2'
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <SynonymFile>\n')
-                        for filterRec in data:
-                            self.WriteSynonymRec(f, filterRec)
-                        f.write('  </SynonymFile>\n')
-                    dbCursor.close()
-
-                progress.Update(self.CalcPercent(18), _('Writing Filter Records'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    SQLText = 'SELECT ReportType, ReportScope, ConfigName, FilterDataType, FilterData FROM Filters2'
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <FilterFile>\n')
-                        for filterRec in data:
-                            self.WriteFilterRec(f, filterRec)
-                        f.write('  </FilterFile>\n')
-                    dbCursor.close()
+            # Determine which sections to export, in the order in which they appear in the export file
+            sectionList = self.GetSectionList()
+            # If Parallel Export is requested, and there is more than one section to export ...
+            if self.parallelCtrl.GetValue() and (len(sectionList) > 1):
+                # ... export the sections using worker threads
+                self.ExportSectionsParallel(f, fs, db, progress, sectionList)
+            # Otherwise ...
+            else:
+                # ... export each section in turn
+                for sectionNum in sectionList:
+                    self.WriteSection(f, db, progress, sectionNum)
 
             f.write('</Transana>\n');
 
             f.flush()
 
-            dbCursor.close()
-            
         except:
 
             print sys.exc_info()[0]
@@ -599,7 +432,6 @@ class XMLExport(Dialogs.GenForm):
             if DEBUG or DEBUG2:
                 import traceback
                 traceback.print_exc(file=sys.stdout)
-            dbCursor.close()
         finally:
             # If we're using sqlite ...
             if TransanaConstants.DBInstalled in ['sqlite3']:
@@ -610,6 +442,321 @@ class XMLExport(Dialogs.GenForm):
         progress.Update(100)
         progress.Destroy()
 
+    def GetSectionList(self):
+        """ Return the list of Section Numbers to be exported, in the order in which they appear in the export file """
+        # A Full Database export includes all sections
+        if self.contentCtrl.GetSelection() == 0:
+            return range(1, 19)
+        # A Codebook export includes only the Keyword section
+        else:
+            return [12]
+
+    def WriteSection(self, f, db, progress, sectionNum):
+        """ Write a single section of the Transana-XML export file, identified by its Section Number, to file f
+            using database connection db """
+        if db == None:
+            return
+        dbCursor = db.cursor()
+        if sectionNum == 1:
+            progress.Update(self.CalcPercent(1), _('Writing Library Records'))
+            SQLText = 'SELECT SeriesNum, SeriesID, SeriesComment, SeriesOwner, DefaultKeywordGroup FROM Series2'
+            dbCursor.execute(SQLText)
+            data = dbCursor.fetchall()
+            if len(data) > 0:
+                f.write('  <SeriesFile>\n')
+                for seriesRec in data:
+                    self.WriteSeriesRec(f, seriesRec)
+                f.write('  </SeriesFile>\n')
+
+        elif sectionNum == 2:
+            progress.Update(self.CalcPercent(2), _('Writing Document Records  (This will seem slow because of the size of the Document Records.)'))
+            SQLText = 'SELECT DocumentNum, DocumentID, LibraryNum, Author, Comment, ImportedFile, ImportDate, DocumentLength, XMLText FROM Documents2'
+            dbCursor.execute(SQLText)
+            data = dbCursor.fetchall()
+            if len(data) > 0:
+                f.write('  <DocumentFile>\n')
+                for documentRec in data:
+                    self.WriteDocumentRec(f, progress, documentRec)
+                f.write('  </DocumentFile>\n')
+
+        elif sectionNum == 3:
+            progress.Update(self.CalcPercent(3), _('Writing Episode Records'))
+            SQLText = 'SELECT EpisodeNum, EpisodeID, SeriesNum, TapingDate, MediaFile, EpLength, EpComment FROM Episodes2'
+            dbCursor.execute(SQLText)
+            data = dbCursor.fetchall()
+            if len(data) > 0:
+                f.write('  <EpisodeFile>\n')
+                for episodeRec in data:
+                    self.WriteEpisodeRec(f, episodeRec)
+                f.write('  </EpisodeFile>\n')
+
+        elif sectionNum == 4:
+            progress.Update(self.CalcPercent(4), _('Writing Core Data Records'))
+            SQLText = """SELECT CoreDataNum, Identifier, Title, Creator, Subject, Description, Publisher,
+                                Contributor, DCDate, DCType, Format, Source, Language, Relation, Coverage, Rights
+                                FROM CoreData2"""
+            dbCursor.execute(SQLText)
+            data = dbCursor.fetchall()
+            if len(data) > 0:
+                f.write('  <CoreDataFile>\n')
+                for coreDataRec in data:
+                    self.WriteCoreDataRec(f, coreDataRec)
+                f.write('  </CoreDataFile>\n')
+
+        elif sectionNum == 5:
+            progress.Update(self.CalcPercent(5), _('Writing Collection Records'))
+            SQLText = 'SELECT CollectNum, CollectID, ParentCollectNum, CollectComment, CollectOwner, DefaultKeywordGroup FROM Collections2'
+            dbCursor.execute(SQLText)
+            data = dbCursor.fetchall()
+            if len(data) > 0:
+                f.write('  <CollectionFile>\n')
+                for collectionRec in data:
+                    self.WriteCollectionRec(f, collectionRec)
+                f.write('  </CollectionFile>\n')
+
+        elif sectionNum == 6:
+            progress.Update(self.CalcPercent(6), _('Writing Quote Records'))
+            SQLText = 'SELECT QuoteNum, QuoteID, CollectNum, SourceDocumentNum, SortOrder, Comment, XMLText FROM Quotes2'
+            dbCursor.execute(SQLText)
+            data = dbCursor.fetchall()
+            if len(data) > 0:
+                f.write('  <QuoteFile>\n')
+                for quoteRec in data:
+                    self.WriteQuoteRec(f, quoteRec)
+                f.write('  </QuoteFile>\n')
+
+        elif sectionNum == 7:
+            progress.Update(self.CalcPercent(7), _('Writing Quote Position Records'))
+            SQLText = 'SELECT QuoteNum, DocumentNum, StartChar, EndChar FROM QuotePositions2'
+            dbCursor.execute(SQLText)
+            data = dbCursor.fetchall()
+            if len(data) > 0:
+                f.write('  <QuotePositionFile>\n')
+                for quotePosRec in data:
+                    self.WriteQuotePosRec(f, quotePosRec)
+                f.write('  </QuotePositionFile>\n')
+
+        elif sectionNum == 8:
+            progress.Update(self.CalcPercent(8), _('Writing Clip Records'))
+            SQLText = 'SELECT ClipNum, ClipID, CollectNum, EpisodeNum, MediaFile, ClipStart, ClipStop, ClipOffset, Audio, '
+            SQLText += 'ClipComment, SortOrder FROM Clips2'
+            dbCursor.execute(SQLText)
+            data = dbCursor.fetchall()
+            if len(data) > 0:
+                f.write('  <ClipFile>\n')
+                for clipRec in data:
+                    self.WriteClipRec(f, clipRec)
+                f.write('  </ClipFile>\n')
+
+        elif sectionNum == 9:
+            progress.Update(self.CalcPercent(9), _('Writing Additional Media File Records'))
+            SQLText = 'SELECT AddVidNum, EpisodeNum, ClipNum, MediaFile, VidLength, Offset, Audio FROM AdditionalVids2'
+            dbCursor.execute(SQLText)
+            data = dbCursor.fetchall()
+            if len(data) > 0:
+                f.write('  <AdditionalVidsFile>\n')
+                for additionalMediaFileRec in data:
+                    self.WriteAdditionalMediaFileRec(f, additionalMediaFileRec)
+                f.write('  </AdditionalVidsFile>\n')
+
+        elif sectionNum == 10:
+            progress.Update(self.CalcPercent(10), _('Writing Transcript Records  (This will seem slow because of the size of the Transcript Records.)'))
+            dbCursor2 = db.cursor()
+            # Load Transcript Information WITHOUT RTFText content, which requires too much memory in some large database
+            # NOTE:  This will probably be a bit slower, but won't crash on databases with many, many images.
+            SQLText = 'SELECT TranscriptNum, TranscriptID, EpisodeNum, SourceTranscriptNum, ClipNum, SortOrder, Transcriber, '
+            SQLText += 'ClipStart, ClipStop, Comment, MinTranscriptWidth FROM Transcripts2'
+            dbCursor.execute(SQLText)
+            data = dbCursor.fetchall()
+            if len(data) > 0:
+                f.write('  <TranscriptFile>\n')
+                for transcriptRec in data:
+                    # Now load the RTFText on a Transcript by Transcript basis (to use less memory)
+                    SQLText2 = 'SELECT RTFText FROM Transcripts2 WHERE TranscriptNum = %s'
+                    SQLText2 = DBInterface.FixQuery(SQLText2)
+                    dbCursor2.execute(SQLText2, (transcriptRec[0],))
+                    rtfText = dbCursor2.fetchone()
+                    # Add the RTFText to the Transcript Record
+                    transcriptRec = transcriptRec + rtfText
+                    # Write the Transcript Record to the Export File
+                    self.WriteTranscriptRec(f, progress, transcriptRec)
+                f.write('  </TranscriptFile>\n')
+            dbCursor2.close()
+
+        elif sectionNum == 11:
+            progress.Update(self.CalcPercent(11), _('Writing Snapshot Records'))
+            SQLText = 'SELECT SnapshotNum, SnapshotID, CollectNum, ImageFile, ImageScale, ImageCoordsX, ImageCoordsY, '
+            SQLText += 'ImageSizeW, ImageSizeH, EpisodeNum, TranscriptNum, SnapshotTimeCode, SnapshotDuration, '
+            SQLText += 'SnapshotComment, SortOrder FROM Snapshots2'
+            dbCursor.execute(SQLText)
+            data = dbCursor.fetchall()
+            if len(data) > 0:
+                f.write('  <SnapshotFile>\n')
+                for snapshotRec in data:
+                    self.WriteSnapshotRec(f, snapshotRec)
+                f.write('  </SnapshotFile>\n')
+
+        elif sectionNum == 12:
+            progress.Update(self.CalcPercent(12), _('Writing Keyword Records'))
+            SQLText = 'SELECT KeywordGroup, Keyword, Definition, LineColorName, LineColorDef, DrawMode, LineWidth, LineStyle FROM Keywords2'
+            dbCursor.execute(SQLText)
+            data = dbCursor.fetchall()
+            if len(data) > 0:
+                f.write('  <KeywordFile>\n')
+                for keywordRec in data:
+                    self.WriteKeywordRec(f, keywordRec)
+                f.write('  </KeywordFile>\n')
+
+        elif sectionNum == 13:
+            progress.Update(self.CalcPercent(13), _('Writing Clip Keyword Records'))
+            SQLText = 'SELECT EpisodeNum, DocumentNum, ClipNum, QuoteNum, SnapshotNum, KeywordGroup, Keyword, Example FROM ClipKeywords2'
+            dbCursor.execute(SQLText)
+            data = dbCursor.fetchall()
+            if len(data) > 0:
+                f.write('  <ClipKeywordFile>\n')
+                for clipKeywordRec in data:
+                    self.WriteClipKeywordRec(f, clipKeywordRec)
+                f.write('  </ClipKeywordFile>\n')
+
+        elif sectionNum == 14:
+            progress.Update(self.CalcPercent(14), _('Writing Snapshot Keywords Records'))
+            SQLText = 'SELECT SnapshotNum, KeywordGroup, Keyword, x1, y1, x2, y2, visible FROM SnapshotKeywords2'
+            dbCursor.execute(SQLText)
+            data = dbCursor.fetchall()
+            if len(data) > 0:
+                f.write('  <SnapshotKeywordFile>\n')
+                for snapshotKeywordRec in data:
+                    self.WriteSnapshotKeywordRec(f, snapshotKeywordRec)
+                f.write('  </SnapshotKeywordFile>\n')
+
+        elif sectionNum == 15:
+            progress.Update(self.CalcPercent(15), _('Writing Snapshot Coding Style Records'))
+            SQLText = 'SELECT SnapshotNum, KeywordGroup, Keyword, DrawMode, LineColorName, LineColorDef, LineWidth, LineStyle '
+            SQLText += 'FROM SnapshotKeywordStyles2'
+            dbCursor.execute(SQLText)
+            data = dbCursor.fetchall()
+            if len(data) > 0:
+                f.write('  <SnapshotKeywordStyleFile>\n')
+                for snapshotKeywordStyleRec in data:
+                    self.WriteSnapshotKeywordStyleRec(f, snapshotKeywordStyleRec)
+                f.write('  </SnapshotKeywordStyleFile>\n')
+
+        elif sectionNum == 16:
+            progress.Update(self.CalcPercent(16), _('Writing Note Records'))
+            SQLText = 'SELECT NoteNum, NoteID, SeriesNum, EpisodeNum, CollectNum, ClipNum, SnapshotNum, DocumentNum, '
+            SQLText += 'QuoteNum, TranscriptNum, NoteTaker, NoteText FROM Notes2'
+            dbCursor.execute(SQLText)
+            data = dbCursor.fetchall()
+            if len(data) > 0:
+                f.write('  <NoteFile>\n')
+                for noteRec in data:
+                    self.WriteNoteRec(f, noteRec)
+                f.write('  </NoteFile>\n')
+
+        elif sectionNum == 17:
+            progress.Update(self.CalcPercent(17), _('Writing Synonym Records'))
+            SQLText = 'SELECT SynonymGroup, Synonym FROM Synonyms2'
+            dbCursor.execute(SQLText)
+            data = dbCursor.fetchall()
+            if len(data) > 0:
+                f.write('  <SynonymFile>\n')
+                for filterRec in data:
+                    self.WriteSynonymRec(f, filterRec)
+                f.write('  </SynonymFile>\n')
+
+        elif sectionNum == 18:
+            progress.Update(self.CalcPercent(18), _('Writing Filter Records'))
+            SQLText = 'SELECT ReportType, ReportScope, ConfigName, FilterDataType, FilterData FROM Filters2'
+            dbCursor.execute(SQLText)
+            data = dbCursor.fetchall()
+            if len(data) > 0:
+                f.write('  <FilterFile>\n')
+                for filterRec in data:
+                    self.WriteFilterRec(f, filterRec)
+                f.write('  </FilterFile>\n')
+
+        dbCursor.close()
+
+    def ExportSectionsParallel(self, f, fs, db, progress, sectionList):
+        """ Write the listed sections to file f using worker threads, each with its own database connection.
+            Each section is written to a temporary file, and the temporary files are then concatenated in
+            canonical order, so the result is identical to a serial export.  Sections a worker cannot
+            handle are written on the main thread using connection db. """
+        # Create a Queue of the sections to be exported, putting the largest sections first
+        sectionQueue = Queue.Queue()
+        for sectionNum in sorted(sectionList, key=lambda x: (x not in PARALLEL_HEAVY_SECTIONS, x)):
+            sectionQueue.put(sectionNum)
+        # Create a Queue for the results reported by the worker threads
+        resultQueue = Queue.Queue()
+        # Determine how many worker threads to use
+        numThreads = min(multiprocessing.cpu_count(), PARALLEL_MAX_THREADS, len(sectionList))
+        # Put the temporary section files next to the export file
+        tempDir = os.path.dirname(os.path.abspath(fs))
+        # Initialize a dictionary of completed section files
+        sectionFiles = {}
+        # Initialize the worker thread list
+        threads = []
+        try:
+            # Create and start the worker threads
+            for x in range(numThreads):
+                thread = SectionExportThread(self, sectionQueue, resultQueue, tempDir)
+                thread.start()
+                threads.append(thread)
+
+            # Initialize the count of sections processed
+            sectionsDone = 0
+            # While worker threads are still running, or there are results we haven't processed ...
+            while (len([t for t in threads if t.isAlive()]) > 0) or not resultQueue.empty():
+                try:
+                    (sectionNum, tempFileName, errorInfo) = resultQueue.get(True, 0.1)
+                except Queue.Empty:
+                    # Keep the Progress Dialog responsive while we wait
+                    progress.Update(self.CalcPercent(sectionsDone))
+                    continue
+                # If a worker raised an unexpected exception, re-raise it here
+                if errorInfo != None:
+                    raise errorInfo[0], errorInfo[1], errorInfo[2]
+                # If the section was written, remember its temporary file
+                if tempFileName != None:
+                    sectionFiles[sectionNum] = tempFileName
+                sectionsDone += 1
+                progress.Update(self.CalcPercent(sectionsDone), _('Writing %d of %d sections') % (sectionsDone, len(sectionList)))
+
+            # Now assemble the export file in canonical order
+            for sectionNum in sectionList:
+                # If a worker wrote this section ...
+                if sectionFiles.has_key(sectionNum):
+                    # ... copy its temporary file into the export file
+                    tempFile = file(sectionFiles[sectionNum], 'rb')
+                    shutil.copyfileobj(tempFile, f)
+                    tempFile.close()
+                # Otherwise, write the section here on the main thread.
+                else:
+                    self.WriteSection(f, db, progress, sectionNum)
+        finally:
+            # Stop any worker threads that are still running, and wait for them to finish
+            while not sectionQueue.empty():
+                try:
+                    sectionQueue.get_nowait()
+                except Queue.Empty:
+                    pass
+            for thread in threads:
+                thread.join()
+            # Make sure no result files are left behind by the worker threads
+            while not resultQueue.empty():
+                (sectionNum, tempFileName, errorInfo) = resultQueue.get_nowait()
+                if tempFileName != None:
+                    sectionFiles[sectionNum] = tempFileName
+            # Remove the temporary section files
+            for tempFileName in sectionFiles.values():
+                if os.path.exists(tempFileName):
+                    os.remove(tempFileName)
+
+    def YieldIfNeeded(self):
+        """ Allow the GUI to process events, but only when called from the main thread """
+        if wx.Thread_IsMain():
+            wx.YieldIfNeeded()
+
     def WriteXMLDTD(self, f):
         f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
         f.write('<!DOCTYPE TransanaData [\n')
@@ -915,7 +1062,7 @@ class XMLExport(Dialogs.GenForm):
 
             # On exporting old, huge databases, you can end up with hundreds of "Importing" popups.
             # This hopefully will allow them to close properly rather than building up.
-            wx.YieldIfNeeded()
+            self.YieldIfNeeded()
 
         f.write('    </Document>\n')
 
@@ -1169,7 +1316,7 @@ class XMLExport(Dialogs.GenForm):
 
             # On exporting old, huge databases, you can end up with hundreds of "Importing" popups.
             # This hopefully will allow them to close properly rather than building up.
-            wx.YieldIfNeeded()
+            self.YieldIfNeeded()
 
         f.write('    </Quote>\n')
 
@@ -1455,6 +1602,10 @@ class XMLExport(Dialogs.GenForm):
                 if DEBUG2:
                     print "RTF Type"
                     
+                # Converting RTF requires the invisible RichTextCtrl, which may only be used on the main thread
+                if not wx.Thread_IsMain():
+                    raise MainThreadRequired
+
                 # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
                 prompt1 = unicode(_('Writing Transcript Records  (This will seem slow because of the size of the Transcript Records.)'), 'utf8')
                 prompt2 = unicode(_('\nConverting %s'), 'utf8')
@@ -1493,6 +1644,10 @@ class XMLExport(Dialogs.GenForm):
                 if DEBUG2:
                     print "STC Type"
 
+                # Converting STC data requires the invisible controls, which may only be used on the main thread
+                if not wx.Thread_IsMain():
+                    raise MainThreadRequired
+
                 # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
                 prompt1 = unicode(_('Writing Transcript Records  (This will seem slow because of the size of the Transcript Records.)'), 'utf8')
                 prompt2 = unicode(_('\nConverting %s'), 'utf8')
@@ -1551,7 +1706,7 @@ class XMLExport(Dialogs.GenForm):
 
             # On exporting old, huge databases, you can end up with hundreds of "Converting RTF" popups.
             # This hopefully will allow them to close properly rather than building up.
-            wx.YieldIfNeeded()
+            self.YieldIfNeeded()
             
         f.write('    </Transcript>\n')
 
@@ -0,0 +1,150 @@
+# Copyright (C) 2002 - 2017 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+""" Tests for Transana's Database Interface.  Run them from the Transana folder with:
+
+        python -m unittest discover tests
+
+    DBInterface needs wxPython, so the tests are skipped if wxPython is not installed. """
+
+__author__ = 'David Woods <dwoods@transana.com>'
+
+# import Python's os module
+import os
+# import Python's shutil module
+import shutil
+# import Python's sys module
+import sys
+# import Python's tempfile module
+import tempfile
+# import Python's unittest module
+import unittest
+
+# Transana's modules are in the folder above this one
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# import wxPython, if it is installed
+try:
+    import wx
+except ImportError:
+    wx = None
+
+if wx != None:
+    # import Python's __builtin__ module
+    import __builtin__
+    # Define the "_" method, pointing it to wxPython's GetTranslation method
+    if not hasattr(__builtin__, '_'):
+        __builtin__._ = wx.GetTranslation
+    # import Transana's Database Interface
+    import DBInterface
+    # import Transana's Constants
+    import TransanaConstants
+    # import Transana's Global Variables
+    import TransanaGlobal
+    # Create a wx.App, which wxPython needs before the Configuration Data can be loaded
+    app = wx.App(False)
+    # import Transana's Configuration Data
+    import ConfigData
+    TransanaGlobal.configData = ConfigData.ConfigData()
+    # import Transana's Project Generator
+    import ProjectGenerator
+
+
+@unittest.skipIf(wx == None, 'wxPython is not installed')
+class ProcessDBDataForUTF8EncodingTest(unittest.TestCase):
+    """ ProcessDBDataForUTF8Encoding() must give the same results for MySQLdb data as the character by character
+        method it replaces, ProcessDBDataForUTF8EncodingByCharacter() """
+
+    def setUp(self):
+        # The whole-string decoding is only used for MySQLdb data
+        self.DBInstalled = TransanaConstants.DBInstalled
+        TransanaConstants.DBInstalled = 'MySQLdb-embedded'
+        # Latin-1 data changes the encoding, so note it
+        self.encoding = TransanaGlobal.encoding
+
+    def tearDown(self):
+        TransanaConstants.DBInstalled = self.DBInstalled
+        TransanaGlobal.encoding = self.encoding
+
+    def assertConforms(self, text, expected=None):
+        """ Check that both methods give the same result for text, of the same type, and leave the same
+            encoding.  If expected is given, the result must also be expected. """
+        TransanaGlobal.encoding = 'utf8'
+        result = DBInterface.ProcessDBDataForUTF8Encoding(text)
+        encoding = TransanaGlobal.encoding
+        TransanaGlobal.encoding = 'utf8'
+        resultByCharacter = DBInterface.ProcessDBDataForUTF8EncodingByCharacter(text)
+        self.assertEqual(result, resultByCharacter)
+        self.assertEqual(type(result), type(resultByCharacter))
+        self.assertEqual(encoding, TransanaGlobal.encoding)
+        if expected != None:
+            self.assertEqual(result, expected)
+
+    def testASCII(self):
+        self.assertConforms('', u'')
+        self.assertConforms('Keyword Group 1', u'Keyword Group 1')
+        self.assertConforms(u'Interview with Participant 3', u'Interview with Participant 3')
+
+    def testMultibyte(self):
+        # MySQLdb hands us the encoded bytes either as a string or as the characters of a unicode object
+        for data in ['\xe4\xba\xb0', u'\xe4\xba\xb0']:
+            self.assertConforms(data, u'\u4eb0')
+        # Two, three, and four byte characters mixed with ASCII
+        for data in ['Caf\xc3\xa9 \xe4\xba\xb0 \xf0\x9f\x98\x80 end', u'Caf\xc3\xa9 \xe4\xba\xb0 \xf0\x9f\x98\x80 end']:
+            self.assertConforms(data, u'Caf\xe9 \u4eb0 \U0001f600 end')
+
+    def testTruncatedMultibyte(self):
+        for data in ['abc\xe4\xba', u'abc\xe4\xba', '\xe4\xbaabc', 'Caf\xc3', '\xf0\x9f\x98']:
+            self.assertConforms(data)
+
+    def testInvalidMultibyte(self):
+        for data in ['\xff\xfe', '\xc3\x28', 'abc\x80def', u'\xc3\x28 abc', '\xed\xa0\x80']:
+            self.assertConforms(data)
+
+    def testLatin1(self):
+        # Latin-1 data from Transana 2.05 and earlier
+        for data in ['caf\xe9', u'caf\xe9', 'na\xefve r\xe9sum\xe9', u'\xc5ngstr\xf6m']:
+            self.assertConforms(data)
+
+    def testNotAString(self):
+        self.assertConforms(None)
+        self.assertConforms(5)
+
+
+@unittest.skipIf((wx == None) or (TransanaConstants.DBInstalled != 'sqlite3'),
+                 'wxPython is not installed, or this is not an sqlite version of Transana')
+class CheckQueryPlansTest(unittest.TestCase):
+    """ The frequently-run queries in DBInterface.INDEXED_QUERIES must be able to use an index on a database
+        created by Transana """
+
+    def setUp(self):
+        # Create a small generated project in a new database file
+        self.tempDir = tempfile.mkdtemp()
+        ProjectGenerator.CreateSQLiteDatabase(os.path.join(self.tempDir, 'Generated.db'))
+        self.counts = ProjectGenerator.ProjectGenerator({'libraries' : 2, 'keywords' : 20}).Generate()
+
+    def tearDown(self):
+        DBInterface.close_db()
+        shutil.rmtree(self.tempDir, True)
+
+    def testNoTableScans(self):
+        # Make sure the project has data for the query planner to look at
+        self.assertTrue(self.counts['Clips2'] > 0)
+        self.assertEqual(DBInterface.CheckQueryPlans(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
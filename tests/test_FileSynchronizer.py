@@ -0,0 +1,83 @@
+# Copyright (C) 2002 - 2017 Spurgeon Woods LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 2 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+
+""" Tests for Transana's File Synchronizer.  FileSynchronizer needs wxPython, so the tests are skipped
+    if wxPython is not installed. """
+
+__author__ = 'David Woods <dwoods@transana.com>'
+
+# import Python's os module
+import os
+# import Python's shutil module
+import shutil
+# import Python's sys module
+import sys
+# import Python's tempfile module
+import tempfile
+# import Python's unittest module
+import unittest
+
+# Transana's modules are in the folder above this one
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# import wxPython, if it is installed
+try:
+    import wx
+except ImportError:
+    wx = None
+
+if wx != None:
+    # import Transana's File Synchronizer
+    import FileSynchronizer
+
+
+@unittest.skipIf(wx == None, 'wxPython is not installed')
+class LocalManifestTest(unittest.TestCase):
+    """ The local manifest must skip the same hidden files and directories as the sFTP manifest, or they are
+        copied again on every synchronization """
+
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempDir, True)
+
+    def WriteFile(self, *path):
+        """ Create a small file in the temporary folder """
+        outFile = open(os.path.join(self.tempDir, *path), 'wb')
+        outFile.write('data')
+        outFile.close()
+
+    def testHiddenFileGivesEmptyDelta(self):
+        self.WriteFile('.hidden')
+        os.mkdir(os.path.join(self.tempDir, '.hiddenDir'))
+        self.WriteFile('.hiddenDir', 'file.txt')
+        manifest = FileSynchronizer.BuildLocalManifest(self.tempDir)
+        self.assertEqual(manifest, ([], {}))
+        self.assertEqual(FileSynchronizer.ComputeDelta(manifest, ([], {})), ([], []))
+
+    def testVisibleFilesAreListed(self):
+        self.WriteFile('.hidden')
+        os.mkdir(os.path.join(self.tempDir, 'media'))
+        self.WriteFile('media', 'video.mp4')
+        self.WriteFile('media', '.DS_Store')
+        (dirs, files) = FileSynchronizer.BuildLocalManifest(self.tempDir)
+        self.assertEqual(dirs, ['media'])
+        self.assertEqual(files.keys(), ['media/video.mp4'])
+
+
+if __name__ == '__main__':
+    unittest.main()